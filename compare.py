@@ -4,10 +4,15 @@ import collections
 import datetime
 import functools
 import itertools
-import json
 import multiprocessing
 import os
 import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "ird"))
+import elf_utils
+import git_cache_utils
+import profile_utils
+import serialization_utils
+import trace_utils
 
 import paramiko
 from fabric import Connection
@@ -51,6 +56,7 @@ def setup_rtl_environment(hostname, remote_dir_path, username = None, remote_dir
             print(f"- executing: {cmd}")
             conn.run(cmd, warn = warn_flag, pty = True)
 
+@trace_utils.traced("get_test_names_from_rtl_test_bench", args = ())
 def get_test_names_from_rtl_test_bench(args):
     """
     1. copy tests directory locally.
@@ -90,10 +96,8 @@ def get_test_names_from_rtl_test_bench(args):
             if None == suites:
                 return None
 
-            import yaml
-
             with open(proj_yml) as stream:
-                proj = yaml.safe_load(stream)
+                proj = serialization_utils.yaml_io.load(stream)
                 suites_key_str = "suites"
                 if not suites_key_str in proj.keys():
                     raise Exception(f"- error: no {suites_key_str} found in file {proj_yml}")
@@ -143,7 +147,6 @@ def get_test_names_from_rtl_test_bench(args):
 
         def get_tests_with_tags_from_files(yml_files, tags, local_infra_dir):
             import re
-            import yaml
 
             tests_str = "tests"
             tests = set()
@@ -152,7 +155,7 @@ def get_test_names_from_rtl_test_bench(args):
                 yml_file_incl_path = get_yml_file_name_incl_path(local_infra_dir, yml_file)
 
                 with open(yml_file_incl_path) as stream:
-                    yml = yaml.safe_load(stream)
+                    yml = serialization_utils.yaml_io.load(stream)
 
                     if tests_str in yml.keys():
                         for test in yml[tests_str]:
@@ -220,15 +223,12 @@ def get_test_names_from_rtl_test_bench(args):
 
     if not os.path.isdir(local_infra_dir):
         print(f"+ Copying ws-tensix/infra directory locally")
-        os.chdir(local_rtl_dir)
         with Connection(hostname, user = username) as conn:
             remote_dir_incl_path  = os.path.join(remote_dir_path, remote_dir)
             infra_dir_incl_path   = os.path.join(remote_dir_incl_path, infra_dir)
-            cmd = f"rsync -az {username}@{hostname}:{infra_dir_incl_path} ."
+            cmd = f"rsync -az {username}@{hostname}:{infra_dir_incl_path} {os.path.abspath(local_rtl_dir)}"
             print(f"+ Executing command: {cmd}")
             conn.local(cmd)
-
-        os.chdir("..")
     else:
         print(f"+ Directory {local_infra_dir} exists locally")
 
@@ -282,36 +282,35 @@ def get_instructions_throughput(rtl_args, t3sim_args):
 
     def get_instructions_throughput(file_name):
         mnemonics_tpt = dict()
-        with open(file_name, 'r') as file:
-            data = json.load(file)
+        data = serialization_utils.json_io.load_file(file_name)
 
-            engines_str = "engines"
-            engineInstructions_str = "engineInstructions"
-            tpt_str = "tpt"
-            name_str = "name"
-            tpt_keys_str = sorted(["int32", "bf16", "fp16", "fp32", "fp64"])
+        engines_str = "engines"
+        engineInstructions_str = "engineInstructions"
+        tpt_str = "tpt"
+        name_str = "name"
+        tpt_keys_str = sorted(["int32", "bf16", "fp16", "fp32", "fp64"])
 
-            if not engines_str in data.keys():
-                raise Exception(f"- could not find key {engines_str} in file {file_name}")
+        if not engines_str in data.keys():
+            raise Exception(f"- could not find key {engines_str} in file {file_name}")
 
-            engines = data[engines_str]
-            for engine in engines:
-                if engineInstructions_str not in engine.keys():
-                    raise Exception(f"- error: could not find key {engineInstructions_str} in engine: {engine}")
+        engines = data[engines_str]
+        for engine in engines:
+            if engineInstructions_str not in engine.keys():
+                raise Exception(f"- error: could not find key {engineInstructions_str} in engine: {engine}")
 
-                instructions = engine[engineInstructions_str]
-                for instruction in instructions:
-                    if tpt_str not in instruction.keys():
-                        raise Exception(f"- error: could not find key {tpt_str} in instruction {instruction} in engine {engine}")
+            instructions = engine[engineInstructions_str]
+            for instruction in instructions:
+                if tpt_str not in instruction.keys():
+                    raise Exception(f"- error: could not find key {tpt_str} in instruction {instruction} in engine {engine}")
 
-                    if name_str not in instruction.keys():
-                        raise Exception(f"- error: could not find key {name_str} in instruction {instruction} in engine {engine}")
+                if name_str not in instruction.keys():
+                    raise Exception(f"- error: could not find key {name_str} in instruction {instruction} in engine {engine}")
 
-                    tpt = instruction[tpt_str]
-                    if sorted(tpt.keys()) != tpt_keys_str:
-                        raise Exception(f"- error: tpt key mismatch. expected: {tpt_keys_str}, received: {sorted(tpt.keys())}")
+                tpt = instruction[tpt_str]
+                if sorted(tpt.keys()) != tpt_keys_str:
+                    raise Exception(f"- error: tpt key mismatch. expected: {tpt_keys_str}, received: {sorted(tpt.keys())}")
 
-                    mnemonics_tpt[instruction[name_str]] = tpt
+                mnemonics_tpt[instruction[name_str]] = tpt
 
         return mnemonics_tpt
 
@@ -319,6 +318,8 @@ def get_instructions_throughput(rtl_args, t3sim_args):
     print(f"- mnemonics and throughput will be obtained from file: {file_name_incl_path}")
     return get_instructions_throughput(file_name_incl_path)
 
+@trace_utils.traced("execute_rtl_test")
+@profile_utils.profiled
 def execute_rtl_test(test, hostname, username, remote_dir_path, remote_dir, debug_dir, test_dir_suffix, log_file_suffix, warn_flag):
         import os
 
@@ -350,6 +351,8 @@ def execute_rtl_test(test, hostname, username, remote_dir_path, remote_dir, debu
                     "exit_code" : result.exited
                     }
 
+@trace_utils.traced("copy_rtl_test_data")
+@profile_utils.profiled
 def copy_rtl_test_data(test, hostname, username, remote_dir_path, remote_dir, debug_dir, test_dir_suffix, local_test_data_dir):
     # print(f"copy rtl test data. test: {test}")
     with Connection(hostname, user = username) as conn:
@@ -361,6 +364,7 @@ def copy_rtl_test_data(test, hostname, username, remote_dir_path, remote_dir, de
         print(f"+ Executing command {cmd}")
         conn.local(cmd)
 
+@trace_utils.traced("execute_rtl_tests", args = ())
 def execute_rtl_tests(tests, args):
     import os
 
@@ -442,15 +446,18 @@ def execute_rtl_tests(tests, args):
 
     return test_results
 
+@trace_utils.traced("execute_t3sim_test")
+@profile_utils.profiled
 def execute_t3sim_test(test, t3sim_args):
     binutils_dir = t3sim_args["binutils_dir"] if "binutils_dir" in t3sim_args.keys() else "binutils-playground"
     t3sim_dir    = t3sim_args["sim_dir"]      if "sim_dir"      in t3sim_args.keys() else "t3sim"
 
     import os
     import sys
-    sys.path.append(f'./{t3sim_dir}')
-    sys.path.append(f'{os.path.join(t3sim_dir, binutils_dir, "py")}')
-    import read_elf
+    for path in [os.path.abspath(t3sim_dir), os.path.abspath(os.path.join(t3sim_dir, binutils_dir, "py"))]:
+        if path not in sys.path: # once per process, not once per test
+            sys.path.append(path)
+
     import decoded_instruction
     import subprocess
     import tensix
@@ -555,8 +562,7 @@ def execute_t3sim_test(test, t3sim_args):
         # t3sim.print_json(input_cfg_dict, f"t3sim_inputcfg_{test_name}.json")
         # print("**************** file to write: ", file_name)
         file_name = os.path.join(cfg_dir, f"t3sim_inputcfg_{test_name}.json")
-        with open(file_name, 'w') as file:
-            json.dump(input_cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(input_cfg_dict, file_name, indent = 2)
 
         return input_cfg_dict
 
@@ -567,19 +573,8 @@ def execute_t3sim_test(test, t3sim_args):
             if not os.path.exists(test_dir):
                 raise Exception(f"- error: {test_dir} does not exist. AAAA")
 
-            os_walk = os.walk(test_dir)
-            ttx_kinds = set()
-            for pwd, _, files in os_walk:
-                for file in files:
-                    if file.endswith(".elf"):
-                        for kind in read_elf.get_instruction_kinds(os.path.join(pwd, file)):
-                            if kind.is_tensix():
-                                ttx_kinds.add(kind)
-
-            if 1 != len(ttx_kinds):
-                raise Exception(f"- error: expected one tensix instruction kind, received {len(ttx_kinds)}, kinds: {ttx_kinds}")
-
-            return list(ttx_kinds)[0]
+            # kind from the arch attribute of the ELFs, decoded only if an ELF has none (elf_utils)
+            return decoded_instruction.instruction_kind[elf_utils.get_tensix_instruction_kind(elf_utils.get_elf_file_names([test_dir]))]
 
         def update_engines(engines, delay, cfg):
             cfg_engines_value = []
@@ -753,8 +748,7 @@ def execute_t3sim_test(test, t3sim_args):
 
         # t3sim.print_json(cfg_dict, f"t3sim_cfg_{test}.json")
         file_name = os.path.join(cfg_dir, f"t3sim_cfg_{test}.json")
-        with open(file_name, "w") as file:
-            json.dump(cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(cfg_dict, file_name, indent = 2)
 
         return cfg_dict
 
@@ -765,19 +759,8 @@ def execute_t3sim_test(test, t3sim_args):
             if not os.path.exists(test_dir):
                 raise Exception(f"- error: {test_dir} does not exist. AAAA")
 
-            os_walk = os.walk(test_dir)
-            ttx_kinds = set()
-            for pwd, _, files in os_walk:
-                for file in files:
-                    if file.endswith(".elf"):
-                        for kind in read_elf.get_instruction_kinds(os.path.join(pwd, file)):
-                            if kind.is_tensix():
-                                ttx_kinds.add(kind)
-
-            if 1 != len(ttx_kinds):
-                raise Exception(f"- error: expected one tensix instruction kind, received {len(ttx_kinds)}, kinds: {ttx_kinds}")
-
-            return list(ttx_kinds)[0]
+            # kind from the arch attribute of the ELFs, decoded only if an ELF has none (elf_utils)
+            return decoded_instruction.instruction_kind[elf_utils.get_tensix_instruction_kind(elf_utils.get_elf_file_names([test_dir]))]
 
         def update_engines(engines, mnemonics_tpt, delay, cfg):
             cfg_engines_value = []
@@ -939,36 +922,35 @@ def execute_t3sim_test(test, t3sim_args):
 
             def get_instructions_throughput(file_name):
                 mnemonics_tpt = dict()
-                with open(file_name, 'r') as file:
-                    data = json.load(file)
+                data = serialization_utils.json_io.load_file(file_name)
 
-                    engines_str = "engines"
-                    engineInstructions_str = "engineInstructions"
-                    tpt_str = "tpt"
-                    name_str = "name"
-                    tpt_keys_str = sorted(["int32", "bf16", "fp16", "fp32", "fp64"])
+                engines_str = "engines"
+                engineInstructions_str = "engineInstructions"
+                tpt_str = "tpt"
+                name_str = "name"
+                tpt_keys_str = sorted(["int32", "bf16", "fp16", "fp32", "fp64"])
 
-                    if not engines_str in data.keys():
-                        raise Exception(f"- could not find key {engines_str} in file {file_name}")
+                if not engines_str in data.keys():
+                    raise Exception(f"- could not find key {engines_str} in file {file_name}")
 
-                    engines = data[engines_str]
-                    for engine in engines:
-                        if engineInstructions_str not in engine.keys():
-                            raise Exception(f"- error: could not find key {engineInstructions_str} in engine: {engine}")
+                engines = data[engines_str]
+                for engine in engines:
+                    if engineInstructions_str not in engine.keys():
+                        raise Exception(f"- error: could not find key {engineInstructions_str} in engine: {engine}")
 
-                        instructions = engine[engineInstructions_str]
-                        for instruction in instructions:
-                            if tpt_str not in instruction.keys():
-                                raise Exception(f"- error: could not find key {tpt_str} in instruction {instruction} in engine {engine}")
+                    instructions = engine[engineInstructions_str]
+                    for instruction in instructions:
+                        if tpt_str not in instruction.keys():
+                            raise Exception(f"- error: could not find key {tpt_str} in instruction {instruction} in engine {engine}")
 
-                            if name_str not in instruction.keys():
-                                raise Exception(f"- error: could not find key {name_str} in instruction {instruction} in engine {engine}")
+                        if name_str not in instruction.keys():
+                            raise Exception(f"- error: could not find key {name_str} in instruction {instruction} in engine {engine}")
 
-                            tpt = instruction[tpt_str]
-                            if sorted(tpt.keys()) != tpt_keys_str:
-                                raise Exception(f"- error: tpt key mismatch. expected: {tpt_keys_str}, received: {sorted(tpt.keys())}")
+                        tpt = instruction[tpt_str]
+                        if sorted(tpt.keys()) != tpt_keys_str:
+                            raise Exception(f"- error: tpt key mismatch. expected: {tpt_keys_str}, received: {sorted(tpt.keys())}")
 
-                            mnemonics_tpt[instruction[name_str]] = tpt
+                        mnemonics_tpt[instruction[name_str]] = tpt
 
                 return mnemonics_tpt
 
@@ -1033,8 +1015,7 @@ def execute_t3sim_test(test, t3sim_args):
 
         # t3sim.print_json(cfg_dict, f"t3sim_cfg_{test}.json")
         file_name = os.path.join(cfg_dir, f"t3sim_cfg_{test}.json")
-        with open(file_name, "w") as file:
-            json.dump(cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(cfg_dict, file_name, indent = 2)
 
         return cfg_dict
 
@@ -1045,19 +1026,8 @@ def execute_t3sim_test(test, t3sim_args):
             if not os.path.exists(test_dir):
                 raise Exception(f"- error: {test_dir} does not exist. AAAA")
 
-            os_walk = os.walk(test_dir)
-            ttx_kinds = set()
-            for pwd, _, files in os_walk:
-                for file in files:
-                    if file.endswith(".elf"):
-                        for kind in read_elf.get_instruction_kinds(os.path.join(pwd, file)):
-                            if kind.is_tensix():
-                                ttx_kinds.add(kind)
-
-            if 1 != len(ttx_kinds):
-                raise Exception(f"- error: expected one tensix instruction kind, received {len(ttx_kinds)}, kinds: {ttx_kinds}")
-
-            return list(ttx_kinds)[0]
+            # kind from the arch attribute of the ELFs, decoded only if an ELF has none (elf_utils)
+            return decoded_instruction.instruction_kind[elf_utils.get_tensix_instruction_kind(elf_utils.get_elf_file_names([test_dir]))]
 
         def update_engines(engines, mnemonics_tpt, delay, cfg):
             cfg_engines_value = []
@@ -1223,36 +1193,35 @@ def execute_t3sim_test(test, t3sim_args):
 
             def get_instructions_throughput(file_name):
                 mnemonics_tpt = dict()
-                with open(file_name, 'r') as file:
-                    data = json.load(file)
+                data = serialization_utils.json_io.load_file(file_name)
 
-                    engines_str = "engines"
-                    engineInstructions_str = "engineInstructions"
-                    tpt_str = "tpt"
-                    name_str = "name"
-                    tpt_keys_str = sorted(["int32", "bf16", "fp16", "fp32", "fp64"])
+                engines_str = "engines"
+                engineInstructions_str = "engineInstructions"
+                tpt_str = "tpt"
+                name_str = "name"
+                tpt_keys_str = sorted(["int32", "bf16", "fp16", "fp32", "fp64"])
 
-                    if not engines_str in data.keys():
-                        raise Exception(f"- could not find key {engines_str} in file {file_name}")
+                if not engines_str in data.keys():
+                    raise Exception(f"- could not find key {engines_str} in file {file_name}")
 
-                    engines = data[engines_str]
-                    for engine in engines:
-                        if engineInstructions_str not in engine.keys():
-                            raise Exception(f"- error: could not find key {engineInstructions_str} in engine: {engine}")
+                engines = data[engines_str]
+                for engine in engines:
+                    if engineInstructions_str not in engine.keys():
+                        raise Exception(f"- error: could not find key {engineInstructions_str} in engine: {engine}")
 
-                        instructions = engine[engineInstructions_str]
-                        for instruction in instructions:
-                            if tpt_str not in instruction.keys():
-                                raise Exception(f"- error: could not find key {tpt_str} in instruction {instruction} in engine {engine}")
+                    instructions = engine[engineInstructions_str]
+                    for instruction in instructions:
+                        if tpt_str not in instruction.keys():
+                            raise Exception(f"- error: could not find key {tpt_str} in instruction {instruction} in engine {engine}")
 
-                            if name_str not in instruction.keys():
-                                raise Exception(f"- error: could not find key {name_str} in instruction {instruction} in engine {engine}")
+                        if name_str not in instruction.keys():
+                            raise Exception(f"- error: could not find key {name_str} in instruction {instruction} in engine {engine}")
 
-                            tpt = instruction[tpt_str]
-                            if sorted(tpt.keys()) != tpt_keys_str:
-                                raise Exception(f"- error: tpt key mismatch. expected: {tpt_keys_str}, received: {sorted(tpt.keys())}")
+                        tpt = instruction[tpt_str]
+                        if sorted(tpt.keys()) != tpt_keys_str:
+                            raise Exception(f"- error: tpt key mismatch. expected: {tpt_keys_str}, received: {sorted(tpt.keys())}")
 
-                            mnemonics_tpt[instruction[name_str]] = tpt
+                        mnemonics_tpt[instruction[name_str]] = tpt
 
                 return mnemonics_tpt
 
@@ -1354,8 +1323,7 @@ def execute_t3sim_test(test, t3sim_args):
 
         # t3sim.print_json(cfg_dict, f"t3sim_cfg_{test}.json")
         file_name = os.path.join(cfg_dir, f"t3sim_cfg_{test}.json")
-        with open(file_name, "w") as file:
-            json.dump(cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(cfg_dict, file_name, indent = 2)
 
         return cfg_dict
 
@@ -1387,18 +1355,18 @@ def execute_t3sim_test(test, t3sim_args):
     get_cfg1(test, t3sim_args)
     get_input_cfg(test, debug_dir, cfg_dir_incl_path, start_function)
 
-    os.chdir(t3sim_dir)
-    odir = f"llk.{t3sim_args['rtl_tag']}"
-    cmd = f"mkdir -p {odir}"
-    subprocess.call(cmd.split())
-    log_file_name = f"{test}{log_file_suffix}"
+    # absolute paths and cwd instead of chdir, the test can be executed from a thread as well.
+    t3sim_dir_incl_path = os.path.abspath(t3sim_dir)
+    odir = os.path.join(t3sim_dir_incl_path, f"llk.{t3sim_args['rtl_tag']}")
+    os.makedirs(odir, exist_ok = True)
+    log_file_name = os.path.join(t3sim_dir_incl_path, f"{test}{log_file_suffix}")
     # cmd = f"python t3sim.py --cfg {cfg_dir}/t3sim_cfg_{test}.json --inputcfg {cfg_dir}/t3sim_inputcfg_{test}.json"
-    cmd = f"python tneoSim.py --cfg {cfg_dir}/t3sim_cfg_{test}.json --inputcfg {cfg_dir}/t3sim_inputcfg_{test}.json --odir {odir}"
+    cmd = ["python", os.path.join(t3sim_dir_incl_path, "tneoSim.py"), "--cfg", os.path.join(t3sim_dir_incl_path, cfg_dir, f"t3sim_cfg_{test}.json"), "--inputcfg", os.path.join(t3sim_dir_incl_path, cfg_dir, f"t3sim_inputcfg_{test}.json"), "--odir", odir]
     print(f"Executing t3sim test: {test}")
-    file = open(log_file_name, 'w')
-    subprocess.call(cmd.split(), stdout = file, stderr = subprocess.STDOUT)
-    os.chdir("..")
+    with open(log_file_name, 'w') as file:
+        subprocess.call(cmd, cwd = t3sim_dir_incl_path, stdout = file, stderr = subprocess.STDOUT)
 
+@trace_utils.traced("execute_t3sim_tests", args = ())
 def execute_t3sim_tests(tests, t3sim_args = None, rtl_args = None):
 
     import filecmp
@@ -1587,21 +1555,18 @@ def execute_t3sim_tests(tests, t3sim_args = None, rtl_args = None):
         for pwd, _, files in os_walk:
             for file in files:
                 if assembly_yaml == file:
-                    file_incl_path = os.path.join(os.getcwd(), pwd, file)
+                    file_incl_path = os.path.abspath(os.path.join(pwd, file))
                     cond1 = os.path.exists(binutils_assembly_yaml) and (not filecmp.cmp(file_incl_path, binutils_assembly_yaml))
                     cond2 = not os.path.exists(binutils_assembly_yaml)
                     found_assembly_yaml = True
                     if cond1 or cond2:
                         print(f"+ Updating {assembly_yaml}")
-                        pwd = os.getcwd()
-                        os.chdir(binutils_assembly_yaml_dir)
-                        prev_assembly_yaml = f"{assembly_yaml}_prev"
+                        prev_assembly_yaml = f"{binutils_assembly_yaml}_prev"
                         if os.path.exists(prev_assembly_yaml):
                             os.remove(prev_assembly_yaml)
-                        if os.path.exists(assembly_yaml):
-                            shutil.move(assembly_yaml, prev_assembly_yaml)
-                        shutil.copy(file_incl_path, ".")
-                        os.chdir(pwd)
+                        if os.path.exists(binutils_assembly_yaml):
+                            shutil.move(binutils_assembly_yaml, prev_assembly_yaml)
+                        shutil.copy(file_incl_path, binutils_assembly_yaml_dir)
 
                     break
 
@@ -1614,21 +1579,13 @@ def execute_t3sim_tests(tests, t3sim_args = None, rtl_args = None):
     t3sim_args["cfg_base_addr_str"] = get_TENSIX_CFG_BASE(rtl_args)
     t3sim_args["cfg_offset"]        = get_CFG_OFFSET(rtl_args)
 
-    if force or (not os.path.isdir(t3sim_dir)):
-        if os.path.isdir(t3sim_dir):
-            shutil.rmtree(t3sim_dir)
-
-        cmd = f"git clone {git_repo} && cd {t3sim_dir} && git checkout {t3sim_branch} && cd .."
-        print(f"- executing command: {cmd}")
-        os.system(f"{cmd}")
+    git_cache_utils.checkout(git_repo, t3sim_branch, t3sim_dir, force = force, **git_cache_utils.get_options(t3sim_args))
 
     if not os.path.isdir(t3sim_dir):
         raise Exception(f"- error: could not find directory {t3sim_dir}")
 
     if not os.path.isdir(os.path.join(t3sim_dir, binutils_dir)):
-        cmd = f"cd {t3sim_dir} && git clone {binutils_git_repo} && cd -"
-        print(f"- executing command: {cmd}")
-        os.system(f"{cmd}")
+        git_cache_utils.checkout(binutils_git_repo, "HEAD", os.path.join(t3sim_dir, binutils_dir), **git_cache_utils.get_options(t3sim_args)) # default branch
 
     if not os.path.isdir(os.path.join(t3sim_dir, logs_dir)):
         cmd = f"cd {t3sim_dir} && mkdir -p {logs_dir} && cd -"
@@ -1658,6 +1615,7 @@ def execute_t3sim_tests(tests, t3sim_args = None, rtl_args = None):
         with multiprocessing.Pool(processes = num_processes) as pool:
             test_results = pool.starmap(execute_t3sim_test, [(test, t3sim_args) for test in tests_to_execute])
 
+@trace_utils.traced("write_status_to_csv", args = ())
 def write_status_to_csv(rtl_args, t3sim_args):
     import status
 
@@ -1677,7 +1635,7 @@ def write_status_to_csv(rtl_args, t3sim_args):
     status_args["t3sim_log_file_suffix"] = t3sim_args["t3sim_log_file_suffix"]
     status_args["assembly_yaml"]         = os.path.join(t3sim_args["sim_dir"], t3sim_args["binutils_dir"], "instruction_sets", t3sim_args["tensix_instructions_kind"], t3sim_args["assembly_yaml"]) # todo: automated instruction sets
 
-    status.write_status_to_csv(status.get_status(tests, status_args), csv_name)
+    status.write_status_to_csv_streaming(tests, status_args, csv_name)
     status.write_regression(summary_csv_name)
     status.write_failure_types(summary_csv_name)
     status.write_s_curve(summary_csv_name)
@@ -1746,38 +1704,45 @@ if "__main__" == __name__:
     print(f"+ Remote RTL test bench directory: {os.path.join(rtl_args["test_bench_dir_path"], rtl_args["test_bench_dir"])}")
     print(f"+ RTL tag: {t3sim_args["rtl_tag"]}")
 
-    tests = get_test_names_from_rtl_test_bench(rtl_args)
-    # print(f"+ Found {len(tests)} matching test(s) tests for the given tags, suites, and yml files.")
-    # print(f"+ We keep the tests only with 1 neo core.")
-    # n1_tests = sorted([test for test in tests if "n1" in test])
-    # other_tests = sorted([test for test in tests if test not in n1_tests])
-    # if other_tests:
-    #     print(f"+ Following {len(other_tests)} tests will not be considered:")
-    #     for test in other_tests:
-    #         print(f"  + {test}")
-
-    # if n1_tests:
-    #     print(f"+ If not executed already, the following {len(n1_tests)} will be executed on both RTL and via performance model:")
-    #     for test in n1_tests:
-    #         print(f"  + {test}")
-    # else:
-    #     msg  = f"- error: could not fine tests with single neo core.\n"
-    #     msg += f"- {len(tests)} matching tests were found with the constraints set by tags, suites, and yml files.\n"
-    #     for test in tests:
-    #         msg += f"{test}\n"
-
-    #     raise Exception(msg.rstrip())
-
-    # tests = n1_tests
-    # # tests = ["t6-quas-n4-ttx-matmul-l1-acc-multicore-height-sharded-llk"]
-    # del n1_tests
-    # del other_tests
-
-    execute_rtl_tests(tests, rtl_args)
-
-    execute_t3sim_tests(tests, t3sim_args, rtl_args)
-
-    write_status_to_csv(rtl_args, t3sim_args)
+    trace_utils.start()
+    profile_utils.start()
+    try:
+        with trace_utils.span("compare", rtl_tag = rtl_args["rtl_tag"]):
+            tests = get_test_names_from_rtl_test_bench(rtl_args)
+            # print(f"+ Found {len(tests)} matching test(s) tests for the given tags, suites, and yml files.")
+            # print(f"+ We keep the tests only with 1 neo core.")
+            # n1_tests = sorted([test for test in tests if "n1" in test])
+            # other_tests = sorted([test for test in tests if test not in n1_tests])
+            # if other_tests:
+            #     print(f"+ Following {len(other_tests)} tests will not be considered:")
+            #     for test in other_tests:
+            #         print(f"  + {test}")
+
+            # if n1_tests:
+            #     print(f"+ If not executed already, the following {len(n1_tests)} will be executed on both RTL and via performance model:")
+            #     for test in n1_tests:
+            #         print(f"  + {test}")
+            # else:
+            #     msg  = f"- error: could not fine tests with single neo core.\n"
+            #     msg += f"- {len(tests)} matching tests were found with the constraints set by tags, suites, and yml files.\n"
+            #     for test in tests:
+            #         msg += f"{test}\n"
+
+            #     raise Exception(msg.rstrip())
+
+            # tests = n1_tests
+            # # tests = ["t6-quas-n4-ttx-matmul-l1-acc-multicore-height-sharded-llk"]
+            # del n1_tests
+            # del other_tests
+
+            execute_rtl_tests(tests, rtl_args)
+
+            execute_t3sim_tests(tests, t3sim_args, rtl_args)
+
+            write_status_to_csv(rtl_args, t3sim_args)
+    finally:
+        trace_utils.finish()
+        profile_utils.finish()
 
 
 
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+# times the local hot paths (test selection, status, cfg/inputcfg generation, ELF kinds, memory map, status csv)
+# against synthetic RTL data sets of increasing size and appends the results to a JSON lines file,
+# so that runs from different commits can be compared.
+#
+#   python benchmark_hot_paths.py [num_tests ...]
+
+import datetime
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import typing
+
+import create_synthetic_rtl_data_set
+import elf_utils
+import ird_polaris
+import polaris_utils
+import registers_utils
+import rtl_utils
+import serialization_utils
+import status_utils
+import t3sim_utils
+
+def get_args(root_dir: str) -> tuple[dict[str, typing.Any], dict[str, typing.Any]]:
+    root_dir = os.path.abspath(root_dir)
+
+    rtl_args = ird_polaris.get_rtl_args("nov6")
+    rtl_args["local_root_dir_path"] = root_dir
+    rtl_args["force"]               = False
+
+    model_args = ird_polaris.get_polaris_big_args(rtl_args)
+    model_args["model_root_dir_path"]   = root_dir
+    model_args["cfg"]                   = os.path.join(root_dir, "cfg.json")
+    model_args["memory_map"]            = os.path.join(root_dir, "memory_map.json")
+    model_args["t3sim_root_dir"]        = "t3sim"
+    model_args["t3sim_root_dir_path"]   = root_dir
+    model_args["t3sim_cfg_dir"]         = "cfg"
+    model_args["t3sim_inputcfg_prefix"] = "inputcfg_"
+
+    return rtl_args, model_args
+
+def get_data_set(num_tests: int, root_dir: str) -> tuple[list[str], dict[str, typing.Any], dict[str, typing.Any]]:
+    rtl_args, model_args = get_args(root_dir)
+
+    marker = os.path.join(root_dir, "synthetic_rtl_data_set.json")
+    stamp = {"num_tests" : num_tests, "defaults" : create_synthetic_rtl_data_set.get_default_args()}
+    if os.path.isfile(marker) and (serialization_utils.json_io.load_file(marker, cache = False) == serialization_utils.json_io.loads(serialization_utils.json_io.dumps(stamp))):
+        tests = create_synthetic_rtl_data_set.get_test_names(num_tests, stamp["defaults"]["seed"])
+    else:
+        start = time.perf_counter()
+        tests = create_synthetic_rtl_data_set.create_synthetic_rtl_data_set(num_tests, rtl_args, model_args)
+        print(f"- created synthetic data set with {num_tests} tests in {time.perf_counter() - start:.2f} s")
+        serialization_utils.json_io.dump_file(stamp, marker)
+
+    return sorted(tests), rtl_args, model_args
+
+def get_benchmarks() -> list[tuple[str, bool, typing.Callable]]:
+    # (name, per test, fn(tests, rtl_args, model_args)). per test benchmarks are run on a sample of tests.
+    def get_tests(tests, rtl_args, model_args):
+        rtl_utils.test_names.get_tests(rtl_args)
+
+    def get_tests_statuses(tests, rtl_args, model_args):
+        status_utils.get_tests_statuses(tests, rtl_args, model_args)
+
+    def t3sim_get_cfg(tests, rtl_args, model_args):
+        for idx, test in enumerate(tests):
+            t3sim_utils.t3sim_tests.get_cfg(idx, test, rtl_args, model_args)
+
+    def t3sim_get_inputcfg(tests, rtl_args, model_args):
+        for idx, test in enumerate(tests):
+            t3sim_utils.t3sim_tests.get_inputcfg(idx, test, rtl_args, model_args)
+
+    def polaris_get_inputcfg(tests, rtl_args, model_args):
+        for idx, test in enumerate(tests):
+            polaris_utils.polaris_tests.get_inputcfg(idx, test, rtl_args, model_args)
+
+    def get_tensix_instruction_kind_cold(tests, rtl_args, model_args):
+        elf_utils.invalidate() # every ELF is read and its arch attribute parsed again.
+        for test in tests:
+            t3sim_utils.get_tensix_instruction_kind(test, rtl_args, model_args)
+
+    def get_tensix_instruction_kind(tests, rtl_args, model_args):
+        for test in tests:
+            t3sim_utils.get_tensix_instruction_kind(test, rtl_args, model_args)
+
+    def get_memory_map(tests, rtl_args, model_args):
+        registers_utils.get_memory_map(os.path.join(rtl_args["local_root_dir_path"], rtl_args["local_root_dir"]), rtl_args["num_bytes_per_register"])
+
+    def write_status_to_csv(tests, rtl_args, model_args):
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        import status
+
+        local_root_dir_incl_path = os.path.join(rtl_args["local_root_dir_path"], rtl_args["local_root_dir"])
+        status_args = dict()
+        status_args["root_dir"]      = local_root_dir_incl_path
+        status_args["debug_dir"]     = os.path.join(rtl_args["debug_dir_path"], rtl_args["debug_dir"])
+        status_args["t3sim_dir"]     = os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"], model_args["model_odir"])
+        status_args["assembly_yaml"] = rtl_utils.test_names.get_file_name_incl_path(local_root_dir_incl_path, rtl_args["isa_file_name"])
+        status.write_status_to_csv_streaming(tests, status_args, os.path.join(rtl_args["local_root_dir_path"], "status.csv"))
+
+    return [
+        ("test_names.get_tests",             False, get_tests),
+        ("status_utils.get_tests_statuses",  True,  get_tests_statuses),
+        ("t3sim_tests.get_cfg",              True,  t3sim_get_cfg),
+        ("t3sim_tests.get_inputcfg",         True,  t3sim_get_inputcfg),
+        ("polaris_tests.get_inputcfg",       True,  polaris_get_inputcfg),
+        ("elf_utils.kind (cold)",            True,  get_tensix_instruction_kind_cold),
+        ("elf_utils.kind (warm)",            True,  get_tensix_instruction_kind),
+        ("registers_utils.get_memory_map",   False, get_memory_map),
+        ("status.write_status_to_csv",       True,  write_status_to_csv),
+    ]
+
+def get_git_commit_id() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, check = True, cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(name: str, fn: typing.Callable, tests: list[str], rtl_args: dict[str, typing.Any], model_args: dict[str, typing.Any], repeat: int) -> dict[str, typing.Any]:
+    result = dict()
+    result["name"]            = name
+    result["num_tests_timed"] = len(tests)
+    times = []
+    try:
+        for _ in range(repeat):
+            serialization_utils.parse_cache.invalidate() # time cold parses, not cache hits.
+            start = time.perf_counter()
+            fn(tests, rtl_args, model_args)
+            times.append(time.perf_counter() - start)
+    except ImportError as exc:
+        result["status"] = f"skipped: {exc}"
+        return result
+    except Exception as exc:
+        result["status"] = f"error: {type(exc).__name__}: {exc}"
+        return result
+
+    result["status"]         = "ok"
+    result["seconds_min"]    = min(times)
+    result["seconds_median"] = statistics.median(times)
+    result["seconds_mean"]   = statistics.mean(times)
+    result["seconds_per_test"] = result["seconds_min"] / max(1, len(tests)) # best of repeat runs
+
+    return result
+
+def run(sizes: list[int], benchmark_args: dict[str, typing.Any] | None = None) -> list[dict[str, typing.Any]]:
+    args = dict()
+    args["root_dir"]     = "__benchmarks"
+    args["results_file"] = os.path.join("__benchmarks", "results.jsonl")
+    args["repeat"]       = 5
+    args["sample_size"]  = 50 # per test benchmarks are timed on at most these many tests
+    args["regression_threshold"]   = 1.25
+    args["regression_min_seconds"] = 0.05 # benchmarks faster than this (best run, now and before) are within noise
+    if benchmark_args:
+        args.update(benchmark_args)
+
+    previous = get_previous_results(args["results_file"])
+
+    run_info = dict()
+    run_info["timestamp"] = datetime.datetime.now().isoformat(timespec = "seconds")
+    run_info["commit"]    = get_git_commit_id()
+    run_info["host"]      = socket.gethostname()
+    run_info["python"]    = platform.python_version()
+
+    results = []
+    for num_tests in sizes:
+        tests, rtl_args, model_args = get_data_set(num_tests, os.path.join(args["root_dir"], f"n{num_tests}"))
+        sample = tests[::max(1, len(tests) // args["sample_size"])][:args["sample_size"]]
+        for name, per_test, fn in get_benchmarks():
+            result = run_benchmark(name, fn, sample if per_test else tests, rtl_args, model_args, args["repeat"])
+            result.update(run_info)
+            result["num_tests"] = num_tests
+            results.append(result)
+            print(result_to_str(result, previous.get((name, num_tests)), args["regression_threshold"], args["regression_min_seconds"]))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args["results_file"])), exist_ok = True)
+    with open(args["results_file"], "ab") as file:
+        for result in results:
+            file.write(serialization_utils.json_io.dumps(result, indent = None) + b"\n")
+
+    return results
+
+def get_previous_results(results_file: str) -> dict[tuple[str, int], dict[str, typing.Any]]:
+    # latest successful result per (benchmark, size)
+    previous = dict()
+    if not os.path.isfile(results_file):
+        return previous
+
+    with open(results_file, "rb") as file:
+        for line in file:
+            if line.strip():
+                result = serialization_utils.json_io.loads(line)
+                if "ok" == result.get("status"):
+                    previous[(result["name"], result["num_tests"])] = result
+
+    return previous
+
+def result_to_str(result: dict[str, typing.Any], previous: dict[str, typing.Any] | None, threshold: float, min_seconds: float = 0.0) -> str:
+    msg = f"  - {result['num_tests']:>6} tests, {result['name']:<34}"
+    if "ok" != result["status"]:
+        return msg + f" {result['status']}"
+
+    msg += f" {result['seconds_min']:>9.4f} s ({result['num_tests_timed']} tests timed, {1000.0 * result['seconds_per_test']:.3f} ms/test)"
+    if previous:
+        ratio = result["seconds_per_test"] / max(previous["seconds_per_test"], 1e-12)
+        msg += f" {ratio:.2f}x vs {previous.get('commit')}"
+        if ratio > threshold and min(result["seconds_min"], previous["seconds_min"]) >= min_seconds:
+            msg += " REGRESSION"
+
+    return msg
+
+if "__main__" == __name__:
+    sizes = [int(ele) for ele in sys.argv[1:]] if len(sys.argv) > 1 else [100, 1000, 10000]
+    run(sizes)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+
+# content addressed store for the local RTL data of all tags, e.g. __ext/blob_store:
+#
+#   store.json             hash algorithm of the store, sha256 by default (sha256sum is on every remote machine),
+#                          blake3 on request (blake3 module locally, b3sum on remote machines)
+#   blobs/ab/cdef...       one read-only file per unique content
+#   manifests/<tag>.json   relative path -> [digest, size]
+#
+# per tag trees are materialized as hardlinks (or reflinks/copies) to the blobs, so identical ELFs and
+# assembly.yaml files of feb19, mar18, ... are stored once. blobs are read-only because every tree
+# linked to them shares the contents: replace files (write + rename, as rsync does), never edit them in place.
+# for a remote tag only the file list and the remote hashes are fetched first, then only new blobs are copied.
+#
+#   python blob_store_utils.py report [store dir]
+
+import collections
+import datetime
+import errno
+import hashlib
+import io
+import os
+import serialization_utils
+import shlex
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+STORE_FILE_NAME   = "store.json"
+BLOBS_DIR         = "blobs"
+MANIFESTS_DIR     = "manifests"
+CHUNK_SIZE        = 1 << 20
+REMOTE_HASH_TOOLS = {"sha256" : "sha256sum", "blake3" : "b3sum"}
+
+def get_default_hash_algorithm():
+    return "sha256"
+
+def init_store(store_dir, algorithm = None):
+    store_file_name = os.path.join(store_dir, STORE_FILE_NAME)
+    if os.path.isfile(store_file_name):
+        store = serialization_utils.json_io.load_file(store_file_name)
+        if algorithm and algorithm != store["algorithm"]:
+            raise Exception(f"- error: store {store_dir} uses {store['algorithm']}, requested {algorithm}")
+
+        return store
+
+    os.makedirs(os.path.join(store_dir, BLOBS_DIR), exist_ok = True)
+    os.makedirs(os.path.join(store_dir, MANIFESTS_DIR), exist_ok = True)
+    store = {"version" : 1, "algorithm" : algorithm if algorithm else get_default_hash_algorithm()}
+    serialization_utils.json_io.dump_file(store, store_file_name)
+
+    return store
+
+def get_hasher(algorithm):
+    match algorithm:
+        case "blake3":
+            if blake3 is None:
+                raise Exception("- error: store uses blake3, but the blake3 module is not available")
+            return blake3.blake3()
+        case "sha256":
+            return hashlib.sha256()
+        case _:
+            raise Exception(f"- error: unknown hash algorithm {algorithm}")
+
+def hash_file(file_name, algorithm):
+    hasher = get_hasher(algorithm)
+    with open(file_name, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+def get_blob_path(store_dir, digest):
+    return os.path.join(store_dir, BLOBS_DIR, digest[:2], digest[2:])
+
+def has_blob(store_dir, digest):
+    return os.path.isfile(get_blob_path(store_dir, digest))
+
+def add_blob(store_dir, file_name, digest, move = False):
+    blob = get_blob_path(store_dir, digest)
+    if os.path.isfile(blob):
+        return blob
+
+    os.makedirs(os.path.dirname(blob), exist_ok = True)
+    tmp_blob = f"{blob}.{os.getpid()}.tmp"
+    if move:
+        shutil.move(file_name, tmp_blob)
+    else:
+        shutil.copyfile(file_name, tmp_blob)
+
+    os.chmod(tmp_blob, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    os.replace(tmp_blob, blob)
+
+    return blob
+
+def get_manifest_file_name(store_dir, tag):
+    return os.path.join(store_dir, MANIFESTS_DIR, f"{tag}.json")
+
+def get_manifest(store_dir, tag):
+    return serialization_utils.json_io.load_file(get_manifest_file_name(store_dir, tag))
+
+def write_manifest(store_dir, tag, files, source):
+    manifest = dict()
+    manifest["tag"]     = tag
+    manifest["source"]  = source
+    manifest["created"] = datetime.datetime.now().isoformat(timespec = "seconds")
+    manifest["files"]   = dict(sorted(files.items()))
+    serialization_utils.json_io.dump_file(manifest, get_manifest_file_name(store_dir, tag))
+
+    return manifest
+
+def get_tags(store_dir):
+    manifests_dir = os.path.join(store_dir, MANIFESTS_DIR)
+    if not os.path.isdir(manifests_dir):
+        return []
+
+    return sorted([file_name[:-len(".json")] for file_name in os.listdir(manifests_dir) if file_name.endswith(".json")])
+
+def get_rel_paths(root_dir, select = None):
+    rel_paths = []
+    for pwd, dirs, files in os.walk(root_dir):
+        dirs.sort()
+        for file in sorted(files):
+            rel_path = os.path.relpath(os.path.join(pwd, file), root_dir).replace(os.sep, "/")
+            if select is None or select(rel_path):
+                rel_paths.append(rel_path)
+
+    return rel_paths
+
+def add_tree(store_dir, tag, src_dir, rel_paths = None):
+    # adds the files of a local directory (all, or the given relative paths) to the store as tag.
+    store = init_store(store_dir)
+    if rel_paths is None:
+        rel_paths = get_rel_paths(src_dir)
+
+    files = dict()
+    num_new_blobs = 0
+    for rel_path in rel_paths:
+        file_name = os.path.join(src_dir, rel_path)
+        digest = hash_file(file_name, store["algorithm"])
+        if not has_blob(store_dir, digest):
+            add_blob(store_dir, file_name, digest)
+            num_new_blobs += 1
+
+        files[rel_path] = [digest, os.path.getsize(file_name)]
+
+    print(f"- added {len(files)} files of tag {tag} from {src_dir} to {store_dir}, {num_new_blobs} new blobs")
+
+    return write_manifest(store_dir, tag, files, src_dir)
+
+def list_remote_files(conn, remote_dir, roots):
+    roots = " ".join([shlex.quote(root) for root in roots])
+    result = conn.run(f"cd {shlex.quote(remote_dir)} && find {roots} -type f 2> /dev/null", hide = True, warn = True)
+
+    return [line[2:] if line.startswith("./") else line for line in result.stdout.splitlines() if line]
+
+def hash_remote_files(conn, remote_dir, rel_paths, algorithm):
+    # the file list goes through stdin, it can be much longer than a command line.
+    tool = REMOTE_HASH_TOOLS[algorithm]
+    result = conn.run(f"cd {shlex.quote(remote_dir)} && xargs -d '\\n' -r {tool} --", hide = True, in_stream = io.StringIO("\n".join(rel_paths) + "\n"))
+
+    digests = dict()
+    for line in result.stdout.splitlines():
+        digest, rel_path = line.split(None, 1)
+        digests[rel_path.lstrip("*")] = digest
+
+    return digests
+
+def add_remote_tree(store_dir, tag, hostname, username, remote_dir, roots = (".",), select = None, port = 22):
+    # hashes on the remote side, copies only the blobs the store does not have yet.
+    import fabric
+
+    store = init_store(store_dir)
+    with fabric.Connection(hostname, user = username, port = port) as conn:
+        rel_paths = [rel_path for rel_path in list_remote_files(conn, remote_dir, roots) if select is None or select(rel_path)]
+        print(f"- found {len(rel_paths)} files for tag {tag} in {remote_dir} on {hostname}")
+        digests = hash_remote_files(conn, remote_dir, rel_paths, store["algorithm"])
+
+    missing = dict()
+    for rel_path, digest in digests.items():
+        if not has_blob(store_dir, digest) and digest not in missing.keys():
+            missing[digest] = rel_path
+
+    print(f"- {len(missing)} of {len(set(digests.values()))} unique blobs of tag {tag} are new, fetching only those")
+    if missing:
+        with tempfile.TemporaryDirectory(dir = store_dir) as staging_dir:
+            files_from = os.path.join(staging_dir, "files_from.txt")
+            with open(files_from, "w") as file:
+                file.write("\n".join(missing.values()) + "\n")
+
+            fetched_dir = os.path.join(staging_dir, "fetched")
+            cmd = f"rsync -az --files-from={shlex.quote(files_from)} -e 'ssh -p {port}' {username}@{hostname}:{shlex.quote(remote_dir)}/ {shlex.quote(fetched_dir)}/"
+            print(f"- executing command: {cmd}")
+            subprocess.run(cmd, shell = True, check = True)
+
+            for digest, rel_path in missing.items():
+                file_name = os.path.join(fetched_dir, rel_path)
+                received = hash_file(file_name, store["algorithm"])
+                if received != digest:
+                    raise Exception(f"- error: {rel_path} from {hostname} changed while it was fetched, expected {digest}, received {received}")
+
+                add_blob(store_dir, file_name, digest, move = True)
+
+    files = dict([(rel_path, [digest, os.path.getsize(get_blob_path(store_dir, digest))]) for rel_path, digest in digests.items()])
+
+    return write_manifest(store_dir, tag, files, f"{username}@{hostname}:{remote_dir}")
+
+def reflink(src, dst):
+    import fcntl
+
+    FICLONE = 0x40049409
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+
+def link_blob(blob, file_name, mode):
+    match mode:
+        case "hardlink":
+            try:
+                os.link(blob, file_name)
+                return "hardlink"
+            except OSError as exc:
+                if exc.errno not in [errno.EXDEV, errno.EPERM, errno.EMLINK]:
+                    raise
+        case "reflink":
+            try:
+                reflink(blob, file_name)
+                return "reflink"
+            except OSError:
+                pass
+
+    shutil.copyfile(blob, file_name)
+    return "copy"
+
+def materialize(store_dir, tag, dest_dir, mode = "hardlink"):
+    # (re)creates the tree of tag below dest_dir. files that are already the linked blob are left alone, files that
+    # are not in the manifest (e.g. of tests no longer selected) are removed, and so are directories left empty.
+    manifest = get_manifest(store_dir, tag)
+    counts = collections.Counter()
+    if os.path.isdir(dest_dir):
+        for rel_path in get_rel_paths(dest_dir):
+            if rel_path not in manifest["files"].keys():
+                os.remove(os.path.join(dest_dir, rel_path))
+                counts["removed"] += 1
+
+        for pwd, _, _ in os.walk(dest_dir, topdown = False):
+            if (pwd != dest_dir) and not os.listdir(pwd):
+                os.rmdir(pwd)
+
+    for rel_path, (digest, size) in manifest["files"].items():
+        blob = get_blob_path(store_dir, digest)
+        file_name = os.path.join(dest_dir, rel_path)
+        if os.path.isfile(file_name):
+            if os.path.samefile(blob, file_name):
+                counts["unchanged"] += 1
+                continue
+
+            os.remove(file_name)
+        else:
+            os.makedirs(os.path.dirname(file_name), exist_ok = True)
+
+        counts[link_blob(blob, file_name, mode)] += 1
+
+    print(f"- materialized tag {tag} at {dest_dir}: {', '.join([f'{value} {key}' for key, value in sorted(counts.items())])}")
+
+    return dest_dir
+
+def get_report(store_dir):
+    report = dict()
+    report["tags"] = dict()
+    referenced = dict()
+    for tag in get_tags(store_dir):
+        files = get_manifest(store_dir, tag)["files"]
+        report["tags"][tag] = {"num_files" : len(files), "num_bytes" : sum([size for digest, size in files.values()]), "num_unique" : len(set([digest for digest, size in files.values()]))}
+        for digest, size in files.values():
+            referenced[digest] = size
+
+    report["num_files"]    = sum([ele["num_files"] for ele in report["tags"].values()])
+    report["num_bytes"]    = sum([ele["num_bytes"] for ele in report["tags"].values()])
+    report["num_blobs"]    = len(referenced)
+    report["stored_bytes"] = sum(referenced.values())
+    report["saved_bytes"]  = report["num_bytes"] - report["stored_bytes"]
+    report["dedup_ratio"]  = report["num_bytes"] / report["stored_bytes"] if report["stored_bytes"] else 1.0
+
+    return report
+
+def report_to_str(report, offset = 2):
+    msg = f"{' ' * offset}- {'tag':<10} {'files':>9} {'unique':>9} {'MiB':>10}\n"
+    for tag, value in report["tags"].items():
+        msg += f"{' ' * offset}- {tag:<10} {value['num_files']:>9} {value['num_unique']:>9} {value['num_bytes'] / 2**20:>10.2f}\n"
+
+    msg += f"{' ' * offset}- files: {report['num_files']}, blobs: {report['num_blobs']}\n"
+    msg += f"{' ' * offset}- logical: {report['num_bytes'] / 2**20:.2f} MiB, stored: {report['stored_bytes'] / 2**20:.2f} MiB, saved: {report['saved_bytes'] / 2**20:.2f} MiB\n"
+    msg += f"{' ' * offset}- dedup ratio: {report['dedup_ratio']:.2f}x"
+
+    return msg
+
+if "__main__" == __name__:
+    if len(sys.argv) > 1 and "report" == sys.argv[1]:
+        store_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join("__ext", "blob_store")
+        print(f"+ Blob store {store_dir}")
+        print(report_to_str(get_report(store_dir)))
+    else:
+        print(f"usage: {sys.argv[0]} report [store dir]")
+        sys.exit(1)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+
+# calibration of engine delays and instruction throughputs against RTL cycles.
+#
+#   params    : sweep_utils engine knobs, delay.<engine name> and tpt.<mnemonic>[.<data type>], each with
+#               {min, max, step, integer, start}. start defaults to the value in the default cfg.
+#   objective : mean over the training tests of min(|PM/RTL - 1|, failure_penalty), a model failure counts as
+#               failure_penalty. training tests: train_fraction of the tests that pass in RTL, per test class.
+#   search    : parallel compass search. all +/- step neighbours of the current point are evaluated at once on
+#               the model pool, the best one is taken if it improves by more than min_improvement, otherwise
+#               the steps are halved. stops after max_num_halvings halvings or max_num_evaluations cfgs.
+#   cache     : every (cfg hash, test) result is appended to <model_logs_dir>/calibration_cache.jsonl, points
+#               that were evaluated before (in this or an earlier calibration) cost nothing. the cfg hash covers
+#               the model commit, results of another model commit are not reused.
+#   output    : in <model_logs_dir>, outside the model checkout: calibration_<name>_cfg.json (full cfg) and the
+#               default cfg file with the fitted values, <default cfg>_<name>.json. use it by copying it into the
+#               model repository and setting polaris_big_args["default_cfg_file_name"].
+#
+#   python calibration_utils.py <tag> <calibration.yaml|calibration.json>
+#
+#   name: unpack_delays
+#   train_fraction: 0.25
+#   max_num_evaluations: 100
+#   params:
+#     delay.UNPACKER0: {min: 0, max: 32, step: 8, integer: true}
+#     tpt.ELWADD:      {min: 0.25, max: 4.0, step: 0.5}
+
+import copy
+import ird_status
+import json
+import math
+import multiprocessing
+import os
+import polaris_utils
+import random
+import rtl_utils
+import serialization_utils
+import status_utils
+import statistics
+import sweep_utils
+import sys
+import trace_utils
+
+CACHE_FILE_NAME = "calibration_cache.jsonl"
+RUNS_DIR        = "calibration"
+
+class result_cache:
+    # (cfg hash, test) -> (model result, model number of cycles or error message), one JSON object per line.
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.results = dict()
+        if os.path.isfile(file_name):
+            with open(file_name) as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError: # cut last line of an interrupted run
+                        continue
+
+                    self.results[(entry["cfg"], entry["test"])] = (entry["result"], entry["num_cycles"])
+
+    def has(self, cfg_hash, test):
+        return (cfg_hash, test) in self.results.keys()
+
+    def get(self, cfg_hash, test):
+        return self.results[(cfg_hash, test)]
+
+    def add(self, cfg_hash, test, result, num_cycles):
+        self.results[(cfg_hash, test)] = (result, num_cycles)
+        with open(self.file_name, "a") as file:
+            file.write(json.dumps({"cfg" : cfg_hash, "test" : test, "result" : result, "num_cycles" : num_cycles}) + "\n")
+
+def get_training_tests(rtl_num_cycles, fraction, seed = 0):
+    # fraction of the tests that pass in RTL, at least one per test class.
+    rng = random.Random(seed)
+    classes_tests = status_utils.get_classes_tests(sorted(rtl_num_cycles.keys()))
+    tests = []
+    for test_class in sorted(classes_tests.keys()):
+        class_tests = sorted(classes_tests[test_class])
+        tests.extend(rng.sample(class_tests, max(1, int(math.ceil(fraction * len(class_tests))))))
+
+    return sorted(tests)
+
+class calibration:
+    def __init__(self, spec, tests, rtl_args, model_args, pool):
+        key_model_logs_dir = "model_logs_dir"
+
+        for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_model_")]:
+            assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+        self.name            = spec["name"]
+        self.params          = spec["params"]
+        self.failure_penalty = spec.get("failure_penalty", 1.0)
+        self.model_args      = model_args
+        self.pool            = pool
+        self.objectives      = dict() # cfg hash -> objective
+        self.history         = []     # (point, cfg hash, objective)
+
+        for knob in self.params.keys():
+            if not sweep_utils.is_engine_knob(knob):
+                raise Exception(f"- error: {knob} can not be calibrated, expected {sweep_utils.DELAY_PREFIX}<engine name> or {sweep_utils.TPT_PREFIX}<mnemonic>[.<data type>]")
+
+        self.model_commit = sweep_utils.get_model_commit(model_args)
+        if self.model_commit is None:
+            print("- WARNING: could not obtain the model commit, cached results of another model version may be reused")
+
+        self.base_cfg = polaris_utils.polaris_tests.get_default_cfg(model_args)
+        self.default_cfg_file_name = polaris_utils.polaris_tests.get_default_cfg_file_name(model_args)
+        self.default_cfg = serialization_utils.json_io.load_file(self.default_cfg_file_name, cache = False)
+        for knob in self.params.keys(): # fail now, not after hours of model runs
+            sweep_utils.get_engine_knob_entries(self.base_cfg["engines"], knob)
+            sweep_utils.get_engine_knob_entries(self.default_cfg["engines"], knob)
+
+        rtl_num_cycles = sweep_utils.get_rtl_num_cycles(tests, rtl_args)
+        self.tests = get_training_tests(rtl_num_cycles, spec.get("train_fraction", 0.25), spec.get("seed", 0))
+        self.rtl_num_cycles = {test : rtl_num_cycles[test] for test in self.tests}
+
+        with trace_utils.span("calibration.get_inputcfgs", num_tests = len(self.tests)):
+            self.inputcfgs = sweep_utils.get_inputcfgs(self.tests, rtl_args, model_args)
+
+        logs_dir = os.path.join(model_args["model_root_dir_path"], model_args[key_model_logs_dir])
+        os.makedirs(logs_dir, exist_ok = True)
+        self.cache = result_cache(os.path.join(logs_dir, CACHE_FILE_NAME))
+        print(f"- calibration {self.name}: {len(self.params)} parameters, {len(self.tests)} training tests, {len(self.cache.results)} cached results")
+
+    def get_cfg(self, point):
+        cfg_dict = copy.deepcopy(self.base_cfg)
+        sweep_utils.set_engine_knobs(cfg_dict["engines"], point)
+        return cfg_dict
+
+    def get_objective(self, cfg_hash):
+        PASS = "PASS"
+        errors = []
+        for test in self.tests:
+            result, num_cycles = self.cache.get(cfg_hash, test)
+            if PASS == result:
+                errors.append(min(abs(float(num_cycles) / float(self.rtl_num_cycles[test]) - 1.0), self.failure_penalty))
+            else:
+                errors.append(self.failure_penalty)
+
+        return statistics.fmean(errors) if errors else math.inf
+
+    def evaluate(self, points):
+        # objectives of the points, the model is run for (cfg, test) pairs that are not in the cache.
+        cfgs = [self.get_cfg(point) for point in points]
+        cfg_hashes = [sweep_utils.get_cfg_hash(cfg_dict, self.model_commit) for cfg_dict in cfgs]
+
+        jobs = []
+        pending = dict() # cfg hash -> variant model args
+        for point, cfg_dict, cfg_hash in zip(points, cfgs, cfg_hashes):
+            if cfg_hash in pending.keys() or all(self.cache.has(cfg_hash, test) for test in self.tests):
+                continue
+
+            variant_model_args = sweep_utils.get_variant_model_args(RUNS_DIR, cfg_hash, self.model_args)
+            cfg_file_name = sweep_utils.write_variant_cfg_file(point, variant_model_args, cfg_dict)
+            pending[cfg_hash] = variant_model_args
+            for test in self.tests:
+                if not self.cache.has(cfg_hash, test):
+                    jobs.append((len(jobs), cfg_hash, test, self.inputcfgs[test], cfg_file_name, variant_model_args))
+
+        if jobs:
+            sweep_utils.execute_jobs(self.pool, jobs, f"calibration {self.name}, {len(pending)} cfgs")
+
+        for _, cfg_hash, test, _, _, variant_model_args in jobs:
+            _, result, num_cycles = status_utils.get_model_test_status(test, variant_model_args)
+            self.cache.add(cfg_hash, test, result, num_cycles)
+
+        objectives = []
+        for point, cfg_hash in zip(points, cfg_hashes):
+            if cfg_hash not in self.objectives.keys():
+                self.objectives[cfg_hash] = self.get_objective(cfg_hash)
+                self.history.append((dict(point), cfg_hash, self.objectives[cfg_hash]))
+
+            objectives.append(self.objectives[cfg_hash])
+
+        return objectives
+
+    def clip(self, knob, value):
+        param = self.params[knob]
+        value = min(max(value, param.get("min", -math.inf)), param.get("max", math.inf))
+        return int(round(value)) if param.get("integer", False) else round(value, 6)
+
+    def get_start(self):
+        return {knob : self.clip(knob, param["start"] if "start" in param.keys() else sweep_utils.get_engine_knob_value(self.base_cfg["engines"], knob)) for knob, param in self.params.items()}
+
+    def get_neighbours(self, point, steps):
+        neighbours = []
+        for knob in self.params.keys():
+            for sign in (1, -1):
+                neighbour = dict(point)
+                neighbour[knob] = self.clip(knob, point[knob] + sign * steps[knob])
+                if neighbour != point and neighbour not in neighbours:
+                    neighbours.append(neighbour)
+
+        return neighbours
+
+    def halve(self, steps):
+        return {knob : max(1, step // 2) if self.params[knob].get("integer", False) else step / 2 for knob, step in steps.items()}
+
+    @trace_utils.traced("calibration.run", args = ())
+    def run(self, max_num_evaluations = 100, max_num_halvings = 3, min_improvement = 1e-3):
+        point = self.get_start()
+        objective = self.evaluate([point])[0]
+        print(f"- calibration {self.name}: start, objective {objective:.4f}, {point}")
+
+        steps = {knob : param["step"] for knob, param in self.params.items()}
+        num_halvings = 0
+        while (len(self.objectives) < max_num_evaluations) and (num_halvings <= max_num_halvings):
+            neighbours = self.get_neighbours(point, steps)[:max(1, max_num_evaluations - len(self.objectives))]
+            objectives = self.evaluate(neighbours) if neighbours else []
+            best = min(range(len(neighbours)), key = lambda idx: objectives[idx]) if neighbours else None
+            if (best is not None) and (objectives[best] < objective - min_improvement):
+                point, objective = neighbours[best], objectives[best]
+                print(f"- calibration {self.name}: {len(self.objectives)} cfgs evaluated, objective {objective:.4f}, {point}")
+            else:
+                steps = self.halve(steps)
+                num_halvings += 1
+                print(f"- calibration {self.name}: {len(self.objectives)} cfgs evaluated, no improvement, steps {steps}")
+
+        return point, objective
+
+    def write(self, point, objective):
+        # full cfg plus the default cfg file with the fitted values, in <model_logs_dir>: a git clean of the model
+        # checkout must not take them.
+        logs_dir = os.path.join(self.model_args["model_root_dir_path"], self.model_args["model_logs_dir"])
+        cfg_file_name = os.path.join(logs_dir, f"calibration_{self.name}_cfg.json")
+        serialization_utils.json_io.dump_file(self.get_cfg(point), cfg_file_name, indent = 2)
+
+        default_cfg = copy.deepcopy(self.default_cfg)
+        sweep_utils.set_engine_knobs(default_cfg["engines"], point)
+        stem, ext = os.path.splitext(os.path.basename(self.default_cfg_file_name))
+        default_cfg_file_name = os.path.join(logs_dir, f"{stem}_{self.name}{ext}")
+        serialization_utils.json_io.dump_file(default_cfg, default_cfg_file_name, indent = 2)
+
+        history_file_name = os.path.join(logs_dir, f"calibration_{self.name}.json")
+        serialization_utils.json_io.dump_file({"best" : point, "objective" : objective, "model_commit" : self.model_commit, "tests" : self.tests, "history" : [{"point" : p, "cfg" : h, "objective" : o} for p, h, o in self.history]}, history_file_name, indent = 2)
+
+        print(f"- calibration {self.name}: best objective {objective:.4f} (mean |PM/RTL - 1| over {len(self.tests)} training tests), {point}")
+        print(f"- wrote {cfg_file_name}")
+        print(f"- wrote {default_cfg_file_name}, copy it to {os.path.dirname(self.default_cfg_file_name)} and use it with polaris_big_args[\"default_cfg_file_name\"] = \"{os.path.basename(default_cfg_file_name)}\"")
+        print(f"- wrote {history_file_name}")
+
+        return default_cfg_file_name
+
+@trace_utils.traced("calibration_utils.calibrate", args = ())
+def calibrate(spec, tests, rtl_args, model_args):
+    key_num_processes = "num_processes"
+
+    for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
+        assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+    sweep_utils.prepare(rtl_args, model_args)
+    num_processes = max(1, min([rtl_args[key_num_processes], model_args[key_num_processes]]))
+    with multiprocessing.Pool(processes = num_processes) as pool:
+        cal = calibration(spec, tests, rtl_args, model_args, pool)
+        point, objective = cal.run(spec.get("max_num_evaluations", 100), spec.get("max_num_halvings", 3), spec.get("min_improvement", 1e-3))
+
+    return cal.write(point, objective)
+
+if "__main__" == __name__:
+    if len(sys.argv) < 3:
+        print(f"usage: {sys.argv[0]} <tag> <calibration.yaml|calibration.json>")
+        sys.exit(1)
+
+    trace_utils.start()
+    try:
+        rtl_args, polaris_big_args = ird_status.get_args(sys.argv[1])
+        tests = sorted(rtl_utils.test_names.get_tests(rtl_args))
+        print(f"- found {len(tests)} tests.")
+        calibrate(sweep_utils.load_sweep(sys.argv[2]), tests, rtl_args, polaris_big_args)
+    finally:
+        trace_utils.finish()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+# failure and test class classification.
+#
+#   failure_classifier : failure bins (lists of substrings that all have to be in the message) compiled into one
+#                        alternation regex. one scan per message finds every bin substring, messages are cached.
+#                        a message that matches no bin is binned by its signature, "unknown: <signature>".
+#   test_classifier    : test name -> test class through a word -> class dict, cached per test name.
+#   get_log_tail(),
+#   get_exception()    : exception type, message and innermost traceback frame from the end of a log file.
+
+import functools
+import os
+import re
+
+UNKNOWN_BIN_PREFIX = "unknown: "
+
+RE_FRAME     = re.compile(r'^\s*File "(?P<file>[^"]+)", line (?P<line>\d+), in (?P<function>\S+)')
+RE_EXCEPTION = re.compile(r'^(?P<type>(?:[A-Za-z_][\w.]*)?(?:Error|Exception|Interrupt|Exit|Warning|Timeout))(?::\s?(?P<message>.*))?$')
+RE_NUMBERS   = re.compile(r"0x[0-9a-fA-F]+|\d+")
+
+def get_log_tail(file_name, num_bytes = 64 * 1024):
+    # last lines of a (possibly large) log file, without reading all of it.
+    if not os.path.isfile(file_name):
+        return []
+
+    with open(file_name, "rb") as file:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(max(0, size - num_bytes))
+        data = file.read()
+
+    lines = data.decode("utf-8", "replace").splitlines()
+    if size > num_bytes and lines:
+        lines = lines[1:] # first line is most likely cut
+
+    return lines
+
+def get_exception(lines):
+    # (exception type, exception message, (file, line, function) of the innermost frame), None where not found.
+    # the last traceback in the lines counts, its exception line is the first line after the last frame that
+    # looks like one.
+    frame = None
+    frame_idx = -1
+    for idx in range(len(lines) - 1, -1, -1):
+        match = RE_FRAME.match(lines[idx])
+        if match:
+            frame = (match.group("file"), int(match.group("line")), match.group("function"))
+            frame_idx = idx
+            break
+
+    start = frame_idx + 1 if frame else 0
+    candidates = lines[start:] if frame else reversed(lines)
+    for line in candidates:
+        match = RE_EXCEPTION.match(line.strip())
+        if match:
+            return match.group("type"), (match.group("message") or "").strip(), frame
+
+    return None, None, frame
+
+def get_signature(lines):
+    # stable key for grouping failures that match no bin: exception type and innermost function, or the
+    # last non-empty line with numbers masked.
+    exc_type, message, frame = get_exception(lines)
+    if exc_type and frame:
+        return f"{exc_type} in {frame[2]} ({os.path.basename(frame[0])})"
+
+    if exc_type:
+        return f"{exc_type}: {RE_NUMBERS.sub('N', message)[:80]}".rstrip(": ")
+
+    for line in reversed(lines):
+        if line.strip():
+            return RE_NUMBERS.sub("N", line.strip())[:80]
+
+    return "no output"
+
+class failure_classifier:
+    def __init__(self, bins):
+        # bins: [[substring, ...], ...], first matching bin wins. bin name: substrings joined by " ".
+        self.bins = [list(strings) for strings in bins]
+        self.names = [" ".join(strings) for strings in self.bins]
+        substrings = sorted(set(s for strings in self.bins for s in strings), key = lambda s: (-len(s), s))
+        # lookahead, so overlapping occurrences are found. at one position only the longest alternative is
+        # reported, the shorter substrings it contains are added through self.contained.
+        self.regex = re.compile("(?=(" + "|".join(re.escape(s) for s in substrings) + "))") if substrings else None
+        self.contained = {s : {t for t in substrings if t in s} for s in substrings}
+        self.classify = functools.lru_cache(maxsize = 1 << 16)(self.classify_uncached)
+
+    def get_substrings(self, msg):
+        found = set()
+        if self.regex is None:
+            return found
+
+        for match in self.regex.finditer(msg):
+            found.update(self.contained[match.group(1)])
+
+        return found
+
+    def classify_uncached(self, msg):
+        # bin name, None if no bin matches.
+        found = self.get_substrings(msg)
+        for name, strings in zip(self.names, self.bins):
+            if all(s in found for s in strings):
+                return name
+
+        return None
+
+    def classify_with_signature(self, msg, lines = None):
+        # bin name, or UNKNOWN_BIN_PREFIX + signature of the log tail (or of the message itself).
+        name = self.classify(msg)
+        if name is not None:
+            return name
+
+        return UNKNOWN_BIN_PREFIX + get_signature(lines if lines else [msg])
+
+def is_unknown_bin(name):
+    return name.startswith(UNKNOWN_BIN_PREFIX)
+
+class test_classifier:
+    def __init__(self, classes):
+        # classes: {test class : {word, ...}}. as before, if words of several classes are in a test name,
+        # the class that comes last in classes wins.
+        self.order = {test_class : idx for idx, test_class in enumerate(classes.keys())}
+        self.words = dict()
+        for test_class, words in classes.items():
+            for word in words:
+                self.words.setdefault(word, []).append(test_class)
+
+        self.classify = functools.lru_cache(maxsize = None)(self.classify_uncached)
+
+    def classify_uncached(self, test):
+        test_classes = [test_class for word in test.split("-") for test_class in self.words.get(word, [])]
+        if not test_classes:
+            return None
+
+        return max(test_classes, key = lambda test_class: self.order[test_class])
@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 
+import blob_store_utils
 import getpass
 import os
-import re
+import rtl_archive_utils
 import rtl_utils
 import time
 import typing
@@ -28,6 +29,20 @@ def get_rtl_data_path(rtl_tag: str) -> str:
         case _:
             raise ValueError(f"Unknown RTL tag: {rtl_tag}")
         
+BLOB_STORE_DIR = os.path.join("__ext", "blob_store")
+ASSEMBLY_YAML_REL_PATH = "meta/instructions/yaml/assembly.yaml"
+
+def get_minimal_rtl_data_selector(test_dirs):
+    # ELFs and sim_result.yml of the given test directories, and assembly.yaml.
+    test_dirs = tuple([test_dir.strip("/") + "/" for test_dir in test_dirs])
+    def select(rel_path):
+        if rel_path.endswith(ASSEMBLY_YAML_REL_PATH):
+            return True
+
+        return rel_path.startswith(test_dirs) and (rel_path.endswith(".elf") or rel_path.endswith("/sim_result.yml"))
+
+    return select
+
 # def copy_assembly_yaml(src_dir: str, dest_dir: str) -> None:
 #     src_yaml = os.path.join(src_dir, "meta/instructions/yaml/assembly.yaml")
 #     dest_yaml_dir = os.path.join(dest_dir, "meta/instructions/yaml")
@@ -68,24 +83,17 @@ def get_minimal_rtl_data(rtl_args: dict[str, typing.Any], polaris_args: dict[str
     dest_dir_path = "__ext/rtl_test_data_set"
     dest_dir = os.path.join(dest_dir_path, rtl_tag)
 
-    # copy assembly.yaml and other directories.
-    cmd = f"rsync -avz --include='*/' --include='meta/instructions/yaml/assembly.yaml' --exclude='*' --prune-empty-dirs {src_dir} {dest_dir}"
-    print(f"Executing command: {cmd}")
-    os.system(cmd)
-
     test_dir_parent_rel_path = os.path.join(rtl_args[key_debug_dir_path], rtl_args[key_debug_dir])
 
-    # copy tests
+    # assembly.yaml and the tests' ELFs and sim_result.yml go into the blob store shared by all tags,
+    # the tag's directory is then made of hardlinks to the blobs.
     tests = rtl_utils.test_names.get_tests(rtl_args)
-    for test in tests:
-        test_path = os.path.join(test_dir_parent_rel_path, test + rtl_args.get(key_test_dir_suffix, "_0"))
-        test_path = re.escape(test_path)
-        cmd = f"rsync -avz --include='*/' "
-        cmd += f"--include='{test_path}/**/*.elf' --include='sim_result.yml' "
-        cmd += f"--exclude='*' --prune-empty-dirs {src_dir} {dest_dir}"
+    select = get_minimal_rtl_data_selector([os.path.join(test_dir_parent_rel_path, test + rtl_args.get(key_test_dir_suffix, "_0")) for test in tests])
+    blob_store_utils.add_tree(BLOB_STORE_DIR, rtl_tag, src_dir, blob_store_utils.get_rel_paths(src_dir, select))
+    blob_store_utils.materialize(BLOB_STORE_DIR, rtl_tag, dest_dir)
 
-        print(f"Executing command: {cmd}")
-        os.system(cmd)
+    # one indexed archive per tag next to the loose directory
+    rtl_archive_utils.pack(dest_dir, f"{dest_dir}.rtlar", test_dir_parent_rel_path)
 
     # minimal_rtl_data_prefix = "__ext/rtl_test_data_set/"
     # rtl_tag = rtl_args.get("rtl_tag", "")
@@ -123,10 +131,6 @@ def main():
 
         os.makedirs(dest_dir, exist_ok = True)
 
-        cmd = f"rsync -avz --include='*/' --include='meta/instructions/yaml/assembly.yaml' --exclude='*' --prune-empty-dirs auslogo2:{src_dir} {dest_dir}"
-        print(f"Executing command: {cmd}")
-        os.system(cmd)
-
         tests_file = f"llk_tests_{tag}.txt"
         if not os.path.isfile(tests_file):
             raise FileNotFoundError(f"Tests file {tests_file} not found.")
@@ -140,15 +144,16 @@ def main():
         else:
             tests = [test.strip() for test in tests]
 
-        cmd = f"rsync -avz --include='*/' "
-        for test in tests:
-            test += "_0"
-            test = re.escape(test)
-            cmd += f"--include='{test}/**/*.elf' --include='{test}/sim_result.yml' "
-            
-        cmd += f"--exclude='*' --prune-empty-dirs auslogo2:{src_dir} {dest_dir}"
-        print(f"Executing command: {cmd}")
-        os.system(cmd)
+        # only blobs that no earlier tag has are fetched from auslogo2.
+        test_dirs = [test + "_0" for test in tests]
+        roots = sorted(set([os.path.dirname(test_dir) for test_dir in test_dirs])) + [os.path.join("src", os.path.dirname(ASSEMBLY_YAML_REL_PATH))]
+        blob_store_utils.add_remote_tree(BLOB_STORE_DIR, tag, "auslogo2", getpass.getuser(), src_dir, roots, get_minimal_rtl_data_selector(test_dirs))
+        blob_store_utils.materialize(BLOB_STORE_DIR, tag, dest_dir)
+
+        rtl_archive_utils.pack(dest_dir, os.path.join(minimal_rtl_data_set_dir, f"{tag}.rtlar"), "rsim/debug")
+
+        print(f"+ Blob store {BLOB_STORE_DIR}")
+        print(blob_store_utils.report_to_str(blob_store_utils.get_report(BLOB_STORE_DIR)))
 
         # # os.system(f"rsync -az --include='*/' --include='*.elf' --include='meta/instructions/yaml/assembly.yaml' --include='sim_result.yml' --exclude='*' auslogo2:{source} {dest}")
         # # --prune-empty-dirs
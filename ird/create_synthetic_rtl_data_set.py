@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+
+# fabricates a from-ws-tensix-<tag> like tree (plus model outputs) for profiling the local hot paths
+# without access to a real RTL drop:
+#   <local_root_dir>/infra/tensix/rsim/tests/{project.yml, <yaml_files>}
+#   <local_root_dir>/rsim/debug/<test>_0/{sim_result.yml, <test>.rtl_test.log, ttx/<kf>/core_00_00/neo_<n>/thread_<t>/out/thread_<t>.elf}
+#   <local_root_dir>/src/hardware/tensix/proj/<proj>/{cfg_defines.h, tt_t6_trisc_map.h, tensix.h, tt_t6_trisc_regs_pkg.sv, *AddressMap.html}
+#   <local_root_dir>/src/meta/instructions/yaml/assembly.yaml (a copy of args["assembly_yaml"] or one op_binary per synthetic opcode)
+#   <model_root_dir>/<model_odir>/{<test>.model_test.log, simreport_<test>.json}
+# register HTML and cfg_defines.h are derived from one of the checked in ttqs_memory_map_<tag>.json files.
+
+import os
+import random
+import shutil
+import struct
+import sys
+import typing
+
+import serialization_utils
+import status_utils
+
+def get_test_names(num_tests: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    kinds = sorted(value for values in status_utils.get_test_classes().values() for value in values)
+    dtypes = ["bf16", "fp16", "fp32", "int32", "mxfp4_a", "mxfp8_r"]
+    tests = []
+    for idx in range(num_tests):
+        kind = kinds[idx % len(kinds)]
+        num_neos = rng.choice([1, 4])
+        dvalid = "-dvalid" if 0 == (idx % 11) else ""
+        tests.append(f"t6-quas-n{num_neos}-ttx-{kind}-{rng.choice(dtypes)}{dvalid}-{idx:05d}-llk")
+
+    return tests
+
+def get_num_neos_from_test_name(test):
+    return 4 if "-n4-" in test else 1
+
+def get_instruction_words(num_instructions: int, rng: random.Random) -> list[int]:
+    rv32 = [
+        0x00108093, # addi x1, x1, 1
+        0x002081b3, # add  x3, x1, x2
+        0x00012283, # lw   x5, 0(x2)
+        0x00512223, # sw   x5, 4(x2)
+        0x00000463, # beq  x0, x0, 8
+        0x12345537, # lui  x10, 0x12345
+        0x02208233, # mul  x4, x1, x2
+    ]
+    words = []
+    for _ in range(num_instructions):
+        if rng.random() < 0.6:
+            words.append(rng.choice(rv32))
+        else:
+            # tensix instructions are emitted rotated left by 2 (.ttinsn) so that they never look like a 32b rv instruction.
+            ttx = (rng.randrange(0x01, 0x40) << 24) | rng.randrange(0, 1 << 24)
+            words.append(((ttx << 2) | (ttx >> 30)) & 0xffffffff)
+
+    words.append(0x00008067) # ret
+    return words
+
+def write_assembly_yaml(file_name: str) -> None:
+    # one instruction per tensix opcode get_instruction_words emits.
+    os.makedirs(os.path.dirname(file_name), exist_ok = True)
+    with open(file_name, "w") as file:
+        for op_binary in range(0x01, 0x40):
+            file.write(f"TTOP_{op_binary:02X}:\n")
+            file.write(f"  op_binary: 0x{op_binary:02x}\n")
+            file.write(f"  ex_resource: {['SYNC', 'UNPACK', 'MATH', 'PACK'][op_binary % 4]}\n")
+
+def get_riscv_attributes(arch: str) -> bytes:
+    # .riscv.attributes contents: format 'A', one "riscv" subsection with Tag_file (1) holding Tag_RISCV_arch (5).
+    attributes = bytes([5]) + arch.encode() + b"\0"
+    file_attributes = bytes([1]) + struct.pack("<I", 1 + 4 + len(attributes)) + attributes
+    vendor = b"riscv\0"
+    return b"A" + struct.pack("<I", 4 + len(vendor) + len(file_attributes)) + vendor + file_attributes
+
+def get_functions(num_functions: int, num_instructions_per_function: int, seed: int) -> list[tuple[str, list[int]]]:
+    # (name, instruction words) of main, func_1, ...
+    rng = random.Random(seed)
+    functions = []
+    for idx in range(num_functions):
+        name = "main" if 0 == idx else f"func_{idx}"
+        functions.append((name, get_instruction_words(rng.randrange(num_instructions_per_function // 2 + 1, num_instructions_per_function + 2), rng)))
+
+    return functions
+
+def write_elf(file_name: str, functions: list[tuple[str | None, list[int]]], arch: str | None = None) -> None:
+    # minimal little endian ELF32 RISC-V executable: null, .text, .symtab, .strtab, .shstrtab and, with arch
+    # (e.g. rv32i2p1_xttqs1p0), .riscv.attributes. .text holds the words of functions in order, one function
+    # symbol per name, words with name None get no symbol.
+    text = bytearray()
+    text_addr = 0x6000
+    strtab = bytearray(b"\0")
+    symtab = bytearray(struct.pack("<IIIBBH", 0, 0, 0, 0, 0, 0))
+    for name, words in functions:
+        if name is not None:
+            symtab += struct.pack("<IIIBBH", len(strtab), text_addr + len(text), 4 * len(words), 0x12, 0, 1) # STB_GLOBAL | STT_FUNC, .text
+            strtab += name.encode() + b"\0"
+
+        text += struct.pack(f"<{len(words)}I", *words)
+
+    attributes = get_riscv_attributes(arch) if arch else b""
+    section_names = ["", ".text", ".symtab", ".strtab", ".shstrtab"] + ([".riscv.attributes"] if arch else [])
+    shstrtab = bytearray()
+    name_offsets = []
+    for name in section_names:
+        name_offsets.append(len(shstrtab))
+        shstrtab += name.encode() + b"\0"
+
+    ehsize = 52
+    body = bytearray()
+    offsets = []
+    for data in [text, symtab, strtab, shstrtab, attributes]:
+        while (ehsize + len(body)) % 4:
+            body += b"\0"
+        offsets.append(ehsize + len(body))
+        body += data
+
+    while (ehsize + len(body)) % 4:
+        body += b"\0"
+    shoff = ehsize + len(body)
+
+    e_ident = b"\x7fELF" + bytes([1, 1, 1, 0]) + bytes(8)
+    header = e_ident + struct.pack("<HHIIIIIHHHHHH", 2, 243, 1, text_addr, 0, shoff, 0, ehsize, 32, 0, 40, len(section_names), 4)
+
+    sections = struct.pack("<10I", *([0] * 10))
+    sections += struct.pack("<10I", name_offsets[1], 1, 0x6, text_addr, offsets[0], len(text), 0, 0, 4, 0)
+    sections += struct.pack("<10I", name_offsets[2], 2, 0, 0, offsets[1], len(symtab), 3, 1, 4, 16)
+    sections += struct.pack("<10I", name_offsets[3], 3, 0, 0, offsets[2], len(strtab), 0, 0, 1, 0)
+    sections += struct.pack("<10I", name_offsets[4], 3, 0, 0, offsets[3], len(shstrtab), 0, 0, 1, 0)
+    if arch:
+        sections += struct.pack("<10I", name_offsets[5], 0x70000003, 0, 0, offsets[4], len(attributes), 0, 0, 1, 0) # SHT_RISCV_ATTRIBUTES
+
+    os.makedirs(os.path.dirname(file_name), exist_ok = True)
+    with open(file_name, "wb") as file:
+        file.write(header + body + sections)
+
+def get_num_cycles(test, rng):
+    base = {"datacopy" : 2000, "matmul" : 12000, "reduce" : 6000, "pck" : 3000, "upk" : 3000}
+    for word, num_cycles in base.items():
+        if word in test:
+            return int(num_cycles * rng.uniform(0.5, 2.0))
+
+    return int(4000 * rng.uniform(0.5, 2.0))
+
+def write_rtl_test(test: str, test_dir_incl_path: str, num_threads: int, rng: random.Random, seed: int, args: dict[str, typing.Any]) -> int:
+    num_cycles = get_num_cycles(test, rng)
+    result = "PASS" if rng.random() < args["rtl_pass_ratio"] else "FAIL"
+    os.makedirs(test_dir_incl_path, exist_ok = True)
+    with open(os.path.join(test_dir_incl_path, "sim_result.yml"), "w") as file:
+        file.write(f"res: {result}\n")
+        file.write(f"total-cycles: {num_cycles}\n")
+        file.write(f"test-name: {test}\n")
+        file.write("seed: 0\n")
+        file.write("messages:\n")
+        file.write("  - done\n")
+
+    with open(os.path.join(test_dir_incl_path, f"{test}.rtl_test.log"), "w") as file:
+        file.write(f"rsim run_test --test {test}\n")
+        file.write(f"test {test} finished, res: {result}, total-cycles: {num_cycles}\n")
+
+    num_neos = get_num_neos_from_test_name(test)
+    for kf in args["ttx_dirs"]:
+        for neo_id in range(num_neos):
+            for thread_id in range(num_threads):
+                elf_incl_path = os.path.join(test_dir_incl_path, "ttx", kf, "core_00_00", f"neo_{neo_id}", f"thread_{thread_id}", "out", f"thread_{thread_id}.elf")
+                write_elf(elf_incl_path, get_functions(args["num_functions"], args["num_instructions_per_function"], seed * 1000 + neo_id * 10 + thread_id), args["arch"])
+
+    return num_cycles
+
+def write_model_test(test: str, odir_incl_path: str, rtl_num_cycles: int, rng: random.Random, args: dict[str, typing.Any]) -> None:
+    failures = [
+        "IndexError: list index out of range",
+        "Exception: Timeout 20000 reached for pipe UNPACKER0",
+        "Exception: Timeout 20000 reached for valid check on MATH",
+        "Exception: Too many resources to select from",
+        "Exception: Write Valid condition Invalid",
+    ]
+
+    lines = [f"- input cfg: inputcfg_{test}.json", "- executing tensix neo model"]
+    for idx in range(args["num_model_log_lines"]):
+        lines.append(f"cycle {idx * 100:>8}: engine {idx % 7} issued instruction {idx}")
+
+    passed = rng.random() < args["model_pass_ratio"]
+    if passed:
+        simreport = os.path.join(odir_incl_path, f"simreport_{test}.json")
+        lines.append(f"Total Cycles = {rtl_num_cycles * rng.uniform(0.7, 1.4):.1f}")
+        lines.append(f"Simreport = {simreport}")
+        serialization_utils.json_io.dump_file({"test" : test, "total_cycles" : rtl_num_cycles}, simreport)
+    else:
+        lines.append("Traceback (most recent call last):")
+        lines.append('  File "ttsim/back/tensix_neo/tneoSim.py", line 412, in <module>')
+        lines.append(rng.choice(failures))
+
+    content = "\n".join(lines) + "\n"
+    for suffix in args["model_log_file_suffixes"]:
+        with open(os.path.join(odir_incl_path, f"{test}{suffix}"), "w") as file:
+            file.write(content)
+
+def write_test_yaml_files(tests: list[str], infra_tests_dir: str, yaml_files: list[str], project_yaml: str) -> None:
+    os.makedirs(infra_tests_dir, exist_ok = True)
+    with open(os.path.join(infra_tests_dir, project_yaml), "w") as file:
+        file.write("suites:\n")
+        file.write("  - suite-name: postcommit\n")
+        file.write("    tags:\n")
+        file.write("      - postcommit\n")
+        file.write("  - suite-name: nightly\n")
+        file.write("    tags:\n")
+        file.write("      - nightly\n")
+
+    for idx, yaml_file in enumerate(yaml_files):
+        with open(os.path.join(infra_tests_dir, yaml_file), "w") as file:
+            file.write("tests:\n")
+            for test in tests[idx::len(yaml_files)]:
+                file.write(f"  - test-name: {test}\n")
+                file.write("    tags:\n")
+                file.write("      - postcommit\n")
+                file.write("      - nightly\n")
+                file.write("    args: --seed 0\n")
+
+def get_html_key(key, value):
+    if value["RESIDES_WITHIN"]:
+        return "..." + key.split(".")[-1]
+
+    return key
+
+def write_address_map_html(file_name: str, address_map: dict[str, typing.Any]) -> None:
+    lines = ["<html>", "<body>", "<table>"]
+    for key, value in address_map.items():
+        lines.append(f'<tr><td class="data">{get_html_key(key, value)}</td><td class="bit_data">0x{int(value["START"], 16):X} - 0x{int(value["END"], 16):X}</td></tr>')
+    lines.append("</table>")
+
+    for key, value in address_map.items():
+        if value.get("REGISTERS"):
+            lines.append("<table>")
+            for reg_name, reg_addr in value["REGISTERS"].items():
+                lines.append(f'<tr><td class="data">{reg_name}</td><td class="bit_data">0x{int(reg_addr, 16):X}</td></tr>')
+            lines.append("</table>")
+
+    lines += ["</body>", "</html>"]
+    os.makedirs(os.path.dirname(file_name), exist_ok = True)
+    with open(file_name, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+def write_cfg_defines(file_name: str, offsets: dict[str, typing.Any]) -> None:
+    lines = ["#pragma once", ""]
+    for offset, regs in offsets.items():
+        for reg_name, reg_info in regs.items():
+            lines.append(f"#define {reg_name}_ADDR32 {offset}")
+            if "SHAMT" in reg_info.keys():
+                lines.append(f"#define {reg_name}_SHAMT {reg_info['SHAMT']}")
+                lines.append(f"#define {reg_name}_MASK {reg_info['MASK']}")
+        lines.append("")
+
+    with open(file_name, "w") as file:
+        file.write("\n".join(lines))
+
+def write_src_files(src_proj_dir: str, memory_map: dict[str, typing.Any]) -> None:
+    trisc_map = memory_map["trisc_map"]
+    os.makedirs(src_proj_dir, exist_ok = True)
+
+    write_cfg_defines(os.path.join(src_proj_dir, "cfg_defines.h"), trisc_map["cfg_regs"]["OFFSETS"])
+
+    with open(os.path.join(src_proj_dir, "tt_t6_trisc_map.h"), "w") as file:
+        file.write("#pragma once\n\n")
+        file.write(f"#define MOP_CFG_BASE {trisc_map['mop_cfg']['START']}\n")
+        file.write(f"#define IBUFFER_BASE {trisc_map['ibuffer']['START']}\n")
+        file.write(f"#define CFG_REGS_BASE {trisc_map['cfg_regs']['START']}\n")
+
+    with open(os.path.join(src_proj_dir, "tensix.h"), "w") as file:
+        file.write("#pragma once\n\n")
+        file.write("#define TENSIX_CFG_BASE CFG_REGS_BASE\n")
+
+    with open(os.path.join(src_proj_dir, "tt_t6_trisc_regs_pkg.sv"), "w") as file:
+        file.write("package tt_t6_trisc_regs_pkg;\n")
+        file.write(f"localparam integer CFG_REGS_END_ADDR = 32'h{int(trisc_map['cfg_regs']['END'], 16):08x};\n")
+        file.write("endpackage\n")
+
+    trisc_map_for_html = {key : {k : v for k, v in value.items() if k != "OFFSETS"} for key, value in trisc_map.items()}
+    write_address_map_html(os.path.join(src_proj_dir, "docs", "TriscAddressMap.html"), trisc_map_for_html)
+    write_address_map_html(os.path.join(src_proj_dir, "docs", "n1", "NocAddressMap.html"), memory_map["n1_cluster_map"])
+    write_address_map_html(os.path.join(src_proj_dir, "docs", "n4", "NocAddressMap.html"), memory_map["n4_cluster_map"])
+
+def get_default_args() -> dict[str, typing.Any]:
+    args = dict()
+    args["memory_map_template"]           = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ttqs_memory_map_jul27.json")
+    args["assembly_yaml"]                 = None # optional, copied to src/meta/instructions/yaml/assembly.yaml, a synthetic one otherwise
+    args["num_functions"]                 = 4
+    args["num_instructions_per_function"] = 64
+    args["num_model_log_lines"]           = 20
+    args["rtl_pass_ratio"]                = 0.95
+    args["model_pass_ratio"]              = 0.9
+    args["seed"]                          = 0
+    args["ttx_dirs"]                      = ["kernels"]
+    args["arch"]                          = "rv32i2p1_m2p0_xttqs1p0" # Tag_RISCV_arch of the ELFs, None for ELFs without .riscv.attributes
+    args["model_log_file_suffixes"]       = [".model_test.log", ".t3sim_test.log"]
+
+    return args
+
+def create_synthetic_rtl_data_set(num_tests: int, rtl_args: dict[str, typing.Any], model_args: dict[str, typing.Any], args: dict[str, typing.Any] | None = None) -> list[str]:
+    key_rtl_local_root_dir               = "local_root_dir"
+    key_rtl_local_root_dir_path          = "local_root_dir_path"
+    key_rtl_debug_dir_path               = "debug_dir_path"
+    key_rtl_debug_dir                    = "debug_dir"
+    key_rtl_test_dir_suffix              = "test_dir_suffix"
+    key_rtl_tests_dir                    = "tests_dir"
+    key_rtl_project_yaml                 = "project.yaml"
+    key_rtl_yaml_files                   = "yaml_files"
+    key_rtl_src_hd_proj_dir_path         = "src_hd_proj_dir_path"
+    key_rtl_src_hd_proj_dir              = "src_hd_proj_dir"
+    key_rtl_max_num_threads_per_neo_core = "max_num_threads_per_neo_core"
+    key_model_root_dir                   = "model_root_dir"
+    key_model_root_dir_path              = "model_root_dir_path"
+    key_model_odir                       = "model_odir"
+
+    for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_rtl_")]:
+        assert key in rtl_args.keys(), f"- error: {key} not found in given rtl_args dict"
+
+    for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_model_")]:
+        assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+    m_args = get_default_args()
+    if args:
+        m_args.update(args)
+
+    local_root_dir_incl_path = os.path.join(rtl_args[key_rtl_local_root_dir_path], rtl_args[key_rtl_local_root_dir])
+    odir_incl_path = os.path.join(model_args[key_model_root_dir_path], model_args[key_model_root_dir], model_args[key_model_odir])
+    for path in [local_root_dir_incl_path, odir_incl_path]:
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+    tests = get_test_names(num_tests, m_args["seed"])
+    print(f"- creating synthetic RTL data set with {len(tests)} tests at {local_root_dir_incl_path}")
+
+    write_test_yaml_files(tests, os.path.join(local_root_dir_incl_path, rtl_args[key_rtl_tests_dir]), sorted(rtl_args[key_rtl_yaml_files].keys()), rtl_args[key_rtl_project_yaml])
+
+    memory_map = serialization_utils.json_io.load_file(m_args["memory_map_template"])
+    src_proj_dir = os.path.join(local_root_dir_incl_path, rtl_args[key_rtl_src_hd_proj_dir_path], rtl_args[key_rtl_src_hd_proj_dir], "tt_t6_quasar")
+    write_src_files(src_proj_dir, memory_map)
+    assembly_yaml_dir = os.path.join(local_root_dir_incl_path, "src", "meta", "instructions", "yaml")
+    if m_args["assembly_yaml"]:
+        os.makedirs(assembly_yaml_dir, exist_ok = True)
+        shutil.copy(m_args["assembly_yaml"], os.path.join(assembly_yaml_dir, "assembly.yaml"))
+    else:
+        write_assembly_yaml(os.path.join(assembly_yaml_dir, "assembly.yaml"))
+
+    debug_dir_incl_path = os.path.join(local_root_dir_incl_path, rtl_args[key_rtl_debug_dir_path], rtl_args[key_rtl_debug_dir])
+    rng = random.Random(m_args["seed"])
+    for idx, test in enumerate(tests):
+        num_threads = 3 if "dvalid" in test else rtl_args[key_rtl_max_num_threads_per_neo_core]
+        test_dir_incl_path = os.path.join(debug_dir_incl_path, test + rtl_args[key_rtl_test_dir_suffix])
+        rtl_num_cycles = write_rtl_test(test, test_dir_incl_path, num_threads, rng, m_args["seed"] * 100000 + idx, m_args)
+        write_model_test(test, odir_incl_path, rtl_num_cycles, rng, m_args)
+
+    return tests
+
+if "__main__" == __name__:
+    import ird_polaris
+
+    num_tests = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    root_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join("__synthetic", f"n{num_tests}")
+
+    rtl_args = ird_polaris.get_rtl_args("nov6")
+    rtl_args["local_root_dir_path"] = os.path.abspath(root_dir)
+    model_args = ird_polaris.get_polaris_big_args(rtl_args)
+    model_args["model_root_dir_path"] = os.path.abspath(root_dir)
+
+    create_synthetic_rtl_data_set(num_tests, rtl_args, model_args)
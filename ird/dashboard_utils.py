@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+
+# local live results dashboard (standard library HTTP server, no external resources in the page).
+#
+#   status_store : per test status (status_utils.get_test_status) plus a stamp of the files it was read from
+#                  (sim_result.yml, model log). refresh() re-reads only tests whose stamp changed, aggregates
+#                  are computed once per change and served from memory. the store is saved to
+#                  <local_root_dir_path>/.dashboard_<tag>.json, so a restarted dashboard does not rescan.
+#   dashboard    : ThreadingHTTPServer plus a refresh thread.
+#                    /                  page, polls the API
+#                    /api/summary       counts, per class table, failure bins
+#                    /api/status        per test statuses
+#                    /s_curve.svg       PM/RTL S-curve by test class (plot_utils.get_s_curve_svg)
+#
+# ird_polaris starts it for the duration of a run if rtl_args["dashboard_port"] is set.
+# ird_status.py <tag> serve [port] serves the results of a finished run.
+
+import datetime
+import http.server
+import os
+import plot_utils
+import serialization_utils
+import status_utils
+import threading
+import time
+
+def get_file_stamp(file_name):
+    try:
+        st = os.stat(file_name)
+    except OSError:
+        return None
+
+    return [st.st_size, st.st_mtime_ns]
+
+class status_store:
+    def __init__(self, tests, rtl_args, model_args, file_name = None):
+        self.tests      = sorted(tests)
+        self.rtl_args   = rtl_args
+        self.model_args = model_args
+        self.file_name  = file_name
+        self.lock       = threading.Lock()
+        self.statuses   = dict() # test -> status dict, {"pending" : msg} while the RTL test directory does not exist, {"error" : msg}
+        self.stamps     = dict() # test -> stamp of the files the status was read from
+        self.rtl_files  = dict() # test -> sim_result.yml incl. path, resolved once
+        self.version    = 0
+        self.updated    = None
+        self.aggregates = {"version" : -1}
+
+        if self.file_name and os.path.isfile(self.file_name):
+            data = serialization_utils.json_io.load_file(self.file_name, cache = False)
+            self.statuses  = {test : value for test, value in data["statuses"].items() if test in self.tests}
+            self.stamps    = {test : value for test, value in data["stamps"].items() if test in self.tests}
+            self.rtl_files = {test : value for test, value in data["rtl_files"].items() if test in self.tests}
+            print(f"- loaded {len(self.statuses)} statuses from {self.file_name}")
+
+    def get_stamp(self, test):
+        if test not in self.rtl_files.keys():
+            try:
+                self.rtl_files[test] = status_utils.get_rtl_sim_result_file_name(test, self.rtl_args)
+            except Exception:
+                pass # test directory not copied yet
+
+        archive_file_name = self.rtl_args.get("rtl_archive")
+        stamp = []
+        stamp.append(get_file_stamp(self.rtl_files[test]) if test in self.rtl_files.keys() else None)
+        stamp.append(get_file_stamp(status_utils.get_model_log_file_name(test, self.model_args)))
+        stamp.append(get_file_stamp(archive_file_name) if archive_file_name else None)
+
+        return stamp
+
+    def refresh(self):
+        changed = dict()
+        stamps = dict()
+        for test in self.tests:
+            stamp = self.get_stamp(test)
+            if test in self.stamps.keys() and stamp == self.stamps[test]:
+                continue
+
+            try:
+                changed[test] = status_utils.get_test_status(test, self.rtl_args, self.model_args)
+            except Exception as exc:
+                changed[test] = {"pending" if test not in self.rtl_files.keys() else "error" : str(exc)}
+
+            stamps[test] = stamp
+
+        if changed:
+            with self.lock:
+                self.statuses.update(changed)
+                self.stamps.update(stamps)
+                self.version += 1
+                self.updated = time.time()
+
+            self.save()
+
+        return len(changed)
+
+    def save(self):
+        if not self.file_name:
+            return
+
+        with self.lock:
+            data = {"statuses" : dict(self.statuses), "stamps" : dict(self.stamps), "rtl_files" : dict(self.rtl_files)}
+
+        tmp_file_name = f"{self.file_name}.{os.getpid()}.tmp"
+        serialization_utils.json_io.dump_file(data, tmp_file_name, indent = None)
+        os.replace(tmp_file_name, self.file_name)
+
+    def get_aggregates(self):
+        with self.lock:
+            if self.aggregates["version"] == self.version:
+                return self.aggregates
+
+            version  = self.version
+            statuses = dict(self.statuses)
+
+        aggregates = get_aggregates(self.tests, statuses)
+        aggregates["version"] = version
+        aggregates["updated"] = self.updated
+        with self.lock:
+            if version >= self.aggregates["version"]:
+                self.aggregates = aggregates
+
+        return aggregates
+
+def is_status(status):
+    return "pending" not in status.keys() and "error" not in status.keys()
+
+def get_aggregates(tests, statuses):
+    PASS = "PASS"
+    valid = {test : status for test, status in statuses.items() if is_status(status)}
+    done = {test : status for test, status in valid.items() if status["model"]["result"] is not None} # model ran
+
+    counts = dict()
+    counts["tests"]      = len(tests)
+    counts["rtl_found"]  = sum([1 for status in valid.values() if status["rtl"]["found_test"]])
+    counts["rtl_pass"]   = sum([1 for status in valid.values() if PASS == status["rtl"]["result"]])
+    counts["model_done"] = len(done)
+    counts["model_pass"] = sum([1 for status in done.values() if "failure_bin" not in status.keys()])
+    counts["model_fail"] = len(done) - counts["model_pass"]
+    counts["pending"]    = len(tests) - len(done) - sum([1 for status in statuses.values() if "error" in status.keys()])
+    counts["errors"]     = sum([1 for status in statuses.values() if "error" in status.keys()])
+
+    classes = []
+    failure_bins = {bin : [] for bin in status_utils.get_failure_bins_in_statuses(done)}
+    for test_class, test_bins in status_utils.get_status_by_class(done).items():
+        row = {"class" : test_class, "tests" : len(test_bins["tests"]), "pass" : len(test_bins[PASS]), "bins" : dict()}
+        for bin in failure_bins.keys():
+            row["bins"][bin] = len(test_bins[bin])
+            failure_bins[bin].extend(test_bins[bin])
+
+        row["fail"] = sum(row["bins"].values())
+        classes.append(row)
+
+    class_points = status_utils.get_test_class_wise_s_curve_points(status_utils.get_test_class_wise_num_cycles_model_by_rtl_from_statuses(done))
+
+    aggregates = dict()
+    aggregates["counts"]       = counts
+    aggregates["classes"]      = classes
+    aggregates["failure_bins"] = {bin : sorted(bin_tests) for bin, bin_tests in failure_bins.items()}
+    aggregates["errors"]       = {test : status["error"] for test, status in sorted(statuses.items()) if "error" in status.keys()}
+    aggregates["s_curve_svg"]  = plot_utils.get_s_curve_svg(class_points)
+
+    return aggregates
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>%(title)s</title>
+<style>
+body { font-family: sans-serif; margin: 1em 2em; }
+table { border-collapse: collapse; margin-bottom: 1em; }
+td, th { border: 1px solid #ccc; padding: 2px 8px; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+.fail { color: #d62728; } .pass { color: #2ca02c; } .muted { color: #888; }
+</style></head>
+<body>
+<h1>%(title)s</h1>
+<div id="counts" class="muted">loading ...</div>
+<div id="s_curve"></div>
+<h2>Test classes</h2><div id="classes"></div>
+<h2>Failure bins</h2><div id="bins"></div>
+<div id="errors"></div>
+<script>
+function esc(s) { return String(s).replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c])); }
+let version = -1;
+async function update() {
+  try {
+    const s = await (await fetch("api/summary")).json();
+    const c = s.counts;
+    const updated = s.updated ? new Date(s.updated * 1000).toLocaleTimeString() : "-";
+    document.getElementById("counts").innerHTML =
+      `tests: ${c.tests}, RTL found: ${c.rtl_found}, RTL pass: ${c.rtl_pass}, model done: ${c.model_done}, ` +
+      `<span class="pass">model pass: ${c.model_pass}</span>, <span class="fail">model fail: ${c.model_fail}</span>, ` +
+      `pending: ${c.pending}, errors: ${c.errors} <span class="muted">(updated ${updated})</span>`;
+    if (s.version === version) { return; }
+    version = s.version;
+    document.getElementById("s_curve").innerHTML = await (await fetch("s_curve.svg")).text();
+    const bins = Object.keys(s.failure_bins);
+    let t = "<table><tr><th>class</th><th>tests</th><th>pass</th><th>fail</th>" + bins.map(b => `<th>${esc(b)}</th>`).join("") + "</tr>";
+    for (const r of s.classes) {
+      t += `<tr><td>${esc(r.class)}</td><td>${r.tests}</td><td class="pass">${r.pass}</td><td class="fail">${r.fail}</td>` + bins.map(b => `<td>${r.bins[b]}</td>`).join("") + "</tr>";
+    }
+    document.getElementById("classes").innerHTML = t + "</table>";
+    document.getElementById("bins").innerHTML = bins.filter(b => s.failure_bins[b].length).map(b =>
+      `<details><summary>${esc(b)} (${s.failure_bins[b].length})</summary><pre>${s.failure_bins[b].map(esc).join("\\n")}</pre></details>`).join("") || "none";
+    const errors = Object.entries(s.errors);
+    document.getElementById("errors").innerHTML = errors.length ? "<h2>Errors</h2><pre>" + errors.map(([k, v]) => esc(k + ": " + v)).join("\\n") + "</pre>" : "";
+  } catch (e) {
+    document.getElementById("counts").textContent = "dashboard not reachable: " + e;
+  }
+}
+update();
+setInterval(update, %(poll_ms)d);
+</script>
+</body></html>
+"""
+
+def get_handler(store, title, poll_seconds):
+    class handler(http.server.BaseHTTPRequestHandler):
+        def send(self, code, content_type, body):
+            body = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            match self.path.split("?", 1)[0]:
+                case "/" | "/index.html":
+                    self.send(200, "text/html; charset=utf-8", PAGE % {"title" : title, "poll_ms" : int(poll_seconds * 1000)})
+                case "/api/summary":
+                    aggregates = store.get_aggregates()
+                    self.send(200, "application/json", serialization_utils.json_io.dumps({key : value for key, value in aggregates.items() if "s_curve_svg" != key}, indent = None))
+                case "/api/status":
+                    with store.lock:
+                        statuses = dict(store.statuses)
+                    self.send(200, "application/json", serialization_utils.json_io.dumps(statuses, indent = None))
+                case "/s_curve.svg":
+                    self.send(200, "image/svg+xml", store.get_aggregates()["s_curve_svg"])
+                case _:
+                    self.send(404, "text/plain", "not found")
+
+        def log_message(self, format, *args):
+            pass # no line per request on the console of the run
+
+    return handler
+
+class dashboard:
+    def __init__(self, tests, rtl_args, model_args, port = None, host = None, refresh_seconds = None):
+        self.port            = port if port is not None else rtl_args.get("dashboard_port", 8050)
+        self.host            = host if host else rtl_args.get("dashboard_host", "127.0.0.1")
+        self.refresh_seconds = refresh_seconds if refresh_seconds else rtl_args.get("dashboard_refresh_seconds", 30)
+        self.store           = status_store(tests, rtl_args, model_args, get_store_file_name(rtl_args))
+        self.stop_event      = threading.Event()
+        self.server          = http.server.ThreadingHTTPServer((self.host, self.port), get_handler(self.store, f"{rtl_args['rtl_tag']} status", min(self.refresh_seconds, 10)))
+        self.server.daemon_threads = True
+        self.threads         = []
+
+    def refresh_loop(self):
+        while True:
+            try:
+                num_changed = self.store.refresh()
+                if num_changed:
+                    print(f"- dashboard: {num_changed} test statuses updated")
+            except Exception as exc:
+                print(f"- dashboard: could not refresh statuses: {exc}")
+
+            if self.stop_event.wait(self.refresh_seconds):
+                break
+
+    def start(self):
+        self.threads.append(threading.Thread(target = self.refresh_loop, name = "dashboard_refresh", daemon = True))
+        self.threads.append(threading.Thread(target = self.server.serve_forever, name = "dashboard_server", daemon = True))
+        for thread in self.threads:
+            thread.start()
+
+        print(f"- dashboard at http://{self.host}:{self.server.server_address[1]}/ (refresh every {self.refresh_seconds} s)")
+
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.server.shutdown()
+        self.server.server_close()
+        for thread in self.threads:
+            thread.join()
+
+        self.store.refresh() # final statuses on disk for the next dashboard
+        print(f"- dashboard stopped at {datetime.datetime.now().strftime('%H:%M:%S')}")
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+def get_store_file_name(rtl_args):
+    return os.path.join(rtl_args["local_root_dir_path"], f".dashboard_{rtl_args['rtl_tag']}.json")
+
+def start_if_requested(tests, rtl_args, model_args):
+    if not rtl_args.get("dashboard_port"):
+        return None
+
+    return dashboard(tests, rtl_args, model_args).start()
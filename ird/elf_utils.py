@@ -0,0 +1,584 @@
+#!/usr/bin/env python
+
+# cheap ELF metadata for the RTL test ELFs, without decoding the instructions.
+#
+#   sections : ELF header and section headers (32 / 64 bit, little / big endian), name -> section.
+#   kinds    : tensix instruction kinds of an ELF from the arch string of its .riscv.attributes section
+#              (Tag_RISCV_arch, e.g. rv32i2p1_m2p0_xttqs1p0 -> ttqs). an ELF without an arch attribute or without a
+#              tensix extension in it is decoded with read_elf.get_instruction_kinds (binutils-playground) instead.
+#   memo     : kinds are kept per content digest (sha1), identical ELFs of different tests are looked at once.
+#              (path, inode, size, mtime) -> digest saves reading a known file again. decoded kinds are also kept
+#              in a json file ($IRD_ELF_KIND_CACHE, default ~/.cache/ird/elf_kinds.json), across processes, keyed on
+#              the digest and the read_elf version (its sources), a changed decoder decodes again. new entries
+#              are written in batches (and at exit), merged with the file on disk, outside the lookup lock.
+#
+#   profile  : per function mnemonic histogram of the executable sections, as read_elf.get_instruction_profile_from_elf_file.
+#              the ELF is memory mapped, each section is one numpy uint32 array sliced by the function symbols, the
+#              words are matched against (mask, match) tables with searchsorted, one pass per distinct mask, and counted
+#              with one bincount. the tables are rv32 i, m, zicsr, zifencei and the op_binary of every instruction of
+#              assembly.yaml (tensix words are the instruction rotated left by 2, .ttinsn), compiled once per file.
+#
+# the arch attribute tells which tensix extension the ELF was compiled for. a test's ELFs are compiled for one
+# extension, get_tensix_instruction_kind asserts that. the profile assumes 32 bit instruction words (no compressed
+# instructions), check-profile (and test_elf_utils.py) compares it with read_elf on real ELFs. words outside every
+# function symbol are counted under the section name.
+#
+#   python elf_utils.py kinds <ELF file or test dir> [...]
+#   python elf_utils.py check <ELF file or test dir> [...]                                  (kinds vs read_elf.get_instruction_kinds)
+#   python elf_utils.py profile <kind> <assembly yaml> <ELF file or test dir> [...]
+#   python elf_utils.py check-profile <kind> <assembly yaml> <ELF file or test dir> [...]   (profile vs read_elf)
+
+import atexit
+import hashlib
+import mmap
+import numpy
+import os
+import re
+import serialization_utils
+import struct
+import sys
+import threading
+import time
+
+KEY_ENV_ELF_KIND_CACHE = "IRD_ELF_KIND_CACHE"
+ELF_MAGIC              = b"\x7fELF"
+SHT_RISCV_ATTRIBUTES   = 0x70000003
+TAG_FILE               = 1
+TAG_RISCV_ARCH         = 5
+TENSIX_KIND_NAMES      = ["ttwh", "ttbh", "ttqs"]
+RE_TENSIX_EXTENSION    = re.compile(r"(?:^|_)x(tt[a-z]+?)(?:\d+p\d+)?(?=_|$)")
+SHT_SYMTAB             = 2
+SHF_EXECINSTR          = 0x4
+STT_FUNC               = 2
+RV_KIND_NAME           = "rv32"
+UNKNOWN_MNEMONIC       = "unknown"
+TENSIX_OPCODE_MASK     = 0xff000000 # op_binary << 24, before the rotation
+NUM_PENDING_DECODED_KINDS = 64      # decoded kinds written to the json file at once
+RV_INSTRUCTIONS        = [ # (mask, match, mnemonic)
+    (0xffffffff, 0x00000073, "ecall"),  (0xffffffff, 0x00100073, "ebreak"), (0xffffffff, 0x30200073, "mret"),
+    (0xffffffff, 0x10500073, "wfi"),
+    (0xfe00707f, 0x00000033, "add"),    (0xfe00707f, 0x40000033, "sub"),    (0xfe00707f, 0x00001033, "sll"),
+    (0xfe00707f, 0x00002033, "slt"),    (0xfe00707f, 0x00003033, "sltu"),   (0xfe00707f, 0x00004033, "xor"),
+    (0xfe00707f, 0x00005033, "srl"),    (0xfe00707f, 0x40005033, "sra"),    (0xfe00707f, 0x00006033, "or"),
+    (0xfe00707f, 0x00007033, "and"),    (0xfe00707f, 0x02000033, "mul"),    (0xfe00707f, 0x02001033, "mulh"),
+    (0xfe00707f, 0x02002033, "mulhsu"), (0xfe00707f, 0x02003033, "mulhu"),  (0xfe00707f, 0x02004033, "div"),
+    (0xfe00707f, 0x02005033, "divu"),   (0xfe00707f, 0x02006033, "rem"),    (0xfe00707f, 0x02007033, "remu"),
+    (0xfe00707f, 0x00001013, "slli"),   (0xfe00707f, 0x00005013, "srli"),   (0xfe00707f, 0x40005013, "srai"),
+    (0x0000707f, 0x00000013, "addi"),   (0x0000707f, 0x00002013, "slti"),   (0x0000707f, 0x00003013, "sltiu"),
+    (0x0000707f, 0x00004013, "xori"),   (0x0000707f, 0x00006013, "ori"),    (0x0000707f, 0x00007013, "andi"),
+    (0x0000707f, 0x00000003, "lb"),     (0x0000707f, 0x00001003, "lh"),     (0x0000707f, 0x00002003, "lw"),
+    (0x0000707f, 0x00004003, "lbu"),    (0x0000707f, 0x00005003, "lhu"),    (0x0000707f, 0x00000023, "sb"),
+    (0x0000707f, 0x00001023, "sh"),     (0x0000707f, 0x00002023, "sw"),     (0x0000707f, 0x00000063, "beq"),
+    (0x0000707f, 0x00001063, "bne"),    (0x0000707f, 0x00004063, "blt"),    (0x0000707f, 0x00005063, "bge"),
+    (0x0000707f, 0x00006063, "bltu"),   (0x0000707f, 0x00007063, "bgeu"),   (0x0000707f, 0x00000067, "jalr"),
+    (0x0000707f, 0x0000000f, "fence"),  (0x0000707f, 0x0000100f, "fence.i"),
+    (0x0000707f, 0x00001073, "csrrw"),  (0x0000707f, 0x00002073, "csrrs"),  (0x0000707f, 0x00003073, "csrrc"),
+    (0x0000707f, 0x00005073, "csrrwi"), (0x0000707f, 0x00006073, "csrrsi"), (0x0000707f, 0x00007073, "csrrci"),
+    (0x0000007f, 0x00000037, "lui"),    (0x0000007f, 0x00000017, "auipc"),  (0x0000007f, 0x0000006f, "jal"),
+    ]
+
+_lock           = threading.Lock()
+_write_lock     = threading.Lock() # one writer of the decoded kinds file per process
+_digests        = dict() # (path, st_dev, st_ino, st_size, st_mtime_ns) -> digest
+_kinds          = dict() # digest -> tuple of tensix kind names
+_decoded_kinds  = None   # "<digest>.<read_elf version>" -> [tensix kind names], json file
+_pending_decoded_kinds = dict() # decoded kinds not written to the json file yet
+_read_elf_version = None
+_stats          = {"attributes" : 0, "decoded" : 0, "cached" : 0}
+
+class section:
+    def __init__(self, index, name, type, flags, addr, offset, size, link, entsize):
+        self.index   = index
+        self.name    = name
+        self.type    = type
+        self.flags   = flags
+        self.addr    = addr
+        self.offset  = offset
+        self.size    = size
+        self.link    = link
+        self.entsize = entsize
+
+    def __repr__(self):
+        return f"section({self.name}, addr 0x{self.addr:x}, size {self.size})"
+
+def get_sections(data):
+    # section name -> section of the ELF file contents data.
+    if ELF_MAGIC != data[:4]:
+        raise Exception("- error: not an ELF file")
+
+    is_64 = 2 == data[4]
+    endian = ">" if 2 == data[5] else "<"
+    if is_64:
+        e_shoff, = struct.unpack_from(f"{endian}Q", data, 0x28)
+        e_shentsize, e_shnum, e_shstrndx = struct.unpack_from(f"{endian}HHH", data, 0x3a)
+        sh_format = f"{endian}IIQQQQIIQQ"
+    else:
+        e_shoff, = struct.unpack_from(f"{endian}I", data, 0x20)
+        e_shentsize, e_shnum, e_shstrndx = struct.unpack_from(f"{endian}HHH", data, 0x2e)
+        sh_format = f"{endian}IIIIIIIIII"
+
+    headers = [struct.unpack_from(sh_format, data, e_shoff + idx * e_shentsize) for idx in range(e_shnum)]
+    if not headers:
+        return dict()
+
+    strtab_offset, strtab_size = headers[e_shstrndx][4], headers[e_shstrndx][5]
+    strtab = data[strtab_offset : strtab_offset + strtab_size]
+
+    sections = dict()
+    for index, (sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size, sh_link, _, _, sh_entsize) in enumerate(headers):
+        name = strtab[sh_name : strtab.find(b"\0", sh_name)].decode(errors = "replace")
+        sections[name] = section(index, name, sh_type, sh_flags, sh_addr, sh_offset, sh_size, sh_link, sh_entsize)
+
+    return sections
+
+def read_uleb128(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not (byte & 0x80):
+            return value, pos
+
+def read_ntbs(data, pos):
+    end = data.index(b"\0", pos)
+    return data[pos : end].decode(errors = "replace"), end + 1
+
+def get_riscv_attributes(data, sections = None):
+    # tag -> value of the file attributes of the riscv vendor in .riscv.attributes, empty if there is no such section.
+    # even tags have uleb128 values, odd tags strings.
+    sections = sections if sections is not None else get_sections(data)
+    attributes_section = next((sec for sec in sections.values() if SHT_RISCV_ATTRIBUTES == sec.type), None)
+    if attributes_section is None:
+        return dict()
+
+    contents = data[attributes_section.offset : attributes_section.offset + attributes_section.size]
+    if not contents or ord("A") != contents[0]:
+        return dict()
+
+    endian = ">" if 2 == data[5] else "<"
+    attributes = dict()
+    pos = 1
+    while pos + 4 <= len(contents):
+        length, = struct.unpack_from(f"{endian}I", contents, pos)
+        end = pos + length
+        vendor, sub_pos = read_ntbs(contents, pos + 4)
+        while "riscv" == vendor and sub_pos < end:
+            tag, attr_pos = read_uleb128(contents, sub_pos)
+            sub_length, = struct.unpack_from(f"{endian}I", contents, attr_pos)
+            sub_end = sub_pos + sub_length
+            attr_pos += 4
+            while TAG_FILE == tag and attr_pos < sub_end:
+                attr_tag, attr_pos = read_uleb128(contents, attr_pos)
+                if attr_tag % 2:
+                    attributes[attr_tag], attr_pos = read_ntbs(contents, attr_pos)
+                else:
+                    attributes[attr_tag], attr_pos = read_uleb128(contents, attr_pos)
+
+            sub_pos = sub_end
+
+        if length <= 0:
+            break
+
+        pos = end
+
+    return attributes
+
+def get_arch(data):
+    # Tag_RISCV_arch of the ELF file contents data, None if it has none.
+    return get_riscv_attributes(data).get(TAG_RISCV_ARCH)
+
+def get_tensix_instruction_kinds_from_arch(arch):
+    # tensix kind names of the extensions in an arch string, e.g. rv32i2p1_m2p0_xttqs1p0 -> ("ttqs",).
+    if not arch:
+        return tuple()
+
+    return tuple(sorted({name for name in RE_TENSIX_EXTENSION.findall(arch.lower()) if name in TENSIX_KIND_NAMES}))
+
+def get_kind_name(kind):
+    # name of a read_elf.instructions.kind member (the name read_elf.instructions.kind[name] looks up), or a kind name.
+    return kind.name if hasattr(kind, "name") else f"{kind}"
+
+def get_tensix_instruction_kinds_decoded(elf_file_name):
+    import read_elf
+
+    return tuple(sorted({get_kind_name(kind) for kind in read_elf.get_instruction_kinds(elf_file_name) if kind.is_tensix()}))
+
+def get_read_elf_version():
+    # hash of the name, size and mtime of read_elf and the binutils modules next to it, read_elf has no version.
+    global _read_elf_version
+    if _read_elf_version is None:
+        import read_elf
+
+        binutils_dir = os.path.dirname(os.path.abspath(read_elf.__file__))
+        stamp = [[file, os.stat(os.path.join(binutils_dir, file)).st_size, os.stat(os.path.join(binutils_dir, file)).st_mtime_ns] for file in sorted(os.listdir(binutils_dir)) if file.endswith(".py")]
+        _read_elf_version = hashlib.sha1(repr(stamp).encode("utf-8")).hexdigest()[:16]
+
+    return _read_elf_version
+
+def get_cache_file_name():
+    return os.environ.get(KEY_ENV_ELF_KIND_CACHE) or os.path.join(os.path.expanduser("~"), ".cache", "ird", "elf_kinds.json")
+
+def get_decoded_kinds():
+    global _decoded_kinds
+    if _decoded_kinds is None:
+        try:
+            _decoded_kinds = serialization_utils.json_io.load_file(get_cache_file_name(), cache = False)
+        except (OSError, ValueError):
+            _decoded_kinds = dict()
+
+    return _decoded_kinds
+
+def add_decoded_kinds(key, kinds):
+    # call with _lock held. returns the pending entries to write (outside the lock) every NUM_PENDING_DECODED_KINDS
+    # entries, else None. the rest is written at exit.
+    global _pending_decoded_kinds
+    get_decoded_kinds()[key] = list(kinds)
+    _pending_decoded_kinds[key] = list(kinds)
+    if len(_pending_decoded_kinds) < NUM_PENDING_DECODED_KINDS:
+        return None
+
+    pending, _pending_decoded_kinds = _pending_decoded_kinds, dict()
+    return pending
+
+def write_decoded_kinds(pending):
+    # merge pending into the file as it is on disk now (other processes may have added entries), write + rename.
+    # concurrent processes may still lose entries of each other but never leave a partial file.
+    if not pending:
+        return
+
+    file_name = get_cache_file_name()
+    with _write_lock:
+        try:
+            decoded_kinds = serialization_utils.json_io.load_file(file_name, cache = False)
+        except (OSError, ValueError):
+            decoded_kinds = dict()
+
+        decoded_kinds.update(pending)
+        try:
+            os.makedirs(os.path.dirname(file_name), exist_ok = True)
+            tmp_file_name = f"{file_name}.{os.getpid()}.tmp"
+            serialization_utils.json_io.dump_file(decoded_kinds, tmp_file_name, indent = None)
+
+            os.replace(tmp_file_name, file_name)
+        except OSError as exc:
+            print(f"- could not write {file_name}: {exc}")
+
+def flush_decoded_kinds():
+    # write the pending decoded kinds, registered to run at exit.
+    global _pending_decoded_kinds
+    with _lock:
+        pending, _pending_decoded_kinds = _pending_decoded_kinds, dict()
+
+    write_decoded_kinds(pending)
+
+# a terminated pool worker never gets here, it loses fewer than NUM_PENDING_DECODED_KINDS entries (decoded again later).
+atexit.register(flush_decoded_kinds)
+
+def get_digest(elf_file_name):
+    # (digest, contents), contents is None if the digest is known for the path, inode, size and mtime.
+    stat = os.stat(elf_file_name)
+    key = (os.path.abspath(elf_file_name), stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        digest = _digests.get(key)
+
+    if digest is not None:
+        return digest, None
+
+    with open(elf_file_name, "rb") as file:
+        data = file.read()
+
+    digest = hashlib.sha1(data).hexdigest()
+    with _lock:
+        _digests[key] = digest
+
+    return digest, data
+
+def invalidate():
+    # forget the kinds and digests known in this process, the decoded kinds file is kept.
+    with _lock:
+        _digests.clear()
+        _kinds.clear()
+
+def get_tensix_instruction_kinds(elf_file_name):
+    # sorted tuple of the tensix instruction kind names of an ELF file, e.g. ("ttqs",).
+    # in this process by digest, else from the arch attribute, else from the decoded kinds file, else decoded.
+    digest, data = get_digest(elf_file_name)
+    with _lock:
+        kinds = _kinds.get(digest)
+        if kinds is not None:
+            _stats["cached"] += 1
+            return kinds
+
+    if data is None:
+        with open(elf_file_name, "rb") as file:
+            data = file.read()
+
+    kinds = get_tensix_instruction_kinds_from_arch(get_arch(data))
+    if kinds:
+        with _lock:
+            _stats["attributes"] += 1
+            _kinds[digest] = kinds
+
+        return kinds
+
+    key = f"{digest}.{get_read_elf_version()}"
+    with _lock:
+        kinds = get_decoded_kinds().get(key)
+        if kinds is not None:
+            kinds = tuple(kinds)
+            _stats["cached"] += 1
+            _kinds[digest] = kinds
+            return kinds
+
+    kinds = get_tensix_instruction_kinds_decoded(elf_file_name)
+    with _lock:
+        _stats["decoded"] += 1
+        pending = add_decoded_kinds(key, kinds)
+        _kinds[digest] = kinds
+
+    write_decoded_kinds(pending)
+
+    return kinds
+
+def get_tensix_instruction_kind(elf_file_names):
+    # the one tensix instruction kind name of the given ELF files.
+    ttx_kinds = set()
+    for elf_file_name in elf_file_names:
+        ttx_kinds.update(get_tensix_instruction_kinds(elf_file_name))
+
+    if 1 != len(ttx_kinds):
+        raise Exception(f"- error: expected one tensix instruction kind, received {len(ttx_kinds)}, kinds: {ttx_kinds}")
+
+    return list(ttx_kinds)[0]
+
+def rotate_left_2(value):
+    return ((value << 2) | (value >> 30)) & 0xffffffff
+
+class opcode_table:
+    # (kind name, mnemonic) per id, and per distinct mask (most specific first) the sorted matches and their ids.
+    def __init__(self, kind, instructions):
+        # instructions: [(kind name, mask, match, mnemonic), ...], the first of equal (mask, match) wins.
+        self.kind     = kind
+        self.columns  = sorted({(kind_name, mnemonic) for kind_name, _, _, mnemonic in instructions} | {(RV_KIND_NAME, UNKNOWN_MNEMONIC), (kind, UNKNOWN_MNEMONIC)})
+        column_ids    = {column : idx for idx, column in enumerate(self.columns)}
+        self.unknown  = (column_ids[(RV_KIND_NAME, UNKNOWN_MNEMONIC)], column_ids[(kind, UNKNOWN_MNEMONIC)])
+        self.groups   = []
+        for mask in sorted({mask for _, mask, _, _ in instructions}, key = lambda mask: (-bin(mask).count("1"), mask)):
+            group = dict()
+            for kind_name, ins_mask, match, mnemonic in instructions:
+                if mask == ins_mask:
+                    group.setdefault(match, column_ids[(kind_name, mnemonic)])
+
+            matches = numpy.array(sorted(group.keys()), dtype = numpy.uint32)
+            self.groups.append((numpy.uint32(mask), matches, numpy.array([group[match] for match in matches.tolist()], dtype = numpy.int32)))
+
+    def match(self, words):
+        # column id per word. words that are no known instruction are unknown rv32 (lowest 2 bits 0b11) or unknown tensix.
+        ids = numpy.full(len(words), -1, dtype = numpy.int32)
+        for mask, matches, group_ids in self.groups:
+            masked = words & mask
+            pos = numpy.minimum(numpy.searchsorted(matches, masked), len(matches) - 1)
+            hits = (matches[pos] == masked) & (ids < 0)
+            ids[hits] = group_ids[pos[hits]]
+
+        unknown = ids < 0
+        ids[unknown] = numpy.where(3 == (words[unknown] & 3), self.unknown[0], self.unknown[1])
+
+        return ids
+
+def compile_opcode_table(assembly_yaml, kind):
+    # opcode_table of rv32 and the tensix instructions of assembly_yaml ({mnemonic : {"op_binary" : ..., ...}}).
+    instructions = [(RV_KIND_NAME, mask, match, mnemonic) for mask, match, mnemonic in RV_INSTRUCTIONS]
+    for mnemonic, value in (serialization_utils.yaml_io.load_file(assembly_yaml) or dict()).items():
+        if isinstance(value, dict) and value.get("op_binary") is not None:
+            op_binary = int(value["op_binary"], 0) if isinstance(value["op_binary"], str) else int(value["op_binary"])
+            instructions.append((kind, rotate_left_2(TENSIX_OPCODE_MASK), rotate_left_2(op_binary << 24), mnemonic))
+
+    if len(instructions) == len(RV_INSTRUCTIONS):
+        raise Exception(f"- error: found no instructions with op_binary in {assembly_yaml}")
+
+    return opcode_table(kind, instructions)
+
+def get_opcode_table(assembly_yaml, kind):
+    # compiled once per assembly yaml (and again if it changes).
+    return serialization_utils.parse_cache.get(assembly_yaml, lambda file_name: compile_opcode_table(file_name, kind), tag = f"elf_utils.opcode_table.{kind}")
+
+def get_functions(data, sections):
+    # section index -> [(start word, end word, function name), ...] of the function symbols, sorted by address.
+    symtab = next((sec for sec in sections.values() if SHT_SYMTAB == sec.type), None)
+    if symtab is None:
+        return dict()
+
+    endian = ">" if 2 == data[5] else "<"
+    if 2 == data[4]:
+        dtype = numpy.dtype([("name", f"{endian}u4"), ("info", "u1"), ("other", "u1"), ("shndx", f"{endian}u2"), ("value", f"{endian}u8"), ("size", f"{endian}u8")])
+    else:
+        dtype = numpy.dtype([("name", f"{endian}u4"), ("value", f"{endian}u4"), ("size", f"{endian}u4"), ("info", "u1"), ("other", "u1"), ("shndx", f"{endian}u2")])
+
+    symbols = numpy.frombuffer(data, dtype = dtype, count = symtab.size // dtype.itemsize, offset = symtab.offset)
+    symbols = symbols[(STT_FUNC == (symbols["info"] & 0xf)) & (symbols["size"] > 0)]
+    strtab = next(sec for sec in sections.values() if symtab.link == sec.index)
+    names = data[strtab.offset : strtab.offset + strtab.size]
+    addrs = {sec.index : sec.addr for sec in sections.values()}
+
+    functions = dict()
+    for name, value, size, shndx in zip(symbols["name"].tolist(), symbols["value"].tolist(), symbols["size"].tolist(), symbols["shndx"].tolist()):
+        if shndx in addrs.keys():
+            start = (value - addrs[shndx]) // 4
+            functions.setdefault(shndx, set()).add((start, start + (size + 3) // 4, names[name : names.find(b"\0", name)].decode(errors = "replace")))
+
+    return {shndx : sorted(value) for shndx, value in functions.items()}
+
+def get_histogram(data, table):
+    # {function : {(kind name, mnemonic) : count}} of the executable sections of the ELF file contents data. words
+    # outside every function symbol (padding, literal pools, code without symbols) count under the section name.
+    sections = get_sections(data)
+    functions = get_functions(data, sections)
+    dtype = numpy.dtype(">u4" if 2 == data[5] else "<u4")
+    names = []
+    keys = []
+    for sec in sorted(sections.values(), key = lambda sec: sec.addr):
+        if not (sec.flags & SHF_EXECINSTR) or sec.size < 4:
+            continue
+
+        words = numpy.frombuffer(data, dtype = dtype, count = sec.size // 4, offset = sec.offset).astype(numpy.uint32)
+        ids = table.match(words)
+        outside = numpy.ones(len(words), dtype = bool)
+        for start, end, name in functions.get(sec.index, []):
+            if name not in names:
+                names.append(name)
+
+            keys.append(names.index(name) * len(table.columns) + ids[max(start, 0) : end].astype(numpy.int64))
+            outside[max(start, 0) : end] = False
+
+        if outside.any():
+            if sec.name not in names:
+                names.append(sec.name)
+
+            keys.append(names.index(sec.name) * len(table.columns) + ids[outside].astype(numpy.int64))
+
+    counts = numpy.bincount(numpy.concatenate(keys), minlength = len(names) * len(table.columns)) if keys else numpy.zeros(0, dtype = numpy.int64)
+    histogram = {name : dict() for name in names}
+    for key in numpy.flatnonzero(counts).tolist():
+        histogram[names[key // len(table.columns)]][table.columns[key % len(table.columns)]] = int(counts[key])
+
+    return histogram
+
+def get_instruction_profile_from_elf_file(elf_file_name, sets, flatten_dict = False, kinds = None):
+    # as read_elf.get_instruction_profile_from_elf_file: ({function : {kind : {mnemonic : (count,)}}},), or
+    # ({kind : {mnemonic : (count,)}},) with flatten_dict. sets: {kind : assembly yaml} of the tensix kinds, the kind
+    # of the ELF is used if there is more than one. kinds: kind name -> key of the profile (e.g. read_elf kinds),
+    # default the kind names.
+    kind_names = {get_kind_name(kind) : assembly_yaml for kind, assembly_yaml in sets.items()}
+    kind = list(kind_names.keys())[0] if 1 == len(kind_names) else get_tensix_instruction_kind([elf_file_name])
+    if kind not in kind_names.keys():
+        raise Exception(f"- error: no instruction set for tensix instruction kind {kind} of {elf_file_name}, sets: {sorted(kind_names.keys())}")
+
+    table = get_opcode_table(kind_names[kind], kind)
+    with open(elf_file_name, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as data:
+            histogram = get_histogram(data, table)
+
+    kinds = kinds if kinds else dict()
+    profile = dict()
+    for function, counts in histogram.items():
+        function_profile = profile if flatten_dict else profile.setdefault(function, dict())
+        for (kind_name, mnemonic), count in counts.items():
+            mnemonics = function_profile.setdefault(kinds.get(kind_name, kind_name), dict())
+            mnemonics[mnemonic] = (mnemonics.get(mnemonic, (0,))[0] + count,)
+
+    return (profile,)
+
+def get_profile_counts(instruction_profile, function = ""):
+    # {(function, kind name, mnemonic) : count} of a (nested) instruction profile, nested function names joined with "/".
+    counts = dict()
+    for key, value in instruction_profile.items():
+        if isinstance(value, dict) and value and all(isinstance(ele, tuple) for ele in value.values()):
+            for mnemonic, mnemonic_value in value.items():
+                if mnemonic_value[0]:
+                    counts[(function, get_kind_name(key), mnemonic)] = counts.get((function, get_kind_name(key), mnemonic), 0) + mnemonic_value[0]
+        elif isinstance(value, dict):
+            for sub_key, count in get_profile_counts(value, f"{function}/{key}" if function else f"{key}").items():
+                counts[sub_key] = counts.get(sub_key, 0) + count
+
+    return counts
+
+def check_profile(elf_file_names, kind, assembly_yaml, max_num_messages = 10):
+    # differential check of get_instruction_profile_from_elf_file vs read_elf, returns the number of ELFs that differ.
+    import read_elf
+
+    read_elf_sets = {read_elf.instructions.kind[kind] : assembly_yaml}
+    num_mismatches = 0
+    times = [0.0, 0.0]
+    for elf_file_name in elf_file_names:
+        start = time.perf_counter()
+        counts = get_profile_counts(get_instruction_profile_from_elf_file(elf_file_name, {kind : assembly_yaml})[0])
+        times[0] += time.perf_counter() - start
+        start = time.perf_counter()
+        read_elf_counts = get_profile_counts(read_elf.get_instruction_profile_from_elf_file(elf_file_name, sets = read_elf_sets, flatten_dict = False)[0])
+        times[1] += time.perf_counter() - start
+        if counts == read_elf_counts:
+            continue
+
+        num_mismatches += 1
+        print(f"- {elf_file_name}: profiles differ")
+        diffs = sorted(key for key in set(counts.keys()) | set(read_elf_counts.keys()) if counts.get(key) != read_elf_counts.get(key))
+        for function, kind_name, mnemonic in diffs[:max_num_messages]:
+            print(f"  - {function} {kind_name} {mnemonic}: {counts.get((function, kind_name, mnemonic), 0)}, read_elf: {read_elf_counts.get((function, kind_name, mnemonic), 0)}")
+
+        if len(diffs) > max_num_messages:
+            print(f"  - ... {len(diffs) - max_num_messages} more")
+
+    print(f"- {len(elf_file_names)} ELFs, {num_mismatches} differ. elf_utils: {times[0]:.3f} s, read_elf: {times[1]:.3f} s")
+
+    return num_mismatches
+
+def get_elf_file_names(paths):
+    # ELF files of the given files and directories, directories in os.walk order.
+    elf_file_names = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pwd, _, files in os.walk(path):
+                elf_file_names.extend(os.path.join(pwd, file) for file in sorted(files) if file.endswith(".elf"))
+        else:
+            elf_file_names.append(path)
+
+    return elf_file_names
+
+if "__main__" == __name__:
+    commands = {"kinds" : 3, "check" : 3, "profile" : 5, "check-profile" : 5}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands.keys() or len(sys.argv) < commands[sys.argv[1]]:
+        print(f"usage: {sys.argv[0]} kinds <ELF file or test dir> [...]")
+        print(f"       {sys.argv[0]} check <ELF file or test dir> [...]")
+        print(f"       {sys.argv[0]} profile <kind> <assembly yaml> <ELF file or test dir> [...]")
+        print(f"       {sys.argv[0]} check-profile <kind> <assembly yaml> <ELF file or test dir> [...]")
+        sys.exit(1)
+
+    if "profile" == sys.argv[1]:
+        for elf_file_name in get_elf_file_names(sys.argv[4:]):
+            print(f"+ {elf_file_name}")
+            for (function, kind_name, mnemonic), count in sorted(get_profile_counts(get_instruction_profile_from_elf_file(elf_file_name, {sys.argv[2] : sys.argv[3]})[0]).items()):
+                print(f"  - {function} {kind_name} {mnemonic}: {count}")
+
+        sys.exit(0)
+
+    if "check-profile" == sys.argv[1]:
+        sys.exit(1 if check_profile(get_elf_file_names(sys.argv[4:]), sys.argv[2], sys.argv[3]) else 0)
+
+    num_mismatches = 0
+    for elf_file_name in get_elf_file_names(sys.argv[2:]):
+        kinds = get_tensix_instruction_kinds(elf_file_name)
+        if "check" == sys.argv[1]:
+            decoded_kinds = get_tensix_instruction_kinds_decoded(elf_file_name)
+            num_mismatches += int(kinds != decoded_kinds)
+            print(f"- {elf_file_name}: {', '.join(kinds)}" + ("" if kinds == decoded_kinds else f" (read_elf: {', '.join(decoded_kinds)})"))
+        else:
+            print(f"- {elf_file_name}: {', '.join(kinds)}")
+
+    print(f"- kinds from attributes: {_stats['attributes']}, decoded: {_stats['decoded']}, cached: {_stats['cached']}")
+    if "check" == sys.argv[1]:
+        print(f"- mismatches: {num_mismatches}")
+        sys.exit(1 if num_mismatches else 0)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+# shared git clone cache for the polaris, t3sim and binutils checkouts.
+#
+#   mirrors   : one bare mirror (git clone --mirror) per url below a cache directory shared by all tags, workspaces
+#               and users of the machine ($IRD_GIT_CACHE_DIR, default ~/.cache/ird/git). an existing mirror is
+#               updated incrementally (git fetch --prune). optionally partial (filter, e.g. blob:none) or shallow
+#               (depth). mirror updates are serialized with a lock file next to the mirror.
+#   checkouts : git worktree of the mirror, detached at the branch / tag / commit. the mirror is fetched before a
+#               branch, tag or HEAD is resolved (as a fresh clone would), only a full commit id the mirror already
+#               has is checked out without a fetch. an existing worktree switches with git checkout, all worktrees
+#               of a url share the objects of its mirror. force fetches and resets the worktree (git reset --hard,
+#               git clean -fdx) instead of removing it and cloning again.
+#
+# a checkout directory that is not a worktree of the mirror (e.g. an earlier plain clone) is kept unless force.
+#
+#   python git_cache_utils.py checkout <url> <ref> <dir> [force]
+#   python git_cache_utils.py list [cache dir]
+#   python git_cache_utils.py prune [cache dir]
+
+import contextlib
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+KEY_ENV_GIT_CACHE_DIR = "IRD_GIT_CACHE_DIR"
+GIT_TIMEOUT_SECONDS   = 3600
+RE_COMMIT_ID          = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+def get_default_cache_dir():
+    return os.environ.get(KEY_ENV_GIT_CACHE_DIR) or os.path.join(os.path.expanduser("~"), ".cache", "ird", "git")
+
+def get_options(args):
+    # optional keys of an args dict (model_args, t3sim_args): git_cache_dir, git_clone_filter, git_clone_depth.
+    options = dict()
+    options["cache_dir"] = args.get("git_cache_dir")
+    options["filter"]    = args.get("git_clone_filter")
+    options["depth"]     = args.get("git_clone_depth")
+
+    return options
+
+def get_mirror_dir(url, cache_dir = None):
+    # <cache dir>/<repository name>-<sha1(url)[:12]>.git, the same name on every machine for a url.
+    cache_dir = cache_dir if cache_dir else get_default_cache_dir()
+    name = url.rstrip("/").split("/")[-1].split(":")[-1]
+    name = name[:-4] if name.endswith(".git") else name
+
+    return os.path.join(cache_dir, f"{name}-{hashlib.sha1(url.encode()).hexdigest()[:12]}.git")
+
+def git(cmd, cwd = None, check = True, verbose = True):
+    if verbose:
+        print(f"- executing command: {' '.join(cmd)}" + (f" (in {cwd})" if cwd else ""))
+
+    result = subprocess.run(
+        cmd,
+        cwd = cwd,
+        capture_output = True,
+        text = True,
+        timeout = GIT_TIMEOUT_SECONDS,
+        )
+
+    if check and 0 != result.returncode:
+        raise Exception(f"- error: {' '.join(cmd)} failed with exit code {result.returncode}:\n{result.stderr.strip()}")
+
+    return result
+
+@contextlib.contextmanager
+def locked(mirror_dir):
+    # exclusive lock of a mirror, across processes and users.
+    os.makedirs(os.path.dirname(mirror_dir), exist_ok = True)
+    with open(f"{mirror_dir}.lock", "a") as file:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+def update_mirror(url, cache_dir = None, filter = None, depth = None):
+    # clone or fetch the mirror of url, returns its directory.
+    mirror_dir = get_mirror_dir(url, cache_dir)
+    with locked(mirror_dir):
+        if os.path.isfile(os.path.join(mirror_dir, "HEAD")):
+            cmd = ["git", "--git-dir", mirror_dir, "fetch", "--prune", "--tags", "origin"]
+            if depth:
+                cmd.append(f"--depth={depth}")
+
+            git(cmd)
+        else:
+            if os.path.isdir(mirror_dir):
+                shutil.rmtree(mirror_dir) # left over from an interrupted clone
+
+            tmp_dir = f"{mirror_dir}.{os.getpid()}.tmp"
+            cmd = ["git", "clone", "--mirror"]
+            if filter:
+                cmd.append(f"--filter={filter}")
+
+            if depth:
+                cmd.extend([f"--depth={depth}", "--no-single-branch"])
+
+            git(cmd + [url, tmp_dir])
+            os.rename(tmp_dir, mirror_dir)
+
+    return mirror_dir
+
+def resolve(mirror_dir, ref):
+    # commit id of ref (branch, tag or commit) in the mirror, None if unknown.
+    result = git(["git", "--git-dir", mirror_dir, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"], check = False, verbose = False)
+
+    return result.stdout.strip() if 0 == result.returncode else None
+
+def is_worktree_of(dir, mirror_dir):
+    git_file_name = os.path.join(dir, ".git")
+    if not os.path.isfile(git_file_name): # worktrees have a .git file, clones a .git directory
+        return False
+
+    with open(git_file_name) as file:
+        git_dir = file.read().strip().removeprefix("gitdir:").strip()
+
+    return os.path.realpath(git_dir).startswith(os.path.realpath(mirror_dir) + os.sep)
+
+def is_commit_id(ref):
+    # full (sha1 or sha256) commit id, not a branch, tag or abbreviated id.
+    return bool(RE_COMMIT_ID.fullmatch(ref))
+
+def get_head(dir):
+    result = git(["git", "rev-parse", "HEAD"], cwd = dir, check = False, verbose = False)
+
+    return result.stdout.strip() if 0 == result.returncode else None
+
+def checkout(url, ref, dir, force = False, cache_dir = None, filter = None, depth = None):
+    # dir at ref of url, as worktree of the cached mirror of url.
+    dir = os.path.abspath(dir)
+    mirror_dir = get_mirror_dir(url, cache_dir)
+
+    if os.path.isdir(dir) and not is_worktree_of(dir, mirror_dir):
+        if not force:
+            print(f"- keeping {dir}, it is not a worktree of {mirror_dir}")
+            return dir
+
+        shutil.rmtree(dir)
+
+    # a branch, tag or HEAD may have moved since the last fetch, only a commit id the mirror has is final.
+    commit = resolve(mirror_dir, ref) if is_commit_id(ref) and os.path.isdir(mirror_dir) else None
+    if force or commit is None:
+        update_mirror(url, cache_dir, filter, depth)
+        commit = resolve(mirror_dir, ref)
+
+    if commit is None:
+        raise Exception(f"- error: could not find {ref} in {url}")
+
+    if not os.path.isdir(dir):
+        with locked(mirror_dir):
+            git(["git", "--git-dir", mirror_dir, "worktree", "prune"])
+            git(["git", "--git-dir", mirror_dir, "worktree", "add", "--force", "--detach", dir, commit])
+    elif force:
+        git(["git", "checkout", "--force", "--detach", commit], cwd = dir)
+        git(["git", "reset", "--hard", commit], cwd = dir)
+        git(["git", "clean", "-fdx"], cwd = dir) # single -f keeps nested checkouts (binutils in t3sim)
+    elif commit != get_head(dir):
+        git(["git", "checkout", "--detach", commit], cwd = dir)
+
+    print(f"- {dir} at {ref} ({commit[:12]})")
+
+    return dir
+
+def get_worktrees(mirror_dir):
+    result = git(["git", "--git-dir", mirror_dir, "worktree", "list", "--porcelain"], check = False, verbose = False)
+
+    return [line.split(" ", 1)[1] for line in result.stdout.splitlines() if line.startswith("worktree ")]
+
+def get_mirror_dirs(cache_dir = None):
+    cache_dir = cache_dir if cache_dir else get_default_cache_dir()
+    if not os.path.isdir(cache_dir):
+        return []
+
+    return [os.path.join(cache_dir, name) for name in sorted(os.listdir(cache_dir)) if name.endswith(".git")]
+
+def mirrors_to_str(cache_dir = None):
+    cache_dir = cache_dir if cache_dir else get_default_cache_dir()
+    msg = f"+ git cache {cache_dir}\n"
+    for mirror_dir in get_mirror_dirs(cache_dir):
+        url = git(["git", "--git-dir", mirror_dir, "config", "--get", "remote.origin.url"], check = False, verbose = False).stdout.strip()
+        msg += f"  - {os.path.basename(mirror_dir)}: {url}\n"
+        for worktree in get_worktrees(mirror_dir):
+            if os.path.realpath(worktree) != os.path.realpath(mirror_dir):
+                msg += f"    + {worktree}\n"
+
+    return msg.rstrip()
+
+if "__main__" == __name__:
+    if len(sys.argv) < 2 or sys.argv[1] not in ["checkout", "list", "prune"] or ("checkout" == sys.argv[1] and len(sys.argv) < 5):
+        print(f"usage: {sys.argv[0]} checkout <url> <ref> <dir> [force]")
+        print(f"       {sys.argv[0]} list [cache dir]")
+        print(f"       {sys.argv[0]} prune [cache dir]")
+        sys.exit(1)
+
+    match sys.argv[1]:
+        case "checkout":
+            checkout(sys.argv[2], sys.argv[3], sys.argv[4], force = len(sys.argv) > 5 and "force" == sys.argv[5])
+        case "list":
+            print(mirrors_to_str(sys.argv[2] if len(sys.argv) > 2 else None))
+        case "prune":
+            for mirror_dir in get_mirror_dirs(sys.argv[2] if len(sys.argv) > 2 else None):
+                with locked(mirror_dir):
+                    git(["git", "--git-dir", mirror_dir, "worktree", "prune"])
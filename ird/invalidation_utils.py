@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+# re-run only the tests a change of the default cfg file (engines, per mnemonic tpt, engine delay) affects.
+#
+#   reverse index : mnemonic -> tests whose ELFs execute it (instruction profiles, smoke_suite_utils.get_used_mnemonics).
+#                   an engine reaches its tests through its instructions in the default cfg.
+#   diff          : old vs new default cfg. a changed tpt, or an instruction added to / removed from an engine,
+#                   touches the mnemonic. a changed delay (or an added / removed engine) touches all mnemonics of
+#                   the engine. a change outside "engines" touches every test.
+#   plan          : tests that execute a touched mnemonic. their model results are removed and they are run
+#                   again through polaris_tests.execute_tests (no force, so the model repository is kept).
+#
+# the old default cfg is the snapshot polaris_tests.execute_tests keeps in <model_odir> (updated by full suite runs
+# and by the run of the affected tests here, not by subset runs), or a given file.
+#
+#   python invalidation_utils.py <tag> [old default cfg] [run]
+
+import ird_status
+import os
+import polaris_utils
+import rtl_utils
+import serialization_utils
+import smoke_suite_utils
+import sys
+import trace_utils
+
+ALL = "*" # touched mnemonics if every test is affected
+
+def get_engines_by_name(cfg_dict):
+    return {engine["engineName"] : engine for engine in cfg_dict.get("engines", [])}
+
+def get_engine_mnemonics(engine):
+    return {instruction["name"] for instruction in engine.get("engineInstructions", [])}
+
+def get_tpts(engine):
+    return {instruction["name"] : instruction.get("tpt") for instruction in engine.get("engineInstructions", [])}
+
+def get_cfg_diff(old_cfg, new_cfg):
+    # (touched mnemonics, [reason, ...]). touched mnemonics is {ALL} if a change is not local to engines.
+    reasons = []
+    for key in sorted(set(old_cfg.keys()) | set(new_cfg.keys())):
+        if "engines" != key and old_cfg.get(key) != new_cfg.get(key):
+            reasons.append(f"{key} changed")
+
+    if reasons:
+        return {ALL}, reasons
+
+    touched = set()
+    old_engines = get_engines_by_name(old_cfg)
+    new_engines = get_engines_by_name(new_cfg)
+    for name in sorted(set(old_engines.keys()) | set(new_engines.keys())):
+        old_engine = old_engines.get(name, {})
+        new_engine = new_engines.get(name, {})
+        mnemonics = get_engine_mnemonics(old_engine) | get_engine_mnemonics(new_engine)
+        if not (old_engine and new_engine):
+            touched.update(mnemonics)
+            reasons.append(f"engine {name} {'added' if new_engine else 'removed'} ({len(mnemonics)} instructions)")
+            continue
+
+        for key in sorted((set(old_engine.keys()) | set(new_engine.keys())) - {"engineName", "engineInstructions"}):
+            if old_engine.get(key) != new_engine.get(key):
+                touched.update(mnemonics)
+                reasons.append(f"engine {name}: {key} {old_engine.get(key)} -> {new_engine.get(key)} ({len(mnemonics)} instructions)")
+
+        old_tpts = get_tpts(old_engine)
+        new_tpts = get_tpts(new_engine)
+        for mnemonic in sorted(set(old_tpts.keys()) | set(new_tpts.keys())):
+            if mnemonic not in old_tpts.keys() or mnemonic not in new_tpts.keys():
+                touched.add(mnemonic)
+                reasons.append(f"engine {name}: instruction {mnemonic} {'added' if mnemonic in new_tpts.keys() else 'removed'}")
+            elif old_tpts[mnemonic] != new_tpts[mnemonic]:
+                touched.add(mnemonic)
+                reasons.append(f"engine {name}: {mnemonic} tpt {old_tpts[mnemonic]} -> {new_tpts[mnemonic]}")
+
+    return touched, reasons
+
+def get_reverse_index(used_mnemonics):
+    # mnemonic -> sorted tests. used_mnemonics: test -> {"<kind>:<mnemonic>", ...}
+    index = dict()
+    for test, names in used_mnemonics.items():
+        for name in names:
+            index.setdefault(name.split(":", 1)[-1], set()).add(test)
+
+    return {mnemonic : sorted(tests) for mnemonic, tests in index.items()}
+
+def get_affected_tests(touched, reverse_index, tests):
+    if ALL in touched:
+        return sorted(tests)
+
+    tests = set(tests)
+    return sorted(set().union(*[reverse_index.get(mnemonic, []) for mnemonic in touched]) & tests)
+
+def remove_model_results(tests, model_args):
+    # log and simreport files, so polaris_tests.is_test_complete is False for the tests.
+    odir_incl_path = os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"], model_args["model_odir"])
+    if not os.path.isdir(odir_incl_path):
+        return
+
+    # exact names: <test><log suffix> and simreport_<test>.<ext>, a test name may be a prefix of another test name.
+    log_file_names = {f"{test}{model_args['model_log_file_suffix']}" for test in tests}
+    simreport_prefixes = tuple(f"{model_args['model_simreport']}{test}." for test in tests)
+    for file in os.listdir(odir_incl_path):
+        if (file in log_file_names) or file.startswith(simreport_prefixes):
+            os.remove(os.path.join(odir_incl_path, file))
+
+@trace_utils.traced("invalidation_utils.plan", args = ())
+def plan(tests, rtl_args, model_args, old_cfg_file_name = None):
+    # tests to run again after the default cfg changed from old_cfg_file_name (default: the snapshot) to the current file.
+    if not old_cfg_file_name:
+        old_cfg_file_name = polaris_utils.polaris_tests.get_default_cfg_snapshot_file_name(model_args)
+
+    new_cfg_file_name = polaris_utils.polaris_tests.get_default_cfg_file_name(model_args)
+    if not os.path.isfile(old_cfg_file_name):
+        print(f"- no default cfg snapshot {old_cfg_file_name}, every test is affected")
+        return sorted(tests)
+
+    old_cfg = serialization_utils.json_io.load_file(old_cfg_file_name, cache = False)
+    new_cfg = serialization_utils.json_io.load_file(new_cfg_file_name, cache = False)
+    touched, reasons = get_cfg_diff(old_cfg, new_cfg)
+    print(f"- default cfg changes, {old_cfg_file_name} -> {new_cfg_file_name}:")
+    for reason in reasons:
+        print(f"  - {reason}")
+
+    if not touched:
+        print("- no changes, no test is affected")
+        return []
+
+    reverse_index = get_reverse_index(smoke_suite_utils.get_used_mnemonics(tests, rtl_args, model_args)) if ALL not in touched else dict()
+    affected = get_affected_tests(touched, reverse_index, tests)
+    if ALL not in touched:
+        for mnemonic in sorted(touched):
+            print(f"  - {mnemonic}: {len(reverse_index.get(mnemonic, []))} tests")
+
+    print(f"- {len(affected)} of {len(tests)} tests affected")
+
+    return affected
+
+if "__main__" == __name__:
+    if len(sys.argv) < 2:
+        print(f"usage: {sys.argv[0]} <tag> [old default cfg] [run]")
+        sys.exit(1)
+
+    args = sys.argv[2:]
+    run = "run" in args
+    args = [arg for arg in args if "run" != arg]
+
+    rtl_args, polaris_big_args = ird_status.get_args(sys.argv[1])
+    tests = sorted(rtl_utils.test_names.get_tests(rtl_args))
+    print(f"- found {len(tests)} tests.")
+    affected = plan(tests, rtl_args, polaris_big_args, args[0] if args else None)
+    for test in affected:
+        print(f"  + {test}")
+
+    if run and affected:
+        remove_model_results(affected, polaris_big_args)
+        polaris_utils.polaris_tests.execute_tests(affected, rtl_args, polaris_big_args, update_cfg_snapshot = True)
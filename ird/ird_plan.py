@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+# what a full ird_polaris run would do with the local data as it is now: which RTL tests
+# lack a local PASS, which model tests would be (re-)run and whether an IRD instance is needed.
+# like ird_status, never imports the SSH or plotting stacks.
+
+import ird_polaris
+import ird_status
+import polaris_utils
+import rtl_utils
+import sys
+
+def get_plan(tests, rtl_args, model_args):
+    plan = dict()
+    plan["rtl"]   = sorted([test for test in tests if rtl_args["force"] or not rtl_utils.rtl_tests.is_local_test_status_pass(test, rtl_args)])
+    plan["model"] = sorted([test for test in tests if model_args["force"] or not polaris_utils.polaris_tests.is_test_complete(test, model_args)])
+    plan["need_ird_instance"] = ird_polaris.is_ird_instance_needed(rtl_args, model_args) or (0 != len(plan["rtl"]))
+
+    return plan
+
+def plan_to_str(tests, plan, offset = 2):
+    msg  = f"{' ' * offset}- number of tests:                    {len(tests)}\n"
+    msg += f"{' ' * offset}- RTL tests without a local PASS:      {len(plan['rtl'])}\n"
+    for test in plan["rtl"]:
+        msg += f"{' ' * offset}  - {test}\n"
+
+    msg += f"{' ' * offset}- model tests to execute:             {len(plan['model'])}\n"
+    for test in plan["model"]:
+        msg += f"{' ' * offset}  - {test}\n"
+
+    msg += f"{' ' * offset}- IRD instance needed:                {plan['need_ird_instance']}"
+
+    return msg
+
+if "__main__" == __name__:
+    rtl_tag = sys.argv[1] if len(sys.argv) > 1 else "nov6"
+    rtl_args, polaris_big_args = ird_status.get_args(rtl_tag)
+
+    tests = sorted(rtl_utils.test_names.get_tests(rtl_args))
+    plan = get_plan(tests, rtl_args, polaris_big_args)
+    print("+ Plan")
+    print(plan_to_str(tests, plan))
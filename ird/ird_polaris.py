@@ -3,7 +3,6 @@
 import collections
 import datetime
 import datetime
-import fabric
 import functools
 import getpass
 import itertools
@@ -11,16 +10,21 @@ import json
 import math
 import multiprocessing
 import os
-import paramiko
 import polaris_utils
 import re
+import rtl_build_cache_utils
 import rtl_utils
 import shlex
 import status_utils
 import sys
 import create_minimal_rtl_data_set
+import dashboard_utils
+import profile_utils
+import trace_utils
 
 def get_ird_reservations_list(username = getpass.getuser(), hostname = "yyz-ird", key_file_name = os.path.expanduser("~/.ssh/id_ed25519")):
+    import fabric
+
     with fabric.Connection(
         hostname,
         user = username,
@@ -64,6 +68,7 @@ def is_ird_instance_needed(rtl_args, polaris_big_args):
 
 
 def reserve_tensix_ird_instance(username = None, hostname = "yyz-ird", machine = None, key = os.path.expanduser("~/.ssh/id_ed25519")):
+    import fabric
 
     def get_ird_selection_id(username, hostname, key):
         table_dict   = get_ird_reservations_list(username = username, hostname = hostname, key_file_name = key)
@@ -113,6 +118,8 @@ def reserve_tensix_ird_instance(username = None, hostname = "yyz-ird", machine =
     return (selection_id, hostname, port)
 
 def ird_release(selection_id, hostname = None, username = None):
+    import fabric
+
     if not hostname:
         hostname = "yyz-ird"
 
@@ -125,6 +132,8 @@ def ird_release(selection_id, hostname = None, username = None):
         conn.run(cmd)
 
 def ird_release_all(username = getpass.getuser(), hostname = "yyz-ird", key_file_name = os.path.expanduser("~/.ssh/id_ed25519")):
+    import fabric
+
     ird_list_op = get_ird_reservations_list(username, hostname, key_file_name)
     ids = sorted([int(ele['SELECTION ID']) for ele in ird_list_op])
 
@@ -161,6 +170,8 @@ def ird_release_all(username = getpass.getuser(), hostname = "yyz-ird", key_file
         print("- end of ird list output")
 
 def clone_rtl_test_bench_at(path, repo_dir, machine, port, username = None):
+    import fabric
+
     repo_url  = f"git@yyz-tensix-gitlab:tensix-hw/{repo_dir}.git"
     if not username:
         username = getpass.getuser()
@@ -201,6 +212,8 @@ def clone_rtl_test_bench(repo_dir, machine, port, username = None):
     return path
 
 def build_rtl_test_bench(path, repo_dir, machine, port, username = None):
+    import fabric
+
     repo_path = os.path.join(path, repo_dir)
     if not username:
         username = getpass.getuser()
@@ -256,7 +269,10 @@ def build_rtl_test_bench(path, repo_dir, machine, port, username = None):
             print(f"- executing command {cmd} on server {machine}, port {port}")
             conn.run(cmd, timeout = 1800)
 
-def check_rtl_test_bench_path_clone_and_build_if_required(path, repo_dir, machine, port, username = None):
+def check_rtl_test_bench_path_clone_and_build_if_required(path, repo_dir, machine, port, username = None, build_cache_dir = None):
+    # build_cache_dir: restore / store builds keyed by commit and toolchain (rtl_build_cache_utils), otherwise any build*.log counts as built.
+    import fabric
+
     if not username:
         username = getpass.getuser()
 
@@ -277,6 +293,11 @@ def check_rtl_test_bench_path_clone_and_build_if_required(path, repo_dir, machin
             else:
                 print(f"{repo_dir} exists at {path} on {machine}, port {port}")
 
+            if build_cache_dir:
+                build = lambda: build_rtl_test_bench(path, repo_dir, machine, port, username)
+                rtl_build_cache_utils.build_if_required(conn, os.path.join(path, repo_dir), build, build_cache_dir)
+                return
+
             with conn.cd(repo_dir):
                 cmd = r'''
                     bash -O nullglob -c '
@@ -318,9 +339,9 @@ def get_yml_files_containing_tests(tag):
             "ttx-llk-fixed.yml" : {"suites" : "postcommit"}
         }
 
-if "__main__" == __name__:
+def get_rtl_args(rtl_tag):
     rtl_args = dict()
-    rtl_args["rtl_tag"] = "nov6"
+    rtl_args["rtl_tag"] = rtl_tag
     path = get_rtl_data_path_from_rtl_tag(rtl_args["rtl_tag"])
     if isinstance(path, tuple):
         rtl_args["rtl_tag"] = path[0]
@@ -341,6 +362,13 @@ if "__main__" == __name__:
     rtl_args["isa_file_name"]            = "assembly.yaml"
     rtl_args["max_num_threads_per_neo_core"] = 4
     rtl_args["num_processes"]            = 11
+    rtl_args["rtl_execution_mode"]       = "agent" # "agent": all tests over one SSH channel, "batch": detached shard scripts, otherwise one SSH session per test
+    rtl_args["rtl_agent_num_jobs"]       = rtl_args["num_processes"]
+    rtl_args["rtl_agent_python"]         = "python3"
+    rtl_args["rtl_batch_num_shards"]     = 1
+    rtl_args["rtl_batch_num_jobs_per_shard"] = rtl_args["num_processes"]
+    rtl_args["rtl_batch_poll_seconds"]   = 60
+    rtl_args["rtl_batch_max_reconnects"] = 10 # consecutive failed reconnects before polling gives up
     rtl_args["project.yaml"]             = "project.yml"
     rtl_args["remote_root_dir"]          = "ws-tensix"
     rtl_args["rtl_log_file_suffix"]      = ".rtl_test.log"
@@ -358,13 +386,21 @@ if "__main__" == __name__:
     rtl_args["username"]                 = getpass.getuser()
     rtl_args["num_bytes_per_register"]   = 4
     rtl_args["remote_root_dir_path"]     = path
+    rtl_args["rtl_build_cache_dir"]      = rtl_build_cache_utils.DEFAULT_CACHE_DIR # shared by the IRD machines, None: no build cache
     rtl_args["local_root_dir_path"]      = os.getcwd()
     rtl_args["local_root_dir"]           = f"from-{rtl_args['remote_root_dir']}-{rtl_args['rtl_tag']}"
+    rtl_args["rtl_archive"]              = None # e.g. __ext/rtl_test_data_set/<tag>.rtlar, status is read from and tests are extracted out of it
+    rtl_args["dashboard_port"]           = None # e.g. 8050, serves live results at http://127.0.0.1:<port>/ during the run
+    rtl_args["dashboard_host"]           = "127.0.0.1"
+    rtl_args["dashboard_refresh_seconds"] = 30
 
     rtl_args['copy_server_hostname'] = "auslogo2"
     rtl_args['copy_server_username'] = rtl_args["username"]
     rtl_args['copy_server_port']     = 22
 
+    return rtl_args
+
+def get_polaris_big_args(rtl_args):
     polaris_big_args = dict()
     polaris_big_args["cfg_enable_shared_l1"]         = 1
     polaris_big_args["cfg_enable_sync"]              = 1
@@ -414,45 +450,80 @@ if "__main__" == __name__:
     polaris_big_args["model_simreport"] = "simreport_"
     polaris_big_args["model_log_file_end"] = "Simreport = "
     polaris_big_args["debug"] = 15
+    polaris_big_args["model_executor"] = "process" # "thread" or "asyncio": tests of a run share one process, see polaris_tests.get_pool
+    polaris_big_args["dedup_tests"] = True # run the model once per unique (thread ELFs, inputcfg), see polaris_tests.get_test_signature
 
-    if os.path.exists(polaris_big_args["model_root_dir"]):
-        print(f"- directory {polaris_big_args["model_root_dir"]} exists!")
+    return polaris_big_args
 
-    need_ird_instance = is_ird_instance_needed(rtl_args, polaris_big_args)
-    print("- need_ird_instance: ", need_ird_instance)
+if "__main__" == __name__:
+    trace_utils.start()
+    profile_utils.start()
+
+    rtl_args = get_rtl_args("nov6")
+    path = rtl_args["remote_root_dir_path"]
+    polaris_big_args = get_polaris_big_args(rtl_args)
+
+    try:
+        with trace_utils.span("ird_polaris", rtl_tag = rtl_args["rtl_tag"]):
+            if os.path.exists(polaris_big_args["model_root_dir"]):
+                print(f"- directory {polaris_big_args["model_root_dir"]} exists!")
+
+            need_ird_instance = is_ird_instance_needed(rtl_args, polaris_big_args)
+            print("- need_ird_instance: ", need_ird_instance)
+
+            with trace_utils.span("ssh_host_keys"):
+                rtl_utils.copy.safe_connection(host = rtl_args["ird_server"], user = rtl_args["username"], connect_kwargs = {"key_filename": rtl_args["ssh_key_file"]})
+                rtl_utils.copy.safe_connection(host = rtl_args["copy_server_hostname"], user = rtl_args["copy_server_username"], connect_kwargs = {"key_filename": rtl_args["ssh_key_file"]})
+
+            if need_ird_instance:
+                with trace_utils.span("reserve_tensix_ird_instance"):
+                    selID, machine, port = reserve_tensix_ird_instance(
+                        hostname = rtl_args["ird_server"],
+                        username = rtl_args["username"],
+                        key = rtl_args["ssh_key_file"])
+            else:
+                selID = None
+                machine = None
+                port = None
 
-    rtl_utils.copy.safe_connection(host = rtl_args["ird_server"], user = rtl_args["username"], connect_kwargs = {"key_filename": rtl_args["ssh_key_file"]})
-    rtl_utils.copy.safe_connection(host = rtl_args["copy_server_hostname"], user = rtl_args["copy_server_username"], connect_kwargs = {"key_filename": rtl_args["ssh_key_file"]})
+            rtl_args["hostname"]   = machine
+            rtl_args["ird_sel_id"] = selID
+            rtl_args["port"]       = port
 
-    if need_ird_instance:
-        selID, machine, port = reserve_tensix_ird_instance(
-            hostname = rtl_args["ird_server"],
-            username = rtl_args["username"],
-            key = rtl_args["ssh_key_file"])
-    else:
-        selID = None
-        machine = None
-        port = None
+            if need_ird_instance:
+                with trace_utils.span("clone_and_build_rtl_test_bench"):
+                    check_rtl_test_bench_path_clone_and_build_if_required(path, rtl_args["remote_root_dir"], machine, port, rtl_args["username"], rtl_args["rtl_build_cache_dir"])
+
+            with trace_utils.span("get_tests"):
+                tests = sorted(rtl_utils.test_names.get_tests(rtl_args))
+            # tests = [test for test in tests if "t6-quas-n4-ttx-matmul-l1-acc-multicore-height-sharded-mxfp4_a-llk" != test]
+            print(f"- found {len(tests)} tests.")
+            for idx, test in enumerate(sorted(tests)):
+                print(f"  - {idx:>{int(math.log(len(tests))) + 1}}. {test}")
+
+            dashboard = dashboard_utils.start_if_requested(tests, rtl_args, polaris_big_args)
+
+            with trace_utils.span("rtl_tests.execute_tests", num_tests = len(tests)):
+                rtl_utils.rtl_tests.execute_tests(tests, rtl_args)
 
-    rtl_args["hostname"]   = machine
-    rtl_args["ird_sel_id"] = selID
-    rtl_args["port"]       = port
+            with trace_utils.span("polaris_tests.execute_tests", num_tests = len(tests)):
+                polaris_utils.polaris_tests.execute_tests(tests, rtl_args, polaris_big_args, update_cfg_snapshot = True)
 
-    if need_ird_instance:
-        check_rtl_test_bench_path_clone_and_build_if_required(path, rtl_args["remote_root_dir"], machine, port, rtl_args["username"])
+            if dashboard:
+                dashboard.stop()
 
-    tests = sorted(rtl_utils.test_names.get_tests(rtl_args))
-    # tests = [test for test in tests if "t6-quas-n4-ttx-matmul-l1-acc-multicore-height-sharded-mxfp4_a-llk" != test]
-    print(f"- found {len(tests)} tests.")
-    for idx, test in enumerate(sorted(tests)):
-        print(f"  - {idx:>{int(math.log(len(tests))) + 1}}. {test}")
+            with trace_utils.span("status_utils.print_status"):
+                status_utils.print_status(tests, rtl_args, polaris_big_args)
 
-    rtl_utils.rtl_tests.execute_tests(tests, rtl_args)
-    polaris_utils.polaris_tests.execute_tests(tests, rtl_args, polaris_big_args)
-    status_utils.print_status(tests, rtl_args, polaris_big_args)
+            with trace_utils.span("rtl_data_copy.copy_rtl_data"):
+                rtl_utils.rtl_data_copy.copy_rtl_data(rtl_args)
 
-    rtl_utils.rtl_data_copy.copy_rtl_data(rtl_args)
-    create_minimal_rtl_data_set.get_minimal_rtl_data(rtl_args, polaris_big_args)
+            with trace_utils.span("get_minimal_rtl_data"):
+                create_minimal_rtl_data_set.get_minimal_rtl_data(rtl_args, polaris_big_args)
 
-    if need_ird_instance:
-        ird_release(selID)
\ No newline at end of file
+            if need_ird_instance:
+                with trace_utils.span("ird_release"):
+                    ird_release(selID)
+    finally:
+        trace_utils.finish()
+        profile_utils.finish()
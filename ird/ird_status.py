@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+# status of an already finished run. reads the local RTL data and model logs only,
+# never imports the SSH (fabric/paramiko) or plotting (matplotlib) stacks.
+#
+#   python ird_status.py [tag]                # print the status
+#   python ird_status.py <tag> serve [port]   # serve the status dashboard (dashboard_utils)
+
+import dashboard_utils
+import ird_polaris
+import os
+import rtl_utils
+import status_utils
+import sys
+
+def get_args(rtl_tag):
+    rtl_args = ird_polaris.get_rtl_args(rtl_tag)
+    polaris_big_args = ird_polaris.get_polaris_big_args(rtl_args)
+
+    rtl_args["force"]         = False
+    polaris_big_args["force"] = False
+
+    local_rtl_data_dir = os.path.join(rtl_args["local_root_dir_path"], rtl_args["local_root_dir"])
+    if not os.path.isdir(os.path.join(local_rtl_data_dir, rtl_args["infra_dir"])):
+        raise Exception(f"- error: local RTL data directory {local_rtl_data_dir} (incl. {rtl_args['infra_dir']}) does not exist, nothing to report.")
+
+    return rtl_args, polaris_big_args
+
+if "__main__" == __name__:
+    rtl_tag = sys.argv[1] if len(sys.argv) > 1 else "nov6"
+    rtl_args, polaris_big_args = get_args(rtl_tag)
+
+    tests = sorted(rtl_utils.test_names.get_tests(rtl_args))
+    print(f"- found {len(tests)} tests.")
+
+    if len(sys.argv) > 2 and "serve" == sys.argv[2]:
+        dashboard_utils.dashboard(tests, rtl_args, polaris_big_args, port = int(sys.argv[3]) if len(sys.argv) > 3 else 8050).serve_forever()
+    else:
+        status_utils.print_status(tests, rtl_args, polaris_big_args, plot = False)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+# S-curves (PM/RTL number of cycles per test, sorted) for suites with thousands of tests.
+#   - Agg canvas on a bare matplotlib Figure (no pyplot state), so figures are freed when the call returns.
+#   - numeric x axis with at most max_num_ticks test labels, the curve itself is rasterized in SVGs.
+#   - render() draws independent plots in worker processes.
+#   - write_s_curve_html() writes one self contained HTML file with an SVG S-curve, test names on hover.
+#
+# points: [(test, value), ...] sorted by value. class_points: {test class : points}.
+
+import html
+import math
+import multiprocessing
+import os
+import trace_utils
+
+DEFAULT_FORMATS       = ("svg", "png")
+DEFAULT_DPI           = 150
+DEFAULT_MAX_NUM_TICKS = 60
+BANDS                 = [(0.3, 0.05), (0.2, 0.1), (0.1, 0.2)] # (+/- fraction of 1, alpha)
+COLORS                = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"] # matplotlib's default cycle
+
+def get_tick_indices(num_points, max_num_ticks = DEFAULT_MAX_NUM_TICKS):
+    if num_points <= max_num_ticks:
+        return list(range(num_points))
+
+    step = math.ceil((num_points - 1) / max(1, max_num_ticks - 1))
+    indices = list(range(0, num_points, step))
+    if indices[-1] != num_points - 1:
+        indices.append(num_points - 1)
+
+    return indices
+
+def get_band_label(values, fraction):
+    num_tests = len(values)
+    num_within = len([ele for ele in values if abs(ele - 1.0) <= fraction])
+    return f"+/- {fraction * 100:.0f}% ({num_within}/{num_tests} tests, {((num_within / num_tests) * 100) if num_tests else 0:.0f}%)"
+
+def get_figure(figsize):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.backends.backend_agg
+    import matplotlib.figure
+
+    fig = matplotlib.figure.Figure(figsize = figsize)
+    matplotlib.backends.backend_agg.FigureCanvasAgg(fig)
+
+    return fig
+
+def save_figure(fig, file_name_prefix, formats = DEFAULT_FORMATS, dpi = DEFAULT_DPI):
+    file_names = []
+    try:
+        for fmt in formats:
+            file_name = f"{file_name_prefix}.{fmt}"
+            fig.savefig(file_name, format = fmt, bbox_inches = "tight", dpi = dpi)
+            file_names.append(file_name)
+    finally:
+        fig.clear()
+
+    return file_names
+
+def set_x_ticks(ax, labels, max_num_ticks):
+    tick_indices = get_tick_indices(len(labels), max_num_ticks)
+    ax.set_xticks([idx + 1 for idx in tick_indices])
+    ax.set_xticklabels([labels[idx] for idx in tick_indices])
+    ax.tick_params(axis = 'x', labelrotation = 90, labelsize = 6 if len(tick_indices) > 20 else 8)
+
+@trace_utils.traced("plot_utils.plot_s_curve", args = ())
+def plot_s_curve(points, file_name_prefix, formats = DEFAULT_FORMATS, dpi = DEFAULT_DPI, max_num_ticks = DEFAULT_MAX_NUM_TICKS):
+    if not points:
+        print(f"- no tests to plot for {file_name_prefix}")
+        return []
+
+    x = list(range(1, len(points) + 1))
+    y = [value for _, value in points]
+    labels = [f"{test} ({value:.2f})" for test, value in points]
+
+    fig = get_figure((8, 4))
+    ax = fig.add_subplot()
+    ax.axhline(1, color = 'black', linestyle = "--", linewidth = 0.5, alpha = 0.5, label = f"{sum([1 for ele in y if ele <= 1])} tests with PM/RTL <= 1")
+    ax.plot(x, y,
+            color     = [0,0,0],
+            marker    = 'o' if len(x) <= 200 else None,
+            linestyle = '-',
+            linewidth = 1.0,
+            markerfacecolor = [1,1,1],
+            rasterized = len(x) > 200)
+
+    for fraction, alpha in BANDS:
+        ax.axhspan(1 - fraction, 1 + fraction, color = "gray", alpha = alpha, label = get_band_label(y, fraction))
+
+    ax.set_xlabel("Tests")
+    ax.set_ylabel("Perf comparison (PM/RTL)")
+    ax.set_xlim(0.5, len(x) + 0.5)
+    set_x_ticks(ax, labels, max_num_ticks)
+    ax.legend()
+
+    file_names = save_figure(fig, file_name_prefix, formats, dpi)
+    print(f"- wrote {', '.join(file_names)}")
+
+    return file_names
+
+@trace_utils.traced("plot_utils.plot_test_class_wise_s_curve", args = ())
+def plot_test_class_wise_s_curve(class_points, file_name_prefix, formats = DEFAULT_FORMATS, dpi = DEFAULT_DPI, max_num_ticks = DEFAULT_MAX_NUM_TICKS, num_markers_per_line = 5):
+    class_points = {test_class : points for test_class, points in class_points.items() if points}
+    if not class_points:
+        print(f"- no tests to plot for {file_name_prefix}")
+        return []
+
+    values = [value for points in class_points.values() for _, value in points]
+    maxy = max(values)
+    miny = min(values)
+
+    fig = get_figure((12, 4))
+    ax = fig.add_subplot()
+    labels = []
+    start = 1
+    for test_class_idx, (test_class, points) in enumerate(class_points.items()):
+        color = COLORS[test_class_idx % len(COLORS)]
+        x = list(range(start, start + len(points)))
+        y = [value for _, value in points]
+        labels.extend([f"{test} ({value:.2f})" for test, value in points])
+        ax.plot(x, y,
+            color     = [0,0,0],
+            marker    = 'o',
+            linestyle = '-',
+            linewidth = 1.0,
+            markerfacecolor = color,
+            markevery = max(1, int(round(len(x) / num_markers_per_line))),
+            rasterized = len(values) > 200)
+
+        ax.axvspan(min(x) - 0.5, max(x) + 0.5, color = color, alpha = 0.05)
+        y_for_text = maxy - (maxy - miny) * 0.07 if len(x) > 3 else maxy
+        ax.text(min(x), y_for_text, test_class, color = color)
+        start += len(points)
+
+    ax.set_xlabel("Tests")
+    ax.set_ylabel("Perf comparison (PM/RTL)")
+    ax.set_xlim(0.5, len(labels) + 0.5)
+    set_x_ticks(ax, labels, max_num_ticks)
+
+    file_names = save_figure(fig, file_name_prefix, formats, dpi)
+    print(f"- wrote {', '.join(file_names)}")
+
+    return file_names
+
+def get_s_curve_svg(class_points, width = 1200, height = 400, title = "Perf comparison (PM/RTL)"):
+    # plain SVG, one circle per test with a <title> (the browser shows it on hover). no text is rendered per test.
+    class_points = {test_class : points for test_class, points in class_points.items() if points}
+    num_points = sum([len(points) for points in class_points.values()])
+    left, right, top, bottom = 60, 20, 30, 40
+    if 0 == num_points:
+        return f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}"><text x="{left}" y="{top}">no tests</text></svg>'
+
+    values = [value for points in class_points.values() for _, value in points]
+    miny = min(min(values), 1 - BANDS[0][0])
+    maxy = max(max(values), 1 + BANDS[0][0])
+    pad = (maxy - miny) * 0.05
+    miny, maxy = miny - pad, maxy + pad
+
+    def px(idx):
+        return left + (idx + 0.5) * (width - left - right) / num_points
+
+    def py(value):
+        return top + (maxy - value) * (height - top - bottom) / (maxy - miny)
+
+    svg = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="11">']
+    svg.append(f'<text x="{left}" y="{top - 10}" font-size="13">{html.escape(title)}</text>')
+    for fraction, alpha in BANDS:
+        svg.append(f'<rect x="{left}" y="{py(1 + fraction):.1f}" width="{width - left - right}" height="{py(1 - fraction) - py(1 + fraction):.1f}" fill="gray" fill-opacity="{alpha}"><title>{html.escape(get_band_label(values, fraction))}</title></rect>')
+
+    svg.append(f'<line x1="{left}" y1="{py(1):.1f}" x2="{width - right}" y2="{py(1):.1f}" stroke="black" stroke-dasharray="4 3" stroke-opacity="0.5"/>')
+    for idx in range(5):
+        value = miny + (maxy - miny) * idx / 4
+        svg.append(f'<text x="{left - 6}" y="{py(value) + 4:.1f}" text-anchor="end">{value:.2f}</text>')
+
+    start = 0
+    for test_class_idx, (test_class, points) in enumerate(class_points.items()):
+        color = COLORS[test_class_idx % len(COLORS)]
+        if len(class_points) > 1:
+            svg.append(f'<rect x="{px(start) - 0.5 * (px(1) - px(0)):.1f}" y="{top}" width="{len(points) * (px(1) - px(0)):.1f}" height="{height - top - bottom}" fill="{color}" fill-opacity="0.05"/>')
+            svg.append(f'<text x="{px(start):.1f}" y="{top + 12}" fill="{color}">{html.escape(str(test_class))}</text>')
+
+        svg.append(f'<polyline fill="none" stroke="black" stroke-width="1" points="{" ".join(f"{px(start + idx):.1f},{py(value):.1f}" for idx, (_, value) in enumerate(points))}"/>')
+        for idx, (test, value) in enumerate(points):
+            svg.append(f'<circle cx="{px(start + idx):.1f}" cy="{py(value):.1f}" r="2.5" fill="{color}"><title>{html.escape(str(test))} ({value:.3f})</title></circle>')
+
+        start += len(points)
+
+    svg.append(f'<text x="{(left + width - right) / 2:.1f}" y="{height - 10}" text-anchor="middle">Tests ({num_points})</text>')
+    svg.append('</svg>')
+
+    return "\n".join(svg)
+
+@trace_utils.traced("plot_utils.write_s_curve_html", args = ())
+def write_s_curve_html(curves, file_name, title = "S-curves"):
+    # curves: {curve title : class_points}, one SVG per curve.
+    body = "\n".join([f"<h2>{html.escape(curve_title)}</h2>\n{get_s_curve_svg(class_points, title = 'Perf comparison (PM/RTL)')}" for curve_title, class_points in curves.items()])
+    with open(file_name, "w") as file:
+        file.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title></head>\n<body style="font-family: sans-serif">\n<h1>{html.escape(title)}</h1>\n{body}\n</body></html>\n')
+
+    print(f"- wrote {file_name}")
+
+    return file_name
+
+def render_job(fn, kwargs):
+    return fn(**kwargs)
+
+def render(jobs, num_processes = None):
+    # jobs: [(module level plot function, kwargs), ...]. one worker process per job, up to num_processes.
+    if not jobs:
+        return []
+
+    num_processes = min(len(jobs), num_processes if num_processes else os.cpu_count())
+    if 1 == num_processes:
+        return [render_job(fn, kwargs) for fn, kwargs in jobs]
+
+    with multiprocessing.Pool(processes = num_processes) as pool:
+        return pool.starmap(render_job, jobs)
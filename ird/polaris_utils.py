@@ -5,34 +5,39 @@ import sys
 sys.path.append("polaris")
 sys.path.append("polaris/ttsim/front/llk")
 
+import asyncio
 import collections
 import contextlib
 import datetime
-import datetime
-import fabric
 import filecmp
 import functools
 import getpass
+import git_cache_utils
+import hashlib
 import itertools
 import json
 import multiprocessing
-import paramiko
-import paramiko.ssh_exception
+import multiprocessing.pool
 import pathlib
+import profile_utils
 import re
-import read_elf
 import registers_utils
+import rtl_archive_utils
 import rtl_utils
+import serialization_utils
 import shlex
 import shutil
+import status_utils
 import subprocess
 import sys
 import t3sim_utils
-import tensix
+import test_layout_utils
+import trace_utils
 import yaml
 
 class polaris_tests:
     @staticmethod
+    @trace_utils.traced("polaris_tests.check_and_update_isa_file", args = ())
     def check_and_update_isa_file(rtl_args, model_args):
         def clone_polaris_if_required(args):
             key_model_force = "force"
@@ -45,19 +50,7 @@ class polaris_tests:
 
             model_root_dir = args[key_model_root_dir]
 
-            if args[key_model_force] or (not os.path.isdir(model_root_dir)):
-                if os.path.isdir(model_root_dir):
-                    shutil.rmtree(model_root_dir)
-
-                cmd = f"git clone {args[key_model_git_url]} && cd {model_root_dir} && git checkout {args[key_model_git_branch]} && cd .."
-
-                result = subprocess.run(
-                    cmd,
-                    shell = True,
-                    capture_output = True,       # collect stdout / stderr
-                    check = True,                # raise CalledProcessError if exit-code ≠ 0
-                    timeout = 3600,              # optional: abort after N seconds
-                    )
+            git_cache_utils.checkout(args[key_model_git_url], args[key_model_git_branch], model_root_dir, force = args[key_model_force], **git_cache_utils.get_options(args))
 
             if not os.path.isdir(model_root_dir):
                 raise Exception(f"- error: could not find directory {model_root_dir}")
@@ -131,8 +124,7 @@ class polaris_tests:
             os.makedirs(cfg_dir_incl_path, exist_ok = True)
 
         file_name = os.path.join(cfg_dir_incl_path, f"{model_args[key_model_cfg_file_prefix]}{test}.json")
-        with open(file_name, 'w') as file:
-            json.dump(cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(cfg_dict, file_name, indent = 2)
 
         return file_name
 
@@ -155,21 +147,14 @@ class polaris_tests:
         for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_t3sim_")]:
             assert key in model_args.keys(), f"- error: {key} not found in given rtl_args dict"
 
-        local_root_dir_incl_path = os.path.join(rtl_args[key_rtl_local_root_dir_path], rtl_args[key_rtl_local_root_dir])
-        test_dir = test + rtl_args[key_rtl_test_dir_suffix]
-        for pwd, _, _ in os.walk(local_root_dir_incl_path):
-            if pwd.endswith(test_dir):
-                test_dir_incl_path = pwd
-
-        if "test_dir_incl_path" not in locals():
-            raise Exception(f"- error: test_dir_incl_path not set, most likely did not find {test_dir} in path {local_root_dir_incl_path}")
+        layout = test_layout_utils.get_layout(test_layout_utils.get_test_dir(test, rtl_args))
 
         input_cfg_dict                  = dict()
         input_cfg_dict["llkVersionTag"] = rtl_args[key_rtl_rtl_tag]
         input_cfg_dict["cfg"]           = model_args[key_model_cfg]
         input_cfg_dict["memoryMap"]     = model_args[key_model_memory_map]
         input_cfg_dict["debug"]         = model_args[key_model_debug]
-        input_cfg_dict["numTCores"]     = t3sim_utils.get_num_neos(test_dir_incl_path)
+        input_cfg_dict["numTCores"]     = layout.get_num_neos()
         input_cfg_dict["input"]         = dict()
         input_cfg                       = input_cfg_dict["input"]
         input_cfg["syn"]                = 0
@@ -179,32 +164,27 @@ class polaris_tests:
         for neo_id in range(num_neos):
             tc_key = f"tc{neo_id}"
             input_neo = dict()
-            neo_dir = f"neo_{neo_id}"
-            for pwd, _, _ in os.walk(test_dir_incl_path):
-                if pwd.endswith(neo_dir):
-                    input_neo["startFunction"] = model_args[key_model_start_function]
-                    input_neo["numThreads"] = rtl_args[key_rtl_max_num_threads_per_neo_core]
-                    for thread_id in range(rtl_args[key_rtl_max_num_threads_per_neo_core]):
-                        key = f"th{thread_id}Path"
-                        input_neo[f"th{thread_id}Path"] = ""
-                        input_neo[f"th{thread_id}Elf"] = ""
-
-                    num_threads = t3sim_utils.get_num_threads(pwd)
-                    if num_threads in {0, None}:
-                        raise Exception(f"- error: expected at least one thread, received {num_threads}. Path: {pwd}")
-
-                    # input_neo["startFunction"] = model_args[key_model_start_function]
-                    # input_neo["numThreads"] = num_threads
-
-                    neo_os_walk = os.walk(pwd)
-                    for pwd1, _, files in neo_os_walk:
-                        for file in files:
-                            if file.endswith(".elf"):
-                                thread_id = int(file.split("_")[-1].split(".")[0])
-                                if thread_id > num_threads:
-                                    raise Exception(f"- error: thread id is greater than number of threads. thread_id: {thread_id}, number of threads: {num_threads}")
-                                input_neo[f"th{thread_id}Path"] = pwd1
-                                input_neo[f"th{thread_id}Elf"] = file
+            for pwd in layout.get_neo_dirs(neo_id):
+                input_neo["startFunction"] = model_args[key_model_start_function]
+                input_neo["numThreads"] = rtl_args[key_rtl_max_num_threads_per_neo_core]
+                for thread_id in range(rtl_args[key_rtl_max_num_threads_per_neo_core]):
+                    key = f"th{thread_id}Path"
+                    input_neo[f"th{thread_id}Path"] = ""
+                    input_neo[f"th{thread_id}Elf"] = ""
+
+                num_threads = layout.get_num_threads(pwd)
+                if num_threads in {0, None}:
+                    raise Exception(f"- error: expected at least one thread, received {num_threads}. Path: {pwd}")
+
+                # input_neo["startFunction"] = model_args[key_model_start_function]
+                # input_neo["numThreads"] = num_threads
+
+                for elf in layout.get_elfs(pwd):
+                    thread_id = int(elf.name.split("_")[-1].split(".")[0])
+                    if thread_id > num_threads:
+                        raise Exception(f"- error: thread id is greater than number of threads. thread_id: {thread_id}, number of threads: {num_threads}")
+                    input_neo[f"th{thread_id}Path"] = elf.dir
+                    input_neo[f"th{thread_id}Elf"] = elf.name
 
             input_cfg[tc_key] = {key : input_neo[key] for key in sorted(input_neo.keys())}
 
@@ -213,6 +193,7 @@ class polaris_tests:
         return input_cfg_dict
 
     @staticmethod
+    @trace_utils.traced("polaris_tests.write_inputcfg_file")
     def write_inputcfg_file(test_id, test, rtl_args, model_args):
         key_root_dir        = "model_root_dir"
         key_cfg_dir         = "model_cfg_dir"
@@ -232,8 +213,7 @@ class polaris_tests:
             os.makedirs(cfg_dir_incl_path, exist_ok = True)
 
         file_name = os.path.join(cfg_dir_incl_path, f"{model_args[key_inputcfg_prefix]}{test}.json")
-        with open(file_name, 'w') as file:
-            json.dump(input_cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(input_cfg_dict, file_name, indent = 2)
 
         return file_name
 
@@ -266,6 +246,18 @@ class polaris_tests:
         return cfg_dict
 
     @staticmethod
+    def get_default_cfg_file_name(model_args):
+        # default cfg file (engines, tpt, delay) in the model repository, read by cfg_engines.
+        model_dir = os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"])
+        return rtl_utils.test_names.get_file_name_incl_path(model_dir, model_args["default_cfg_file_name"])
+
+    @staticmethod
+    def get_default_cfg_snapshot_file_name(model_args):
+        # copy of the default cfg file the results in <model_odir> were obtained with, see invalidation_utils.
+        return os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"], model_args["model_odir"], "default_cfg_snapshot.json")
+
+    @staticmethod
+    @trace_utils.traced("polaris_tests.write_default_cfg_file", args = ())
     def write_default_cfg_file(model_args):
         key_model_cfg_dir         = "model_cfg_dir"
         key_model_cfg_file_prefix = "model_cfg_file_prefix"
@@ -281,12 +273,12 @@ class polaris_tests:
             os.makedirs(cfg_dir_incl_path, exist_ok = True)
 
         file_name = os.path.join(cfg_dir_incl_path, f"{model_args[key_model_cfg_file_prefix]}.json")
-        with open(file_name, 'w') as file:
-            json.dump(cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(cfg_dict, file_name, indent = 2)
 
         return file_name
 
     @staticmethod
+    @trace_utils.traced("polaris_tests.write_default_memory_map_file", args = ())
     def write_default_memory_map_file(rtl_args, model_args):
         key_model_cfg_dir         = "model_cfg_dir"
         key_model_cfg_file_prefix = "model_cfg_file_prefix"
@@ -315,6 +307,36 @@ class polaris_tests:
 
 
     @staticmethod
+    def is_test_complete(test, model_args):
+        key_model_log_file_suffix = "model_log_file_suffix"
+        key_model_odir = "model_odir"
+        key_model_root_dir = "model_root_dir"
+        key_model_root_dir_path = "model_root_dir_path"
+        key_model_simreport = "model_simreport"
+        key_model_log_file_end = "model_log_file_end"
+
+        for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_model_")]:
+            assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+        odir_incl_path = os.path.join(model_args[key_model_root_dir_path], model_args[key_model_root_dir], model_args[key_model_odir])
+        log_file_name = os.path.join(odir_incl_path, f"{test}{model_args[key_model_log_file_suffix]}")
+
+        if os.path.isfile(log_file_name):
+            with open(log_file_name) as file:
+                lines = file.readlines()
+                if not lines or not lines[-1].strip().startswith(model_args[key_model_log_file_end]):
+                    return False
+
+        if not os.path.isdir(odir_incl_path):
+            return False
+
+        # simreport_<test>.json in <model_odir> itself, sweeps and calibration runs write elsewhere.
+        prefix = f"{model_args[key_model_simreport]}{test}."
+        return any(file.startswith(prefix) for file in os.listdir(odir_incl_path))
+
+    @staticmethod
+    @trace_utils.traced("polaris_tests.execute_test")
+    @profile_utils.profiled
     def execute_test(test_id, test, rtl_args, model_args):
         key_model_log_file_suffix = "model_log_file_suffix"
         key_model_odir = "model_odir"
@@ -327,46 +349,91 @@ class polaris_tests:
         for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_model_")]:
             assert key in model_args.keys(), f"- error: {key} not found in given rtl_args dict"
 
+        rtl_archive_utils.extract_test_if_required(test, rtl_args)
         inputcfg_file_name = polaris_tests.write_inputcfg_file(test_id, test, rtl_args, model_args)
         # cfg_file_name = polaris_tests.write_cfg_file(test_id, test, rtl_args, model_args)
 
-        pb_dir_incl_path = os.path.join(model_args[key_model_root_dir_path], model_args[key_model_root_dir])
+        polaris_tests.run_model(test_id, test, inputcfg_file_name, model_args)
+
+    @staticmethod
+    def get_model_cmd(test, inputcfg_file_name, model_args):
+        # (argv, cwd, env, log file name) of a model run. absolute paths, no shell and no chdir, so a run can be
+        # started from a process pool, a thread pool or an asyncio task.
+        key_model_log_file_suffix = "model_log_file_suffix"
+        key_model_odir = "model_odir"
+        key_model_root_dir = "model_root_dir"
+        key_model_root_dir_path = "model_root_dir_path"
+
+        for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_model_")]:
+            assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+        pb_dir_incl_path = os.path.abspath(os.path.join(model_args[key_model_root_dir_path], model_args[key_model_root_dir]))
         odir_incl_path = os.path.join(pb_dir_incl_path, model_args[key_model_odir])
         log_file_name = os.path.join(odir_incl_path, f"{test}{model_args[key_model_log_file_suffix]}")
 
         if not os.path.isdir(odir_incl_path):
             os.makedirs(odir_incl_path, exist_ok = True)
 
-        if not model_args[key_model_force]:
-            skip_test = True
-            if os.path.isfile(log_file_name):
-                with open(log_file_name) as file:
-                    lines = file.readlines()
-                    if not lines[-1].strip().startswith(model_args[key_model_log_file_end]):
-                        skip_test = False
-
-            if skip_test:
-                for pwd, _, files in os.walk(odir_incl_path):
-                    for file in files:
-                        if file.startswith(model_args[key_model_simreport]) and (test in file):
-                            return
-
-        cmds = [
-            f"cd {pb_dir_incl_path}",
-            f"PYTHONPATH='.' python ttsim/back/tensix_neo/tneoSim.py --inputcfg {inputcfg_file_name} --odir {model_args[key_model_odir]}"
-        ]
-        cmd = " && ".join(cmds)
-        print(f"- test ID: {test_id}, executing: {cmd}")
-
-        with open(log_file_name, "w") as log_file:
-            subprocess.call(
-            cmd,
-            shell=True,
-            stdout=log_file,
-            stderr=subprocess.STDOUT)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = pb_dir_incl_path
+        argv = ["python", os.path.join(pb_dir_incl_path, "ttsim", "back", "tensix_neo", "tneoSim.py"), "--inputcfg", os.path.abspath(inputcfg_file_name), "--odir", odir_incl_path]
+
+        return argv, pb_dir_incl_path, env, log_file_name
+
+    @staticmethod
+    def run_model(test_id, test, inputcfg_file_name, model_args):
+        # runs the model on an already written inputcfg file, log in <model_odir>/<test><model_log_file_suffix>.
+        if not model_args["force"] and polaris_tests.is_test_complete(test, model_args):
+            return
+
+        argv, cwd, env, log_file_name = polaris_tests.get_model_cmd(test, inputcfg_file_name, model_args)
+        print(f"- test ID: {test_id}, executing: {shlex.join(argv)}")
+
+        with trace_utils.span("polaris_tests.run_model", test = test), open(log_file_name, "w") as log_file:
+            subprocess.run(argv, cwd = cwd, env = env, stdout = log_file, stderr = subprocess.STDOUT)
+
+    @staticmethod
+    async def run_model_async(test_id, test, inputcfg_file_name, model_args):
+        # run_model for an asyncio event loop, the model runs as a subprocess without blocking the loop.
+        if not model_args["force"] and polaris_tests.is_test_complete(test, model_args):
+            return
+
+        argv, cwd, env, log_file_name = polaris_tests.get_model_cmd(test, inputcfg_file_name, model_args)
+        print(f"- test ID: {test_id}, executing: {shlex.join(argv)}")
+
+        with trace_utils.span("polaris_tests.run_model", test = test), open(log_file_name, "w") as log_file:
+            process = await asyncio.create_subprocess_exec(*argv, cwd = cwd, env = env, stdout = log_file, stderr = asyncio.subprocess.STDOUT)
+            await process.wait()
 
     @staticmethod
-    def execute_tests(tests, rtl_args, model_args):
+    async def execute_test_async(test_id, test, rtl_args, model_args, semaphore):
+        # execute_test for an asyncio event loop. inputcfg files are written in a worker thread.
+        async with semaphore:
+            with trace_utils.span("polaris_tests.execute_test", test = test):
+                await asyncio.to_thread(rtl_archive_utils.extract_test_if_required, test, rtl_args)
+                inputcfg_file_name = await asyncio.to_thread(polaris_tests.write_inputcfg_file, test_id, test, rtl_args, model_args)
+                await polaris_tests.run_model_async(test_id, test, inputcfg_file_name, model_args)
+
+    @staticmethod
+    async def execute_tests_async(test_ids, rtl_args, model_args, num_processes):
+        # test_ids: {test : test ID}. at most num_processes tests are executed at a time.
+        semaphore = asyncio.Semaphore(num_processes)
+        await asyncio.gather(*[polaris_tests.execute_test_async(test_id, test, rtl_args, model_args, semaphore) for test, test_id in test_ids.items()])
+
+    @staticmethod
+    def get_pool(executor, num_processes):
+        # "process": one process per test (default). "thread", "asyncio": threads of this process, the models are
+        # subprocesses either way.
+        match executor:
+            case "process":
+                return multiprocessing.Pool(processes = num_processes)
+            case "thread" | "asyncio":
+                return multiprocessing.pool.ThreadPool(processes = num_processes)
+            case _:
+                raise Exception(f"- error: unknown model executor {executor}, expected process, thread or asyncio")
+
+    @staticmethod
+    def execute_tests(tests, rtl_args, model_args, update_cfg_snapshot = False):
         assert isinstance(rtl_args, dict), "- error: expected rtl_args to be a dict"
         assert isinstance(model_args, dict), "- error: expected model_args to be a dict"
 
@@ -386,5 +453,100 @@ class polaris_tests:
         print(f"- Number of tests to execute via model:                  {len(tests)}")
         print(f"- Number of parallel processes to execute polaris tests: {num_processes}")
 
-        with multiprocessing.Pool(processes = num_processes) as pool:
-            test_results = pool.starmap(polaris_tests.execute_test, [(idx, test, rtl_args, model_args) for idx, test in enumerate(sorted(tests))])
\ No newline at end of file
+        executor = model_args.get("model_executor", "process")
+        print(f"- Model executor:                                        {executor}")
+
+        with polaris_tests.get_pool(executor, num_processes) as pool:
+            test_ids = {test : idx for idx, test in enumerate(sorted(tests))}
+            dedup = model_args.get("dedup_tests", False)
+            groups = polaris_tests.get_duplicate_groups(tests, rtl_args, model_args, pool) if dedup else {test : [] for test in tests}
+            if "asyncio" == executor:
+                asyncio.run(polaris_tests.execute_tests_async({test : test_ids[test] for test in sorted(groups.keys())}, rtl_args, model_args, num_processes))
+            else:
+                test_results = pool.starmap(polaris_tests.execute_test, [(test_ids[test], test, rtl_args, model_args) for test in sorted(groups.keys())])
+
+        if dedup:
+            polaris_tests.fan_out_duplicates(groups, model_args)
+
+        # the snapshot is the cfg every model result in <model_odir> was produced with: only a run of the full
+        # suite, or of every test a cfg change affects (invalidation_utils), may move it.
+        if update_cfg_snapshot:
+            shutil.copyfile(polaris_tests.get_default_cfg_file_name(model_args), polaris_tests.get_default_cfg_snapshot_file_name(model_args))
+
+    @staticmethod
+    def get_test_signature(test_id, test, rtl_args, model_args):
+        # hash of what the model consumes for a test: the inputcfg without test name and paths, with the thread
+        # ELFs (in tc/thread order) by content. tests with the same signature give the same model result.
+        rtl_archive_utils.extract_test_if_required(test, rtl_args)
+        input_cfg_dict = polaris_tests.get_inputcfg(test_id, test, rtl_args, model_args)
+
+        sha256 = hashlib.sha256()
+        sha256.update(json.dumps({key : value for key, value in input_cfg_dict.items() if key not in ("input", "description")}, sort_keys = True).encode("utf-8"))
+        input_cfg = input_cfg_dict["input"]
+        for tc_key in sorted(key for key in input_cfg.keys() if key.startswith("tc")):
+            input_neo = input_cfg[tc_key]
+            for key in sorted(input_neo.keys()):
+                if key.endswith("Path"):
+                    continue
+                elif key.endswith("Elf"):
+                    sha256.update(f"{tc_key}.{key}=".encode("utf-8"))
+                    if input_neo[key]:
+                        with open(os.path.join(input_neo[key[:-len("Elf")] + "Path"], input_neo[key]), "rb") as file:
+                            sha256.update(hashlib.file_digest(file, "sha256").digest())
+                else:
+                    sha256.update(f"{tc_key}.{key}={input_neo[key]}".encode("utf-8"))
+
+        return sha256.hexdigest()
+
+    @staticmethod
+    @trace_utils.traced("polaris_tests.get_duplicate_groups", args = ())
+    def get_duplicate_groups(tests, rtl_args, model_args, pool):
+        # {representative test : [duplicate tests]}, the representative is the first test of a signature in sorted order.
+        tests = sorted(tests)
+        signatures = pool.starmap(polaris_tests.get_test_signature, [(idx, test, rtl_args, model_args) for idx, test in enumerate(tests)])
+
+        representatives = dict()
+        groups = dict()
+        for test, signature in zip(tests, signatures):
+            if signature in representatives.keys():
+                groups[representatives[signature]].append(test)
+            else:
+                representatives[signature] = test
+                groups[test] = []
+
+        print(f"- Number of unique model inputs:                         {len(groups)} of {len(tests)} tests (dedup factor {len(tests) / max(1, len(groups)):.2f}x)")
+
+        return groups
+
+    @staticmethod
+    def fan_out_duplicates(groups, model_args):
+        # copies the representative's log and simreport files to every duplicate, so status reads them as the
+        # duplicate's own. the groups are kept in <model_odir>/dedup.json.
+        key_model_log_file_suffix = "model_log_file_suffix"
+        key_model_odir = "model_odir"
+        key_model_root_dir = "model_root_dir"
+        key_model_root_dir_path = "model_root_dir_path"
+        key_model_simreport = "model_simreport"
+
+        for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_model_")]:
+            assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+        odir_incl_path = os.path.join(model_args[key_model_root_dir_path], model_args[key_model_root_dir], model_args[key_model_odir])
+        simreports = [file for file in os.listdir(odir_incl_path) if file.startswith(model_args[key_model_simreport])] if os.path.isdir(odir_incl_path) else []
+        for test, duplicates in groups.items():
+            log_file_name = os.path.join(odir_incl_path, f"{test}{model_args[key_model_log_file_suffix]}")
+            if not os.path.isfile(log_file_name):
+                continue
+
+            # simreport_<test>.<ext> only, a test name may be a prefix of another test name.
+            prefix = f"{model_args[key_model_simreport]}{test}."
+            test_simreports = [file for file in simreports if file.startswith(prefix)]
+            for duplicate in duplicates:
+                shutil.copyfile(log_file_name, os.path.join(odir_incl_path, f"{duplicate}{model_args[key_model_log_file_suffix]}"))
+                for file in test_simreports:
+                    duplicate_file = f"{model_args[key_model_simreport]}{duplicate}.{file[len(prefix):]}"
+                    shutil.copyfile(os.path.join(odir_incl_path, file), os.path.join(odir_incl_path, duplicate_file))
+
+        serialization_utils.json_io.dump_file({test : duplicates for test, duplicates in groups.items() if duplicates}, status_utils.get_model_dedup_file_name(model_args), indent = 2)
+        num_tests = len(groups) + sum(len(duplicates) for duplicates in groups.values())
+        print(f"- fanned out model results of {len([duplicates for duplicates in groups.values() if duplicates])} tests to {num_tests - len(groups)} duplicates")
\ No newline at end of file
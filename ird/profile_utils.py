@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+# opt-in profiling of the harness code, enabled with the PROFILE environment variable:
+#
+#   PROFILE=1 python ird_polaris.py           # cProfile
+#   PROFILE=memory python ird_polaris.py      # cProfile and tracemalloc
+#
+# functions decorated with profiled() (the per test workers of the pools) run under one cProfile
+# profiler per process, dumped to <profile_dir>/<pid>.prof. finish() merges them into merged.prof
+# (pstats) and merged.collapsed (one "frame;frame;frame microseconds" line per stack, the input of
+# flamegraph.pl/speedscope). functions decorated with memory_profiled() report peak memory and the
+# top allocation sites under tracemalloc.
+
+import cProfile
+import datetime
+import functools
+import os
+import pstats
+import threading
+import tracemalloc
+
+KEY_ENV_PROFILE     = "PROFILE"
+KEY_ENV_PROFILE_DIR = "IRD_PROFILE_DIR"
+KEY_ENV_PROFILE_MEMORY = "IRD_PROFILE_MEMORY"
+
+_profiler = {"pid" : None, "profiler" : None, "depth" : 0, "lock" : threading.Lock()}
+
+def is_requested():
+    return os.environ.get(KEY_ENV_PROFILE, "").lower() not in ["", "0", "false", "no", "off"]
+
+def is_enabled():
+    return bool(os.environ.get(KEY_ENV_PROFILE_DIR))
+
+def is_memory_enabled():
+    return is_enabled() and bool(os.environ.get(KEY_ENV_PROFILE_MEMORY))
+
+def get_profile_dir():
+    return os.environ.get(KEY_ENV_PROFILE_DIR)
+
+def start(profile_dir = None, memory = None):
+    # no-op unless PROFILE is set. like tracing, the directory is passed to the workers through the environment.
+    if not is_requested():
+        return None
+
+    if not profile_dir:
+        profile_dir = os.path.join("__profiles", f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+
+    if memory is None:
+        memory = "memory" == os.environ.get(KEY_ENV_PROFILE, "").lower()
+
+    profile_dir = os.path.abspath(profile_dir)
+    os.makedirs(profile_dir, exist_ok = True)
+    os.environ[KEY_ENV_PROFILE_DIR] = profile_dir
+    if memory:
+        os.environ[KEY_ENV_PROFILE_MEMORY] = "1"
+
+    print(f"- profiling to {profile_dir}{' (incl. tracemalloc)' if memory else ''}")
+
+    return profile_dir
+
+def get_profiler():
+    # one profiler per process, a forked worker must not reuse the parent's.
+    if _profiler["pid"] != os.getpid():
+        _profiler["pid"]      = os.getpid()
+        _profiler["profiler"] = cProfile.Profile()
+        _profiler["depth"]    = 0
+
+    return _profiler["profiler"]
+
+def profiled(fn):
+    # stats accumulate over all calls in a process and are dumped after every outermost call,
+    # so nothing is lost when a pool terminates its workers. one profiler per process: from python
+    # 3.12 on cProfile sees all threads and only one profiler can be active at a time.
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not is_enabled():
+            return fn(*args, **kwargs)
+
+        with _profiler["lock"]:
+            profiler = get_profiler()
+            _profiler["depth"] += 1
+            if 1 == _profiler["depth"]:
+                profiler.enable()
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with _profiler["lock"]:
+                _profiler["depth"] -= 1
+                if 0 == _profiler["depth"]:
+                    profiler.disable()
+                    profiler.dump_stats(os.path.join(get_profile_dir(), f"{os.getpid()}.prof"))
+
+    return wrapper
+
+def memory_profiled(name = None, top = 15):
+    def decorator(fn):
+        report_name = name if name else fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not is_memory_enabled():
+                return fn(*args, **kwargs)
+
+            was_tracing = tracemalloc.is_tracing()
+            if not was_tracing:
+                tracemalloc.start(25)
+
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                current, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                if not was_tracing:
+                    tracemalloc.stop()
+
+                write_memory_report(report_name, before, after, current, peak, top)
+
+        return wrapper
+
+    return decorator
+
+def memory_report_to_str(name, before, after, current, peak, top):
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+
+    msg  = f"+ Memory: {name}\n"
+    msg += f"  - peak:    {peak / 2**20:>10.3f} MiB\n"
+    msg += f"  - current: {current / 2**20:>10.3f} MiB\n"
+    msg += f"  - top {top} allocation sites (size retained after the call, number of blocks):\n"
+    for stat in diff[:top]:
+        frame = stat.traceback[0]
+        msg += f"    - {stat.size_diff / 2**10:>12.1f} KiB {stat.count_diff:>9} {frame.filename}:{frame.lineno}\n"
+
+    return msg.rstrip()
+
+def write_memory_report(name, before, after, current, peak, top):
+    msg = memory_report_to_str(name, before, after, current, peak, top)
+    print(msg)
+    with open(os.path.join(get_profile_dir(), f"{name}.{os.getpid()}.memory.txt"), "a") as file:
+        file.write(msg + "\n")
+
+def get_frame_name(func):
+    file_name, line, fn_name = func
+    if "~" == file_name: # built-ins
+        return fn_name
+
+    return f"{fn_name} ({os.path.basename(file_name)}:{line})"
+
+def get_collapsed_stacks(stats, max_depth = 64, min_us = 1):
+    # pstats keeps caller -> callee edges only, not full stacks. a callee's time is split over its callers
+    # in proportion to the cumulative time of each edge, which is what flamegraph converters for cProfile do.
+    callees = dict()
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    stacks = dict()
+    def walk(func, stack, scale):
+        cc, nc, tt, ct, callers = stats.stats[func]
+        stack = stack + [get_frame_name(func)]
+        self_us = int(tt * scale * 1e6)
+        if self_us >= min_us:
+            key = ";".join(stack)
+            stacks[key] = stacks.get(key, 0) + self_us
+
+        if len(stack) >= max_depth:
+            return
+
+        for callee, edge_ct in callees.get(func, []):
+            callee_ct = stats.stats[callee][3]
+            callee_scale = scale * edge_ct / callee_ct if callee_ct > 0 else 0.0
+            if get_frame_name(callee) in stack or (callee_scale * callee_ct * 1e6) < min_us:
+                continue # recursion, or too small to show
+
+            walk(callee, stack, callee_scale)
+
+    roots = [func for func, value in stats.stats.items() if not value[4] and "_lsprof.Profiler" not in func[2]]
+    for root in roots:
+        walk(root, [], 1.0)
+
+    return stacks
+
+def merge(profile_dir = None, top = 30):
+    if not profile_dir:
+        profile_dir = get_profile_dir()
+
+    files = sorted([os.path.join(profile_dir, file_name) for file_name in os.listdir(profile_dir) if file_name.endswith(".prof") and "merged.prof" != file_name])
+    if not files:
+        print(f"- no profiles found in {profile_dir}")
+        return None
+
+    stats = pstats.Stats(*files)
+    merged_file_name = os.path.join(profile_dir, "merged.prof")
+    stats.dump_stats(merged_file_name)
+
+    collapsed_file_name = os.path.join(profile_dir, "merged.collapsed")
+    with open(collapsed_file_name, "w") as file:
+        for stack, us in sorted(get_collapsed_stacks(stats).items()):
+            file.write(f"{stack} {us}\n")
+
+    print(f"- merged {len(files)} profiles into {merged_file_name} and {collapsed_file_name}")
+    print(f"+ Top {top} functions by cumulative time")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+    return merged_file_name
+
+def finish(top = 30):
+    if not is_enabled():
+        return None
+
+    profile_dir = get_profile_dir()
+    os.environ.pop(KEY_ENV_PROFILE_DIR, None)
+    os.environ.pop(KEY_ENV_PROFILE_MEMORY, None)
+
+    return merge(profile_dir, top)
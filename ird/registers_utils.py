@@ -1,10 +1,10 @@
 #!/usr/bin/env python
 
 import math
-import bs4
-import json
 import os
+import profile_utils
 import re
+import serialization_utils
 import sys
 import copy
 
@@ -40,6 +40,8 @@ def get_files_from_path(path, name=None, extension=None):
     return sorted(files)
 
 def parse_html_file(file_name):
+    import bs4
+
     if not os.path.exists(file_name):
         raise FileNotFoundError(f"HTML file '{file_name}' does not exist.")
 
@@ -341,8 +343,7 @@ def get_one_register_name_per_address_from_cfg_defines(path):
 def write_registers_addresses_to_file(path, filename):
     regs_addrs = get_one_register_name_per_address_from_cfg_defines(path)
     dict_to_write = {"CFG_REGISTER_OFFSETS" : regs_addrs}
-    with open(filename, 'w') as f:
-        json.dump(dict_to_write, f, indent = 2)
+    serialization_utils.json_io.dump_file(dict_to_write, filename, indent = 2)
 
 def identify_missing_addresses_in_cfg_defines(path):
     addrs_regs = get_addresses_registers_from_cfg_defines(path)
@@ -403,6 +404,7 @@ def get_cluster_map(path, num_bytes_per_register):
 
     return addrs
 
+@profile_utils.memory_profiled("registers_utils.get_memory_map")
 def get_memory_map(path, num_bytes_per_register):
     mem_map = dict()
     mem_map['trisc_map'] = get_trisc_address_map_incl_reg_size(path, num_bytes_per_register)
@@ -427,8 +429,7 @@ def change_addresses_to_hex(mem_map):
 def write_memory_map(path, num_bytes_per_register, file_to_write):
     mem_map = get_memory_map(path, num_bytes_per_register)
     mem_map = change_addresses_to_hex(mem_map)
-    with open(file_to_write, 'w') as f:
-        json.dump(mem_map, f, indent = 2)
+    serialization_utils.json_io.dump_file(mem_map, file_to_write, indent = 2)
 
 if "__main__" == __name__:
     tags = {"feb19", "mar18", "jul1", "jul27"}
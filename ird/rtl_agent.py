@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+# agent that rtl_utils.rtl_agent copies to the IRD machine and starts over one SSH channel.
+# it sources the test bench setup once, then reads one JSON request per line from stdin,
+#   {"cmd": "run", "test_id": 0, "test": "...", "log_file_dir": "...", "log_file": "...", "force": false}
+#   {"cmd": "close"}
+# runs the tests with at most --jobs at a time and writes one JSON event per line to stdout:
+#   ready, start, finish (exit code, result, cycles, seconds), error, done.
+#
+# runs with the system python of the container, so only the standard library and python 3.6 syntax.
+
+import argparse
+import concurrent.futures
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+_out_lock = threading.Lock()
+
+def emit(event, **kwargs):
+    kwargs["event"] = event
+    kwargs["time"] = time.time()
+    line = json.dumps(kwargs)
+    with _out_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+def get_environment(root, setup_file):
+    # environment after sourcing the setup script once. -0: values may contain new lines.
+    cmd = "cd {} && source {} > /dev/null 2>&1 && env -0".format(root, setup_file)
+    output = subprocess.check_output(["bash", "-c", cmd])
+    env = dict()
+    for entry in output.split(b"\0"):
+        if b"=" in entry:
+            key, value = entry.split(b"=", 1)
+            env[key.decode("utf-8", "replace")] = value.decode("utf-8", "replace")
+
+    return env
+
+def is_command_available(command, env):
+    return 0 == subprocess.call(["bash", "-c", "command -v {}".format(command)], env = env, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+
+def get_sim_result(file_name, key_result, key_num_cycles):
+    result = None
+    num_cycles = None
+    if not os.path.isfile(file_name):
+        return result, num_cycles
+
+    with open(file_name) as file:
+        for line in file:
+            if line.startswith(key_result + ":"):
+                result = line.split(":", 1)[1].strip().strip("'\"")
+            elif line.startswith(key_num_cycles + ":"):
+                try:
+                    num_cycles = int(line.split(":", 1)[1].strip())
+                except ValueError:
+                    pass
+
+    return result, num_cycles
+
+def run_test(request, args, env):
+    test = request["test"]
+    log_file_dir = request["log_file_dir"]
+    sim_result_yaml = os.path.join(log_file_dir, args.sim_result_yaml)
+
+    if request.get("force", False):
+        if os.path.isfile(sim_result_yaml):
+            os.remove(sim_result_yaml)
+    else:
+        result, num_cycles = get_sim_result(sim_result_yaml, args.key_result, args.key_num_cycles)
+        if result == args.result_pass:
+            emit("finish", test = test, test_id = request.get("test_id"), skipped = True, exit_code = 0, result = result, num_cycles = num_cycles, seconds = 0.0)
+            return
+
+    emit("start", test = test, test_id = request.get("test_id"))
+    start = time.time()
+    os.makedirs(log_file_dir, exist_ok = True)
+    with open(os.path.join(log_file_dir, request["log_file"]), "w") as log_file:
+        exit_code = subprocess.call(["bash", "-c", "rsim run_test --test {}".format(test)], cwd = args.root, env = env, stdout = log_file, stderr = subprocess.STDOUT)
+
+    result, num_cycles = get_sim_result(sim_result_yaml, args.key_result, args.key_num_cycles)
+    emit("finish", test = test, test_id = request.get("test_id"), skipped = False, exit_code = exit_code, result = result, num_cycles = num_cycles, seconds = time.time() - start)
+
+def run_test_and_report_errors(request, args, env):
+    try:
+        run_test(request, args, env)
+    except Exception as exc:
+        emit("error", test = request.get("test"), test_id = request.get("test_id"), message = "{}: {}".format(type(exc).__name__, exc))
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", required = True, help = "test bench root directory")
+    parser.add_argument("--setup", required = True, help = "setup script to source, relative to root")
+    parser.add_argument("--jobs", type = int, default = 4, help = "maximum number of concurrent tests")
+    parser.add_argument("--sim-result-yaml", default = "sim_result.yml")
+    parser.add_argument("--key-result", default = "res")
+    parser.add_argument("--key-num-cycles", default = "total-cycles")
+    parser.add_argument("--result-pass", default = "PASS")
+
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+
+    start = time.time()
+    try:
+        env = get_environment(args.root, args.setup)
+    except subprocess.CalledProcessError as exc:
+        emit("error", message = "could not source {} in {}: {}".format(args.setup, args.root, exc))
+        emit("done")
+        return 1
+
+    if not is_command_available("rsim", env):
+        emit("error", message = "rsim is not available after sourcing {}, e.g. a shell function that is not exported".format(args.setup))
+        emit("done")
+        return 1
+
+    emit("ready", pid = os.getpid(), jobs = args.jobs, setup_seconds = time.time() - start)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = args.jobs) as executor:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                request = json.loads(line)
+            except ValueError:
+                emit("error", message = "could not parse request {!r}".format(line))
+                continue
+
+            if "close" == request.get("cmd"):
+                break
+            elif "run" == request.get("cmd"):
+                executor.submit(run_test_and_report_errors, request, args, env)
+            else:
+                emit("error", message = "unknown request {!r}".format(line))
+
+    emit("done")
+
+    return 0
+
+if "__main__" == __name__:
+    sys.exit(main())
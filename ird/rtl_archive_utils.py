@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+
+# single file archive of a (minimal) RTL data set, e.g. __ext/rtl_test_data_set/<tag>.rtlar.
+#
+#   header  : magic (8 bytes), version (u32), reserved (u32), index offset (u64), index length (u64)
+#   members : compressed one by one (zstd if the zstandard module is available, zlib otherwise),
+#             identical contents are stored once.
+#   index   : zlib compressed JSON. member path -> [offset, compressed size, size, sha256, mtime],
+#             test directory name (test + test_dir_suffix) -> {"dir": ..., "members": [...]}.
+#
+# member paths are relative to the data set root, i.e. the same as below
+# <local_root_dir_path>/<local_root_dir>. readers mmap the archive and decompress single members, so
+# status can be read without extracting. tools that need real files (read_elf, the models) use
+# extract_test_if_required(), which extracts a test directory into the local RTL data directory.
+#
+#   python rtl_archive_utils.py pack <data set dir> <archive> [test dirs relative path]
+#   python rtl_archive_utils.py list <archive>
+#   python rtl_archive_utils.py extract <archive> <dest dir> [test dir ...]
+#   python rtl_archive_utils.py verify <archive>
+
+import hashlib
+import json
+import mmap
+import os
+import serialization_utils
+import struct
+import sys
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC   = b"RTLAR\0\0\0"
+VERSION = 1
+HEADER  = struct.Struct("<8sIIQQ")
+
+OFFSET, COMPRESSED_SIZE, SIZE, SHA256, MTIME = range(5)
+
+_lock     = threading.Lock()
+_archives = dict() # archive file name -> (stamp, rtl_archive)
+
+class codecs:
+    @staticmethod
+    def get_default():
+        return "zstd" if zstandard is not None else "zlib"
+
+    @staticmethod
+    def get_compressor(codec, level = None):
+        match codec:
+            case "zstd":
+                return zstandard.ZstdCompressor(level = 19 if level is None else level).compress
+            case "zlib":
+                return lambda data: zlib.compress(data, 9 if level is None else level)
+            case _:
+                raise Exception(f"- error: unknown codec {codec}")
+
+    @staticmethod
+    def get_decompressor(codec):
+        match codec:
+            case "zstd":
+                if zstandard is None:
+                    raise Exception("- error: archive is zstd compressed, but the zstandard module is not available")
+                return zstandard.ZstdDecompressor().decompress
+            case "zlib":
+                return zlib.decompress
+            case _:
+                raise Exception(f"- error: unknown codec {codec}")
+
+def get_test_dir_name(rel_path, test_dirs_rel_path):
+    # "rsim/debug/<test>_0/ttx/.../x.elf" -> "<test>_0"
+    prefix = test_dirs_rel_path.strip("/") + "/"
+    if not rel_path.startswith(prefix):
+        return None
+
+    rest = rel_path[len(prefix):]
+    return rest.split("/", 1)[0] if "/" in rest else None
+
+def pack(root_dir, file_name, test_dirs_rel_path = "rsim/debug", codec = None, level = None):
+    codec = codec if codec else codecs.get_default()
+    compress = codecs.get_compressor(codec, level)
+
+    rel_paths = []
+    for pwd, dirs, files in os.walk(root_dir):
+        dirs.sort()
+        for file in sorted(files):
+            rel_paths.append(os.path.relpath(os.path.join(pwd, file), root_dir).replace(os.sep, "/"))
+
+    members = dict()
+    tests = dict()
+    blobs = dict() # sha256 -> (offset, compressed size)
+    tmp_file_name = file_name + ".tmp"
+    with open(tmp_file_name, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        for rel_path in rel_paths:
+            src = os.path.join(root_dir, rel_path)
+            with open(src, "rb") as src_file:
+                data = src_file.read()
+
+            sha256 = hashlib.sha256(data).hexdigest()
+            if sha256 not in blobs.keys():
+                compressed = compress(data)
+                blobs[sha256] = (file.tell(), len(compressed))
+                file.write(compressed)
+
+            offset, compressed_size = blobs[sha256]
+            members[rel_path] = [offset, compressed_size, len(data), sha256, os.stat(src).st_mtime]
+
+            test_dir_name = get_test_dir_name(rel_path, test_dirs_rel_path)
+            if test_dir_name:
+                test = tests.setdefault(test_dir_name, {"dir" : f"{test_dirs_rel_path.strip('/')}/{test_dir_name}", "members" : []})
+                test["members"].append(rel_path)
+
+        index = dict()
+        index["version"]            = VERSION
+        index["codec"]              = codec
+        index["test_dirs_rel_path"] = test_dirs_rel_path
+        index["members"]            = members
+        index["tests"]              = tests
+        index_data = zlib.compress(json.dumps(index, separators = (",", ":")).encode("utf-8"), 6)
+        index_offset = file.tell()
+        file.write(index_data)
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, 0, index_offset, len(index_data)))
+
+    os.replace(tmp_file_name, file_name)
+    size = sum([member[SIZE] for member in members.values()])
+    print(f"- packed {len(members)} files ({len(blobs)} unique, {len(tests)} tests, {size / 2**20:.1f} MiB) from {root_dir} into {file_name} ({os.path.getsize(file_name) / 2**20:.1f} MiB, {codec})")
+
+    return file_name
+
+class rtl_archive:
+    def __init__(self, file_name):
+        self.file_name = os.path.abspath(file_name)
+        with open(self.file_name, "rb") as file:
+            self.mm = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        magic, version, _, index_offset, index_length = HEADER.unpack_from(self.mm, 0)
+        if MAGIC != magic:
+            raise Exception(f"- error: {self.file_name} is not an RTL data set archive")
+
+        if VERSION != version:
+            raise Exception(f"- error: unsupported archive version {version} in {self.file_name}, expected {VERSION}")
+
+        index = json.loads(zlib.decompress(self.mm[index_offset:index_offset + index_length]))
+        self.codec              = index["codec"]
+        self.members            = index["members"]
+        self.tests              = index["tests"]
+        self.test_dirs_rel_path = index["test_dirs_rel_path"]
+        self.decompress         = codecs.get_decompressor(self.codec)
+        self.lock               = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.mm.close()
+
+    def has_member(self, rel_path):
+        return rel_path in self.members.keys()
+
+    def has_test(self, test_dir_name):
+        return test_dir_name in self.tests.keys()
+
+    def get_test_dir(self, test_dir_name):
+        return self.tests[test_dir_name]["dir"]
+
+    def get_test_members(self, test_dir_name):
+        return self.tests[test_dir_name]["members"]
+
+    def read(self, rel_path, verify = False):
+        member = self.members[rel_path]
+        data = self.decompress(self.mm[member[OFFSET]:member[OFFSET] + member[COMPRESSED_SIZE]])
+        if verify and hashlib.sha256(data).hexdigest() != member[SHA256]:
+            raise Exception(f"- error: checksum mismatch for {rel_path} in {self.file_name}")
+
+        return data
+
+    def read_text(self, rel_path):
+        return self.read(rel_path).decode("utf-8")
+
+    def is_extracted(self, rel_path, dest_dir):
+        # size and mtime, as written by extract(). a file with another mtime is compared by content. a file newer
+        # than the member (e.g. of a local rerun) counts as extracted, it is not overwritten with the older member.
+        member = self.members[rel_path]
+        file_name = os.path.join(dest_dir, rel_path)
+        if not os.path.isfile(file_name):
+            return False
+
+        st = os.stat(file_name)
+        if st.st_mtime > member[MTIME] + 1e-3:
+            return True
+
+        if st.st_size != member[SIZE]:
+            return False
+
+        if abs(st.st_mtime - member[MTIME]) < 1e-3:
+            return True
+
+        with open(file_name, "rb") as file:
+            return hashlib.sha256(file.read()).hexdigest() == member[SHA256]
+
+    def extract(self, rel_path, dest_dir):
+        file_name = os.path.join(dest_dir, rel_path)
+        os.makedirs(os.path.dirname(file_name), exist_ok = True)
+        tmp_file_name = f"{file_name}.{os.getpid()}.{threading.get_native_id()}.tmp"
+        with open(tmp_file_name, "wb") as file:
+            file.write(self.read(rel_path, verify = True))
+
+        os.utime(tmp_file_name, (self.members[rel_path][MTIME], self.members[rel_path][MTIME]))
+        os.replace(tmp_file_name, file_name) # concurrent extractions of the same member are safe
+
+        return file_name
+
+    def extract_test(self, test_dir_name, dest_dir):
+        for rel_path in self.get_test_members(test_dir_name):
+            if not self.is_extracted(rel_path, dest_dir):
+                self.extract(rel_path, dest_dir)
+
+        return os.path.join(dest_dir, self.get_test_dir(test_dir_name))
+
+    def extract_all(self, dest_dir):
+        for rel_path in self.members.keys():
+            if not self.is_extracted(rel_path, dest_dir):
+                self.extract(rel_path, dest_dir)
+
+        return dest_dir
+
+    def verify(self):
+        return [rel_path for rel_path in self.members.keys() if hashlib.sha256(self.read(rel_path)).hexdigest() != self.members[rel_path][SHA256]]
+
+def get_archive(file_name):
+    # one open (mmapped) archive per file and process, reopened when the file changes. the previous mapping is
+    # closed then, a reader still using the previous archive object fails instead of reading a stale file.
+    file_name = os.path.abspath(file_name)
+    stamp = serialization_utils.parse_cache.get_stamp(file_name)
+    with _lock:
+        entry = _archives.get(file_name)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        archive = rtl_archive(file_name)
+        _archives[file_name] = (stamp, archive)
+
+    if entry is not None:
+        entry[1].close()
+
+    return archive
+
+def get_archive_file_name(rtl_args):
+    # archive configured in rtl_args["rtl_archive"], None if there is none.
+    file_name = rtl_args.get("rtl_archive")
+    return file_name if file_name and os.path.isfile(file_name) else None
+
+def get_sim_result(test, rtl_args):
+    # (found, result, num_cycles) from the archive, None if the test is not archived or the local sim result (same
+    # path below the local RTL data directory, e.g. of a rerun) is newer than the archived one.
+    file_name = get_archive_file_name(rtl_args)
+    if not file_name:
+        return None
+
+    archive = get_archive(file_name)
+    test_dir_name = test + rtl_args["test_dir_suffix"]
+    if not archive.has_test(test_dir_name):
+        return None
+
+    rel_path = f"{archive.get_test_dir(test_dir_name)}/{rtl_args['sim_result.yaml']}"
+    local_file_name = os.path.join(rtl_args["local_root_dir_path"], rtl_args["local_root_dir"], rel_path)
+    local_mtime = os.stat(local_file_name).st_mtime if os.path.isfile(local_file_name) else None
+    if (local_mtime is not None) and ((not archive.has_member(rel_path)) or (local_mtime > archive.members[rel_path][MTIME] + 1e-3)):
+        return None
+
+    if not archive.has_member(rel_path):
+        return (False, None, None)
+
+    fields = serialization_utils.yaml_io.get_top_level_fields_from_str(archive.read_text(rel_path), ("res", "total-cycles"))
+    if fields is None or "res" not in fields.keys():
+        raise Exception(f"- error: could not obtain correct YAML mapping from {rel_path} in {file_name}")
+
+    return (True, fields["res"], fields.get("total-cycles"))
+
+def extract_test_if_required(test, rtl_args):
+    # extracts the test's directory into the local RTL data directory unless it is there already.
+    file_name = get_archive_file_name(rtl_args)
+    if not file_name:
+        return None
+
+    archive = get_archive(file_name)
+    test_dir_name = test + rtl_args["test_dir_suffix"]
+    if not archive.has_test(test_dir_name):
+        return None
+
+    return archive.extract_test(test_dir_name, os.path.join(rtl_args["local_root_dir_path"], rtl_args["local_root_dir"]))
+
+if "__main__" == __name__:
+    match sys.argv[1] if len(sys.argv) > 1 else "":
+        case "pack":
+            pack(sys.argv[2], sys.argv[3], *sys.argv[4:5])
+        case "list":
+            with rtl_archive(sys.argv[2]) as archive:
+                for test_dir_name in sorted(archive.tests.keys()):
+                    print(f"- {test_dir_name}: {len(archive.get_test_members(test_dir_name))} files")
+                print(f"- {len(archive.tests)} tests, {len(archive.members)} files, codec {archive.codec}")
+        case "extract":
+            with rtl_archive(sys.argv[2]) as archive:
+                if len(sys.argv) > 4:
+                    for test_dir_name in sys.argv[4:]:
+                        print(f"- extracted {archive.extract_test(test_dir_name, sys.argv[3])}")
+                else:
+                    archive.extract_all(sys.argv[3])
+        case "verify":
+            with rtl_archive(sys.argv[2]) as archive:
+                bad = archive.verify()
+                print(f"- {len(archive.members) - len(bad)} of {len(archive.members)} members ok")
+                for rel_path in bad:
+                    print(f"  - checksum mismatch: {rel_path}")
+                sys.exit(1 if bad else 0)
+        case _:
+            print(f"usage: {sys.argv[0]} pack|list|extract|verify ...")
+            sys.exit(1)
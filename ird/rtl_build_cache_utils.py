@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+# build cache of the RTL test bench (ws-tensix) on storage shared by the IRD machines, e.g.
+# /proj_tensix/user_dev/sjaju/rtl_build_cache (rtl_args["rtl_build_cache_dir"]).
+#
+#   key    : sha256 of the ws-tensix commit, the (recursive) submodule commits and the toolchain versions
+#            (TOOLCHAIN_CMD after sourcing the setup script) on the IRD machine. uncommitted changes are not part of
+#            the key, the test bench is a fresh clone.
+#   entry  : <cache dir>/<commit[:12]>-<key[:16]>/ with build.tar.zst (build.tar.gz without zstd) and manifest.json.
+#            the tarball holds the files the build adds to the work tree (untracked and ignored files), without the
+#            test run directory. entries are written to a temporary directory and renamed, readers never see
+#            a partial entry.
+#   marker : <repo>/.rtl_build_key, written after a build or a restore. a work tree with the marker of the current
+#            key is not built again. a build*.log alone does not tell which commit was built, it is ignored.
+#
+# build_if_required: marker matches -> nothing, entry exists -> restore (minutes), otherwise build and store.
+#
+#   python rtl_build_cache_utils.py list [cache dir]    (on a machine that mounts the cache dir)
+
+import datetime
+import getpass
+import hashlib
+import os
+import serialization_utils
+import shlex
+import sys
+
+DEFAULT_CACHE_DIR    = "/proj_tensix/user_dev/sjaju/rtl_build_cache"
+MARKER_FILE_NAME     = ".rtl_build_key"
+MANIFEST_FILE_NAME   = "manifest.json"
+SETUP_SCRIPT         = "SETUP.cctb.local.sh"
+TOOLCHAIN_TOOLS      = ["gcc", "g++", "make", "python3", "verilator", "vcs", "xrun", "bender"]
+TOOLCHAIN_CMD        = "; ".join([f"command -v {tool} > /dev/null 2>&1 && echo \"{tool}: $(timeout 60 {tool} --version 2>&1 | head -n 1)\"" for tool in TOOLCHAIN_TOOLS])
+RESTORE_TIMEOUT      = 3600
+
+def run(conn, cmd, timeout = None):
+    print(f"- executing command: {cmd} on {conn.host}, port {conn.port}")
+    res = conn.run(f"bash -c {shlex.quote(cmd)}", hide = True, warn = True, timeout = timeout)
+    if res.failed:
+        raise Exception(f"- error: {cmd} failed on {conn.host}, port {conn.port} (exit code {res.exited}):\n{res.stderr.strip()}")
+
+    return res.stdout
+
+def get_key(conn, repo_path):
+    # (commit, key, toolchain) of the work tree at repo_path.
+    repo = shlex.quote(repo_path)
+    commit = run(conn, f"git -C {repo} rev-parse HEAD").strip()
+    submodules = run(conn, f"git -C {repo} submodule status --recursive").strip()
+    toolchain = run(conn, f"cd {repo} && (source {SETUP_SCRIPT} > /dev/null 2>&1; {TOOLCHAIN_CMD}; true)").strip()
+
+    key = hashlib.sha256("\n".join([commit, submodules, toolchain]).encode()).hexdigest()
+
+    return commit, key, toolchain
+
+def get_entry_dir(cache_dir, commit, key):
+    return os.path.join(cache_dir, f"{commit[:12]}-{key[:16]}")
+
+def has_entry(conn, entry_dir):
+    return conn.run(f"test -f {shlex.quote(os.path.join(entry_dir, MANIFEST_FILE_NAME))}", hide = True, warn = True).ok
+
+def read_marker(conn, repo_path):
+    res = conn.run(f"cat {shlex.quote(os.path.join(repo_path, MARKER_FILE_NAME))}", hide = True, warn = True)
+
+    return res.stdout.strip() if res.ok else None
+
+def write_marker(conn, repo_path, key):
+    run(conn, f"echo {key} > {shlex.quote(os.path.join(repo_path, MARKER_FILE_NAME))}")
+
+def store(conn, repo_path, entry_dir, commit, key, toolchain, debug_dir):
+    # tarball of the build outputs in repo_path and its manifest as entry_dir.
+    manifest = dict()
+    manifest["commit"]    = commit
+    manifest["key"]       = key
+    manifest["toolchain"] = toolchain.splitlines()
+    manifest["host"]      = conn.host
+    manifest["user"]      = getpass.getuser()
+    manifest["created"]   = datetime.datetime.now().isoformat(timespec = "seconds")
+
+    tmp_dir = shlex.quote(f"{entry_dir}.tmp.{os.getpid()}")
+    exclude = "|".join([f"^{prefix}" for prefix in [debug_dir.strip("/") + "/", MARKER_FILE_NAME.replace(".", "\\.")]])
+    cmds = []
+    cmds.append("set -e -o pipefail")
+    cmds.append(f"cd {shlex.quote(repo_path)}")
+    cmds.append(f"rm -rf {tmp_dir} && mkdir -p {tmp_dir}")
+    cmds.append(f"{{ git ls-files -z --others --exclude-standard; git ls-files -z --others --ignored --exclude-standard; }} | {{ grep -zvE {shlex.quote(exclude)} || true; }} > {tmp_dir}/files")
+    cmds.append(f"if command -v zstd > /dev/null; then tar --null -T {tmp_dir}/files -cf - | zstd -q -T0 -o {tmp_dir}/build.tar.zst; else tar --null -T {tmp_dir}/files -czf {tmp_dir}/build.tar.gz; fi")
+    cmds.append(f"rm {tmp_dir}/files")
+    cmds.append(f"printf '%s\\n' {shlex.quote(serialization_utils.json_io.dumps(manifest, indent = 2).decode('utf-8'))} > {tmp_dir}/{MANIFEST_FILE_NAME}")
+    cmds.append(f"mv -T {tmp_dir} {shlex.quote(entry_dir)} || rm -rf {tmp_dir}") # an entry stored concurrently wins
+    run(conn, "\n".join(cmds), timeout = RESTORE_TIMEOUT)
+    print(f"- stored build of {commit[:12]} as {entry_dir}")
+
+def restore(conn, repo_path, entry_dir, key):
+    entry = shlex.quote(entry_dir)
+    cmds = []
+    cmds.append("set -e -o pipefail")
+    cmds.append(f"cd {shlex.quote(repo_path)}")
+    cmds.append(f"if [ -f {entry}/build.tar.zst ]; then zstd -dc {entry}/build.tar.zst | tar -xpf -; else tar -xpzf {entry}/build.tar.gz; fi")
+    run(conn, "\n".join(cmds), timeout = RESTORE_TIMEOUT)
+    write_marker(conn, repo_path, key)
+    print(f"- restored build from {entry_dir}")
+
+def build_if_required(conn, repo_path, build, cache_dir = DEFAULT_CACHE_DIR, debug_dir = "rsim/debug"):
+    # build: callable that builds the test bench at repo_path. returns "up to date", "restored" or "built".
+    commit, key, toolchain = get_key(conn, repo_path)
+    print(f"- rtl test bench {repo_path}: commit {commit[:12]}, build key {key[:16]}")
+    if key == read_marker(conn, repo_path):
+        print("- rtl test bench already built for this commit and toolchain")
+        return "up to date"
+
+    entry_dir = get_entry_dir(cache_dir, commit, key) if cache_dir else None
+    if entry_dir and has_entry(conn, entry_dir):
+        restore(conn, repo_path, entry_dir, key)
+        return "restored"
+
+    build()
+    write_marker(conn, repo_path, key)
+    if entry_dir:
+        run(conn, f"mkdir -p {shlex.quote(cache_dir)}")
+        store(conn, repo_path, entry_dir, commit, key, toolchain, debug_dir)
+
+    return "built"
+
+def get_entries(cache_dir = DEFAULT_CACHE_DIR):
+    # [(entry dir, manifest, size in bytes), ...] of a locally mounted cache dir, latest first.
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+
+    for name in os.listdir(cache_dir):
+        manifest_file_name = os.path.join(cache_dir, name, MANIFEST_FILE_NAME)
+        if not os.path.isfile(manifest_file_name):
+            continue
+
+        manifest = serialization_utils.json_io.load_file(manifest_file_name, cache = False)
+
+        size = sum(entry.stat().st_size for entry in os.scandir(os.path.join(cache_dir, name)) if entry.is_file())
+        entries.append((os.path.join(cache_dir, name), manifest, size))
+
+    return sorted(entries, key = lambda entry: entry[1].get("created", ""), reverse = True)
+
+def entries_to_str(entries):
+    msg = f"+ {len(entries)} cached rtl test bench builds\n"
+    for entry_dir, manifest, size in entries:
+        msg += f"  - {os.path.basename(entry_dir)}: commit {manifest['commit'][:12]}, {size / (1 << 30):.2f} GiB, {manifest['created']} by {manifest['user']} on {manifest['host']}\n"
+
+    return msg.rstrip()
+
+if "__main__" == __name__:
+    if len(sys.argv) < 2 or "list" != sys.argv[1]:
+        print(f"usage: {sys.argv[0]} list [cache dir]")
+        sys.exit(1)
+
+    print(entries_to_str(get_entries(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CACHE_DIR)))
@@ -1,29 +1,31 @@
 #!/usr/bin/env python
 
 import collections
+import concurrent.futures
 import contextlib
 import datetime
 import typing
-import fabric
 import functools
 import getpass
 import itertools
 import json
 import multiprocessing
 import os
-import paramiko
-import paramiko.ssh_exception
 import pathlib
+import profile_utils
+import serialization_utils
 import shlex
 import shutil
 import subprocess
 import sys
-import yaml
+import test_layout_utils
+import time
+import trace_utils
 
 class yaml_files:
     @staticmethod
     def get_value_at_key_from_stream(key, stream):
-        data = yaml.safe_load(stream)
+        data = serialization_utils.yaml_io.load(stream)
 
         if data is None or not isinstance(data, dict):
             raise Exception("Error: YAML content is empty or not a dictionary")
@@ -38,12 +40,21 @@ class yaml_files:
         if not os.path.isfile(file_name):
             raise Exception("- error: given file {file_name} does not exist")
 
-        with open(file_name) as stream:
-            return yaml_files.get_value_at_key_from_stream(key, stream)
+        data = serialization_utils.yaml_io.load_file(file_name)
+
+        if data is None or not isinstance(data, dict):
+            raise Exception("Error: YAML content is empty or not a dictionary")
+
+        if not key in data.keys():
+            raise Exception(f"- error: could not find key {key} in file {file_name}. available keys: {data.keys()}")
+
+        return data[key]
 
 class copy:
     @staticmethod
-    def update_known_hosts(host: str, new_key: paramiko.PKey):
+    def update_known_hosts(host: str, new_key: "paramiko.PKey"):
+        import paramiko
+
         # Replace any stored host-key for *host* with *new_key* in ~/.ssh/known_hosts.
         known_hosts = os.path.expanduser("~/.ssh/known_hosts")
         host_keys = paramiko.HostKeys()
@@ -56,7 +67,10 @@ class copy:
         print(f"- updated host key for {host}")
 
     @staticmethod
-    def safe_connection(**conn_kwargs) -> fabric.Connection:
+    def safe_connection(**conn_kwargs) -> "fabric.Connection":
+        import fabric
+        import paramiko
+
         # Fabric connection that fixes a changed host key after *you* have decided the new key is legitimate.
         while True:
             try:
@@ -76,7 +90,11 @@ class copy:
 
 
     @staticmethod
+    @trace_utils.traced("copy.copy_dir_from_remote_to_local", args = ("remote_dir",))
+    @profile_utils.profiled
     def copy_dir_from_remote_to_local(hostname, username, port, remote_dir, local_dir, mode = ""):
+        import fabric
+
         if ("force" == mode) and pathlib.Path(local_dir).exists():
             shutil.rmtree(local_dir)
 
@@ -120,12 +138,7 @@ class test_names:
 
     @staticmethod
     def get_dirs_incl_path(root_dir, dir_name):
-        dir_names = []
-        for pwd, _, _ in os.walk(root_dir):
-            if pwd.endswith(dir_name):
-                dir_names.append(pwd)
-
-        return dir_names
+        return test_layout_utils.find_dirs(root_dir, dir_name) # one cached scandir index per root instead of a walk per call
 
     @staticmethod
     def get_dir_incl_path(root_dir, dir_name):
@@ -149,51 +162,49 @@ class test_names:
 
     @staticmethod
     def get_all_tests(yaml_file_name):
-        with open(yaml_file_name) as stream:
-            data = yaml.safe_load(stream)
-            if not "tests" in data.keys():
-                print(f"- WARNING: could not find tests section in file {yaml_file_name}, returning")
-                return
-            return set([test["test-name"] for test in data["tests"]])
+        data = serialization_utils.yaml_io.load_file(yaml_file_name)
+        if not "tests" in data.keys():
+            print(f"- WARNING: could not find tests section in file {yaml_file_name}, returning")
+            return
+        return set([test["test-name"] for test in data["tests"]])
 
     @staticmethod
     def get_tags(project_yaml_incl_path: str,
         suites = None,
         tags = None):
         def get_tags_from_suites(project_yaml_incl_path, suites):
-            with open(project_yaml_incl_path) as stream:
-                proj = yaml.safe_load(stream)
-                key_suites = "suites"
-                if not key_suites in proj.keys():
-                    raise Exception(f"- error: no {key_suites} found in file {project_yaml_incl_path}")
-
-                suites_names_from_proj = dict([(suite["suite-name"], idx) for idx, suite in enumerate(proj["suites"])])
-
-                # suites_names_from_proj = [(suite["suite-name"], idx) for idx, suite in enumerate(proj[key_suites])]
-                # suites_as_list_len = len(suites_names_from_proj)
-                # suites_names_from_proj = dict([(suite["suite-name"], idx) for idx, suite in enumerate(proj["suites"])])
-                # suites_as_dict_len = len(suites_names_from_proj)
-                # if suites_as_list_len != suites_as_dict_len:
-                #     msg = f"- error: duplicate suite names found. List of suite names when converted to dict, has different length. Suites length as list: {suites_as_list_len}, suites length as dict: {suites_as_dict_len}"
-                #     slist = [suite["suite-name"] for idx, suite in enumerate(proj["suites"])]
-                #     slistc = collections.Counter(slist)
-                #     print(slistc.most_common())
-                #     raise Exception(msg)
-
-                if isinstance(suites, str):
-                    suites = [suites]
-
-                if not isinstance(suites, (list, tuple, set)):
-                    raise Exception(f"- error: expect suites type to be list/tuple/set. Type of given suites is {type(suites)}")
-
-                tags = set()
-                for suite in suites:
-                    if suite in suites_names_from_proj.keys():
-                        tags.update(proj[key_suites][suites_names_from_proj[suite]]['tags'])
-                    else:
-                        print(f"- WARNING: suite {suite} is not present in list of suite names obtained from project.yaml")
-
-                return tags
+            proj = serialization_utils.yaml_io.load_file(project_yaml_incl_path)
+            key_suites = "suites"
+            if not key_suites in proj.keys():
+                raise Exception(f"- error: no {key_suites} found in file {project_yaml_incl_path}")
+
+            suites_names_from_proj = dict([(suite["suite-name"], idx) for idx, suite in enumerate(proj["suites"])])
+
+            # suites_names_from_proj = [(suite["suite-name"], idx) for idx, suite in enumerate(proj[key_suites])]
+            # suites_as_list_len = len(suites_names_from_proj)
+            # suites_names_from_proj = dict([(suite["suite-name"], idx) for idx, suite in enumerate(proj["suites"])])
+            # suites_as_dict_len = len(suites_names_from_proj)
+            # if suites_as_list_len != suites_as_dict_len:
+            #     msg = f"- error: duplicate suite names found. List of suite names when converted to dict, has different length. Suites length as list: {suites_as_list_len}, suites length as dict: {suites_as_dict_len}"
+            #     slist = [suite["suite-name"] for idx, suite in enumerate(proj["suites"])]
+            #     slistc = collections.Counter(slist)
+            #     print(slistc.most_common())
+            #     raise Exception(msg)
+
+            if isinstance(suites, str):
+                suites = [suites]
+
+            if not isinstance(suites, (list, tuple, set)):
+                raise Exception(f"- error: expect suites type to be list/tuple/set. Type of given suites is {type(suites)}")
+
+            tags = set()
+            for suite in suites:
+                if suite in suites_names_from_proj.keys():
+                    tags.update(proj[key_suites][suites_names_from_proj[suite]]['tags'])
+                else:
+                    print(f"- WARNING: suite {suite} is not present in list of suite names obtained from project.yaml")
+
+            return tags
 
         m_tags = set()
         if suites:
@@ -216,12 +227,11 @@ class test_names:
             key_tests = "tests"
             tests = set()
 
-            with open(yaml_file_incl_path) as stream:
-                data = yaml.safe_load(stream)
-                if key_tests in data.keys():
-                    for test in data[key_tests]:
-                        if any(re.match(test_tag, tag) for test_tag in test["tags"] for tag in tags):
-                            tests.add(test["test-name"])
+            data = serialization_utils.yaml_io.load_file(yaml_file_incl_path)
+            if key_tests in data.keys():
+                for test in data[key_tests]:
+                    if any(re.match(test_tag, tag) for test_tag in test["tags"] for tag in tags):
+                        tests.add(test["test-name"])
 
             return tests
 
@@ -289,7 +299,38 @@ class test_names:
         return m_tests
 class rtl_tests:
     @staticmethod
+    def is_local_test_status_pass(test, args):
+        key_debug_dir             = "debug_dir"
+        key_debug_dir_path        = "debug_dir_path"
+        key_test_dir_suffix       = "test_dir_suffix"
+        key_sim_result_yaml       = "sim_result.yaml"
+        key_sim_result_yaml_key_result = "sim_result.yaml_key_result"
+        key_sim_result_yaml_key_result_val_PASS = "sim_result.yaml_key_result_val_PASS"
+        key_local_root_dir       = "local_root_dir"
+        key_local_root_dir_path  = "local_root_dir_path"
+
+        for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
+            assert key in args.keys(), f"- error: {key} not found in given args dict"
+
+        rel_log_file_dir          = os.path.join(args[key_debug_dir_path], args[key_debug_dir], test + args[key_test_dir_suffix])
+        local_root_dir_incl_path  = os.path.join(args[key_local_root_dir_path], args[key_local_root_dir])
+        log_file_dir              = os.path.join(local_root_dir_incl_path, rel_log_file_dir)
+        sim_result_yaml_incl_path = os.path.join(log_file_dir, args[key_sim_result_yaml])
+        if not os.path.isfile(sim_result_yaml_incl_path):
+            return False
+
+        data = serialization_utils.yaml_io.get_top_level_fields_from_file(sim_result_yaml_incl_path, [args[key_sim_result_yaml_key_result]])
+        assert isinstance(data, dict), f"- error: could not obtain correct YAML mapping from file {sim_result_yaml_incl_path}"
+        assert args[key_sim_result_yaml_key_result] in data.keys(), f"- error: key {args[key_sim_result_yaml_key_result]} not found in file {sim_result_yaml_incl_path}"
+
+        return data[args[key_sim_result_yaml_key_result]] == args[key_sim_result_yaml_key_result_val_PASS]
+
+    @staticmethod
+    @trace_utils.traced("rtl_tests.execute_test")
+    @profile_utils.profiled
     def execute_test(test_id, test, args):
+        import fabric
+
         assert isinstance(args, dict), "- error: expected args to be a dict"
         key_debug_dir             = "debug_dir"
         key_debug_dir_path        = "debug_dir_path"
@@ -320,19 +361,7 @@ class rtl_tests:
         check_local_files = True if not args[key_force] else False
         check_remote_files = not check_local_files
         if check_local_files:
-            local_root_dir_incl_path  = os.path.join(args[key_local_root_dir_path], args[key_local_root_dir])
-            log_file_dir              = os.path.join(local_root_dir_incl_path, rel_log_file_dir)
-            sim_result_yaml_incl_path = os.path.join(log_file_dir, args[key_sim_result_yaml])
-            if os.path.isfile(sim_result_yaml_incl_path):
-                with open(sim_result_yaml_incl_path, "r") as sim_result_yaml_file:
-                    data = yaml.safe_load(sim_result_yaml_file.read())
-                    assert isinstance(data, dict), f"- error: could not obtain correct YAML mapping from file {sim_result_yaml_incl_path}"
-                    assert args[key_sim_result_yaml_key_result] in data.keys(), f"- error: key {args[key_sim_result_yaml_key_result]} not found in file {sim_result_yaml_incl_path}"
-                    is_test_status_pass = data[args[key_sim_result_yaml_key_result]] == args[key_sim_result_yaml_key_result_val_PASS]
-                    if not is_test_status_pass:
-                        check_remote_files = True
-            else:
-                check_remote_files = True
+            check_remote_files = not rtl_tests.is_local_test_status_pass(test, args)
 
         if check_remote_files:
             hostname = args[key_copy_server_hostname]
@@ -355,7 +384,7 @@ class rtl_tests:
             remote_sim_result_yaml_incl_path = os.path.join(remote_log_file_dir, args[key_sim_result_yaml])
 
             is_test_status_pass = False
-            with fabric.Connection(
+            with trace_utils.span("rtl_tests.remote_status_probe", test = test), fabric.Connection(
                 host = hostname,
                 user = username,
                 port = port) as conn:
@@ -366,7 +395,7 @@ class rtl_tests:
                             sftp.remove(remote_sim_result_yaml_incl_path)
 
                     with contextlib.suppress(FileNotFoundError), sftp.open(remote_sim_result_yaml_incl_path, "r") as remote_file:
-                        data = yaml.safe_load(remote_file.read().decode("utf-8"))
+                        data = serialization_utils.yaml_io.get_top_level_fields_from_str(remote_file.read().decode("utf-8"), [args[key_sim_result_yaml_key_result]])
                         assert isinstance(data, dict), f"- error: could not obtain correct YAML mapping from file {remote_sim_result_yaml_incl_path} on {conn.host}"
                         assert args[key_sim_result_yaml_key_result] in data.keys(), f"- error: key {args[key_sim_result_yaml_key_result]} not found in file {remote_sim_result_yaml_incl_path} on {conn.host}"
                         is_test_status_pass = data[args[key_sim_result_yaml_key_result]] == args[key_sim_result_yaml_key_result_val_PASS]
@@ -396,7 +425,8 @@ class rtl_tests:
 
                             cmd = ' && '.join(cmds)
                             print(f"- test ID {test_id}. executing command {cmd} on server {hostname}, port {port}")
-                            result = conn.run(cmd, warn = True, pty = True, hide = True) # warn: yes, move to next
+                            with trace_utils.span("rtl_tests.rsim_run_test", test = test):
+                                result = conn.run(cmd, warn = True, pty = True, hide = True) # warn: yes, move to next
 
                             if result.failed:
                                 print(f"- test {test!r} execuition failed")
@@ -418,6 +448,16 @@ class rtl_tests:
         for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
             assert key in args.keys(), f"- error: {key} not found in given args dict"
 
+        if "agent" == args.get("rtl_execution_mode") and args.get("hostname") and args.get("port"):
+            results = rtl_agent.execute_tests(tests, args)
+            if results is not None:
+                return results
+
+            print("- WARNING: could not start the RTL agent, executing RTL tests with one SSH session per test.")
+
+        if "batch" == args.get("rtl_execution_mode") and args.get("hostname") and args.get("port"):
+            return rtl_batch.execute_tests(tests, args)
+
         num_processes = min(args[key_num_processes], len(tests))
         print(f"- Number of RTL tests to execute:                    {len(tests)}")
         print(f"- Number of parallel processes to execute RTL tests: {num_processes}")
@@ -463,6 +503,8 @@ class rtl_tests:
 
     @staticmethod
     def get_git_commit_id(args, file_to_read):
+        import fabric
+
         key_local_root_dir = "local_root_dir"
         key_local_root_dir_path = "local_root_dir_path"
         key_remote_root_dir = "remote_root_dir"
@@ -544,8 +586,423 @@ class rtl_tests:
             with open(file_to_write, "w") as f:
                 f.write(rtl_args[key_commit_id])
 
+class rtl_agent:
+    # all RTL tests over one SSH channel to the IRD machine: rtl_agent.py is copied to the remote side, sources
+    # the test bench setup once, runs the tests with at most rtl_agent_num_jobs at a time and streams back
+    # JSON line events. the data of each finished test is copied back while the other tests still run.
+    @staticmethod
+    def get_setup_file(args):
+        return "SETUP.cctb.sh" if args["rtl_tag"] in set(["feb19", "mar18"]) else "SETUP.cctb.local.sh"
+
+    @staticmethod
+    def deploy(conn, args):
+        local_agent_incl_path  = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rtl_agent.py")
+        remote_agent_incl_path = os.path.join(args["remote_root_dir_path"], f".rtl_agent_{args['username']}.py")
+        conn.put(local_agent_incl_path, remote_agent_incl_path)
+
+        return remote_agent_incl_path
+
+    @staticmethod
+    def get_command(remote_agent_incl_path, args):
+        cmd = [
+            args["rtl_agent_python"], remote_agent_incl_path,
+            "--root", os.path.join(args["remote_root_dir_path"], args["remote_root_dir"]),
+            "--setup", rtl_agent.get_setup_file(args),
+            "--jobs", str(args["rtl_agent_num_jobs"]),
+            "--sim-result-yaml", args["sim_result.yaml"],
+            "--key-result", args["sim_result.yaml_key_result"],
+            "--result-pass", args["sim_result.yaml_key_result_val_PASS"]]
+
+        return shlex.join(cmd)
+
+    @staticmethod
+    def get_requests(tests, args):
+        remote_root_dir_incl_path = os.path.join(args["remote_root_dir_path"], args["remote_root_dir"])
+        requests = []
+        for idx, test in enumerate(tests):
+            if not args["force"] and rtl_tests.is_local_test_status_pass(test, args):
+                continue
+
+            request = dict()
+            request["cmd"]          = "run"
+            request["test_id"]      = idx
+            request["test"]         = test
+            request["log_file_dir"] = os.path.join(remote_root_dir_incl_path, args["debug_dir_path"], args["debug_dir"], test + args["test_dir_suffix"])
+            request["log_file"]     = test + args["rtl_log_file_suffix"]
+            request["force"]        = args["force"]
+            requests.append(request)
+
+        return requests
+
+    @staticmethod
+    def parse_json_line(line):
+        line = line.strip()
+        if not line.startswith("{"):
+            return None
+
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+
+        return data if isinstance(data, dict) else None
+
+    @staticmethod
+    def parse_event(line):
+        event = rtl_agent.parse_json_line(line)
+        return event if event is not None and "event" in event.keys() else None
+
+    @staticmethod
+    def copy_test_data(test, args):
+        rel_log_file_dir = os.path.join(args["debug_dir_path"], args["debug_dir"], test + args["test_dir_suffix"])
+        copy.copy_dir_from_remote_to_local(
+            hostname=args["copy_server_hostname"],
+            username=args["copy_server_username"],
+            port=args["copy_server_port"],
+            remote_dir=os.path.join(args["remote_root_dir_path"], args["remote_root_dir"], rel_log_file_dir),
+            local_dir=os.path.join(args["local_root_dir_path"], args["local_root_dir"], rel_log_file_dir))
+
+    @staticmethod
+    @trace_utils.traced("rtl_agent.execute_tests", args = ())
+    def execute_tests(tests, args):
+        # returns test -> finish event, or None if the agent could not be started.
+        import fabric
+
+        key_copy_server_hostname = "copy_server_hostname"
+        key_copy_server_port     = "copy_server_port"
+        key_copy_server_username = "copy_server_username"
+        key_debug_dir            = "debug_dir"
+        key_debug_dir_path       = "debug_dir_path"
+        key_force                = "force"
+        key_hostname             = "hostname"
+        key_local_root_dir       = "local_root_dir"
+        key_local_root_dir_path  = "local_root_dir_path"
+        key_num_processes        = "num_processes"
+        key_port                 = "port"
+        key_remote_root_dir      = "remote_root_dir"
+        key_remote_root_dir_path = "remote_root_dir_path"
+        key_rtl_agent_num_jobs   = "rtl_agent_num_jobs"
+        key_rtl_agent_python     = "rtl_agent_python"
+        key_rtl_log_file_suffix  = "rtl_log_file_suffix"
+        key_rtl_tag              = "rtl_tag"
+        key_test_dir_suffix      = "test_dir_suffix"
+        key_username             = "username"
+
+        for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
+            assert key in args.keys(), f"- error: {key} not found in given args dict"
+
+        requests = rtl_agent.get_requests(tests, args)
+        print(f"- Number of RTL tests to send to the agent:          {len(requests)} of {len(tests)}")
+        if not requests:
+            return dict()
+
+        results = dict()
+        with fabric.Connection(host = args[key_hostname], user = args[key_username], port = args[key_port]) as conn:
+            remote_agent_incl_path = rtl_agent.deploy(conn, args)
+            cmd = rtl_agent.get_command(remote_agent_incl_path, args)
+            print(f"- executing command {cmd} on server {args[key_hostname]}, port {args[key_port]}")
+
+            conn.open()
+            channel = conn.client.get_transport().open_session()
+            channel.set_combine_stderr(True)
+            channel.exec_command(cmd)
+            for request in requests + [{"cmd" : "close"}]:
+                channel.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            channel.shutdown_write()
+
+            is_ready = False
+            num_processes = min(args[key_num_processes], len(requests))
+            with concurrent.futures.ThreadPoolExecutor(max_workers = num_processes) as executor, channel.makefile("r") as stdout:
+                copies = []
+                for line in stdout:
+                    event = rtl_agent.parse_event(line)
+                    if event is None:
+                        print(f"  - agent: {line.rstrip()}")
+                        continue
+
+                    match event["event"]:
+                        case "ready":
+                            is_ready = True
+                            print(f"- RTL agent ready on {args[key_hostname]} (pid {event['pid']}, {event['jobs']} jobs, environment set up in {event['setup_seconds']:.1f} s)")
+                        case "start":
+                            print(f"- test ID {event['test_id']}. test: {event['test']!r} started")
+                        case "finish":
+                            results[event["test"]] = event
+                            if event["skipped"]:
+                                print(f"- test ID {event['test_id']}. test: {event['test']!r}. pass: True (remote)")
+                            else:
+                                print(f"- test ID {event['test_id']}. test: {event['test']!r}. result: {event['result']}, exit code: {event['exit_code']}, cycles: {event['num_cycles']}, {event['seconds']:.1f} s")
+
+                            copies.append(executor.submit(rtl_agent.copy_test_data, event["test"], args))
+                        case "error":
+                            print(f"- error from RTL agent{' for test ' + repr(event['test']) if event.get('test') else ''}: {event['message']}")
+                        case "done":
+                            break
+
+                for future in copies:
+                    future.result()
+
+            exit_status = channel.recv_exit_status()
+            if not is_ready:
+                print(f"- error: RTL agent on {args[key_hostname]} exited with status {exit_status} before it was ready.")
+                return None
+
+        missing = [request["test"] for request in requests if request["test"] not in results.keys()]
+        if missing:
+            print(f"- WARNING: no result from the RTL agent for {len(missing)} test(s):")
+            for test in missing:
+                print(f"  - {test}")
+
+        return results
+
+class rtl_batch:
+    # one detached shell script per shard on the IRD machine: it sources the setup once, runs the shard's
+    # tests with at most rtl_batch_num_jobs_per_shard at a time (xargs -P) under nohup, and appends one JSON
+    # line per finished test to a single manifest. the local side polls the manifest over one SSH session and
+    # copies each finished test back. the run is recorded locally, so a later invocation resumes polling. a recorded
+    # run that is not resumed (force, or tests that are not requested now) is stopped before a new one is launched.
+    @staticmethod
+    def get_run_dir(args):
+        return os.path.join(args["remote_root_dir_path"], f".rtl_batch_{args['username']}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+    @staticmethod
+    def get_state_file_name(args):
+        return os.path.join(args["local_root_dir_path"], f".rtl_batch_{args['rtl_tag']}.json")
+
+    @staticmethod
+    def get_script(shard_id, run_dir, args):
+        # appends of lines shorter than PIPE_BUF to a file opened with O_APPEND do not interleave.
+        lines = []
+        lines.append("#!/bin/bash")
+        lines.append(f"# shard {shard_id}, generated by rtl_utils.rtl_batch")
+        lines.append(f"cd {shlex.quote(os.path.join(args['remote_root_dir_path'], args['remote_root_dir']))} || exit 1")
+        lines.append(f"source {rtl_agent.get_setup_file(args)} > /dev/null 2>&1")
+        lines.append("export -f rsim > /dev/null 2>&1 # rsim may be a shell function, make it visible to the xargs children")
+        lines.append(f"export manifest={shlex.quote(os.path.join(run_dir, 'manifest.jsonl'))}")
+        lines.append(f"export sim_result_yaml={shlex.quote(args['sim_result.yaml'])}")
+        lines.append(f"export key_result={shlex.quote(args['sim_result.yaml_key_result'])}")
+        lines.append(f"export result_pass={shlex.quote(args['sim_result.yaml_key_result_val_PASS'])}")
+        lines.append(f"export force={1 if args['force'] else 0}")
+        lines.append("""json_str() { printf '"%s"' "$(printf '%s' "$1" | sed 's/[\\\\"]/\\\\&/g')"; } # JSON string of $1, \\ and " escaped""")
+        lines.append("export -f json_str")
+        lines.append("run_test() {")
+        lines.append('    test_id="$1"; test="$2"; log_file_dir="$3"; log_file="$4"')
+        lines.append('    sim_result="$log_file_dir/$sim_result_yaml"')
+        lines.append('    get_field() { sed -n "s/^$1:[ \\t]*//p" "$sim_result" 2>/dev/null | head -n 1 | tr -d "\\"'"'"'\\r"; }')
+        lines.append('    if [ "$force" = "1" ]; then')
+        lines.append('        rm -f "$sim_result"')
+        lines.append('    elif [ "$(get_field "$key_result")" = "$result_pass" ]; then')
+        lines.append('        echo "{\\"test_id\\": $test_id, \\"test\\": $(json_str "$test"), \\"skipped\\": true, \\"exit_code\\": 0, \\"result\\": $(json_str "$result_pass"), \\"seconds\\": 0}" >> "$manifest"')
+        lines.append('        return 0')
+        lines.append('    fi')
+        lines.append('    start=$(date +%s)')
+        lines.append('    mkdir -p "$log_file_dir"')
+        lines.append('    rsim run_test --test "$test" > "$log_file_dir/$log_file" 2>&1')
+        lines.append('    exit_code=$?')
+        lines.append('    cycles=$(get_field total-cycles)')
+        lines.append('    if [ -z "$cycles" ]; then cycles=null') # a non-numeric value goes into the manifest as a string, not dropped
+        lines.append('    elif ! [[ "$cycles" =~ ^[0-9]+([.][0-9]+)?([eE][-+]?[0-9]+)?$ ]]; then cycles=$(json_str "$cycles"); fi')
+        lines.append('    echo "{\\"test_id\\": $test_id, \\"test\\": $(json_str "$test"), \\"skipped\\": false, \\"exit_code\\": $exit_code, \\"result\\": $(json_str "$(get_field "$key_result")"), \\"num_cycles\\": $cycles, \\"seconds\\": $(( $(date +%s) - start ))}" >> "$manifest"')
+        lines.append("}")
+        lines.append("export -f run_test")
+        lines.append(f"xargs -0 -P {args['rtl_batch_num_jobs_per_shard']} -n 4 bash -c 'run_test \"$@\"' _ < {shlex.quote(os.path.join(run_dir, f'shard_{shard_id}.tests'))}")
+        lines.append(f'echo "{{\\"shard_done\\": {shard_id}}}" >> "$manifest"')
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def get_shards(requests, num_shards):
+        num_shards = max(1, min(num_shards, len(requests)))
+        return [requests[idx::num_shards] for idx in range(num_shards)]
+
+    @staticmethod
+    def launch(conn, requests, args):
+        run_dir = rtl_batch.get_run_dir(args)
+        conn.run(f"mkdir -p {shlex.quote(run_dir)}", hide = True)
+
+        shards = rtl_batch.get_shards(requests, args["rtl_batch_num_shards"])
+        pids = []
+        with conn.sftp() as sftp:
+            for shard_id, shard in enumerate(shards):
+                with sftp.open(os.path.join(run_dir, f"shard_{shard_id}.sh"), "w") as file:
+                    file.write(rtl_batch.get_script(shard_id, run_dir, args))
+
+                # NUL separated fields (xargs -0), paths and test names may contain white space.
+                with sftp.open(os.path.join(run_dir, f"shard_{shard_id}.tests"), "w") as file:
+                    file.write("".join([f"{request['test_id']}\0{request['test']}\0{request['log_file_dir']}\0{request['log_file']}\0" for request in shard]))
+
+        for shard_id in range(len(shards)):
+            script = shlex.quote(os.path.join(run_dir, f"shard_{shard_id}.sh"))
+            log = shlex.quote(os.path.join(run_dir, f"shard_{shard_id}.log"))
+            cmd = f"nohup setsid bash {script} > {log} 2>&1 < /dev/null & echo $!"
+            print(f"- executing command {cmd} on server {conn.host}, port {conn.port}")
+            pids.append(int(conn.run(cmd, hide = True).stdout.strip().splitlines()[-1]))
+
+        run = dict()
+        run["run_dir"]    = run_dir
+        run["hostname"]   = conn.host
+        run["port"]       = conn.port
+        run["pids"]       = pids
+        run["num_shards"] = len(shards)
+        run["tests"]      = [request["test"] for request in requests]
+
+        return run
+
+    @staticmethod
+    def get_running_shards(conn, run):
+        # shard ids whose process is alive, one kill -0 per pid (kill -0 of several pids fails if any one exited).
+        cmd = f"for pid in {' '.join([str(pid) for pid in run['pids']])}; do kill -0 $pid 2> /dev/null && echo $pid; done"
+        alive = {int(pid) for pid in conn.run(cmd, hide = True, warn = True).stdout.split()}
+
+        return {shard_id for shard_id, pid in enumerate(run["pids"]) if pid in alive}
+
+    @staticmethod
+    def abandon(run, args, reason):
+        # stops the shards of a recorded run that is not resumed, so they do not run tests into the log_file_dirs of
+        # a new run. every shard is its own session (setsid), its process group id is its pid.
+        import fabric
+
+        print(f"- abandoning RTL batch {run['run_dir']} on {run['hostname']} ({len(run['tests'])} tests, pids {run['pids']}): {reason}")
+        try:
+            with fabric.Connection(host = run["hostname"], user = args["username"], port = run["port"]) as conn:
+                running = rtl_batch.get_running_shards(conn, run)
+                pids = [run["pids"][shard_id] for shard_id in sorted(running)]
+                if pids:
+                    conn.run(" ; ".join([f"kill -TERM -- -{pid} 2> /dev/null" for pid in pids]), hide = True, warn = True)
+
+                print(f"- stopped {len(pids)} running shard(s) of {run['run_dir']}, pids {pids}")
+        except Exception as exc:
+            raise Exception(f"- error: could not stop the RTL batch {run['run_dir']} on {run['hostname']} ({exc}). stop pids {run['pids']} (process groups) by hand, or run again without force to resume it.")
+
+    @staticmethod
+    def poll(run, args):
+        # returns test -> manifest entry. survives dropped SSH connections by reconnecting on the next poll.
+        import fabric
+        import paramiko
+
+        results = dict()
+        shards_done = set()
+        shards_dead = set() # exited without done marker at the last poll, dead if still so at the next one
+        num_reconnects = 0
+        offset = 0
+        manifest = os.path.join(run["run_dir"], "manifest.jsonl")
+        tests = set(run["tests"])
+        num_processes = min(args["num_processes"], len(tests))
+        with concurrent.futures.ThreadPoolExecutor(max_workers = max(1, num_processes)) as executor:
+            copies = []
+            while len(shards_done) < run["num_shards"]:
+                try:
+                    with fabric.Connection(host = run["hostname"], user = args["username"], port = run["port"]) as conn, conn.sftp() as sftp:
+                        num_reconnects = 0
+                        while len(shards_done) < run["num_shards"]:
+                            data = b""
+                            with contextlib.suppress(FileNotFoundError), sftp.open(manifest, "r") as file:
+                                file.seek(offset)
+                                data = file.read()
+
+                            data = data[:data.rfind(b"\n") + 1] # complete lines only
+                            offset += len(data)
+                            for line in data.decode("utf-8").splitlines():
+                                entry = rtl_agent.parse_json_line(line)
+                                if entry is None:
+                                    print(f"- WARNING: ignoring malformed line in {manifest}: {line!r}")
+                                elif "shard_done" in entry.keys():
+                                    shards_done.add(entry["shard_done"])
+                                elif entry.get("test") in tests:
+                                    results[entry["test"]] = entry
+                                    print(f"- test ID {entry['test_id']}. test: {entry['test']!r}. result: {entry['result']}, exit code: {entry['exit_code']}, cycles: {entry.get('num_cycles')}, {entry['seconds']} s ({len(results)}/{len(tests)})")
+                                    if isinstance(entry.get("num_cycles"), str):
+                                        print(f"- WARNING: test {entry['test']!r}: non-numeric total-cycles {entry['num_cycles']!r}")
+
+                                    copies.append(executor.submit(rtl_agent.copy_test_data, entry["test"], args))
+
+                            if len(shards_done) < run["num_shards"]:
+                                if not data:
+                                    # a shard writes its done marker before it exits, a dead shard is confirmed
+                                    # on the next poll (its marker may have been written after the read).
+                                    exited = set(range(run["num_shards"])) - shards_done - rtl_batch.get_running_shards(conn, run)
+                                    for shard_id in sorted(exited & shards_dead):
+                                        print(f"- error: RTL batch shard {shard_id} in {run['run_dir']} on {run['hostname']} exited without finishing, see shard_{shard_id}.log")
+                                        shards_done.add(shard_id)
+
+                                    shards_dead = exited - shards_done
+
+                                time.sleep(args["rtl_batch_poll_seconds"])
+                except (OSError, EOFError, paramiko.ssh_exception.SSHException) as exc:
+                    num_reconnects += 1
+                    if num_reconnects > args["rtl_batch_max_reconnects"]:
+                        raise Exception(f"- error: lost connection to {run['hostname']} while polling the RTL batch {run['run_dir']}, {num_reconnects - 1} reconnect(s) failed ({exc}). the batch keeps running, run again to resume.")
+
+                    print(f"- WARNING: lost connection to {run['hostname']} while polling the RTL batch ({exc}), reconnecting ({num_reconnects}/{args['rtl_batch_max_reconnects']}).")
+                    time.sleep(args["rtl_batch_poll_seconds"])
+
+            for future in copies:
+                future.result()
+
+        missing = [test for test in run["tests"] if test not in results.keys()]
+        if missing:
+            print(f"- WARNING: no result in the RTL batch manifest for {len(missing)} test(s):")
+            for test in missing:
+                print(f"  - {test}")
+
+        return results
+
+    @staticmethod
+    @trace_utils.traced("rtl_batch.execute_tests", args = ())
+    def execute_tests(tests, args):
+        import fabric
+
+        key_force                    = "force"
+        key_hostname                 = "hostname"
+        key_num_processes            = "num_processes"
+        key_port                     = "port"
+        key_remote_root_dir          = "remote_root_dir"
+        key_remote_root_dir_path     = "remote_root_dir_path"
+        key_rtl_batch_num_jobs_per_shard = "rtl_batch_num_jobs_per_shard"
+        key_rtl_batch_num_shards     = "rtl_batch_num_shards"
+        key_rtl_batch_max_reconnects = "rtl_batch_max_reconnects"
+        key_rtl_batch_poll_seconds   = "rtl_batch_poll_seconds"
+        key_rtl_tag                  = "rtl_tag"
+        key_username                 = "username"
+
+        for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
+            assert key in args.keys(), f"- error: {key} not found in given args dict"
+
+        results = dict()
+        state_file_name = rtl_batch.get_state_file_name(args)
+        if os.path.isfile(state_file_name):
+            run = serialization_utils.json_io.load_file(state_file_name, cache = False)
+            if args[key_force]:
+                rtl_batch.abandon(run, args, "force is set")
+            elif not set(run["tests"]) <= set(tests):
+                rtl_batch.abandon(run, args, f"{len(set(run['tests']) - set(tests))} of its tests are not requested now")
+            else:
+                print(f"- resuming RTL batch {run['run_dir']} on {run['hostname']} ({len(run['tests'])} tests)")
+                results = rtl_batch.poll(run, args)
+                # tests that were not part of the resumed run, or have no result in its manifest, are launched below.
+                tests = [test for test in tests if test not in results.keys()]
+
+            os.remove(state_file_name)
+
+        requests = rtl_agent.get_requests(tests, args)
+        print(f"- Number of RTL tests to execute in batch mode:      {len(requests)} of {len(tests)}")
+        if not requests:
+            return results
+
+        with fabric.Connection(host = args[key_hostname], user = args[key_username], port = args[key_port]) as conn:
+            run = rtl_batch.launch(conn, requests, args)
+
+        serialization_utils.json_io.dump_file(run, state_file_name)
+        print(f"- launched {run['num_shards']} shard(s) in {run['run_dir']} on {run['hostname']}, pids {run['pids']}")
+
+        results.update(rtl_batch.poll(run, args))
+        os.remove(state_file_name)
+
+        return results
+
 class rtl_data_copy:
     @staticmethod
+    @trace_utils.traced("rtl_data_copy.copy_infra_dir", args = ())
     def copy_infra_dir(args):
             assert isinstance(args, dict), "- error: expected args to be a dict"
             key_force = "force"
@@ -599,6 +1056,7 @@ class rtl_data_copy:
             return local_infra_dir_incl_path
 
     @staticmethod
+    @trace_utils.traced("rtl_data_copy.copy_partial_src", args = ())
     def copy_partial_src(args):
         assert isinstance(args, dict), "- error: expected args to be a dict"
         key_force = "force"
@@ -635,6 +1093,8 @@ class rtl_data_copy:
                     os.path.join(local_src_dir_incl_path, dir_name)) for dir_name in dirs_to_copy])
                 
     @staticmethod
+    @trace_utils.traced("rtl_data_copy.copy_rtl_rsim_debug_test_data")
+    @profile_utils.profiled
     def copy_rtl_rsim_debug_test_data(test: str, rtl_args: dict[str, typing.Any]) -> None:
         assert isinstance(rtl_args, dict), "- error: expected rtl_args to be a dict"
         key_local_root_dir = "local_root_dir"
@@ -672,6 +1132,7 @@ class rtl_data_copy:
         )
 
     @staticmethod
+    @trace_utils.traced("rtl_data_copy.copy_rtl_rsim_debug_dir", args = ())
     def copy_rtl_rsim_debug_dir(rtl_args: dict[str, typing.Any]) -> None:
         assert isinstance(rtl_args, dict), "- error: expected rtl_args to be a dict"
         key_local_root_dir = "local_root_dir"
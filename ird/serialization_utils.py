@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+import json
+import os
+import re
+import threading
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# libyaml backed loader when available, the pure python loader otherwise.
+YAML_LOADER = yaml.CSafeLoader if getattr(yaml, "__with_libyaml__", False) else yaml.SafeLoader
+
+class parse_cache:
+    # (file_name, tag) -> (stamp, parsed object).
+    # objects handed out by the cache are shared between callers, treat them as read-only.
+    _entries = dict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_stamp(file_name):
+        st = os.stat(file_name)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @staticmethod
+    def get(file_name, parser, tag = None):
+        file_name = os.path.abspath(file_name)
+        key = (file_name, tag)
+        stamp = parse_cache.get_stamp(file_name)
+        with parse_cache._lock:
+            entry = parse_cache._entries.get(key)
+
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        data = parser(file_name)
+        with parse_cache._lock:
+            parse_cache._entries[key] = (stamp, data)
+
+        return data
+
+    @staticmethod
+    def invalidate(file_name = None):
+        with parse_cache._lock:
+            if file_name is None:
+                parse_cache._entries.clear()
+            else:
+                file_name = os.path.abspath(file_name)
+                for key in [key for key in parse_cache._entries.keys() if key[0] == file_name]:
+                    del parse_cache._entries[key]
+
+class yaml_io:
+    # top level `key: scalar` lines, e.g. "res: PASS" or "total-cycles: 1234" in sim_result.yml
+    _top_level_scalar = re.compile(r"^([A-Za-z0-9_.\-]+)[ \t]*:[ \t]*(.*?)[ \t]*$")
+    # scalars resolved without the YAML resolver: decimal integers, floats with a dot (YAML 1.1 needs the dot and a
+    # signed exponent) and plain words that are not null / bool. anything else (0x.., 010, 1e5, ~, yes, dates,
+    # quoted strings, ...) goes through the YAML loader.
+    _int = re.compile(r"^[-+]?(0|[1-9][0-9]*)$")
+    _float = re.compile(r"^[-+]?[0-9]+\.[0-9]*([eE][-+][0-9]+)?$")
+    _word = re.compile(r"^[A-Za-z_][A-Za-z0-9_\-]*$")
+    _comment = re.compile(r"[ \t]#")
+    _special_words = {"null", "Null", "NULL", "true", "True", "TRUE", "false", "False", "FALSE", "yes", "Yes", "YES", "no", "No", "NO", "on", "On", "ON", "off", "Off", "OFF"}
+
+    @staticmethod
+    def load(stream):
+        return yaml.load(stream, Loader = YAML_LOADER)
+
+    @staticmethod
+    def load_file_uncached(file_name):
+        with open(file_name) as stream:
+            return yaml_io.load(stream)
+
+    @staticmethod
+    def load_file(file_name, cache = True):
+        if not cache:
+            return yaml_io.load_file_uncached(file_name)
+
+        return parse_cache.get(file_name, yaml_io.load_file_uncached)
+
+    @staticmethod
+    def scalar_from_str(value):
+        # (True, value) or (False, None) if the text is not a scalar.
+        if yaml_io._int.match(value):
+            return True, int(value)
+
+        if yaml_io._float.match(value):
+            return True, float(value)
+
+        if yaml_io._word.match(value) and value not in yaml_io._special_words:
+            return True, value
+
+        try:
+            data = yaml_io.load(value)
+        except yaml.YAMLError:
+            return False, None
+
+        return not isinstance(data, (dict, list)), data
+
+    @staticmethod
+    def get_top_level_fields_from_lines(lines, keys):
+        # fast path for a handful of top level scalar fields. returns None whenever the plain
+        # `key: value` form is not sufficient, the caller then falls back to a full parse.
+        keys = set(keys)
+        fields = dict()
+        for line in lines:
+            if not line or line[0] in " \t#-\r\n":
+                continue
+
+            m = yaml_io._top_level_scalar.match(line.rstrip("\r\n"))
+            if not m or m.group(1) not in keys:
+                continue
+
+            value = m.group(2)
+            if value.startswith(("'", '"')):
+                if not (2 <= len(value) and value[-1] == value[0]):
+                    return None
+            else:
+                value = yaml_io._comment.split(value, 1)[0].rstrip()
+
+            if not value or value[0] in "{[|>&*!%@`":
+                return None
+
+            is_scalar, value = yaml_io.scalar_from_str(value)
+            if not is_scalar:
+                return None
+
+            fields[m.group(1)] = value
+            if len(fields) == len(keys):
+                return fields
+
+        return None
+
+    @staticmethod
+    def get_top_level_fields_from_data(data, keys):
+        if not isinstance(data, dict):
+            return None
+
+        return dict([(key, data[key]) for key in keys if key in data.keys()])
+
+    @staticmethod
+    def get_top_level_fields_from_str(text, keys):
+        fields = yaml_io.get_top_level_fields_from_lines(text.splitlines(), keys)
+        if fields is not None:
+            return fields
+
+        return yaml_io.get_top_level_fields_from_data(yaml_io.load(text), keys)
+
+    @staticmethod
+    def get_top_level_fields_from_file_uncached(file_name, keys):
+        with open(file_name) as stream:
+            fields = yaml_io.get_top_level_fields_from_lines(stream, keys)
+
+        if fields is not None:
+            return fields
+
+        return yaml_io.get_top_level_fields_from_data(yaml_io.load_file(file_name), keys)
+
+    @staticmethod
+    def get_top_level_fields_from_file(file_name, keys, cache = True):
+        keys = tuple(keys)
+        if not cache:
+            return yaml_io.get_top_level_fields_from_file_uncached(file_name, keys)
+
+        return parse_cache.get(file_name, lambda name: yaml_io.get_top_level_fields_from_file_uncached(name, keys), tag = keys)
+
+    @staticmethod
+    def get_sim_result(file_name, key_result = "res", key_num_cycles = "total-cycles", cache = True):
+        # (result, num_cycles) from sim_result.yml
+        fields = yaml_io.get_top_level_fields_from_file(file_name, (key_result, key_num_cycles), cache = cache)
+        if fields is None:
+            raise Exception(f"- error: could not obtain correct YAML mapping from file {file_name}")
+
+        # KeyError for a missing key, as indexing the parsed file does.
+        return (fields[key_result], fields[key_num_cycles])
+
+class json_io:
+    if orjson is not None:
+        _dump_options = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    @staticmethod
+    def loads(text):
+        if orjson is not None:
+            return orjson.loads(text)
+
+        return json.loads(text)
+
+    @staticmethod
+    def load_file_uncached(file_name):
+        with open(file_name, "rb") as file:
+            return json_io.loads(file.read())
+
+    @staticmethod
+    def load_file(file_name, cache = True):
+        if not cache:
+            return json_io.load_file_uncached(file_name)
+
+        return parse_cache.get(file_name, json_io.load_file_uncached)
+
+    @staticmethod
+    def dumps(obj, indent = 2):
+        # bytes. the same JSON value as json.dumps(obj, indent = indent), not always the same text: with orjson
+        # (indent 2 or None) non-ASCII is written as UTF-8 instead of \u escapes, indent None is compact (no
+        # spaces after , and :) and NaN / inf are written as null.
+        if orjson is not None and indent in (2, None):
+            try:
+                return orjson.dumps(obj, option = json_io._dump_options if indent else orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+            except TypeError:
+                pass # e.g. integers wider than 64 bits, use the stdlib encoder.
+
+        return json.dumps(obj, indent = indent).encode("utf-8")
+
+    @staticmethod
+    def dump_file(obj, file_name, indent = 2):
+        with open(file_name, "wb") as file:
+            file.write(json_io.dumps(obj, indent = indent))
+
+        parse_cache.invalidate(file_name)
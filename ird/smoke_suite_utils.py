@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+# smoke suite: a subset of the tests that fits a wall-clock budget and covers every used mnemonic, every test
+# class and every (test class, data type) at least once.
+#
+#   elements  : per test, "mnemonic:<kind>:<mnemonic>" for the instructions in its profile (status.iter_status,
+#               profile_only), "class:<class>" (status_utils.get_test_classes) and "class_dtype:<class>:<dtype>"
+#               (data type tokens of the test name, e.g. bf16, mxfp4_a).
+#   runtimes  : model runtime per test from earlier traces (polaris_tests.run_model spans below trace_root),
+#               otherwise from the model log (log mtime - inputcfg mtime), otherwise the median of the test
+#               class (or of all tests).
+#   selection : greedy budgeted set cover. the test with the most newly covered elements per second that still
+#               fits into the budget (total runtime / num_processes, at least the longest test) is added until
+#               everything is covered or nothing fits any more.
+#
+#   python smoke_suite_utils.py <tag> <budget minutes> [run]
+#
+# writes <model_logs_dir>/smoke_suite.txt, one test per line. with run, the suite is executed through
+# polaris_tests.execute_tests.
+
+import ird_status
+import json
+import os
+import polaris_utils
+import re
+import rtl_utils
+import status_utils
+import statistics
+import sys
+import trace_utils
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # status.py
+RE_DTYPE                   = re.compile(r"^(?:mx)?(?:fp|bf|int|uint|tf)\d+(?:_[a-z0-9]+)?$")
+DEFAULT_RUNTIME_SECONDS    = 60.0
+DEFAULT_TRACE_ROOT         = "__traces"
+SMOKE_SUITE_FILE_NAME      = "smoke_suite.txt"
+
+def get_test_dtypes(test):
+    # data type tokens of a test name, "t6-quas-n4-ttx-elwsub-mxfp4_a-00004-llk" -> {"mxfp4_a"}
+    return {token for token in test.split("-") if RE_DTYPE.match(token)}
+
+def get_status_args(rtl_args, model_args):
+    local_root_dir_incl_path = os.path.join(rtl_args["local_root_dir_path"], rtl_args["local_root_dir"])
+    status_args = dict()
+    status_args["root_dir"]      = local_root_dir_incl_path
+    status_args["debug_dir"]     = os.path.join(rtl_args["debug_dir_path"], rtl_args["debug_dir"])
+    status_args["t3sim_dir"]     = os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"], model_args["model_odir"])
+    status_args["assembly_yaml"] = rtl_utils.test_names.get_file_name_incl_path(local_root_dir_incl_path, rtl_args["isa_file_name"])
+    status_args["profile_cache"] = True
+
+    return status_args
+
+@trace_utils.traced("smoke_suite_utils.get_used_mnemonics", args = ())
+def get_used_mnemonics(tests, rtl_args, model_args):
+    # test -> {"<kind>:<mnemonic>", ...} from the tests' instruction profiles.
+    import status
+
+    used = dict()
+    for test_status in status.iter_status(sorted(tests), get_status_args(rtl_args, model_args), profile_only = True):
+        profile = test_status.profile
+        counts = profile.get_num_instructions_per_column()
+        used[test_status.name] = {name for name, count in zip(profile.get_column_names(), counts) if count > 0}
+
+    return used
+
+def get_elements(tests, used_mnemonics):
+    # test -> set of elements to cover.
+    elements = dict()
+    for test in tests:
+        test_class = status_utils.get_test_classifier().classify(test)
+        test_elements = {f"mnemonic:{mnemonic}" for mnemonic in used_mnemonics.get(test, set())}
+        if test_class:
+            test_elements.add(f"class:{test_class}")
+            test_elements.update({f"class_dtype:{test_class}:{dtype}" for dtype in get_test_dtypes(test)})
+
+        elements[test] = test_elements
+
+    return elements
+
+def get_traced_runtimes(tests, trace_root = DEFAULT_TRACE_ROOT):
+    # test -> seconds of the latest polaris_tests.run_model span found in <trace_root>/*/<pid>.jsonl.
+    tests = set(tests)
+    runtimes = dict()
+    if not os.path.isdir(trace_root):
+        return runtimes
+
+    for trace_dir in sorted(os.listdir(trace_root)): # trace directories start with a timestamp, later runs win
+        trace_dir_incl_path = os.path.join(trace_root, trace_dir)
+        if not os.path.isdir(trace_dir_incl_path):
+            continue
+
+        for file_name in sorted(os.listdir(trace_dir_incl_path)):
+            if not file_name.endswith(".jsonl"):
+                continue
+
+            with open(os.path.join(trace_dir_incl_path, file_name)) as file:
+                for line in file:
+                    if '"polaris_tests.run_model"' not in line:
+                        continue
+
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+                    test = event.get("args", {}).get("test")
+                    if test in tests and "exception" not in event["args"].keys():
+                        runtimes[test] = event["dur"] / 1e6
+
+    return runtimes
+
+def get_log_runtime(test, model_args):
+    # log mtime - inputcfg mtime, the inputcfg file is written right before the model starts.
+    log_file_name = status_utils.get_model_log_file_name(test, model_args)
+    inputcfg_file_name = os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"], model_args["model_cfg_dir"], f"{model_args['model_inputcfg_file_prefix']}{test}.json")
+    if not (os.path.isfile(log_file_name) and os.path.isfile(inputcfg_file_name)):
+        return None
+
+    runtime = os.path.getmtime(log_file_name) - os.path.getmtime(inputcfg_file_name)
+    return runtime if runtime > 0 else None
+
+def get_runtimes(tests, model_args, trace_root = DEFAULT_TRACE_ROOT):
+    # test -> estimated model runtime in seconds, (test -> source) for reporting.
+    runtimes = get_traced_runtimes(tests, trace_root)
+    sources = {test : "trace" for test in runtimes.keys()}
+    for test in tests:
+        if test not in runtimes.keys():
+            runtime = get_log_runtime(test, model_args)
+            if runtime is not None:
+                runtimes[test] = runtime
+                sources[test] = "log"
+
+    classes_runtimes = dict()
+    for test, runtime in runtimes.items():
+        classes_runtimes.setdefault(status_utils.get_test_classifier().classify(test), []).append(runtime)
+
+    overall = statistics.median(runtimes.values()) if runtimes else DEFAULT_RUNTIME_SECONDS
+    for test in tests:
+        if test not in runtimes.keys():
+            class_runtimes = classes_runtimes.get(status_utils.get_test_classifier().classify(test))
+            runtimes[test] = statistics.median(class_runtimes) if class_runtimes else overall
+            sources[test] = "estimate"
+
+    return runtimes, sources
+
+def get_wall_clock(total, longest, num_processes):
+    return max(total / max(1, num_processes), longest)
+
+def select(elements, runtimes, budget_seconds, num_processes = 1):
+    # greedy budgeted set cover. returns (selected tests, covered elements, uncovered elements).
+    universe = set().union(*elements.values()) if elements else set()
+    uncovered = set(universe)
+    selected = []
+    total = 0.0
+    longest = 0.0
+    candidates = {test for test, test_elements in elements.items() if test_elements}
+    while uncovered and candidates:
+        best = None
+        best_score = 0.0
+        for test in sorted(candidates):
+            gain = len(elements[test] & uncovered)
+            if 0 == gain:
+                continue
+
+            if get_wall_clock(total + runtimes[test], max(longest, runtimes[test]), num_processes) > budget_seconds:
+                continue
+
+            score = gain / max(runtimes[test], 1e-3)
+            if score > best_score:
+                best, best_score = test, score
+
+        if best is None:
+            break
+
+        selected.append(best)
+        uncovered -= elements[best]
+        total += runtimes[best]
+        longest = max(longest, runtimes[best])
+        candidates.discard(best)
+        candidates = {test for test in candidates if elements[test] & uncovered}
+
+    return sorted(selected), universe - uncovered, uncovered
+
+def selection_to_str(selected, covered, uncovered, runtimes, sources, num_processes):
+    total = sum(runtimes[test] for test in selected)
+    wall_clock = get_wall_clock(total, max([runtimes[test] for test in selected], default = 0.0), num_processes)
+    kinds = sorted(set(element.split(":", 1)[0] for element in covered | uncovered))
+
+    msg = f"+ smoke suite: {len(selected)} tests, ~{wall_clock / 60:.1f} min on {num_processes} processes ({total / 60:.1f} min model time)\n"
+    for kind in kinds:
+        num_covered = len([element for element in covered if element.startswith(kind + ":")])
+        num_total = num_covered + len([element for element in uncovered if element.startswith(kind + ":")])
+        msg += f"  - {kind:<12}: {num_covered:>5} of {num_total:>5} covered\n"
+
+    for element in sorted(uncovered)[:20]:
+        msg += f"  - not covered within the budget: {element}\n"
+
+    if len(uncovered) > 20:
+        msg += f"  - ... {len(uncovered) - 20} more not covered\n"
+
+    for test in selected:
+        msg += f"  + {test} ({runtimes[test]:.0f} s, {sources[test]})\n"
+
+    return msg.rstrip()
+
+@trace_utils.traced("smoke_suite_utils.get_smoke_suite", args = ())
+def get_smoke_suite(tests, rtl_args, model_args, budget_seconds, trace_root = DEFAULT_TRACE_ROOT):
+    key_rtl_num_processes     = "num_processes"
+    key_model_num_processes   = "num_processes"
+    key_model_root_dir_path   = "model_root_dir_path"
+    key_model_logs_dir        = "model_logs_dir"
+
+    for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_rtl_")]:
+        assert key in rtl_args.keys(), f"- error: {key} not found in given rtl_args dict"
+
+    for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_model_")]:
+        assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+    num_processes = min(rtl_args[key_rtl_num_processes], model_args[key_model_num_processes])
+    elements = get_elements(tests, get_used_mnemonics(tests, rtl_args, model_args))
+    runtimes, sources = get_runtimes(tests, model_args, trace_root)
+    selected, covered, uncovered = select(elements, runtimes, budget_seconds, num_processes)
+    print(selection_to_str(selected, covered, uncovered, runtimes, sources, num_processes))
+
+    logs_dir = os.path.join(model_args[key_model_root_dir_path], model_args[key_model_logs_dir])
+    os.makedirs(logs_dir, exist_ok = True)
+    file_name = os.path.join(logs_dir, SMOKE_SUITE_FILE_NAME)
+    with open(file_name, "w") as file:
+        file.write("\n".join(selected) + "\n")
+
+    print(f"- wrote {file_name}")
+
+    return selected
+
+if "__main__" == __name__:
+    if len(sys.argv) < 3:
+        print(f"usage: {sys.argv[0]} <tag> <budget minutes> [run]")
+        sys.exit(1)
+
+    rtl_args, polaris_big_args = ird_status.get_args(sys.argv[1])
+    tests = sorted(rtl_utils.test_names.get_tests(rtl_args))
+    print(f"- found {len(tests)} tests.")
+    smoke_suite = get_smoke_suite(tests, rtl_args, polaris_big_args, float(sys.argv[2]) * 60)
+
+    if len(sys.argv) > 3 and "run" == sys.argv[3]:
+        polaris_utils.polaris_tests.execute_tests(smoke_suite, rtl_args, polaris_big_args)
@@ -1,12 +1,19 @@
 #!/usr/bin/env python
 
+import classifier_utils
 import copy
 import datetime
+import functools
 import math
-import matplotlib.pyplot as plt
 import os
-import rtl_utils
-import yaml
+import plot_utils
+import profile_utils
+import rtl_archive_utils
+import serialization_utils
+import test_layout_utils
+import trace_utils
+
+MODEL_DEDUP_FILE_NAME = "dedup.json"
 
 def get_test_classes():
     classes = dict()
@@ -40,12 +47,45 @@ def get_failure_bins_as_str():
 
     return str_bins
 
-def get_failure_bin_index(msg):
-    for idx, b in enumerate(get_failure_bins_as_str()):
-        if b == msg:
-            return idx
+def get_failure_bins_in_statuses(statuses):
+    # the known bins, then the bins of failures that matched none of them (classifier_utils.UNKNOWN_BIN_PREFIX + signature).
+    bins = get_failure_bins_as_str()
+    unknown_bins = set(status["failure_bin"] for status in statuses.values() if "failure_bin" in status.keys()) - set(bins)
+
+    return bins + sorted(unknown_bins)
+
+@functools.lru_cache(maxsize = None)
+def get_failure_classifier():
+    return classifier_utils.failure_classifier(get_failure_bins())
+
+@functools.lru_cache(maxsize = None)
+def get_test_classifier():
+    return classifier_utils.test_classifier(get_test_classes())
+
+def get_rtl_sim_result_file_name(test, rtl_args):
+    return os.path.join(test_layout_utils.get_test_dir(test, rtl_args), rtl_args["sim_result.yaml"])
 
-    return idx + 1
+def get_model_log_file_name(test, model_args):
+    model_odir = os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"], model_args["model_odir"])
+    return os.path.join(model_odir, test + model_args["model_log_file_suffix"])
+
+def get_model_dedup_file_name(model_args):
+    # {representative test : [duplicate tests]} of the last model run with dedup_tests, see polaris_tests.fan_out_duplicates.
+    model_odir = os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"], model_args["model_odir"])
+    return os.path.join(model_odir, MODEL_DEDUP_FILE_NAME)
+
+def get_model_dedup_groups(model_args):
+    file_name = get_model_dedup_file_name(model_args)
+    return serialization_utils.json_io.load_file(file_name, cache = False) if os.path.isfile(file_name) else dict()
+
+def dedup_groups_to_str(groups, tests):
+    tests = set(tests)
+    groups = {test : [ele for ele in duplicates if ele in tests] for test, duplicates in groups.items() if test in tests}
+    num_duplicates = sum(len(duplicates) for duplicates in groups.values())
+    if 0 == num_duplicates:
+        return ""
+
+    return f"{num_duplicates} of {len(tests)} tests share the model result of {len([ele for ele in groups.values() if ele])} tests with identical model inputs (dedup factor {len(tests) / (len(tests) - num_duplicates):.2f}x)"
 
 def get_rtl_test_status(test, rtl_args):
     key_local_root_dir = "local_root_dir"
@@ -56,25 +96,20 @@ def get_rtl_test_status(test, rtl_args):
     for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
         assert key in rtl_args.keys(), f"- error: {key} not found in given rtl_args dict."
 
-    test_dir = test + rtl_args[key_test_dir_suffix]
-    local_root_dir_incl_path = os.path.join(rtl_args[key_local_root_dir_path], rtl_args[key_local_root_dir])
-    test_dir_incl_path = rtl_utils.test_names.get_dir_incl_path(local_root_dir_incl_path, test_dir)
-    sim_result_incl_path = os.path.join(test_dir_incl_path, rtl_args[key_sim_result_yaml])
+    archived_status = rtl_archive_utils.get_sim_result(test, rtl_args)
+    if archived_status is not None:
+        return archived_status
+
+    sim_result_incl_path = get_rtl_sim_result_file_name(test, rtl_args)
     if os.path.isfile(sim_result_incl_path):
-        with open(sim_result_incl_path) as stream:
-            yml = yaml.safe_load(stream)
-            return (True, yml['res'], yml['total-cycles'])
+        res, num_cycles = serialization_utils.yaml_io.get_sim_result(sim_result_incl_path, "res", "total-cycles")
+        return (True, res, num_cycles)
     else:
         return (False, None, None)
 
-def get_failure_bin(msg, test):
-    bins = get_failure_bins()
-
-    for strings in bins:
-        if len(strings) == sum([1 for s in strings if s in msg]):
-            return " ".join([s for s in strings])
-
-    raise Exception(f"- error: could not find failure bin for test {test}. msg = {msg}")
+def get_failure_bin(msg, test, lines = None):
+    # lines: end of the test's log, used for the signature of failures that match no bin.
+    return get_failure_classifier().classify_with_signature(msg, lines)
 
 def get_model_test_status(test, model_args):
     key_model_log_file_suffix = "model_log_file_suffix"
@@ -85,9 +120,7 @@ def get_model_test_status(test, model_args):
     for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
         assert key in model_args.keys(), f"- error: {key} not found in given model_args dict."
 
-    model_odir = os.path.join(model_args[key_model_root_dir_path], model_args[key_model_root_dir], model_args[key_model_odir])
-    model_log_file_name = test + model_args[key_model_log_file_suffix]
-    model_log_file_incl_path = os.path.join(model_odir, model_log_file_name)
+    model_log_file_incl_path = get_model_log_file_name(test, model_args)
 
     if os.path.isfile(model_log_file_incl_path):
         with open(model_log_file_incl_path, "r") as file:
@@ -101,16 +134,7 @@ def get_model_test_status(test, model_args):
         return (False, None, None)
 
 def get_test_class(test):
-    classes = get_test_classes()
-
-    test_words = test.split("-")
-
-    test_class = None
-    for key, values in classes.items():
-        for value in values:
-            if value in test_words:
-                test_class = key
-
+    test_class = get_test_classifier().classify(test)
     if not test_class:
         raise Exception(f"- error: could not determine test class for {test}")
 
@@ -134,10 +158,15 @@ def get_test_status(test, rtl_args, model_args):
     status["rtl"]["result"]       = rtl_res
     status["class"]               = get_test_class(test)
     if isinstance(model_num_cycles, str):
-        status["failure_bin"] = get_failure_bin(model_num_cycles, test)
+        lines = classifier_utils.get_log_tail(get_model_log_file_name(test, model_args))
+        exc_type, exc_message, frame = classifier_utils.get_exception(lines)
+        status["failure_bin"] = get_failure_bin(model_num_cycles, test, lines)
+        status["failure"]     = {"exception" : exc_type, "message" : exc_message, "frame" : list(frame) if frame else None}
 
     return status
 
+@trace_utils.traced("status_utils.get_tests_statuses", args = ())
+@profile_utils.profiled
 def get_tests_statuses(tests, rtl_args, model_args):
     statuses = dict()
     for test in sorted(tests):
@@ -406,7 +435,8 @@ def overall_status_to_str(statuses):
 def get_status_for_class(test_class, statuses):
     PASS = "PASS"
     key_tests = "tests"
-    bins = get_failure_bins_as_str()
+    failure_bins = get_failure_bins_in_statuses(statuses)
+    bins = list(failure_bins)
     assert PASS not in bins
     assert key_tests not in bins
     bins.append(PASS)
@@ -415,7 +445,7 @@ def get_status_for_class(test_class, statuses):
 
     num_pass = 0
     num_tests = 0
-    num_fail = [0 for _ in get_failure_bins_as_str()]
+    num_fail = {b : 0 for b in failure_bins}
     test_bins = dict()
     for b in bins:
         test_bins[b] = []
@@ -428,7 +458,7 @@ def get_status_for_class(test_class, statuses):
                 num_pass += 1
                 test_bins[PASS].append(test)
             else:
-                num_fail[get_failure_bin_index(status["failure_bin"])] += 1
+                num_fail[status["failure_bin"]] += 1
                 assert status["failure_bin"] in test_bins.keys()
                 test_bins[status["failure_bin"]].append(test)
 
@@ -437,9 +467,8 @@ def get_status_for_class(test_class, statuses):
 
     assert num_tests == len(test_bins[key_tests])
     assert num_pass == len(test_bins[PASS])
-    for bin in get_failure_bins_as_str():
-        bin_idx = get_failure_bin_index(bin)
-        assert len(test_bins[bin]) == num_fail[bin_idx]
+    for bin in failure_bins:
+        assert len(test_bins[bin]) == num_fail[bin]
 
     assert len(test_bins[key_tests]) == sum(len(value) for key, value in test_bins.items() if key != key_tests)
 
@@ -459,7 +488,6 @@ def status_by_class_to_str(statuses): # classes_statuses
     key_tests = "tests"
     PASS = "PASS"
 
-    failure_bins_as_str = get_failure_bins_as_str()
     status_dict = dict()
     for status in statuses.values():
         for key in status.keys():
@@ -483,7 +511,7 @@ def status_by_class_to_str(statuses): # classes_statuses
     statuses = copy.deepcopy(statuses)
     statuses[overall] = status_dict
 
-    failure_bins_as_str = sorted(get_failure_bins_as_str())
+    failure_bins_as_str = sorted(key for key in status_dict.keys() if key not in (key_tests, PASS))
     max_idx_len         = math.ceil(math.log10(len(statuses)))
     max_class_len       = max([len(key) for key in statuses.keys()])
     max_num_tests_len   = math.ceil(math.log10(max([len(status[key_tests]) for status in statuses.values()])))
@@ -509,7 +537,7 @@ def status_by_class_to_str(statuses): # classes_statuses
     return msg
 
 def failed_tests_by_test_class_to_str(statuses): # classes_statuses
-    failure_bin_as_str = sorted(get_failure_bins_as_str())
+    failure_bin_as_str = sorted(set(key for status in statuses.values() for key in status.keys()) - {"tests", "PASS"})
     max_idx_len = math.ceil(math.log10(max(1, max(len(status[bin]) for status in statuses.values() for bin in failure_bin_as_str))))
     msg = ""
     for c, status in statuses.items():
@@ -522,141 +550,41 @@ def failed_tests_by_test_class_to_str(statuses): # classes_statuses
 
     return msg.rstrip()
 
+def get_s_curve_points(tests_num_cycles, sort_by = "model_by_rtl"):
+    sort_by_idx = get_sort_by_index_for_num_cycles_model_by_rtl(sort_by)
+    return [(test, num_cycles[sort_by_idx]) for test, num_cycles in sorted(tests_num_cycles.items(), key = lambda x: x[1][sort_by_idx])]
+
+def get_test_class_wise_s_curve_points(perf_nums, sort_by = "model_by_rtl"):
+    return {test_class : get_s_curve_points(perf_nums[test_class], sort_by) for test_class in sorted(perf_nums.keys())}
+
 def plot_s_curve(tests_num_cycles, file_to_write = ""):
-    sort_by_idx = get_sort_by_index_for_num_cycles_model_by_rtl("model_by_rtl")
-    x = [None for _ in range(len(tests_num_cycles))]
-    y = [None for _ in range(len(tests_num_cycles))]
-    for idx, elem in enumerate(sorted(tests_num_cycles.items(), key = lambda x: x[1][sort_by_idx])):
-        test = elem[0]
-        num_cycles = elem[1]
-        x[idx] = test
-        y[idx] = num_cycles[sort_by_idx]
-
-    assert all(ele is not None for ele in x)
-    assert all(ele is not None for ele in y)
-    assert len(x) == len(y)
-
-    num_tests = len(x)
-    num_tests_len = math.ceil(math.log10(num_tests))
-
-    x = [f"{x[idx]} ({y[idx]:.2f})" for idx in range(len(x))]
-
-    num_10pc = len([ele for ele in y if abs(ele - 1.0) <= 0.1])
-    num_20pc = len([ele for ele in y if abs(ele - 1.0) <= 0.2])
-    num_30pc = len([ele for ele in y if abs(ele - 1.0) <= 0.3])
-
-    fig, ax = plt.subplots(figsize=(8, 4))
-    # ax.plot(x, y, color = "black", linewidth = 1, alpha = 0.5)
-    # ax.scatter(x, y, alpha = 0.5)
-    ax.axhline(1, color = 'black', linestyle = "--", linewidth = 0.5, alpha = 0.5, label = f"{sum([1 for ele in y if ele <= 1])} tests with PM/RTL <= 1")
-    ax.plot(x, y,
-            color     = [0,0,0],
-            marker    = 'o',
-            linestyle = '-',
-            linewidth = 1.0,
-            alpha     = 1,
-            markerfacecolor = [1,1,1],
-            # markeredgecolor = colors[test_class_idx],
-            markevery = 1)
-
-    # Highlight the region 0.9 to 1.1 slightly darker
-    ax.axhspan(0.7, 1.3, color="gray", alpha=0.05, label=f"+/- 30% ({num_30pc}/{num_tests} tests, {((num_30pc/num_tests)*100):.0f}%)")
-
-    # Highlight the region 0.9 to 1.1 slightly darker
-    ax.axhspan(0.8, 1.2, color="gray", alpha=0.1,  label=f"+/- 20% ({num_20pc}/{num_tests} tests, {((num_20pc/num_tests)*100):.0f}%)")
-
-    # Highlight the region 0.9 to 1.1 slightly darker
-    ax.axhspan(0.9, 1.1, color="gray", alpha=0.2,  label=f"+/- 10% ({num_10pc}/{num_tests} tests, {((num_10pc/num_tests)*100):.0f}%)")
-
-    # Labels and title
-    ax.set_xlabel("Tests")
-    ax.set_ylabel("Perf comparison (PM/RTL)")
-    # ax.set_title("col1 vs col5 Plot")
-    ax.tick_params(axis='x', labelrotation=90, labelsize = 6)
-
-    # Show legend
-    ax.legend()
-
-    # Save plot as an SVG file with no extra white space
-    plt.savefig(f"s_curve_{file_to_write}.svg", format="svg", bbox_inches="tight", dpi = 512)
-    plt.savefig(f"s_curve_{file_to_write}.png", format="png", bbox_inches="tight", dpi = 512)
-
-    print("- end of s curve")
+    return plot_utils.plot_s_curve(get_s_curve_points(tests_num_cycles), f"s_curve_{file_to_write}")
 
 def plot_test_class_wise_s_curve(tests, rtl_args, model_args, file_to_write):
-    sort_by = "model_by_rtl"
-    num_markers_per_line = 5
     statuses = get_tests_statuses(tests, rtl_args, model_args)
     perf_nums = get_test_class_wise_num_cycles_model_by_rtl_from_statuses(statuses)
-    sort_by_idx = get_sort_by_index_for_num_cycles_model_by_rtl(sort_by)
-    x_dict = dict()
-    x_labels = dict()
-    idx_x = 1
-    maxy = -1
-    for test_class in sorted(perf_nums.keys()):
-        tests_num_cycles = perf_nums[test_class]
-        if 0 != len(tests_num_cycles):
-            for test_num_cycles in sorted(tests_num_cycles.items(), key = lambda x: x[1][sort_by_idx]):
-                test = test_num_cycles[0]
-                maxy = max(maxy, test_num_cycles[1][sort_by_idx])
-                x_dict[test] = idx_x
-                idx_x += 1
-    miny = maxy
-    for test_class in perf_nums.keys():
-        tests_num_cycles = perf_nums[test_class]
-        for test_num_cycles in tests_num_cycles.values():
-            miny = min(miny, test_num_cycles[sort_by_idx])
+    return plot_utils.plot_test_class_wise_s_curve(get_test_class_wise_s_curve_points(perf_nums), f"test_class_wise_s_curve_{file_to_write}")
 
-    # Get colors from the default color cycle
-    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
-    assert len(colors) >= len(perf_nums)
+def plot_statuses(statuses, file_to_write, html = False):
+    # overall and test class wise S-curves, rendered in parallel.
+    points = get_s_curve_points(get_num_cycles_model_by_rtl_from_statuses(statuses))
+    class_points = get_test_class_wise_s_curve_points(get_test_class_wise_num_cycles_model_by_rtl_from_statuses(statuses))
+    jobs = []
+    jobs.append((plot_utils.plot_s_curve, {"points" : points, "file_name_prefix" : f"s_curve_{file_to_write}"}))
+    jobs.append((plot_utils.plot_test_class_wise_s_curve, {"class_points" : class_points, "file_name_prefix" : f"test_class_wise_s_curve_{file_to_write}"}))
+    plot_utils.render(jobs)
 
-    fig, ax = plt.subplots(figsize=(12, 4))
+    if html:
+        plot_utils.write_s_curve_html({"All tests" : {"ALL" : points}, "By test class" : class_points}, f"s_curve_{file_to_write}.html", title = f"S-curves {file_to_write}")
 
-    for test_class_idx, test_class in enumerate(sorted(perf_nums.keys())):
-        tests_num_cycles = perf_nums[test_class]
-        tests = []
-        for test_num_cycles in sorted(tests_num_cycles.items(), key = lambda x: x[1][sort_by_idx]):
-            test = test_num_cycles[0]
-            tests.append(test)
-
-        x = [x_dict[test] for test in tests]
-        y = [tests_num_cycles[test][sort_by_idx] for test in tests]
-        for idx, test in enumerate(tests):
-            x_labels[test] = f"{test} ({y[idx]:.2f})"
-        ax.plot(x, y, color = "black", linewidth = 1, alpha = 0.5)
-        # ax.scatter(x, y, alpha = 0.5)
-        mark_every = max(1, int(round(len(x) / num_markers_per_line)))
-        ax.plot(x, y,
-            color     = [0,0,0],
-            marker    = 'o',
-            linestyle = '-',
-            linewidth = 1.0,
-            alpha     = 1,
-            markerfacecolor = colors[test_class_idx],
-            # markeredgecolor = colors[test_class_idx],
-            markevery = mark_every)
-
-        ax.axvspan(min(x) - 0.5, max(x) + 0.5, color = colors[test_class_idx], alpha=0.05)
-        y_for_text = maxy - (maxy - miny) * 0.07 if len(x) > 3 else maxy
-        ax.text(min(x), y_for_text, test_class, color = colors[test_class_idx])
-
-    # Labels and title
-    ax.set_xlabel("Tests")
-    ax.set_ylabel("Perf comparison (PM/RTL)")
-    # ax.set_title("col1 vs col5 Plot")
-    ax.set_xticks(list(x_dict.values()))
-    ax.set_xticklabels(list(x_labels.values()))
-    ax.tick_params(axis='x', labelrotation=90, labelsize = 6)
-
-    plt.savefig(f"test_class_wise_s_curve_{file_to_write}.svg", format="svg", bbox_inches="tight", dpi = 512)
-    plt.savefig(f"test_class_wise_s_curve_{file_to_write}.png", format="png", bbox_inches="tight", dpi = 512)
-
-def print_status(tests, rtl_args, model_args):
+def print_status(tests, rtl_args, model_args, plot = True, plot_html = False):
     statuses = get_tests_statuses(tests, rtl_args, model_args)
     classes_statuses = get_status_by_class(statuses)
     perf_nums = get_num_cycles_model_by_rtl_from_statuses(statuses)
     print(f"+ Overall status: {overall_status_to_str(statuses)}")
+    dedup_msg = dedup_groups_to_str(get_model_dedup_groups(model_args), tests)
+    if dedup_msg:
+        print(f"+ Model dedup: {dedup_msg}")
     print()
     print("+ Status by test class")
     print(status_by_class_to_str(classes_statuses))
@@ -670,8 +598,8 @@ def print_status(tests, rtl_args, model_args):
     print("+ Failed tests by test class")
     print(failed_tests_by_test_class_to_str(classes_statuses))
 
-    plot_s_curve(perf_nums, rtl_args['rtl_tag'])
-    plot_test_class_wise_s_curve(tests, rtl_args, model_args, rtl_args['rtl_tag'])
+    if plot:
+        plot_statuses(statuses, rtl_args['rtl_tag'], html = plot_html)
 
 
 
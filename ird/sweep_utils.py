@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+
+# parameter sweeps over the model cfg knobs, (variant x test) model runs on all cores.
+#
+#   knobs    : polaris_big_args cfg keys (cfg_latency_l1, cfg_risc.cpi, cfg_order_scheme, ...),
+#              delay.<engine name> for the delay cfg_engines.add_delay takes from the default cfg file and
+#              tpt.<mnemonic>[.<data type>] for the throughput of an instruction (all data types if none given).
+#   variants : get_grid_variants() (all combinations) or get_random_variants() (num_variants samples, a knob is
+#              either a list of values or {"min": ..., "max": ...}). a variant's id is a hash of its knobs.
+#   stamp    : <variant odir>/sweep_stamp.json keeps the hash of the variant's full cfg and the model commit, and
+#              per test the model input signature (polaris_tests.get_test_signature, incl. the ELFs). results of a
+#              variant whose cfg or model commit changed, and of tests whose inputs changed, are removed before
+#              the run, so a sweep that is run again only runs what is missing or stale.
+#   run      : cfg per variant via polaris_tests.get_default_cfg, inputcfg per test built once (memory map
+#              unchanged) and only its cfg replaced per variant. variant v writes to
+#              <model_odir>__sweeps/<sweep>/<v> and <model_cfg_dir>__sweeps/<sweep>/<v>, next to (not inside) the
+#              directories of the normal runs, whose results must not be mixed up with variant results.
+#   table    : PM/RTL error statistics per variant, <model_logs_dir>/sweep_<sweep>.csv.
+#
+#   python sweep_utils.py <tag> <sweep.yaml|sweep.json>
+#
+#   name: l1_cpi
+#   grid:                            # or random: {num_variants: 50, seed: 0, space: {...}}
+#     cfg_latency_l1:  [8.0, 10.0, 12.0]
+#     cfg_risc.cpi:    [1.0, 1.25]
+#     delay.UNPACKER0: [0, 2, 4]
+
+import copy
+import csv
+import git_cache_utils
+import hashlib
+import invalidation_utils
+import ird_status
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import polaris_utils
+import random
+import rtl_archive_utils
+import rtl_utils
+import serialization_utils
+import statistics
+import status_utils
+import sys
+import time
+import trace_utils
+
+DELAY_PREFIX = "delay."
+TPT_PREFIX   = "tpt."
+BASELINE     = "baseline"
+SWEEPS_DIR_SUFFIX = "__sweeps" # <model_odir>__sweeps, <model_cfg_dir>__sweeps
+STAMP_FILE_NAME   = "sweep_stamp.json"
+
+def get_variant_id(variant):
+    if not variant:
+        return BASELINE
+
+    return "v_" + hashlib.sha1(json.dumps(variant, sort_keys = True).encode("utf-8")).hexdigest()[:10]
+
+def get_model_commit(model_args):
+    # HEAD of the model checkout, None if it is not a git checkout.
+    return git_cache_utils.get_head(os.path.join(model_args["model_root_dir_path"], model_args["model_root_dir"]))
+
+def get_cfg_hash(cfg_dict, model_commit):
+    return hashlib.sha1(json.dumps([model_commit, cfg_dict], sort_keys = True).encode("utf-8")).hexdigest()[:16]
+
+def get_grid_variants(grid):
+    # grid: {knob : [value, ...]}, all combinations in the order of the grid.
+    knobs = list(grid.keys())
+    return [dict(zip(knobs, values)) for values in itertools.product(*[grid[knob] for knob in knobs])]
+
+def get_random_variants(space, num_variants, seed = 0):
+    # space: {knob : [value, ...] or {"min" : ..., "max" : ..., "log" : bool, "round" : num decimals}}
+    rng = random.Random(seed)
+
+    def sample(values):
+        if isinstance(values, list):
+            return copy.deepcopy(rng.choice(values))
+
+        lo, hi = values["min"], values["max"]
+        if values.get("log", False):
+            value = math.exp(rng.uniform(math.log(lo), math.log(hi)))
+        else:
+            value = rng.uniform(lo, hi)
+
+        if isinstance(lo, int) and isinstance(hi, int) and not values.get("log", False):
+            return int(round(value))
+
+        return round(value, values.get("round", 3))
+
+    variants = dict()
+    max_num_tries = 100 * num_variants
+    for _ in range(max_num_tries):
+        if len(variants) == num_variants:
+            break
+
+        variant = {knob : sample(values) for knob, values in space.items()}
+        variants.setdefault(get_variant_id(variant), variant)
+
+    if len(variants) < num_variants:
+        print(f"- only {len(variants)} distinct variants out of {num_variants} requested, the space is too small")
+
+    return list(variants.values())
+
+def get_variants(sweep):
+    # sweep: {"name" : ..., "grid" : {...}} or {"name" : ..., "random" : {"num_variants" : n, "seed" : s, "space" : {...}}}
+    if "grid" in sweep.keys():
+        variants = get_grid_variants(sweep["grid"])
+    elif "random" in sweep.keys():
+        design = sweep["random"]
+        variants = get_random_variants(design["space"], design["num_variants"], design.get("seed", 0))
+    else:
+        raise Exception(f"- error: sweep {sweep.get('name')} has neither a grid nor a random design")
+
+    if sweep.get("baseline", True) and {} not in variants:
+        variants = [{}] + variants
+
+    return variants
+
+def is_engine_knob(knob):
+    return knob.startswith(DELAY_PREFIX) or knob.startswith(TPT_PREFIX)
+
+def check_variant(variant, model_args):
+    for knob in variant.keys():
+        if not is_engine_knob(knob) and knob not in model_args.keys():
+            raise Exception(f"- error: unknown knob {knob}, expected a model_args key (e.g. cfg_latency_l1), {DELAY_PREFIX}<engine name> or {TPT_PREFIX}<mnemonic>[.<data type>]")
+
+def get_engine_knob_entries(engines, knob):
+    # [(dict, key), ...] the knob refers to in engines (cfg "engines" list, same layout in the default cfg file).
+    entries = []
+    if knob.startswith(DELAY_PREFIX):
+        engine_name = knob[len(DELAY_PREFIX):]
+        entries = [(engine, "delay") for engine in engines if engine["engineName"] == engine_name]
+    elif knob.startswith(TPT_PREFIX):
+        mnemonic, _, data_type = knob[len(TPT_PREFIX):].partition(".")
+        for engine in engines:
+            for instruction in engine.get("engineInstructions", []):
+                if instruction["name"] == mnemonic:
+                    entries.extend([(instruction["tpt"], key) for key in ([data_type] if data_type else sorted(instruction["tpt"].keys()))])
+
+    if not entries:
+        raise Exception(f"- error: could not find {knob} in engines {[engine['engineName'] for engine in engines]}")
+
+    return entries
+
+def get_engine_knob_value(engines, knob):
+    values = [entry[key] for entry, key in get_engine_knob_entries(engines, knob)]
+    return statistics.fmean(values) if len(set(values)) > 1 else values[0]
+
+def set_engine_knobs(engines, variant):
+    for knob, value in variant.items():
+        if is_engine_knob(knob):
+            for entry, key in get_engine_knob_entries(engines, knob):
+                entry[key] = value
+
+    return engines
+
+def get_variant_model_args(sweep_name, variant_id, model_args):
+    key_model_cfg_dir  = "model_cfg_dir"
+    key_model_odir     = "model_odir"
+
+    for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_model_")]:
+        assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+    variant_model_args = dict(model_args)
+    variant_model_args[key_model_cfg_dir] = os.path.join(f"{model_args[key_model_cfg_dir]}{SWEEPS_DIR_SUFFIX}", sweep_name, variant_id)
+    variant_model_args[key_model_odir]    = os.path.join(f"{model_args[key_model_odir]}{SWEEPS_DIR_SUFFIX}", sweep_name, variant_id)
+
+    return variant_model_args
+
+def get_variant_cfg(variant, model_args):
+    # default cfg with the variant's knobs, engine knobs are set after cfg_engines.add_delay.
+    check_variant(variant, model_args)
+    args = dict(model_args)
+    args.update({knob : value for knob, value in variant.items() if not is_engine_knob(knob)})
+    cfg_dict = polaris_utils.polaris_tests.get_default_cfg(args)
+    set_engine_knobs(cfg_dict["engines"], variant)
+
+    return cfg_dict
+
+def write_variant_cfg_file(variant, variant_model_args, cfg_dict = None):
+    cfg_dir_incl_path = os.path.join(variant_model_args["model_root_dir_path"], variant_model_args["model_root_dir"], variant_model_args["model_cfg_dir"])
+    os.makedirs(cfg_dir_incl_path, exist_ok = True)
+
+    file_name = os.path.join(cfg_dir_incl_path, f"{variant_model_args['model_cfg_file_prefix']}.json")
+    serialization_utils.json_io.dump_file(cfg_dict if cfg_dict is not None else get_variant_cfg(variant, variant_model_args), file_name, indent = 2)
+    serialization_utils.json_io.dump_file(variant, os.path.join(cfg_dir_incl_path, "variant.json"), indent = 2)
+
+    return file_name
+
+def get_stamp_file_name(variant_model_args):
+    return os.path.join(variant_model_args["model_root_dir_path"], variant_model_args["model_root_dir"], variant_model_args["model_odir"], STAMP_FILE_NAME)
+
+def remove_stale_results(tests, cfg_hash, signatures, variant_model_args):
+    # removes the model results of the tests the stamp of an earlier run does not match, writes the new stamp.
+    stamp_file_name = get_stamp_file_name(variant_model_args)
+    stamp = serialization_utils.json_io.load_file(stamp_file_name, cache = False) if os.path.isfile(stamp_file_name) else dict()
+    if cfg_hash != stamp.get("cfg"):
+        stale = list(tests)
+    else:
+        stale = [test for test in tests if signatures[test] != stamp.get("tests", dict()).get(test)]
+
+    invalidation_utils.remove_model_results(stale, variant_model_args)
+    stamp_tests = stamp.get("tests", dict()) if cfg_hash == stamp.get("cfg") else dict()
+    stamp_tests.update({test : signatures[test] for test in tests})
+    os.makedirs(os.path.dirname(stamp_file_name), exist_ok = True)
+    serialization_utils.json_io.dump_file({"cfg" : cfg_hash, "tests" : stamp_tests}, stamp_file_name, indent = 2)
+
+    return stale
+
+def prepare(rtl_args, model_args):
+    # isa file, memory map and default cfg, as polaris_tests.execute_tests does before running tests.
+    polaris_utils.polaris_tests.check_and_update_isa_file(rtl_args, model_args)
+    model_args["memory_map"] = polaris_utils.polaris_tests.write_default_memory_map_file(rtl_args, model_args)
+    model_args["cfg"]        = polaris_utils.polaris_tests.write_default_cfg_file(model_args)
+
+def get_inputcfgs(tests, rtl_args, model_args):
+    # test -> inputcfg dict. the directory walks happen once per test, not once per (variant, test).
+    inputcfgs = dict()
+    for idx, test in enumerate(tests):
+        rtl_archive_utils.extract_test_if_required(test, rtl_args)
+        inputcfgs[test] = polaris_utils.polaris_tests.get_inputcfg(idx, test, rtl_args, model_args)
+
+    return inputcfgs
+
+def execute_job(job_id, variant_id, test, inputcfg, cfg_file_name, variant_model_args):
+    inputcfg = dict(inputcfg)
+    inputcfg["cfg"] = cfg_file_name
+
+    cfg_dir_incl_path = os.path.dirname(cfg_file_name)
+    inputcfg_file_name = os.path.join(cfg_dir_incl_path, f"{variant_model_args['model_inputcfg_file_prefix']}{test}.json")
+    serialization_utils.json_io.dump_file(inputcfg, inputcfg_file_name, indent = 2)
+
+    with trace_utils.span("sweep_utils.execute_job", variant = variant_id, test = test):
+        polaris_utils.polaris_tests.run_model(job_id, test, inputcfg_file_name, variant_model_args)
+
+    return variant_id, test
+
+def execute_job_star(job):
+    return execute_job(*job)
+
+def execute_jobs(pool, jobs, label):
+    start = time.perf_counter()
+    for idx, _ in enumerate(pool.imap_unordered(execute_job_star, jobs)):
+        if (0 == ((idx + 1) % max(1, len(jobs) // 100))) or ((idx + 1) == len(jobs)):
+            elapsed = time.perf_counter() - start
+            print(f"- {label}: {idx + 1}/{len(jobs)} model runs done, {elapsed / 60:.1f} min elapsed, ~{elapsed / (idx + 1) * (len(jobs) - idx - 1) / 60:.1f} min left")
+
+def get_rtl_num_cycles(tests, rtl_args):
+    # test -> RTL number of cycles, for passing tests only. read once for all variants.
+    PASS = "PASS"
+    rtl_num_cycles = dict()
+    for test in tests:
+        found, res, num_cycles = status_utils.get_rtl_test_status(test, rtl_args)
+        if found and (PASS == res) and isinstance(num_cycles, int):
+            rtl_num_cycles[test] = num_cycles
+
+    return rtl_num_cycles
+
+def get_variant_errors(tests, rtl_num_cycles, variant_model_args):
+    # test -> PM/RTL - 1 for tests that pass in RTL and model, number of model failures.
+    PASS = "PASS"
+    errors = dict()
+    num_model_failures = 0
+    for test in tests:
+        found, res, num_cycles = status_utils.get_model_test_status(test, variant_model_args)
+        if found and (PASS == res):
+            if test in rtl_num_cycles.keys():
+                errors[test] = float(num_cycles) / float(rtl_num_cycles[test]) - 1.0
+        elif res is not None:
+            num_model_failures += 1
+
+    return errors, num_model_failures
+
+def get_error_statistics(errors, num_tests, num_model_failures):
+    abs_errors = [abs(ele) for ele in errors.values()]
+    stats = dict()
+    stats["num_tests"]          = num_tests
+    stats["num_compared"]       = len(abs_errors)
+    stats["num_model_failures"] = num_model_failures
+    stats["mean_abs_error"]     = statistics.fmean(abs_errors) if abs_errors else None
+    stats["median_abs_error"]   = statistics.median(abs_errors) if abs_errors else None
+    stats["rms_error"]          = math.sqrt(statistics.fmean([ele * ele for ele in abs_errors])) if abs_errors else None
+    stats["max_abs_error"]      = max(abs_errors) if abs_errors else None
+    stats["geomean_pm_by_rtl"]  = math.exp(statistics.fmean([math.log(1.0 + ele) for ele in errors.values()])) if errors else None
+    for fraction in (0.1, 0.2, 0.3):
+        stats[f"within_{int(fraction * 100)}pc"] = len([ele for ele in abs_errors if ele <= fraction])
+
+    return stats
+
+def get_table(variants, tests, rtl_args, model_args, sweep_name):
+    # [(variant id, variant, stats), ...] sorted by mean absolute error, variants without results last.
+    rtl_num_cycles = get_rtl_num_cycles(tests, rtl_args)
+    table = []
+    for variant in variants:
+        variant_id = get_variant_id(variant)
+        errors, num_model_failures = get_variant_errors(tests, rtl_num_cycles, get_variant_model_args(sweep_name, variant_id, model_args))
+        table.append((variant_id, variant, get_error_statistics(errors, len(tests), num_model_failures)))
+
+    return sorted(table, key = lambda row: (row[2]["mean_abs_error"] is None, row[2]["mean_abs_error"] or 0.0, -row[2]["num_compared"]))
+
+def write_table(table, file_name):
+    knobs = sorted(set(knob for _, variant, _ in table for knob in variant.keys()))
+    stats_keys = list(table[0][2].keys()) if table else []
+    with open(file_name, "w", newline = "") as file:
+        writer = csv.writer(file)
+        writer.writerow(["variant"] + knobs + stats_keys)
+        for variant_id, variant, stats in table:
+            writer.writerow([variant_id] + [json.dumps(variant[knob]) if knob in variant.keys() else "" for knob in knobs] + ["" if stats[key] is None else (f"{stats[key]:.6f}" if isinstance(stats[key], float) else stats[key]) for key in stats_keys])
+
+    print(f"- wrote {file_name}")
+
+    return file_name
+
+def table_to_str(table, max_num_rows = 20):
+    msg = f"+ sweep results ({len(table)} variants, sorted by mean |PM/RTL - 1|):\n"
+    for idx, (variant_id, variant, stats) in enumerate(table[:max_num_rows]):
+        mean_abs_error = "-" if stats["mean_abs_error"] is None else f"{stats['mean_abs_error'] * 100:6.2f} %"
+        knobs = ", ".join(f"{knob} = {json.dumps(value)}" for knob, value in variant.items()) if variant else "(default cfg)"
+        msg += f"  {idx:>3}. {variant_id:<13} mean |err|: {mean_abs_error:>8}, within 10%: {stats['within_10pc']:>4}/{stats['num_compared']:<4}, model failures: {stats['num_model_failures']:>4}, {knobs}\n"
+
+    return msg.rstrip()
+
+@trace_utils.traced("sweep_utils.run_sweep", args = ())
+def run_sweep(sweep, tests, rtl_args, model_args):
+    key_num_processes = "num_processes"
+    key_model_logs_dir = "model_logs_dir"
+
+    for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
+        assert key in model_args.keys(), f"- error: {key} not found in given model_args dict"
+
+    sweep_name = sweep["name"]
+    variants = get_variants(sweep)
+    tests = sorted(tests)
+    for variant in variants:
+        check_variant(variant, model_args)
+
+    prepare(rtl_args, model_args)
+
+    with trace_utils.span("sweep_utils.get_inputcfgs", num_tests = len(tests)):
+        inputcfgs = get_inputcfgs(tests, rtl_args, model_args)
+
+    model_commit = get_model_commit(model_args)
+    if model_commit is None:
+        print("- WARNING: could not obtain the model commit, results of another model version may be reused")
+
+    num_processes = max(1, min([rtl_args[key_num_processes], model_args[key_num_processes], len(variants) * len(tests)]))
+    with multiprocessing.Pool(processes = num_processes) as pool:
+        with trace_utils.span("sweep_utils.get_test_signatures", num_tests = len(tests)):
+            signatures = dict(zip(tests, pool.starmap(polaris_utils.polaris_tests.get_test_signature, [(idx, test, rtl_args, model_args) for idx, test in enumerate(tests)])))
+
+        jobs = []
+        for variant in variants:
+            variant_id = get_variant_id(variant)
+            variant_model_args = get_variant_model_args(sweep_name, variant_id, model_args)
+            cfg_dict = get_variant_cfg(variant, variant_model_args)
+            cfg_file_name = write_variant_cfg_file(variant, variant_model_args, cfg_dict)
+            stale = remove_stale_results(tests, get_cfg_hash(cfg_dict, model_commit), signatures, variant_model_args)
+            if stale:
+                print(f"- sweep {sweep_name}: variant {variant_id}, removed stale results of {len(stale)} tests")
+
+            for test in tests:
+                jobs.append((len(jobs), variant_id, test, inputcfgs[test], cfg_file_name, variant_model_args))
+
+        print(f"- sweep {sweep_name}: {len(variants)} variants x {len(tests)} tests = {len(jobs)} model runs on {num_processes} processes")
+        execute_jobs(pool, jobs, f"sweep {sweep_name}")
+
+    table = get_table(variants, tests, rtl_args, model_args, sweep_name)
+    logs_dir = os.path.join(model_args["model_root_dir_path"], model_args[key_model_logs_dir])
+    os.makedirs(logs_dir, exist_ok = True)
+    write_table(table, os.path.join(logs_dir, f"sweep_{sweep_name}.csv"))
+    print(table_to_str(table))
+
+    return table
+
+def load_sweep(file_name):
+    if file_name.endswith(".json"):
+        sweep = serialization_utils.json_io.load_file(file_name, cache = False)
+    else:
+        sweep = serialization_utils.yaml_io.load_file(file_name, cache = False)
+
+    if "name" not in sweep.keys():
+        sweep["name"] = os.path.splitext(os.path.basename(file_name))[0]
+
+    return sweep
+
+if "__main__" == __name__:
+    if len(sys.argv) < 3:
+        print(f"usage: {sys.argv[0]} <tag> <sweep.yaml|sweep.json>")
+        sys.exit(1)
+
+    trace_utils.start()
+    try:
+        rtl_args, polaris_big_args = ird_status.get_args(sys.argv[1])
+        tests = sorted(rtl_utils.test_names.get_tests(rtl_args))
+        print(f"- found {len(tests)} tests.")
+        run_sweep(load_sweep(sys.argv[2]), tests, rtl_args, polaris_big_args)
+    finally:
+        trace_utils.finish()
@@ -4,28 +4,29 @@ import collections
 import contextlib
 import datetime
 import datetime
-import fabric
+import elf_utils
 import filecmp
 import functools
 import getpass
+import git_cache_utils
 import itertools
-import json
 import multiprocessing
 import os
-import paramiko
-import paramiko.ssh_exception
 import pathlib
+import profile_utils
+import rtl_archive_utils
 import rtl_utils
+import serialization_utils
 import shlex
 import shutil
 import subprocess
 import sys
+import test_layout_utils
+import trace_utils
 import yaml
 import re
 
 sys.path.append("t3sim/binutils-playground/py")
-import read_elf
-import tensix
 
 def sv_literal_to_int(literal: str) -> int:
     # from chatgpt
@@ -81,26 +82,7 @@ def rename_with_timestamp(path: str | pathlib.Path,
     return new_path
 
 def get_num_dirs_with_keyword(path, keyword):
-    for _, sub_dirs, _ in os.walk(path):
-        if any(sub_dir.startswith(keyword) for sub_dir in sub_dirs):
-            kw_dirs = []
-            for sub_dir in sub_dirs:
-                if sub_dir.startswith(keyword):
-                    kw_dirs.append(sub_dir)
-
-            kw_dirs = sorted(kw_dirs)
-            if not kw_dirs:
-                raise Exception(f"- error: did not find any directories with keyword {keyword} in path {path}")
-
-            kw_ids = sorted(int(kw_dir.split('_')[-1]) for kw_dir in kw_dirs)
-            min_kw_id = min(kw_ids)
-            if 0 != min_kw_id:
-                raise Exception(f"- error: neo cores do not start from 0. kw_dirs are as follows: {kw_dirs}")
-
-            if kw_ids == list(range(min(kw_ids), max(kw_ids) + 1)):
-                return len(kw_ids)
-            else:
-                raise Exception(f"- error: found non-continuous directories: {kw_dirs}")
+    return test_layout_utils.get_num_dirs_with_keyword(os.walk(path), path, keyword)
 
 def get_num_neos(path):
     return get_num_dirs_with_keyword(path, "neo_")
@@ -119,23 +101,10 @@ def get_tensix_instruction_kind(test, rtl_args, t3sim_args):
     for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_t3sim_")]:
         assert key in t3sim_args.keys(), f"- error: {key} not found in given t3sim_args dict"
 
-    test_dir_incl_path = rtl_utils.test_names.get_dir_incl_path(os.path.join(rtl_args[key_rtl_local_root_dir_path], rtl_args[key_rtl_local_root_dir]), test + rtl_args[key_rtl_test_dir_suffix])
-
-    if not os.path.exists(test_dir_incl_path):
-        raise Exception(f"- error: {test_dir_incl_path} does not exist.")
-
-    ttx_kinds = set()
-    for pwd, _, files in os.walk(test_dir_incl_path):
-        for file in files:
-            if file.endswith(".elf"):
-                for kind in read_elf.get_instruction_kinds(os.path.join(pwd, file)):
-                    if kind.is_tensix():
-                        ttx_kinds.add(kind)
-
-    if 1 != len(ttx_kinds):
-        raise Exception(f"- error: expected one tensix instruction kind, received {len(ttx_kinds)}, kinds: {ttx_kinds}")
+    layout = test_layout_utils.get_layout(test_layout_utils.get_test_dir(test, rtl_args))
 
-    return f"{list(ttx_kinds)[0]}"
+    # arch attribute of the ELFs, memoized by contents. ELFs without one are decoded (read_elf).
+    return elf_utils.get_tensix_instruction_kind([elf.path for elf in layout.get_elfs()])
 
 def get_address_from_C_macro(path, file_name, macro_name):
     # file: <file>
@@ -335,8 +304,7 @@ class cfg_engines:
         cfg_file_name = rtl_utils.test_names.get_file_name_incl_path(model_dir, t3sim_args[key_default_cfg_file_name])
 
         mnemonics_tpt = dict()
-        with open(cfg_file_name, 'r') as file:
-            data = json.load(file)
+        data = serialization_utils.json_io.load_file(cfg_file_name)
 
         engines_str = "engines"
         engineInstructions_str = "engineInstructions"
@@ -370,6 +338,8 @@ class cfg_engines:
 
     @staticmethod
     def get_engines_incl_mnemonics_througputs(model_args):
+        import tensix
+
         key_instruction_kind = "instruction_kind"
 
         for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_")]:
@@ -473,8 +443,7 @@ class cfg_engines:
         model_dir = os.path.join(model_args[key_model_root_dir_path], model_args[key_model_root_dir])
         cfg_file_name = rtl_utils.test_names.get_file_name_incl_path(model_dir, model_args[key_default_cfg_file_name])
 
-        with open(cfg_file_name, 'r') as file:
-            data = json.load(file)
+        data = serialization_utils.json_io.load_file(cfg_file_name)
 
         engines_str = "engines"
         if not engines_str in data.keys():
@@ -568,6 +537,7 @@ class cfg_engines:
 
 class t3sim_tests:
     @staticmethod
+    @trace_utils.traced("t3sim_tests.clone_t3sim_and_update_assembly_yaml_if_required", args = ())
     def clone_t3sim_and_update_assembly_yaml_if_required(rtl_args, t3sim_args):
         def clone_t3sim_if_required(args):
             key_force = "force"
@@ -580,19 +550,7 @@ class t3sim_tests:
 
             t3sim_root_dir = args[key_t3sim_root_dir]
 
-            if args[key_force] or (not os.path.isdir(t3sim_root_dir)):
-                if os.path.isdir(t3sim_root_dir):
-                    shutil.rmtree(t3sim_root_dir)
-
-                cmd = f"git clone {args[key_t3sim_git_url]} && cd {t3sim_root_dir} && git checkout {args[key_t3sim_git_branch]} && cd .."
-
-                result = subprocess.run(
-                    cmd,
-                    shell = True,
-                    capture_output = True,       # collect stdout / stderr
-                    check = True,                # raise CalledProcessError if exit-code ≠ 0
-                    timeout = 3600,              # optional: abort after N seconds
-                    )
+            git_cache_utils.checkout(args[key_t3sim_git_url], args[key_t3sim_git_branch], t3sim_root_dir, force = args[key_force], **git_cache_utils.get_options(args))
 
             if not os.path.isdir(t3sim_root_dir):
                 raise Exception(f"- error: could not find directory {t3sim_root_dir}")
@@ -611,19 +569,7 @@ class t3sim_tests:
 
             binutils_dir_incl_path = os.path.join(t3sim_root_dir, binutils_root_dir)
 
-            if args[key_force] or (not os.path.isdir(binutils_dir_incl_path)):
-                if os.path.isdir(binutils_root_dir):
-                    shutil.rmtree(binutils_root_dir)
-
-                cmds = f"cd {shlex.quote(t3sim_root_dir)} && git clone {shlex.quote(args[key_binutils_git_url])} && cd -"
-
-                result = subprocess.run(
-                    cmds,
-                    shell = True,
-                    capture_output = True,       # collect stdout / stderr
-                    check = True,                # raise CalledProcessError if exit-code ≠ 0
-                    timeout = 3600,              # optional: abort after N seconds
-                    )
+            git_cache_utils.checkout(args[key_binutils_git_url], "HEAD", binutils_dir_incl_path, force = args[key_force], **git_cache_utils.get_options(args)) # default branch
 
             if not os.path.isdir(binutils_dir_incl_path):
                 raise Exception(f"- error: could not find directory {binutils_dir_incl_path}")
@@ -703,7 +649,7 @@ class t3sim_tests:
         cfg_dict["enableSync"]     = t3sim_args[key_t3sim_cfg_enable_sync]
         cfg_dict["arch"]           = t3sim_args[key_t3sim_instruction_kind]
         cfg_dict["llkVersionTag"]  = rtl_args[key_rtl_rtl_tag]
-        cfg_dict["numTCores"]      = get_num_neos(rtl_utils.test_names.get_dir_incl_path(os.path.join(rtl_args[key_rtl_local_root_dir_path], rtl_args[key_rtl_local_root_dir]), test + rtl_args[key_rtl_test_dir_suffix]))
+        cfg_dict["numTCores"]      = test_layout_utils.get_layout(test_layout_utils.get_test_dir(test, rtl_args)).get_num_neos()
         cfg_dict["numTriscCores"]  = cfg_dict["numTCores"]
         cfg_dict["orderScheme"]    = t3sim_args[key_t3sim_cfg_order_scheme]
         cfg_dict["risc.cpi"]       = t3sim_args[key_t3sim_cfg_risc_cpi]
@@ -722,6 +668,7 @@ class t3sim_tests:
         return cfg_dict
 
     @staticmethod
+    @trace_utils.traced("t3sim_tests.write_cfg_file")
     def write_cfg_file(test_id, test, rtl_args, t3sim_args):
         key_t3sim_t3sim_cfg_dir        = "t3sim_cfg_dir"
         key_t3sim_t3sim_cfg_prefix     = "t3sim_cfg_prefix"
@@ -740,8 +687,7 @@ class t3sim_tests:
             os.makedirs(cfg_dir_incl_path, exist_ok = True)
 
         file_name = os.path.join(cfg_dir_incl_path, f"{t3sim_args[key_t3sim_t3sim_cfg_prefix]}{test}.json")
-        with open(file_name, 'w') as file:
-            json.dump(cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(cfg_dict, file_name, indent = 2)
 
         return file_name
 
@@ -762,14 +708,7 @@ class t3sim_tests:
         for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_t3sim_")]:
             assert key in t3sim_args.keys(), f"- error: {key} not found in given rtl_args dict"
 
-        local_root_dir_incl_path = os.path.join(rtl_args[key_rtl_local_root_dir_path], rtl_args[key_rtl_local_root_dir])
-        test_dir = test + rtl_args[key_rtl_test_dir_suffix]
-        for pwd, _, _ in os.walk(local_root_dir_incl_path):
-            if pwd.endswith(test_dir):
-                test_dir_incl_path = pwd
-
-        if "test_dir_incl_path" not in locals():
-            raise Exception(f"- error: test_dir_incl_path not set, most likely did not find {test_dir} in path {local_root_dir_incl_path}")
+        layout = test_layout_utils.get_layout(test_layout_utils.get_test_dir(test, rtl_args))
 
         input_cfg_dict                = dict()
         input_cfg_dict["description"] = dict()
@@ -777,30 +716,25 @@ class t3sim_tests:
         input_cfg                     = input_cfg_dict["input"]
         input_cfg["syn"]              = 0
         input_cfg["name"]             = test
-        num_neos                      = get_num_neos(test_dir_incl_path)
+        num_neos                      = layout.get_num_neos()
 
         for neo_id in range(num_neos):
             tc_key = f"tc{neo_id}"
             input_neo = dict()
-            neo_dir = f"neo_{neo_id}"
-            for pwd, _, _ in os.walk(test_dir_incl_path):
-                if pwd.endswith(neo_dir):
-                    num_threads = get_num_threads(pwd)
-                    if num_threads in {0, None}:
-                        raise Exception(f"- error: expected at least one thread, received {num_threads}. Path: {pwd}")
-
-                    input_neo["startFunction"] = t3sim_args[key_t3sim_start_function]
-                    input_neo["numThreads"] = num_threads
-
-                    neo_os_walk = os.walk(pwd)
-                    for pwd1, _, files in neo_os_walk:
-                        for file in files:
-                            if file.endswith(".elf"):
-                                thread_id = int(file.split("_")[-1].split(".")[0])
-                                if thread_id > num_threads:
-                                    raise Exception(f"- error: thread id is greater than number of threads. thread_id: {thread_id}, number of threads: {num_threads}")
-                                input_neo[f"th{thread_id}Path"] = pwd1
-                                input_neo[f"th{thread_id}Elf"] = file
+            for pwd in layout.get_neo_dirs(neo_id):
+                num_threads = layout.get_num_threads(pwd)
+                if num_threads in {0, None}:
+                    raise Exception(f"- error: expected at least one thread, received {num_threads}. Path: {pwd}")
+
+                input_neo["startFunction"] = t3sim_args[key_t3sim_start_function]
+                input_neo["numThreads"] = num_threads
+
+                for elf in layout.get_elfs(pwd):
+                    thread_id = int(elf.name.split("_")[-1].split(".")[0])
+                    if thread_id > num_threads:
+                        raise Exception(f"- error: thread id is greater than number of threads. thread_id: {thread_id}, number of threads: {num_threads}")
+                    input_neo[f"th{thread_id}Path"] = elf.dir
+                    input_neo[f"th{thread_id}Elf"] = elf.name
 
             input_cfg[tc_key] = {key : input_neo[key] for key in sorted(input_neo.keys())}
 
@@ -832,6 +766,7 @@ class t3sim_tests:
         return input_cfg_dict
 
     @staticmethod
+    @trace_utils.traced("t3sim_tests.write_inputcfg_file")
     def write_inputcfg_file(test_id, test, rtl_args, t3sim_args):
         key_t3sim_t3sim_root_dir        = "t3sim_root_dir"
         key_t3sim_t3sim_cfg_dir         = "t3sim_cfg_dir"
@@ -851,12 +786,13 @@ class t3sim_tests:
             os.makedirs(cfg_dir_incl_path, exist_ok = True)
 
         file_name = os.path.join(cfg_dir_incl_path, f"{t3sim_args[key_t3sim_t3sim_inputcfg_prefix]}{test}.json")
-        with open(file_name, 'w') as file:
-            json.dump(input_cfg_dict, file, indent = 2)
+        serialization_utils.json_io.dump_file(input_cfg_dict, file_name, indent = 2)
 
         return file_name
 
     @staticmethod
+    @trace_utils.traced("t3sim_tests.execute_test")
+    @profile_utils.profiled
     def execute_test(test_id, test, rtl_args, t3sim_args):
         key_t3sim_t3sim_log_file_suffix = "t3sim_log_file_suffix"
         key_t3sim_t3sim_odir = "t3sim_odir"
@@ -866,29 +802,23 @@ class t3sim_tests:
         for key in [var_value for var_name, var_value in locals().items() if var_name.startswith("key_t3sim_")]:
             assert key in t3sim_args.keys(), f"- error: {key} not found in given rtl_args dict"
 
+        rtl_archive_utils.extract_test_if_required(test, rtl_args)
         inputcfg_file_name = t3sim_tests.write_inputcfg_file(test_id, test, rtl_args, t3sim_args)
         cfg_file_name = t3sim_tests.write_cfg_file(test_id, test, rtl_args, t3sim_args)
 
-        t3sim_dir_incl_path = os.path.join(t3sim_args[key_t3sim_t3sim_root_dir_path], t3sim_args[key_t3sim_t3sim_root_dir])
+        t3sim_dir_incl_path = os.path.abspath(os.path.join(t3sim_args[key_t3sim_t3sim_root_dir_path], t3sim_args[key_t3sim_t3sim_root_dir]))
         odir_incl_path = os.path.join(t3sim_dir_incl_path, t3sim_args[key_t3sim_t3sim_odir])
         log_file_name = os.path.join(odir_incl_path, f"{test}{t3sim_args[key_t3sim_t3sim_log_file_suffix]}")
 
         if not os.path.isdir(odir_incl_path):
             os.makedirs(odir_incl_path, exist_ok = True)
 
-        cmds = [
-            f"cd {t3sim_dir_incl_path}",
-            f"python tneoSim.py --cfg {cfg_file_name} --inputcfg {inputcfg_file_name} --odir {t3sim_args[key_t3sim_t3sim_odir]}"
-        ]
-        cmd = " && ".join(cmds)
-        print(f"- test ID: {test_id}, executing: {cmd}")
-
-        with open(log_file_name, "w") as log_file:
-            subprocess.call(
-            cmd,
-            shell=True,
-            stdout=log_file,
-            stderr=subprocess.STDOUT)
+        # absolute paths, no shell and no chdir: the test can be executed from a thread as well.
+        argv = ["python", os.path.join(t3sim_dir_incl_path, "tneoSim.py"), "--cfg", os.path.abspath(cfg_file_name), "--inputcfg", os.path.abspath(inputcfg_file_name), "--odir", odir_incl_path]
+        print(f"- test ID: {test_id}, executing: {shlex.join(argv)}")
+
+        with trace_utils.span("t3sim_tests.run_model", test = test), open(log_file_name, "w") as log_file:
+            subprocess.run(argv, cwd = t3sim_dir_incl_path, stdout = log_file, stderr = subprocess.STDOUT)
 
         # cmd = f"cd {t3sim_dir_incl_path} && mkdir -p {t3sim_args[key_t3sim_t3sim_odir]} && "
         # os.chdir(t3sim_dir)
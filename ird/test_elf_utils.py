@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# elf_utils on synthetic ELFs of known contents (create_synthetic_rtl_data_set.write_elf): arch attribute and per
+# function histograms, always run.
+# elf_utils vs read_elf (binutils-playground) on real ELFs: tensix kinds, kind names and instruction profiles.
+# skipped when read_elf is not importable or no ELFs are given.
+#
+#   IRD_TEST_ELF_DIR=<ELF file or test dir> IRD_TEST_ASSEMBLY_YAML=<assembly yaml> [IRD_TEST_ELF_KIND=ttqs] python -m unittest test_elf_utils
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "t3sim", "binutils-playground", "py"))
+import create_synthetic_rtl_data_set
+import elf_utils
+
+try:
+    import read_elf
+except ImportError:
+    read_elf = None
+
+KEY_ENV_ELF_DIR       = "IRD_TEST_ELF_DIR"
+KEY_ENV_ASSEMBLY_YAML = "IRD_TEST_ASSEMBLY_YAML"
+KEY_ENV_ELF_KIND      = "IRD_TEST_ELF_KIND"
+
+ADDI       = 0x00108093 # addi x1, x1, 1
+ADD        = 0x002081b3 # add  x3, x1, x2
+LW         = 0x00012283 # lw   x5, 0(x2)
+MUL        = 0x02208233 # mul  x4, x1, x2
+NOP        = 0x00000013 # addi x0, x0, 0
+RET        = 0x00008067 # jalr x0, 0(x1)
+RV_UNKNOWN = 0x0000007b # custom-3 opcode, lowest 2 bits 0b11
+ARCH       = "rv32i2p1_m2p0_xttqs1p0"
+
+def get_ttqs_word(op_binary):
+    return elf_utils.rotate_left_2(op_binary << 24)
+
+class test_synthetic_elfs(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.assembly_yaml = os.path.join(self.tmp_dir.name, "assembly.yaml")
+        create_synthetic_rtl_data_set.write_assembly_yaml(self.assembly_yaml) # TTOP_01 .. TTOP_3F
+        self.elf_file_name = os.path.join(self.tmp_dir.name, "ttqs.elf")
+        create_synthetic_rtl_data_set.write_elf(self.elf_file_name, [
+            ("main",   [ADDI, ADD, get_ttqs_word(0x05), get_ttqs_word(0x05), RV_UNKNOWN, get_ttqs_word(0x7f), RET]),
+            (None,     [LW, 0x00000000]),
+            ("func_1", [MUL, get_ttqs_word(0x3f)]),
+            (None,     [NOP]),
+            ], ARCH)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_kinds(self):
+        no_arch_elf_file_name = os.path.join(self.tmp_dir.name, "no_arch.elf")
+        create_synthetic_rtl_data_set.write_elf(no_arch_elf_file_name, [("main", [ADDI, RET])])
+        with open(self.elf_file_name, "rb") as file:
+            self.assertEqual(ARCH, elf_utils.get_arch(file.read()))
+
+        with open(no_arch_elf_file_name, "rb") as file:
+            self.assertIsNone(elf_utils.get_arch(file.read()))
+
+        self.assertEqual(("ttqs",), elf_utils.get_tensix_instruction_kinds(self.elf_file_name))
+
+    def test_histogram(self):
+        # unknown words: lowest 2 bits 0b11 are rv32, else tensix (op_binary 0x7f is not in assembly.yaml, 0 is no
+        # instruction). words outside every function count under the section name, wherever they are.
+        with open(self.elf_file_name, "rb") as file:
+            histogram = elf_utils.get_histogram(file.read(), elf_utils.compile_opcode_table(self.assembly_yaml, "ttqs"))
+
+        expected = dict()
+        expected["main"]   = {("rv32", "addi") : 1, ("rv32", "add") : 1, ("ttqs", "TTOP_05") : 2, ("rv32", "unknown") : 1, ("ttqs", "unknown") : 1, ("rv32", "jalr") : 1}
+        expected[".text"]  = {("rv32", "lw") : 1, ("ttqs", "unknown") : 1, ("rv32", "addi") : 1}
+        expected["func_1"] = {("rv32", "mul") : 1, ("ttqs", "TTOP_3F") : 1}
+        self.assertEqual(expected, histogram)
+
+    def test_profile(self):
+        profile = elf_utils.get_instruction_profile_from_elf_file(self.elf_file_name, {"ttqs" : self.assembly_yaml})[0]
+        self.assertEqual({"rv32" : {"mul" : (1,)}, "ttqs" : {"TTOP_3F" : (1,)}}, profile["func_1"])
+        flat_profile = elf_utils.get_instruction_profile_from_elf_file(self.elf_file_name, {"ttqs" : self.assembly_yaml}, flatten_dict = True)[0]
+        self.assertEqual((2,), flat_profile["rv32"]["addi"])
+        self.assertEqual((2,), flat_profile["ttqs"]["unknown"])
+
+@unittest.skipIf(read_elf is None, "read_elf is not importable")
+class test_read_elf_kinds(unittest.TestCase):
+    def test_kind_names(self):
+        # the names elf_utils keys profiles with are the read_elf kind member names.
+        names = [elf_utils.get_kind_name(kind) for kind in read_elf.instructions.kind]
+        self.assertIn(elf_utils.RV_KIND_NAME, names)
+        for kind in read_elf.instructions.kind:
+            self.assertIs(read_elf.instructions.kind[elf_utils.get_kind_name(kind)], kind)
+
+        for name in elf_utils.TENSIX_KIND_NAMES:
+            if name in names:
+                self.assertTrue(read_elf.instructions.kind[name].is_tensix())
+
+@unittest.skipIf(read_elf is None, "read_elf is not importable")
+@unittest.skipIf(not os.environ.get(KEY_ENV_ELF_DIR), f"{KEY_ENV_ELF_DIR} is not set")
+class test_read_elf_elfs(unittest.TestCase):
+    def setUp(self):
+        self.elf_file_names = elf_utils.get_elf_file_names([os.environ[KEY_ENV_ELF_DIR]])
+        self.assertTrue(self.elf_file_names, f"- error: no ELF files in {os.environ[KEY_ENV_ELF_DIR]}")
+
+    def test_kinds(self):
+        for elf_file_name in self.elf_file_names:
+            self.assertEqual(elf_utils.get_tensix_instruction_kinds(elf_file_name), elf_utils.get_tensix_instruction_kinds_decoded(elf_file_name), elf_file_name)
+
+    @unittest.skipIf(not os.environ.get(KEY_ENV_ASSEMBLY_YAML), f"{KEY_ENV_ASSEMBLY_YAML} is not set")
+    def test_profile(self):
+        # every (function, kind, mnemonic) count, incl. the unknown words and the words outside every function.
+        kind = os.environ.get(KEY_ENV_ELF_KIND, "ttqs")
+        self.assertEqual(0, elf_utils.check_profile(self.elf_file_names, kind, os.environ[KEY_ENV_ASSEMBLY_YAML]))
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+
+# layout of an RTL test directory, e.g. <local_root_dir>/rsim/debug/<test>_0:
+#
+#   sim_result.yml, <test>.rtl_test.log
+#   ttx/<kf>/core_<i>_<j>/neo_<n>/thread_<t>/out/thread_<t>.elf
+#
+# get_layout(test_dir) makes one os.scandir pass over the test directory and keeps the tree in a test_layout:
+# the directories in os.walk order with their sub directories and files, the ELF files with their indices
+# (kf, core ids, neo id, thread id), the top level files. layouts are cached per process and scanned again only
+# if the mtime of one of the scanned directories changed (adding, removing or replacing a file changes the mtime of
+# its directory).
+#
+# find_dirs(root_dir, dir_name) finds directories by name below a root from an index built with one scandir
+# walk of the root, walked again (like a layout) if the mtime of one of the indexed directories changed, so a
+# directory added anywhere below the root is seen. get_test_dir(test, rtl_args) tries
+# <debug_dir_path>/<debug_dir>/<test><test_dir_suffix> first.
+#
+#   python test_layout_utils.py <test dir> [...]
+
+import os
+import re
+import sys
+import threading
+
+RE_CORE   = re.compile(r"core_(\d+)_(\d+)")
+RE_NEO    = re.compile(r"neo_(\d+)")
+RE_THREAD = re.compile(r"thread_(\d+)")
+TTX_DIR   = "ttx"
+
+_lock    = threading.Lock()
+_layouts = dict() # test dir -> test_layout
+_indices = dict() # root dir -> dir_index
+
+class test_elf:
+    def __init__(self, dir, name, rel_path):
+        self.dir  = dir  # directory incl path
+        self.name = name # file name
+        self.path = os.path.join(dir, name)
+
+        # indices from the path relative to the test directory, ttx/kernels/core_00_00/neo_0/thread_0/out/thread_0.elf
+        parts = rel_path.split(os.sep)
+        self.kf = parts[parts.index(TTX_DIR) + 1] if TTX_DIR in parts[:-2] else None
+        match = RE_CORE.search(rel_path)
+        self.core_ids = (int(match.group(1)), int(match.group(2))) if match else None
+        match = RE_NEO.search(rel_path)
+        self.neo_id = int(match.group(1)) if match else None
+        thread_ids = [int(thread_id) for thread_id in RE_THREAD.findall(rel_path)]
+        self.thread_id = thread_ids[0] if thread_ids and thread_ids.count(thread_ids[0]) == len(thread_ids) else None
+
+    def __repr__(self):
+        return f"test_elf({self.path})"
+
+class test_layout:
+    def __init__(self, test_dir):
+        self.test_dir = test_dir
+        self.dirs     = dict() # dir incl path -> (sub dir names, file names), os.walk (top down) order
+        self.mtimes   = dict() # dir incl path -> st_mtime_ns when scanned
+        self.elfs     = []     # test_elf, os.walk order
+
+    def is_valid(self):
+        try:
+            return all(os.stat(dir).st_mtime_ns == mtime for dir, mtime in self.mtimes.items())
+        except FileNotFoundError:
+            return False
+
+    def walk(self, top = None):
+        # os.walk(top) from the scanned tree.
+        top = os.path.abspath(top) if top else self.test_dir
+        prefix = top + os.sep
+        for dir, (sub_dirs, files) in self.dirs.items():
+            if dir == top or dir.startswith(prefix):
+                yield dir, sub_dirs, files
+
+    def get_files(self):
+        # top level file names
+        return self.dirs[self.test_dir][1]
+
+    def get_file_name(self, name):
+        # top level file incl path, None if it does not exist.
+        return os.path.join(self.test_dir, name) if name in self.get_files() else None
+
+    def get_sim_result_file_name(self, sim_result_yml = "sim_result.yml"):
+        return self.get_file_name(sim_result_yml)
+
+    def get_log_file_name(self, suffix = ".rtl_test.log"):
+        file_names = [name for name in self.get_files() if name.endswith(suffix)]
+        return os.path.join(self.test_dir, file_names[0]) if file_names else None
+
+    def get_elfs(self, top = None):
+        if not top:
+            return list(self.elfs)
+
+        top = os.path.abspath(top)
+        return [elf for elf in self.elfs if elf.dir == top or elf.dir.startswith(top + os.sep)]
+
+    def get_ttx_kinds(self):
+        return sorted({elf.kf for elf in self.elfs if elf.kf is not None})
+
+    def get_cores(self, kf = None):
+        return sorted({elf.core_ids for elf in self.elfs if elf.core_ids is not None and kf in (None, elf.kf)})
+
+    def get_neo_ids(self, kf = None):
+        return sorted({elf.neo_id for elf in self.elfs if elf.neo_id is not None and kf in (None, elf.kf)})
+
+    def get_neo_dirs(self, neo_id):
+        # every neo_<neo_id> directory (one per kf and core), os.walk order.
+        name = f"neo_{neo_id}"
+        return [dir for dir in self.dirs.keys() if os.path.basename(dir) == name]
+
+    def get_num_neos(self, path = None):
+        return get_num_dirs_with_keyword(self.walk(path), path if path else self.test_dir, "neo_")
+
+    def get_num_threads(self, neo_dir):
+        return get_num_dirs_with_keyword(self.walk(neo_dir), neo_dir, "thread_")
+
+def get_num_dirs_with_keyword(walk, path, keyword):
+    # number of <keyword><id> directories in the first directory of walk that has any, ids have to be 0, 1, ...
+    for _, sub_dirs, _ in walk:
+        kw_dirs = sorted(sub_dir for sub_dir in sub_dirs if sub_dir.startswith(keyword))
+        if not kw_dirs:
+            continue
+
+        kw_ids = sorted(int(kw_dir.split('_')[-1]) for kw_dir in kw_dirs)
+        if 0 != min(kw_ids):
+            raise Exception(f"- error: neo cores do not start from 0. kw_dirs are as follows: {kw_dirs}")
+
+        if kw_ids == list(range(min(kw_ids), max(kw_ids) + 1)):
+            return len(kw_ids)
+        else:
+            raise Exception(f"- error: found non-continuous directories: {kw_dirs}")
+
+def scan(test_dir):
+    test_dir = os.path.abspath(test_dir)
+    layout = test_layout(test_dir)
+
+    def scan_dir(dir, rel_dir):
+        layout.mtimes[dir] = os.stat(dir).st_mtime_ns # before the listing, a change during the scan invalidates the layout
+        with os.scandir(dir) as entries:
+            entries = sorted(entries, key = lambda entry: entry.name)
+
+        # as os.walk: links to directories are listed as sub directories, but not followed.
+        sub_dirs = [entry.name for entry in entries if entry.is_dir()]
+        files = [entry.name for entry in entries if not entry.is_dir()]
+        layout.dirs[dir] = (sub_dirs, files)
+        for name in files:
+            if name.endswith(".elf"):
+                layout.elfs.append(test_elf(dir, name, os.path.join(rel_dir, name)))
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks = False):
+                scan_dir(entry.path, os.path.join(rel_dir, entry.name))
+
+    scan_dir(test_dir, "")
+
+    return layout
+
+def get_layout(test_dir):
+    test_dir = os.path.abspath(test_dir)
+    with _lock:
+        layout = _layouts.get(test_dir)
+
+    if layout is not None and layout.is_valid():
+        return layout
+
+    if not os.path.isdir(test_dir):
+        raise Exception(f"- error: could not find test directory {test_dir}")
+
+    layout = scan(test_dir)
+    with _lock:
+        _layouts[test_dir] = layout
+
+    return layout
+
+class dir_index:
+    # dir name -> [dirs incl path] of every directory below a root (symbolic links are not followed), os.walk order,
+    # and the mtime of every indexed directory when it was scanned.
+    def __init__(self):
+        self.names  = dict()
+        self.mtimes = dict()
+
+    def is_valid(self):
+        try:
+            return all(os.stat(dir).st_mtime_ns == mtime for dir, mtime in self.mtimes.items())
+        except FileNotFoundError:
+            return False
+
+def get_dir_index(root_dir):
+    index = dir_index()
+    stack = [root_dir]
+    while stack:
+        dir = stack.pop()
+        index.names.setdefault(os.path.basename(dir), []).append(dir)
+        try:
+            index.mtimes[dir] = os.stat(dir).st_mtime_ns # before the scan, a change during the scan is seen next time
+            with os.scandir(dir) as entries:
+                sub_dirs = sorted(entry.path for entry in entries if entry.is_dir(follow_symlinks = False))
+        except OSError:
+            continue
+
+        stack.extend(reversed(sub_dirs))
+
+    return index
+
+def find_dirs(root_dir, dir_name):
+    # directories incl path below root_dir (or root_dir itself) that end with dir_name.
+    root_dir = root_dir.rstrip(os.sep) if os.sep != root_dir else root_dir
+    name = os.path.basename(dir_name.rstrip(os.sep))
+    with _lock:
+        index = _indices.get(root_dir)
+
+    if index is None or not index.is_valid():
+        index = get_dir_index(root_dir)
+        with _lock:
+            _indices[root_dir] = index
+
+    return [dir for dir in index.names.get(name, []) if dir.endswith(dir_name)]
+
+def get_test_dir(test, rtl_args):
+    # <local_root_dir>/<debug_dir_path>/<debug_dir>/<test><test_dir_suffix> if it exists, otherwise the only
+    # directory of that name below <local_root_dir>.
+    test_dir = test + rtl_args["test_dir_suffix"]
+    local_root_dir_incl_path = os.path.join(rtl_args["local_root_dir_path"], rtl_args["local_root_dir"])
+    if "debug_dir_path" in rtl_args.keys() and "debug_dir" in rtl_args.keys():
+        test_dir_incl_path = os.path.join(local_root_dir_incl_path, rtl_args["debug_dir_path"], rtl_args["debug_dir"], test_dir)
+        if os.path.isdir(test_dir_incl_path):
+            return test_dir_incl_path
+
+    test_dirs = find_dirs(local_root_dir_incl_path, test_dir)
+    if 1 != len(test_dirs):
+        raise Exception(f"- error: expected one directory {test_dir} in {local_root_dir_incl_path}, found {len(test_dirs)}: {test_dirs}")
+
+    return test_dirs[0]
+
+def layout_to_str(layout):
+    msg = f"+ {layout.test_dir}\n"
+    msg += f"  - files       : {', '.join(layout.get_files())}\n"
+    msg += f"  - ttx kinds   : {', '.join(layout.get_ttx_kinds())}\n"
+    msg += f"  - cores       : {', '.join(f'core_{core_ids[0]:02d}_{core_ids[1]:02d}' for core_ids in layout.get_cores())}\n"
+    msg += f"  - neos        : {layout.get_num_neos()}\n"
+    msg += f"  - directories : {len(layout.dirs)}\n"
+    for elf in layout.elfs:
+        msg += f"  - {elf.kf} core {elf.core_ids} neo {elf.neo_id} thread {elf.thread_id}: {os.path.relpath(elf.path, layout.test_dir)}\n"
+
+    return msg.rstrip()
+
+if "__main__" == __name__:
+    if len(sys.argv) < 2:
+        print(f"usage: {sys.argv[0]} <test dir> [...]")
+        sys.exit(1)
+
+    for test_dir in sys.argv[1:]:
+        print(layout_to_str(get_layout(test_dir)))
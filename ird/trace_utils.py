@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+# stage level tracing. spans are nested per thread (and per asyncio task) and written, one JSON line per finished span, to
+# <trace_dir>/<pid>.jsonl. the trace directory is passed through the environment, so processes of
+# multiprocessing pools (and child scripts) started after start() record their spans as well.
+# finish() merges all files into one Chrome/Perfetto trace (chrome://tracing, ui.perfetto.dev) and
+# prints the critical path and per stage totals.
+#
+#   trace_utils.start()
+#   with trace_utils.span("stage", test = test):
+#       ...
+#   trace_utils.finish()
+
+import collections
+import contextlib
+import contextvars
+import datetime
+import functools
+import inspect
+import itertools
+import json
+import os
+import serialization_utils
+import socket
+import threading
+import time
+
+KEY_ENV_TRACE_DIR = "IRD_TRACE_DIR"
+
+_stack = contextvars.ContextVar("trace_utils_stack", default = ()) # ids of the open spans, a new thread or task starts its own
+_writer = {"pid" : None, "file" : None, "lock" : threading.Lock()}
+_ids = itertools.count()
+
+def get_trace_dir():
+    return os.environ.get(KEY_ENV_TRACE_DIR)
+
+def is_enabled():
+    return bool(os.environ.get(KEY_ENV_TRACE_DIR))
+
+def start(trace_dir = None):
+    if not trace_dir:
+        trace_dir = os.path.join("__traces", f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+
+    trace_dir = os.path.abspath(trace_dir)
+    os.makedirs(trace_dir, exist_ok = True)
+    os.environ[KEY_ENV_TRACE_DIR] = trace_dir
+    print(f"- tracing to {trace_dir}")
+
+    return trace_dir
+
+def stop():
+    with _writer["lock"]:
+        if _writer["file"] is not None and _writer["pid"] == os.getpid():
+            _writer["file"].close()
+
+        _writer["pid"]  = None
+        _writer["file"] = None
+
+    os.environ.pop(KEY_ENV_TRACE_DIR, None)
+
+def write_event(event):
+    # one file per process. a forked worker inherits the parent's file object, hence the pid check.
+    with _writer["lock"]:
+        if _writer["pid"] != os.getpid():
+            _writer["pid"]  = os.getpid()
+            _writer["file"] = open(os.path.join(get_trace_dir(), f"{os.getpid()}.jsonl"), "a", buffering = 1)
+
+        _writer["file"].write(json.dumps(event) + "\n")
+
+def get_stack():
+    return _stack.get()
+
+@contextlib.contextmanager
+def span(name, **args):
+    if not is_enabled():
+        yield
+        return
+
+    stack = get_stack()
+    event = dict()
+    event["name"]   = name
+    event["ph"]     = "X"
+    event["pid"]    = os.getpid()
+    event["tid"]    = threading.get_native_id()
+    event["id"]     = f"{os.getpid()}.{next(_ids)}"
+    event["parent"] = stack[-1] if stack else None
+    event["args"]   = dict([(key, str(value)) for key, value in args.items()])
+    token = _stack.set(stack + (event["id"],))
+    event["ts"] = time.time_ns() // 1000
+    try:
+        yield
+    except BaseException as exc:
+        event["args"]["exception"] = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        event["dur"] = time.time_ns() // 1000 - event["ts"]
+        _stack.reset(token)
+        write_event(event)
+
+def traced(name = None, args = ("test",)):
+    # decorator form of span. arguments of the decorated function named in args are recorded with the span.
+    def decorator(fn):
+        span_name = name if name else fn.__qualname__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*fn_args, **fn_kwargs):
+            if not is_enabled():
+                return fn(*fn_args, **fn_kwargs)
+
+            bound = signature.bind_partial(*fn_args, **fn_kwargs).arguments
+            with span(span_name, **dict([(key, bound[key]) for key in args if key in bound.keys()])):
+                return fn(*fn_args, **fn_kwargs)
+
+        return wrapper
+
+    return decorator
+
+def get_events(trace_dir):
+    events = []
+    for file_name in sorted(os.listdir(trace_dir)):
+        if not file_name.endswith(".jsonl"):
+            continue
+
+        with open(os.path.join(trace_dir, file_name)) as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"- WARNING: skipping truncated trace line in {file_name}") # e.g. a worker terminated mid-write
+
+    return sorted(events, key = lambda event: (event["ts"], -event["dur"]))
+
+def set_parents_across_processes(events, root_pid):
+    # spans without a parent in a worker process are attached to the innermost span of the root process
+    # that encloses them in time, e.g. a worker's execute_test span to the main process's execute_tests span.
+    root_spans = [event for event in events if event["pid"] == root_pid]
+    for event in events:
+        if event["pid"] == root_pid or event["parent"] is not None:
+            continue
+
+        enclosing = [ele for ele in root_spans if ele["ts"] <= event["ts"] and (event["ts"] + event["dur"]) <= (ele["ts"] + ele["dur"])]
+        if enclosing:
+            event["parent"] = min(enclosing, key = lambda ele: ele["dur"])["id"]
+
+    return events
+
+def get_children(events):
+    children = collections.defaultdict(list)
+    for event in events:
+        children[event["parent"]].append(event)
+
+    return children
+
+def get_critical_path(events, root_pid, max_depth = 4):
+    # walking back from the end of a span, the child that finishes last is on the critical path, then the
+    # child that finishes last before that child started, and so on. the chosen children are expanded
+    # recursively. for sequential stages this is every stage, for a pool it is the chain of stragglers.
+    events = set_parents_across_processes(events, root_pid)
+    children = get_children(events)
+
+    def expand(event, depth):
+        path = [(depth, event)]
+        if depth >= max_depth:
+            return path
+
+        chain = []
+        end = event["ts"] + event["dur"]
+        candidates = sorted(children.get(event["id"], []), key = lambda ele: ele["ts"] + ele["dur"], reverse = True)
+        for child in candidates:
+            if (child["ts"] + child["dur"]) <= end:
+                chain.append(child)
+                end = child["ts"]
+
+        for child in reversed(chain):
+            path += expand(child, depth + 1)
+
+        return path
+
+    roots = [event for event in children.get(None, []) if event["pid"] == root_pid]
+    path = []
+    for root in roots:
+        path += expand(root, 0)
+
+    return path
+
+def critical_path_to_str(path, offset = 2):
+    if not path:
+        return f"{' ' * offset}- no spans recorded."
+
+    total = sum([event["dur"] for depth, event in path if 0 == depth])
+    msg = ""
+    for depth, event in path:
+        args = ", ".join([f"{key}: {value}" for key, value in event["args"].items()])
+        msg += f"{' ' * (offset + 2 * depth)}- {event['dur'] / 1e6:>10.3f} s {100.0 * event['dur'] / max(total, 1):>6.2f}% {event['name']}"
+        msg += f" ({args})\n" if args else "\n"
+
+    return msg.rstrip()
+
+def get_totals_by_name(events):
+    totals = collections.defaultdict(list)
+    for event in events:
+        totals[event["name"]].append(event["dur"])
+
+    return totals
+
+def totals_by_name_to_str(totals, offset = 2):
+    msg = f"{' ' * offset}- {'stage':<48} {'count':>7} {'total [s]':>12} {'mean [s]':>10} {'max [s]':>10}\n"
+    for name, durs in sorted(totals.items(), key = lambda ele: sum(ele[1]), reverse = True):
+        msg += f"{' ' * offset}- {name:<48} {len(durs):>7} {sum(durs) / 1e6:>12.3f} {sum(durs) / len(durs) / 1e6:>10.3f} {max(durs) / 1e6:>10.3f}\n"
+
+    return msg.rstrip()
+
+def get_chrome_trace(events, root_pid):
+    trace_events = []
+    for pid in sorted(set([event["pid"] for event in events])):
+        trace_events.append({"name" : "process_name", "ph" : "M", "pid" : pid, "tid" : 0, "args" : {"name" : f"{'main' if pid == root_pid else 'worker'} {pid}"}})
+
+    for event in events:
+        trace_events.append(dict([(key, event[key]) for key in ["name", "ph", "pid", "tid", "ts", "dur", "args"]]))
+
+    return {"traceEvents" : trace_events, "displayTimeUnit" : "ms", "otherData" : {"host" : socket.gethostname()}}
+
+def finish(file_name = None, print_summary = True):
+    trace_dir = get_trace_dir()
+    if not trace_dir:
+        return None
+
+    root_pid = os.getpid()
+    stop()
+
+    events = get_events(trace_dir)
+    if not file_name:
+        file_name = os.path.join(trace_dir, "trace.json")
+
+    serialization_utils.json_io.dump_file(get_chrome_trace(events, root_pid), file_name, indent = None)
+    print(f"- trace with {len(events)} spans written to {file_name}")
+
+    if print_summary:
+        print("+ Critical path")
+        print(critical_path_to_str(get_critical_path(events, root_pid)))
+        print()
+        print("+ Time by stage")
+        print(totals_by_name_to_str(get_totals_by_name(events)))
+
+    return file_name
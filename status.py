@@ -1,11 +1,18 @@
 #!/usr/bin/env python
 
-import collections
 import itertools
+import numpy
 
+import os
 import sys
 sys.path.append("t3sim/binutils-playground/py") # todo: remove hardcoding.
-import read_elf
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "ird"))
+import classifier_utils
+import elf_utils
+import plot_utils
+import profile_utils
+import serialization_utils
+import test_layout_utils
 
 # https://stackoverflow.com/a/287944/27310047
 class bcolors:
@@ -34,37 +41,220 @@ class test_results:
     def __repr__(self):
         return self.__str__()
 
-class elf_file(collections.defaultdict):
-    def __init__(self):
-        super().__init__(elf_file)
-
-    def __getattr__(self, name):
-        return self[name]
-
-    def __getitem__(self, key):
-        return super().__getitem__(key)
-
-    def __str__(self):
-        return f"elf_file({dict(self)})"
-
-    def __repr__(self):
-        return f"elf_file({dict(self)})"
+class instruction_profile_matrix:
+    # instruction profiles of one or more tests as one sparse matrix. a row per
+    # (test, ttx, core_id0, core_id1, neo_id, thread_id, function), a column per (kind, mnemonic).
+    #   row_keys          : int32 [num_rows, 7], the test, ttx and function columns index self.tests, self.ttx, self.functions
+    #   indptr, indices,
+    #   counts            : CSR, the counts of row r are counts[indptr[r]:indptr[r + 1]] for columns indices[indptr[r]:indptr[r + 1]]
+    #   columns           : (kind id, mnemonic) per column, column_kinds the kind id per column as an array
+    # everything else is a few short lists of names, so a matrix pickles cheaply (e.g. from pool workers)
+    # and aggregations are bincounts over the arrays.
+    TEST, TTX, CORE_ID0, CORE_ID1, NEO_ID, THREAD_ID, FUNCTION = range(7)
 
-class elf_file_indices:
     def __init__(self):
-        self.ttx        = []
-        self.core_id0s  = []
-        self.core_id1s  = []
-        self.neo_ids    = []
-        self.thread_ids = []
+        self.tests     = []
+        self.ttx       = []
+        self.functions = []
+        self.kinds     = []
+        self.columns   = []
+        self.row_keys  = numpy.zeros((0, 7), dtype = numpy.int32)
+        self.indptr    = numpy.zeros(1, dtype = numpy.int64)
+        self.indices   = numpy.zeros(0, dtype = numpy.int32)
+        self.counts    = numpy.zeros(0, dtype = numpy.int64)
+        self.init_ids()
+
+    def init_ids(self):
+        self.ids = dict()
+        for name in ["tests", "ttx", "functions", "kinds", "columns"]:
+            self.ids[name] = {value : idx for idx, value in enumerate(getattr(self, name))}
+
+        self.pending = {"row_keys" : [], "indices" : [], "counts" : []}
+
+    def __getstate__(self):
+        self.compact()
+        state = self.__dict__.copy()
+        del state["ids"], state["pending"]
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_ids()
+
+    def get_id(self, name, value):
+        ids = self.ids[name]
+        if value not in ids.keys():
+            ids[value] = len(ids)
+            getattr(self, name).append(value)
+
+        return ids[value]
+
+    def add_row(self, test, ttx, core_id0, core_id1, neo_id, thread_id, function, num_instructions):
+        # num_instructions: {kind : {mnemonic : count}}
+        row_indices = []
+        row_counts  = []
+        for kind, mnemonics in num_instructions.items():
+            kind_id = self.get_id("kinds", kind)
+            for mnemonic, count in mnemonics.items():
+                row_indices.append(self.get_id("columns", (kind_id, mnemonic)))
+                row_counts.append(count)
+
+        self.pending["row_keys"].append((self.get_id("tests", test), self.get_id("ttx", ttx), core_id0, core_id1, neo_id, thread_id, self.get_id("functions", function)))
+        self.pending["indices"].append(row_indices)
+        self.pending["counts"].append(row_counts)
+
+    def add_profile(self, test, ttx, core_id0, core_id1, neo_id, thread_id, instruction_profile, is_kind, function = ""):
+        # instruction_profile as from read_elf.get_instruction_profile_from_elf_file()[0]: {kind : {mnemonic : (count, ...)}},
+        # nested by function unless flattened. nested function names are joined with "/".
+        if all(is_kind(key) for key in instruction_profile.keys()):
+            num_instructions = {kind : {mnemonic : value[0] for mnemonic, value in mnemonics.items()} for kind, mnemonics in instruction_profile.items()}
+            self.add_row(test, ttx, core_id0, core_id1, neo_id, thread_id, function, num_instructions)
+            return
+
+        for key, value in instruction_profile.items():
+            if isinstance(value, dict):
+                self.add_profile(test, ttx, core_id0, core_id1, neo_id, thread_id, value, is_kind, f"{function}/{key}" if function else key)
+
+    def compact(self):
+        if not self.pending["row_keys"]:
+            return
+
+        lengths = [len(ele) for ele in self.pending["indices"]]
+        self.row_keys = numpy.concatenate([self.row_keys, numpy.array(self.pending["row_keys"], dtype = numpy.int32).reshape(-1, 7)])
+        self.indptr   = numpy.concatenate([self.indptr, self.indptr[-1] + numpy.cumsum(lengths, dtype = numpy.int64)])
+        self.indices  = numpy.concatenate([self.indices, numpy.fromiter(itertools.chain.from_iterable(self.pending["indices"]), dtype = numpy.int32, count = sum(lengths))])
+        self.counts   = numpy.concatenate([self.counts, numpy.fromiter(itertools.chain.from_iterable(self.pending["counts"]), dtype = numpy.int64, count = sum(lengths))])
+        self.pending  = {"row_keys" : [], "indices" : [], "counts" : []}
+
+    @staticmethod
+    def concatenate(matrices):
+        # one matrix over all given matrices, e.g. the per test matrices of a status dict.
+        # vocabularies are merged and the ids of each matrix remapped with one lookup per array.
+        matrix = instruction_profile_matrix()
+        row_keys = [matrix.row_keys]
+        indptr   = [matrix.indptr]
+        indices  = [matrix.indices]
+        counts   = [matrix.counts]
+        for ele in matrices:
+            ele.compact()
+            test_map     = numpy.array([matrix.get_id("tests", value) for value in ele.tests] + [0], dtype = numpy.int32)
+            ttx_map      = numpy.array([matrix.get_id("ttx", value) for value in ele.ttx] + [0], dtype = numpy.int32)
+            function_map = numpy.array([matrix.get_id("functions", value) for value in ele.functions] + [0], dtype = numpy.int32)
+            column_map   = numpy.array([matrix.get_id("columns", (matrix.get_id("kinds", ele.kinds[kind_id]), mnemonic)) for kind_id, mnemonic in ele.columns] + [0], dtype = numpy.int32)
+
+            keys = ele.row_keys.copy()
+            keys[:, instruction_profile_matrix.TEST]     = test_map[keys[:, instruction_profile_matrix.TEST]]
+            keys[:, instruction_profile_matrix.TTX]      = ttx_map[keys[:, instruction_profile_matrix.TTX]]
+            keys[:, instruction_profile_matrix.FUNCTION] = function_map[keys[:, instruction_profile_matrix.FUNCTION]]
+            row_keys.append(keys)
+            indptr.append(indptr[-1][-1] + ele.indptr[1:])
+            indices.append(column_map[ele.indices])
+            counts.append(ele.counts)
+
+        matrix.row_keys = numpy.concatenate(row_keys)
+        matrix.indptr   = numpy.concatenate(indptr)
+        matrix.indices  = numpy.concatenate(indices)
+        matrix.counts   = numpy.concatenate(counts)
+
+        return matrix
+
+    @property
+    def num_rows(self):
+        self.compact()
+        return len(self.row_keys)
+
+    @property
+    def column_kinds(self):
+        return numpy.array([kind_id for kind_id, _ in self.columns], dtype = numpy.int32)
+
+    def get_column_names(self):
+        return [f"{self.kinds[kind_id]}:{mnemonic}" for kind_id, mnemonic in self.columns]
+
+    def get_entry_mask(self, test = None):
+        # mask over the non-zero entries of the given test, None for all tests.
+        self.compact()
+        if test is None:
+            return numpy.ones(len(self.indices), dtype = bool)
+
+        if test not in self.ids["tests"].keys():
+            return numpy.zeros(len(self.indices), dtype = bool)
+
+        return numpy.repeat(self.row_keys[:, self.TEST] == self.ids["tests"][test], numpy.diff(self.indptr))
+
+    def get_entry_rows(self):
+        self.compact()
+        return numpy.repeat(numpy.arange(len(self.row_keys)), numpy.diff(self.indptr))
+
+    def get_num_instructions_per_column(self, test = None):
+        mask = self.get_entry_mask(test)
+        return numpy.bincount(self.indices[mask], weights = self.counts[mask], minlength = len(self.columns)).astype(numpy.int64)
+
+    def get_num_instructions_per_kind(self, test = None):
+        # {kind : number of instructions}, for the kinds that are present in the (given test's) profiles.
+        mask = self.get_entry_mask(test)
+        kind_ids = self.column_kinds[self.indices[mask]]
+        num_instructions = numpy.bincount(kind_ids, weights = self.counts[mask], minlength = len(self.kinds)).astype(numpy.int64)
+
+        return {self.kinds[kind_id] : int(num_instructions[kind_id]) for kind_id in numpy.unique(kind_ids)}
+
+    def get_num_instructions_per_test_and_kind(self):
+        # int64 [len(self.tests), len(self.kinds)]
+        self.compact()
+        test_ids = self.row_keys[self.get_entry_rows(), self.TEST]
+        kind_ids = self.column_kinds[self.indices]
+        num_instructions = numpy.bincount(test_ids.astype(numpy.int64) * len(self.kinds) + kind_ids, weights = self.counts, minlength = len(self.tests) * len(self.kinds))
+
+        return num_instructions.astype(numpy.int64).reshape(len(self.tests), len(self.kinds))
+
+    def get_num_instructions_per_class_and_kind(self, test_classes):
+        # test_classes: {test : class}. returns {class : {kind : number of instructions}}
+        classes = sorted(set(test_classes.values()))
+        class_ids = numpy.array([classes.index(test_classes[test]) for test in self.tests], dtype = numpy.int64)
+        per_class = numpy.zeros((len(classes), len(self.kinds)), dtype = numpy.int64)
+        numpy.add.at(per_class, class_ids, self.get_num_instructions_per_test_and_kind())
+
+        return {tclass : {kind : int(per_class[class_id][kind_id]) for kind_id, kind in enumerate(self.kinds)} for class_id, tclass in enumerate(classes)}
+
+    def get_kinds(self, test = None):
+        mask = self.get_entry_mask(test)
+        return {self.kinds[kind_id] for kind_id in numpy.unique(self.column_kinds[self.indices[mask]])}
+
+    def get_index_values(self, key, test = None):
+        # sorted distinct values of one row key column, e.g. the core_id0s of a test.
+        self.compact()
+        rows = self.row_keys if test is None else self.row_keys[self.row_keys[:, self.TEST] == self.ids["tests"].get(test, -1)]
+        values = numpy.unique(rows[:, key]).tolist()
+        match key:
+            case self.TEST:
+                return sorted(self.tests[ele] for ele in values)
+            case self.TTX:
+                return sorted(self.ttx[ele] for ele in values)
+            case self.FUNCTION:
+                return sorted(self.functions[ele] for ele in values)
+            case _:
+                return values
+
+    def get_rows(self, test = None):
+        # yields (ttx, core_id0, core_id1, neo_id, thread_id, function, column ids, counts) in the order
+        # ttx, core_id0, core_id1, neo_id, thread_id, function (names sorted alphabetically).
+        self.compact()
+        ttx_rank      = numpy.argsort(numpy.argsort(numpy.array(self.ttx, dtype = object))) if self.ttx else numpy.zeros(0, dtype = numpy.int64)
+        function_rank = numpy.argsort(numpy.argsort(numpy.array(self.functions, dtype = object))) if self.functions else numpy.zeros(0, dtype = numpy.int64)
+        rows = numpy.arange(len(self.row_keys)) if test is None else numpy.flatnonzero(self.row_keys[:, self.TEST] == self.ids["tests"].get(test, -1))
+        keys = self.row_keys[rows]
+        order = numpy.lexsort((function_rank[keys[:, self.FUNCTION]], keys[:, self.THREAD_ID], keys[:, self.NEO_ID], keys[:, self.CORE_ID1], keys[:, self.CORE_ID0], ttx_rank[keys[:, self.TTX]], keys[:, self.TEST])) if len(rows) else rows
+        for row in rows[order]:
+            key = self.row_keys[row]
+            begin, end = self.indptr[row], self.indptr[row + 1]
+            yield self.ttx[key[self.TTX]], int(key[self.CORE_ID0]), int(key[self.CORE_ID1]), int(key[self.NEO_ID]), int(key[self.THREAD_ID]), self.functions[key[self.FUNCTION]], self.indices[begin:end], self.counts[begin:end]
 
 class test_status:
     def __init__(self):
         self.name             = None
         self.rtl              = test_results() # rtl_status
         self.pm               = test_results() # performance_model_status
-        self.elf              = elf_file()
-        self.elf_file_indices = elf_file_indices()
+        self.profile          = instruction_profile_matrix() # rows of this test only
 
     def __str__(self):
         # def traverse_elf(elf, msg, path = ""):
@@ -82,15 +272,15 @@ class test_status:
 
         #     return msg
 
-        def instruction_profile_to_str(elf_ips, elf_file_indices):
+        def instruction_profile_to_str(profile):
             import os
 
+            names = profile.get_column_names()
             msg = ''
-            for ttx_name, core_id0, core_id1, neo_id, thread_id in itertools.product(elf_file_indices.ttx, elf_file_indices.core_id0s, elf_file_indices.core_id1s, elf_file_indices.neo_ids, elf_file_indices.thread_ids):
-                ip = elf_ips[ttx_name].core[core_id0][core_id1].neo[neo_id].thread[thread_id]
+            for ttx_name, core_id0, core_id1, neo_id, thread_id, function, column_ids, counts in profile.get_rows():
                 path = os.path.join("ttx", ttx_name, f"core_{core_id0:02d}_{core_id1:02d}", f"neo_{neo_id}", f"thread_{thread_id}", "out", f"thread_{thread_id}.elf")
-                msg += "  " + path + "\n"
-                msg += read_elf.instructions.instruction_histogram_to_str(ip[0], "", preemble = path, print_offset = 4)
+                msg += "  " + path + (f" {function}" if function else "") + "\n"
+                msg += to_matrix_str(sorted([f"{names[column_id]}: {count}" for column_id, count in zip(column_ids, counts)]), 4, 4) + "\n"
 
             return msg.rstrip()
 
@@ -104,52 +294,17 @@ class test_status:
         msg += f"{self.pm}"
         msg += "\n"
         msg += "+ Instruction profile from ELF file: \n"
-        msg += instruction_profile_to_str(self.elf, self.elf_file_indices)
+        msg += instruction_profile_to_str(self.profile)
         return msg
 
     def __repr__(self):
         return self.__str__()
 
     def get_num_instructions(self):
-        def get_num_instructions_from_profile(instruction_profile, num_instructions):
-            if all(isinstance(ele, read_elf.instructions.kind) for ele in instruction_profile.keys()):
-                for instr_kind, num_instrs in instruction_profile.items():
-                    if instr_kind not in num_instructions.keys():
-                        num_instructions.update({instr_kind : 0})
-
-                    for instr in num_instrs.keys():
-                        num_instructions[instr_kind] += num_instrs[instr][0]
-
-            else:
-                for value in instruction_profile.values():
-                    if isinstance(value, dict):
-                        get_num_instructions_from_profile(value, num_instructions)
-
-        num_instructions = dict()
-        for ttx_name, core_id0, core_id1, neo_id, thread_id in itertools.product(self.elf_file_indices.ttx, self.elf_file_indices.core_id0s, self.elf_file_indices.core_id1s, self.elf_file_indices.neo_ids, self.elf_file_indices.thread_ids):
-            ip = self.elf[ttx_name].core[core_id0][core_id1].neo[neo_id].thread[thread_id]
-            get_num_instructions_from_profile(ip[0], num_instructions)
-
-        return num_instructions
+        return self.profile.get_num_instructions_per_kind()
 
     def get_instruction_kinds(self):
-        def get_instruction_kinds_from_profile(instruction_profile, instruction_kinds):
-            if all(isinstance(ele, read_elf.instructions.kind) for ele in instruction_profile.keys()):
-                for instr_kind, num_instrs in instruction_profile.items():
-                    instruction_kinds.add(instr_kind)
-
-            else:
-                for value in instruction_profile.values():
-                    if isinstance(value, dict):
-                        get_instruction_kinds_from_profile(value, instruction_kinds)
-
-        instruction_kinds = set()
-        for ttx_name, core_id0, core_id1, neo_id, thread_id in itertools.product(self.elf_file_indices.ttx, self.elf_file_indices.core_id0s, self.elf_file_indices.core_id1s, self.elf_file_indices.neo_ids, self.elf_file_indices.thread_ids):
-            ip = self.elf[ttx_name].core[core_id0][core_id1].neo[neo_id].thread[thread_id]
-            get_instruction_kinds_from_profile(ip[0], instruction_kinds)
-
-        return instruction_kinds
-
+        return self.profile.get_kinds()
 
 def to_matrix_str(strings, num_columns, offset = 2):
     def to_str (strings, num_columns, offset):
@@ -185,8 +340,84 @@ def print_str_list_as_matrix(str_list, num_columns = 5, print_offset = 2):
 
     print(to_matrix_str(str_list, num_columns, print_offset))
 
+# per test instruction_profile_matrix, pickled to <profile cache dir>/<test>.<hash of the test dir>.pickle
+# (status_args["profile_cache"], status_args["profile_cache_dir"]), not into the RTL test directory. valid as
+# long as the ELF files, the assembly yaml, flatten_dict and the profiler (its source files) are the same.
+PROFILE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ird", "instruction_profiles")
+
+def get_profile_cache_file_name(cache_dir, test_dir):
+    import hashlib
+    import os
+
+    test_dir = os.path.abspath(test_dir)
+    return os.path.join(cache_dir, f"{os.path.basename(test_dir)}.{hashlib.sha1(test_dir.encode('utf-8')).hexdigest()[:16]}.pickle")
+
+def get_instruction_profiler_version(instruction_profiler):
+    # [file, size, mtime] of the profiler's python sources: read_elf and the binutils modules next to it, or elf_utils.
+    import os
+    import read_elf
+
+    if "elf_utils" == instruction_profiler:
+        file_names = [elf_utils.__file__]
+    else:
+        binutils_dir = os.path.dirname(os.path.abspath(read_elf.__file__))
+        file_names = [os.path.join(binutils_dir, file) for file in os.listdir(binutils_dir) if file.endswith(".py")]
+
+    return [[os.path.basename(file_name), os.stat(file_name).st_size, os.stat(file_name).st_mtime_ns] for file_name in sorted(file_names)]
+
+def get_profile_cache_stamp(ttx_dir, elf_files, assembly_yaml, flatten_dict, instruction_profiler = "read_elf", profiler_version = None):
+    import os
+
+    stamp = [[os.path.relpath(file_name, ttx_dir), os.stat(file_name).st_size, os.stat(file_name).st_mtime_ns] for file_name in sorted(elf_files)]
+    stamp.append([os.path.abspath(assembly_yaml), os.stat(assembly_yaml).st_size, os.stat(assembly_yaml).st_mtime_ns])
+    stamp.append(["flatten_dict", flatten_dict])
+    stamp.append(["instruction_profiler", instruction_profiler, profiler_version])
+
+    return stamp
+
+def load_cached_profile(file_name, stamp):
+    import os
+    import pickle
+
+    if not os.path.isfile(file_name):
+        return None
+
+    try:
+        with open(file_name, "rb") as file:
+            cached_stamp, profile = pickle.load(file)
+    except Exception as exc:
+        print(f"- WARNING: ignoring profile cache {file_name}: {exc}")
+        return None
+
+    return profile if cached_stamp == stamp else None
+
+def dump_cached_profile(file_name, stamp, profile):
+    import os
+    import pickle
+
+    # a cache that cannot be written (read-only or full disk) costs a re-profile next time, not the status.
+    tmp_file_name = f"{file_name}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(file_name), exist_ok = True)
+        with open(tmp_file_name, "wb") as file:
+            pickle.dump((stamp, profile), file, protocol = pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_file_name, file_name)
+    except OSError as exc:
+        print(f"- WARNING: could not write profile cache {file_name}: {exc}")
+        if os.path.isfile(tmp_file_name):
+            os.remove(tmp_file_name)
+
+@profile_utils.memory_profiled("status.get_status")
+@profile_utils.profiled
 def get_status(test_names, status_args):
+    return {ele.name : ele for ele in iter_status(test_names, status_args)}
+
+def iter_status(test_names, status_args, profile_only = False):
+    # one test_status at a time, so callers that stream (write_status_to_csv_streaming) hold one test in memory.
+    # profile_only: skip the RTL and performance model statuses.
     import os
+    import read_elf
 
     root_dir              = status_args["root_dir"]              if "root_dir"              in status_args.keys() else os.path.dirname(os.path.abspath(__file__))
     debug_dir             = status_args["debug_dir"]             if "debug_dir"             in status_args.keys() else "debug"
@@ -197,6 +428,9 @@ def get_status(test_names, status_args):
     rtl_log_file_suffix   = status_args["rtl_log_file_suffix"]   if "rtl_log_file_suffix"   in status_args.keys() else ".rtl_test.log"
     t3sim_log_file_suffix = status_args["rtl_log_file_suffix"]   if "t3sim_log_file_suffix" in status_args.keys() else ".t3sim_test.log"
     assembly_yaml         = status_args["assembly_yaml"]         if "assembly_yaml"         in status_args.keys() else "t3sim/binutils-playground/instruction_sets/ttqs/assembly.yaml" # remove hardcoding.
+    profile_cache         = status_args["profile_cache"]         if "profile_cache"         in status_args.keys() else False
+    profile_cache_dir     = status_args["profile_cache_dir"]     if "profile_cache_dir"     in status_args.keys() else PROFILE_CACHE_DIR
+    instruction_profiler  = status_args["instruction_profiler"]  if "instruction_profiler"  in status_args.keys() else "read_elf" # or "elf_utils" (numpy)
 
     if not os.path.exists(root_dir):
         raise Exception(f"- error: given root directory does not exist. given root directory: {root_dir}")
@@ -219,16 +453,12 @@ def get_status(test_names, status_args):
 
         def get_rtl_status_from_sim_result_yml(test, root_dir, debug_dir, test_dir_suffix, sim_result_yml, rtl_status):
             import os
-            import yaml
 
             sim_result_incl_path = get_sim_result_yml_incl_path(test, root_dir, debug_dir, test_dir_suffix, sim_result_yml)
 
             if os.path.isfile(sim_result_incl_path):
-                with open(sim_result_incl_path) as stream:
-                    yml = yaml.safe_load(stream)
-                    rtl_status.status = yml['res']
-                    rtl_status.num_cycles = yml['total-cycles']
-                    return True
+                rtl_status.status, rtl_status.num_cycles = serialization_utils.yaml_io.get_sim_result(sim_result_incl_path, 'res', 'total-cycles')
+                return True
             else:
                 return False
 
@@ -265,67 +495,45 @@ def get_status(test_names, status_args):
         instruction_set.update({read_elf.instructions.kind.ttqs : ttqs_assembly_yaml}) # todo: remove hardcoding
         return instruction_set
 
-    def get_instruction_profile_from_elf_file(test, root_dir, debug_dir, elf_files, elf_file_indices, instruction_set, flatten_dict):
-        def get_indices_from_path(path):
-            import re
-            # 1. Extract the second part (kernels)
-            match1 = re.search(r'ttx/([^/]+)/', path)
-            kf = match1.group(1) if match1 else None # kernels/firmwares
-
-            # 2. Extract the [0][0] associated with `core`
-            match2 = re.search(r'core_(\d+)_(\d+)', path)
-            core_ids = [int(ele) for ele in match2.groups()] if match2 else None # core_00_00
-
-            # 3. Extract the id `0`` associated with `neo``
-            match3 = re.search(r'neo_(\d+)', path)
-            neo_id = int(match3.group(1)) if match3 else None
-
-            # 4. Extract the id `2` associated with `thread`
-            match4 = re.findall(r'thread_(\d+)', path)
-            thread_ids = [int(ele) for ele in match4] if match4 else None
-
-            if thread_ids:
-                thread_ids = int(thread_ids[0]) if thread_ids.count(thread_ids[0]) == len(thread_ids) else None
-
-            return kf, core_ids, neo_id, thread_ids
-
+    def get_instruction_profile_from_elf_file(test, root_dir, debug_dir, instruction_set, flatten_dict):
         import os
+        profile = instruction_profile_matrix()
         test_dir = os.path.join(root_dir, debug_dir, test + "_0")
         if os.path.isdir(test_dir):
             ttx_dir = os.path.join(test_dir, "ttx")
-            os_walk = os.walk(ttx_dir)
-            for pwd, _, files in os_walk:
-                for file in files:
-                    if file.endswith(".elf"):
-                        file_name_incl_path = os.path.join(pwd, file)
-                        indices = get_indices_from_path(file_name_incl_path)
-                        kf        = indices[0]
-                        core_id0  = indices[1][0]
-                        core_id1  = indices[1][1]
-                        neo_id    = indices[2]
-                        thread_id = indices[3]
-
-                        elf_file_indices.ttx.append(kf)
-                        elf_file_indices.core_id0s.append(core_id0)
-                        elf_file_indices.core_id1s.append(core_id1)
-                        elf_file_indices.neo_ids.append(neo_id)
-                        elf_file_indices.thread_ids.append(thread_id)
-
-                        elf_files[kf].core[core_id0][core_id1].neo[neo_id].thread[thread_id] = read_elf.get_instruction_profile_from_elf_file(file_name_incl_path, sets = instruction_set, flatten_dict = flatten_dict)
-
-            elf_file_indices.ttx        = sorted(set(elf_file_indices.ttx))
-            elf_file_indices.core_id0s  = sorted(set(elf_file_indices.core_id0s))
-            elf_file_indices.core_id1s  = sorted(set(elf_file_indices.core_id1s))
-            elf_file_indices.neo_ids    = sorted(set(elf_file_indices.neo_ids))
-            elf_file_indices.thread_ids = sorted(set(elf_file_indices.thread_ids))
-
-            for ttx_name, core_id0, core_id1, neo_id, thread_id in itertools.product(elf_file_indices.ttx, elf_file_indices.core_id0s, elf_file_indices.core_id1s, elf_file_indices.neo_ids, elf_file_indices.thread_ids):
+            # kf, core ids, neo id and thread id of the ELF files from one scan of the test directory
+            elfs = test_layout_utils.get_layout(test_dir).get_elfs(ttx_dir)
+            elf_files = [elf.path for elf in elfs]
+
+            cache_file_name = get_profile_cache_file_name(profile_cache_dir, test_dir)
+            if profile_cache:
+                stamp = get_profile_cache_stamp(ttx_dir, elf_files, assembly_yaml, flatten_dict, instruction_profiler, profiler_version)
+                cached_profile = load_cached_profile(cache_file_name, stamp)
+                if cached_profile is not None:
+                    return cached_profile
+
+            for elf in elfs:
+                if "elf_utils" == instruction_profiler:
+                    instruction_profile = elf_utils.get_instruction_profile_from_elf_file(elf.path, sets = instruction_set, flatten_dict = flatten_dict, kinds = kinds)
+                else:
+                    instruction_profile = read_elf.get_instruction_profile_from_elf_file(elf.path, sets = instruction_set, flatten_dict = flatten_dict)
+                profile.add_profile(test, elf.kf, elf.core_ids[0], elf.core_ids[1], elf.neo_id, elf.thread_id, instruction_profile[0], is_kind)
+
+            profile.compact()
+            elf_files_set = set(elf_files)
+            indices = [profile.get_index_values(key) for key in [profile.TTX, profile.CORE_ID0, profile.CORE_ID1, profile.NEO_ID, profile.THREAD_ID]]
+            for ttx_name, core_id0, core_id1, neo_id, thread_id in itertools.product(*indices):
                 # ttx/kernels/core_00_00/neo_0/thread_0/out/thread_0.elf
                 elf_file_name = os.path.join(ttx_name, f"core_{core_id0:02d}_{core_id1:02d}", f"neo_{neo_id}", f"thread_{thread_id}", "out", f"thread_{thread_id}.elf")
                 elf_file_name_incl_path = os.path.join(ttx_dir, elf_file_name)
-                if not os.path.isfile(elf_file_name_incl_path):
+                if os.path.abspath(elf_file_name_incl_path) not in elf_files_set:
                     raise Exception(f"{elf_file_name_incl_path} does not exist!")
 
+            if profile_cache:
+                dump_cached_profile(cache_file_name, stamp, profile)
+
+        return profile
+
     def get_t3sim_test_status(test, path, status):
         import os
         log_file = os.path.join(path, f"{test}.t3sim_test.log")
@@ -343,25 +551,30 @@ def get_status(test_names, status_args):
                 status.status = "FAIL"
                 status.num_cycles = line
 
+    def is_kind(key):
+        return isinstance(key, read_elf.instructions.kind)
+
     instruction_set = get_instruction_set(assembly_yaml)
-    status_dict = dict()
+    kinds = {elf_utils.get_kind_name(kind) : kind for kind in read_elf.instructions.kind} # elf_utils profiles are keyed by kind names
+    profiler_version = get_instruction_profiler_version(instruction_profiler) if profile_cache else None
 
     if isinstance(test_names, str):
         test_names = [test_names]
 
     if isinstance(test_names, (list, tuple, set)):
         for test in test_names:
-            status_dict.update({test : test_status()})
-            status_dict[test].name = test
-            get_rtl_status_of_test(test, root_dir, debug_dir, sim_result_yml, test_dir_suffix, status_dict[test].rtl)
-            get_instruction_profile_from_elf_file(test, root_dir, debug_dir, status_dict[test].elf, status_dict[test].elf_file_indices, instruction_set, flatten_dict)
-            get_t3sim_test_status(test, t3sim_dir, status_dict[test].pm)
+            status = test_status()
+            status.name = test
+            if not profile_only:
+                get_rtl_status_of_test(test, root_dir, debug_dir, sim_result_yml, test_dir_suffix, status.rtl)
+            status.profile = get_instruction_profile_from_elf_file(test, root_dir, debug_dir, instruction_set, flatten_dict)
+            if not profile_only:
+                get_t3sim_test_status(test, t3sim_dir, status.pm)
+            yield status
     else:
         msg = f"- error: no method defined to determine the status for test names of type {type(test_names)}"
         raise Exception(msg)
 
-    return status_dict
-
 def check_status(status):
     def check_rtl_test_status(rtl_status):
         if None == test_status.rtl.status:
@@ -478,7 +691,6 @@ def write_failure_types(file_to_read):
 
 def write_s_curve(file_to_read):
     import polars
-    import matplotlib.pyplot as plt
 
     data = polars.read_csv(file_to_read)
     num_tests = data.shape[0]
@@ -496,71 +708,37 @@ def write_s_curve(file_to_read):
     with polars.Config(set_float_precision=2, tbl_rows=len(result), fmt_str_lengths=max_col_width, tbl_cell_numeric_alignment="RIGHT"):
         print(result)
 
-    # Convert columns to lists for plotting
-    x = result["Test"].to_list()  # Categories for x-axis
-    y = result["Perf comparison"].to_list()  # Numerical values for y-axis
-    x = [f"{x[idx]} ({y[idx]:.2f})" for idx in range(len(x))]
-    num_10pc = len([ele for ele in y if abs(ele - 1.0) <= 0.1])
-    num_20pc = len([ele for ele in y if abs(ele - 1.0) <= 0.2])
-    num_30pc = len([ele for ele in y if abs(ele - 1.0) <= 0.3])
-
-    # Create the plot
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.plot(x, y, color = "black", linewidth = 1, alpha = 0.5)
-    ax.scatter(x, y, alpha = 0.5)
-
-    # Highlight the region 0.9 to 1.1 slightly darker
-    ax.axhspan(0.7, 1.3, color="gray", alpha=0.05, label=f"+/- 30% ({num_30pc}/{num_tests} tests, {((num_30pc/num_tests)*100):.0f}%)")
-
-    # Highlight the region 0.9 to 1.1 slightly darker
-    ax.axhspan(0.8, 1.2, color="gray", alpha=0.1,  label=f"+/- 20% ({num_20pc}/{num_tests} tests, {((num_20pc/num_tests)*100):.0f}%)")
-
-    # Highlight the region 0.9 to 1.1 slightly darker
-    ax.axhspan(0.9, 1.1, color="gray", alpha=0.2,  label=f"+/- 10% ({num_10pc}/{num_tests} tests, {((num_10pc/num_tests)*100):.0f}%)")
-
-    # Labels and title
-    ax.set_xlabel("Tests")
-    ax.set_ylabel("Perf comparison (PM/RTL)")
-    # ax.set_title("col1 vs col5 Plot")
-    ax.tick_params(axis='x', labelrotation=90, labelsize = 6)
-
-
-    # Show legend
-    ax.legend()
-
-    # Save plot as an SVG file with no extra white space
-    plt.savefig(f"s_curve_{file_to_read}.svg", format="svg", bbox_inches="tight")
-    plt.savefig(f"s_curve_{file_to_read}.png", format="png", bbox_inches="tight")
+    plot_utils.plot_s_curve(list(zip(result["Test"].to_list(), result["Perf comparison"].to_list())), f"s_curve_{file_to_read}")
 
     print("- end of s curve")
 
 def write_status_to_csv(status, file_to_write):
-    def get_instructions_from_profile(instruction_profile, instructions):
-        if all(isinstance(ele, read_elf.instructions.kind) for ele in instruction_profile.keys()):
-            for instr_kind, num_instrs in instruction_profile.items():
-                if instr_kind not in instructions.keys():
-                    instructions.update({instr_kind : set()})
+    def get_statuses(profile_only = False):
+        return (status[test_name] for test_name in sorted(status.keys()))
 
-                for instr in num_instrs.keys():
-                    instructions[instr_kind].add(instr)
+    write_statuses_to_csv(get_statuses, file_to_write)
 
-        else:
-            for value in instruction_profile.values():
-                if isinstance(value, dict):
-                    get_instructions_from_profile(value, instructions)
+def write_status_to_csv_streaming(test_names, status_args, file_to_write):
+    # same files as write_status_to_csv(get_status(test_names, status_args), file_to_write), but with one test
+    # in memory at a time. the profiles are cached (profile_cache_dir), so the second pass does not read them again.
+    status_args = dict(status_args)
+    if "profile_cache" not in status_args.keys():
+        status_args["profile_cache"] = True
 
-    def get_instructions(status):
+    def get_statuses(profile_only = False):
+        return iter_status(sorted(test_names), status_args, profile_only = profile_only)
 
-        instructions = dict()
-        # instructions.update({read_elf.instructions.kind.ttqs : set()})
-        # instructions.update({read_elf.instructions.kind.rv32 : set()})
-        # todo: write a get_kinds function.
+    write_statuses_to_csv(get_statuses, file_to_write)
 
-        for test_status in status.values():
-            elf_file_indices = test_status.elf_file_indices
-            for ttx_name, core_id0, core_id1, neo_id, thread_id in itertools.product(elf_file_indices.ttx, elf_file_indices.core_id0s, elf_file_indices.core_id1s, elf_file_indices.neo_ids, elf_file_indices.thread_ids):
-                ip = test_status.elf[ttx_name].core[core_id0][core_id1].neo[neo_id].thread[thread_id]
-                get_instructions_from_profile(ip[0], instructions)
+def write_statuses_to_csv(get_statuses, file_to_write):
+    # get_statuses(profile_only) returns an iterable of test_status sorted by test name. it is iterated twice:
+    # pass one collects the instruction names (the header), pass two writes the rows of one test at a time.
+    def get_instructions(get_statuses):
+        instructions = dict()
+        for test_status in get_statuses(profile_only = True):
+            profile = test_status.profile
+            for kind_id, mnemonic in profile.columns:
+                instructions.setdefault(profile.kinds[kind_id], set()).add(mnemonic)
 
         msg = ''
         for kind, instructions_list in instructions.items():
@@ -576,56 +754,51 @@ def write_status_to_csv(status, file_to_write):
             for instr in instruction_set:
                 instruction_list.append(f"{kind}:{instr}")
 
-        return sorted(instruction_list)
+        return sorted(instruction_list), list(instructions.keys())
 
-    def get_test_class(test):
+    def get_test_classifier():
         classes = {}
         classes['datacopy'.upper()] = {'datacopy'}
         classes['eltw'.upper()]     = {'elwmul', 'elwadd', 'elwsub'}
         classes['matmul'.upper()]   = {'matmul'}
         classes['pck'.upper()]      = {'pck'}
         classes['reduce'.upper()]   = {'reduce'}
-        classes['sfpu'.upper()]     = {'lrelu', 'tanh', 'sqrt', 'exp', 'recip', 'relu'}
+        classes['sfpu'.upper()]     = {'lrelu', 'tanh', 'sqrt', 'exp', 'recip', 'relu', 'cast'} # as status_utils.get_test_classes
         classes['upk'.upper()]      = {'upk'}
 
         # fields = test.split("-")
         # test_bin = fields[5] if fields[4].startswith("fp") else fields[4]
         # test_class = "SFPU" if test_bin in sfpu_bins else "ELTW" if test_bin in elw_bins else test_bin.upper()
 
-        test_words = test.split("-")
-
-        test_class = None
-        for key, values in classes.items():
-            for value in values:
-                if value in test_words:
-                    test_class = key
+        return classifier_utils.test_classifier(classes)
 
+    def get_test_class(test):
+        test_class = test_classifier.classify(test)
         if not test_class:
             raise Exception(f"- error: could not determine test class for {test}")
 
         return test_class
 
-    def get_failure_class(test_name, msg):
-        bins = {'attribs', 'Too many resources', 'Timeout', 'register', 'KeyboardInterrupt', 'has no attribute', 'Replay', 'Semaphore', "object cannot be interpreted as an integer", "Zero Dst expected", "TypeError: unsupported operand type(s) for &"}
-        print("get_failure_class: ", test_name, msg, type(msg))
-        for b in bins:
-            if b in msg:
-                return b
-
-        raise Exception(f"- error: could not find failure class from message: {msg} for test {test_name}")
-
-    def get_instruction_kinds(status):
-        instruction_kinds = set()
-        for test_status in status.values():
-            instruction_kinds.update(test_status.get_instruction_kinds())
+    def get_failure_classifier():
+        bins = ['attribs', 'Too many resources', 'Timeout', 'register', 'KeyboardInterrupt', 'has no attribute', 'Replay', 'Semaphore', "object cannot be interpreted as an integer", "Zero Dst expected", "TypeError: unsupported operand type(s) for &"]
+        return classifier_utils.failure_classifier([[b] for b in bins])
 
-        return instruction_kinds
+    def get_failure_class(test_name, msg):
+        # failures that match no bin are binned by their signature instead of stopping the report.
+        return failure_classifier.classify_with_signature(msg)
 
-    instructions = get_instructions(status)
-    instruction_kinds = get_instruction_kinds(status)
+    test_classifier = get_test_classifier()
+    failure_classifier = get_failure_classifier()
+    instructions, instruction_kinds = get_instructions(get_statuses)
+    instruction_positions = {name : idx for idx, name in enumerate(instructions)}
 
     import csv
-    with open(file_to_write, mode='w', newline='', encoding='utf-8') as file:
+    summary_file_to_write = os.path.join(os.path.dirname(file_to_write), "summary_" + os.path.basename(file_to_write))
+    test_class_dict = dict()
+    class_tests_dict = dict()
+    test_results_dict = dict()
+    class_num_instructions = dict()
+    with open(file_to_write, mode='w', newline='', encoding='utf-8') as file, open(summary_file_to_write, mode='w', newline='', encoding='utf-8') as summary_file:
         writer = csv.writer(file)
         header = []
         header.append("Test ID")
@@ -642,64 +815,8 @@ def write_status_to_csv(status, file_to_write):
         header.append("PM number of cycles")
         header.extend(instructions)
         writer.writerow(header)
-        for test_id, test_name in enumerate(sorted(status.keys())):
-            test_status = status[test_name]
-            elf_file_indices = test_status.elf_file_indices
-            for ttx_name, core_id0, core_id1, neo_id, thread_id in itertools.product(elf_file_indices.ttx, elf_file_indices.core_id0s, elf_file_indices.core_id1s, elf_file_indices.neo_ids, elf_file_indices.thread_ids):
-                ip = test_status.elf[ttx_name].core[core_id0][core_id1].neo[neo_id].thread[thread_id]
-                functions = sorted(ip[0].keys())
-                for function in functions: # assumes flatten_dict is False
-                    instruction_profile = ip[0][function]
-                    row = []
-                    row.append(test_id)
-                    row.append(test_status.name)
-                    row.append(ttx_name)
-                    row.append(core_id0)
-                    row.append(core_id1)
-                    row.append(neo_id)
-                    row.append(thread_id)
-                    row.append(function)
-                    row.append(test_status.rtl.status)
-                    row.append(test_status.rtl.num_cycles)
-                    row.append(test_status.pm.status)
-                    row.append(test_status.pm.num_cycles)
-                    num_instructions = dict()
-                    for instr in instructions:
-                        num_instructions.update({instr : None})
-
-                    for kind, num_instrs in instruction_profile.items():
-                        for mnemonic, num_instr in num_instrs.items():
-                            instr = f"{kind}:{mnemonic}"
-                            if not instr in num_instructions.keys():
-                                raise Exception(f"- error: could not find {instr} in instructions list")
-
-                            num_instructions[instr] = num_instr[0]
-
-                    row.extend(list(num_instructions.values()))
-                    writer.writerow(row)
-
-    test_class_dict = dict()
-    class_tests_dict = dict()
-    for test_name in status.keys():
-        test_class = get_test_class(test_name)
-        test_class_dict[test_name] = test_class
-        if test_class not in class_tests_dict.keys():
-            class_tests_dict[test_class] = []
-        class_tests_dict[test_class].append(test_name)
-    max_test_class_str_len = len(max(class_tests_dict.keys(), key = len))
-    max_test_name_str_len = len(max(status.keys(), key = len))
-    for tclass in sorted(class_tests_dict.keys()):
-        print(f"+ test class: {tclass}")
-        for ele in sorted(class_tests_dict[tclass]):
-            msg = f"  + {ele:<{max_test_name_str_len}}: RTL: {status[ele].rtl.status}, PM: {status[ele].pm.status}"
-            if "FAIL" in (status[ele].pm.status, status[ele].rtl.status):
-                print(f"{bcolors.FAIL}{msg}{bcolors.ENDC}")
-            else:
-                print(msg)
 
-    summary_file_to_write = "summary_" + file_to_write
-    with open(summary_file_to_write, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
+        summary_writer = csv.writer(summary_file)
         header = []
         header.append("Test ID")
         header.append("Test class")
@@ -713,14 +830,50 @@ def write_status_to_csv(status, file_to_write):
         for kind in instruction_kinds:
             header.append(f"Number of instructions of kind {kind}")
 
-        writer.writerow(header)
+        summary_writer.writerow(header)
+
+        # one list of counts reused for all rows, only the entries of a row are set and reset.
+        num_instructions = [None] * len(instructions)
+        for test_id, test_status in enumerate(get_statuses()):
+            test_name = test_status.name
+            profile = test_status.profile
+            positions = [instruction_positions[name] for name in profile.get_column_names()]
+            for ttx_name, core_id0, core_id1, neo_id, thread_id, function, column_ids, counts in profile.get_rows():
+                row = []
+                row.append(test_id)
+                row.append(test_name)
+                row.append(ttx_name)
+                row.append(core_id0)
+                row.append(core_id1)
+                row.append(neo_id)
+                row.append(thread_id)
+                row.append(function)
+                row.append(test_status.rtl.status)
+                row.append(test_status.rtl.num_cycles)
+                row.append(test_status.pm.status)
+                row.append(test_status.pm.num_cycles)
+                row_positions = [positions[column_id] for column_id in column_ids.tolist()]
+                for position, count in zip(row_positions, counts.tolist()):
+                    num_instructions[position] = count
+
+                writer.writerow(itertools.chain(row, num_instructions))
+                for position in row_positions:
+                    num_instructions[position] = None
+
+            test_class = get_test_class(test_name)
+            test_class_dict[test_name] = test_class
+            class_tests_dict.setdefault(test_class, []).append(test_name)
+            test_results_dict[test_name] = (test_status.rtl.status, test_status.pm.status)
+
+            test_num_instructions = test_status.get_num_instructions()
+            for kind, num in test_num_instructions.items():
+                class_num_instructions.setdefault(test_class, dict())
+                class_num_instructions[test_class][kind] = class_num_instructions[test_class].get(kind, 0) + num
 
-        for test_id, test_name in enumerate(sorted(status.keys())):
-            test_status = status[test_name]
             row = []
             row.append(test_id)
-            row.append(test_class_dict[test_name])
-            row.append(test_status.name)
+            row.append(test_class)
+            row.append(test_name)
             row.append(test_status.rtl.status)
             row.append(test_status.rtl.num_cycles)
             row.append(test_status.pm.status)
@@ -732,11 +885,25 @@ def write_status_to_csv(status, file_to_write):
 
             row.append(None if isinstance(test_status.pm.num_cycles, (int, float)) else get_failure_class(test_status.name, test_status.pm.num_cycles))
 
-            num_instructions = test_status.get_num_instructions()
             for kind in instruction_kinds:
-                row.append(num_instructions[kind])
+                row.append(test_num_instructions.get(kind, 0))
+
+            summary_writer.writerow(row)
+
+    max_test_class_str_len = len(max(class_tests_dict.keys(), key = len))
+    max_test_name_str_len = len(max(test_class_dict.keys(), key = len))
+    for tclass in sorted(class_tests_dict.keys()):
+        print(f"+ test class: {tclass}")
+        for ele in sorted(class_tests_dict[tclass]):
+            rtl_status, pm_status = test_results_dict[ele]
+            msg = f"  + {ele:<{max_test_name_str_len}}: RTL: {rtl_status}, PM: {pm_status}"
+            if "FAIL" in (pm_status, rtl_status):
+                print(f"{bcolors.FAIL}{msg}{bcolors.ENDC}")
+            else:
+                print(msg)
 
-            writer.writerow(row)
+    for tclass in sorted(class_num_instructions.keys()):
+        print(f"+ number of instructions of test class {tclass:<{max_test_class_str_len}}: {', '.join(f'{kind}: {num}' for kind, num in class_num_instructions[tclass].items())}")
 
 def get_elf_files(status, root_dir = None, debug_dir = "rsim/debug", test_dir_suffix = "_0", ttx_dir = "ttx"):
     def get_root_dir(root_dir):